@@ -24,4 +24,5 @@ setuptools.setup(
     package_dir={"": "src"},
     packages=setuptools.find_packages(where="src"),
     install_requires=["tqdm", "requests", "torch", "numpy", "PyGithub", "matplotlib"],
+    entry_points={"console_scripts": ["medigan=medigan.__main__:main"]},
 )
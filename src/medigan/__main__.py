@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" Command line interface of medigan.
+
+Run e.g. `python -m medigan serve --model_ids 00001 --port 8100` to start a local generation server, or
+`python -m medigan jobs submit 00001 1000` and `python -m medigan jobs work` to queue and run generation jobs.
+"""
+
+# Import python native libs
+from __future__ import absolute_import
+
+import argparse
+import json
+import logging
+
+# Import library internal modules
+from .config_manager import ConfigManager
+from .constants import (
+    DEFAULT_JOB_DATABASE,
+    DEFAULT_JOB_MAX_ATTEMPTS,
+    DEFAULT_SERVER_MAX_BATCH_SIZE,
+    DEFAULT_SERVER_MAX_WAIT_SECONDS,
+    DEFAULT_SERVER_PORT,
+)
+from .generation_server import GenerationServer
+from .generators import Generators
+from .jobs import JobQueue, JobWorker
+
+
+def parse_args(args: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="medigan", description="medigan")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Start a local HTTP server that keeps models warm and batches concurrent generation requests",
+    )
+    serve_parser.add_argument(
+        "--model_ids",
+        type=str,
+        default=[],
+        nargs="+",
+        help="Model ids that are imported at startup. Other models are imported on their first request.",
+    )
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_SERVER_PORT,
+        help="Port of the server",
+    )
+    serve_parser.add_argument(
+        "--address",
+        type=str,
+        default="127.0.0.1",
+        help="Address the server binds to",
+    )
+    serve_parser.add_argument(
+        "--max_batch_size",
+        type=int,
+        default=DEFAULT_SERVER_MAX_BATCH_SIZE,
+        help="Maximum number of samples of concurrent requests that are generated in one generate call",
+    )
+    serve_parser.add_argument(
+        "--max_wait_ms",
+        type=float,
+        default=DEFAULT_SERVER_MAX_WAIT_SECONDS * 1000,
+        help="Maximum time in milliseconds to wait for further requests to add to a batch",
+    )
+    serve_parser.add_argument(
+        "--config",
+        type=str,
+        default=None,
+        help="JSON file with model configs (in the format of global.json) to use instead of the medigan config",
+    )
+    serve_parser.add_argument(
+        "--install_dependencies",
+        action="store_true",
+        help="Automatically install the dependencies of the models",
+    )
+    jobs_parser = subparsers.add_parser(
+        "jobs", help="Submit, run, and monitor queued generation jobs"
+    )
+    jobs_parser.add_argument(
+        "--database",
+        type=str,
+        default=DEFAULT_JOB_DATABASE,
+        help="SQLite file of the job queue",
+    )
+    jobs_subparsers = jobs_parser.add_subparsers(dest="jobs_command", required=True)
+    submit_parser = jobs_subparsers.add_parser("submit", help="Add a generation job")
+    submit_parser.add_argument("model_id", type=str, help="Id of the model")
+    submit_parser.add_argument(
+        "num_samples", type=int, help="Number of samples to generate"
+    )
+    submit_parser.add_argument(
+        "--priority",
+        type=int,
+        default=0,
+        help="Priority of the job. Jobs with higher priority are run first.",
+    )
+    submit_parser.add_argument(
+        "--max_attempts",
+        type=int,
+        default=DEFAULT_JOB_MAX_ATTEMPTS,
+        help="Number of times the job is run before it is marked as failed",
+    )
+    submit_parser.add_argument(
+        "--output_path",
+        type=str,
+        default=None,
+        help="Output folder of the job",
+    )
+    submit_parser.add_argument(
+        "--kwargs",
+        type=json.loads,
+        default={},
+        help="JSON object of further arguments of the generate function, e.g. '{\"batch_size\": 16}'",
+    )
+    work_parser = jobs_subparsers.add_parser(
+        "work", help="Run queued jobs until the queue is empty"
+    )
+    work_parser.add_argument(
+        "--max_jobs",
+        type=int,
+        default=None,
+        help="Maximum number of jobs to run",
+    )
+    work_parser.add_argument(
+        "--wait",
+        action="store_true",
+        help="Wait for new jobs instead of returning when the queue is empty",
+    )
+    work_parser.add_argument(
+        "--install_dependencies",
+        action="store_true",
+        help="Automatically install the dependencies of the models",
+    )
+    jobs_subparsers.add_parser("status", help="Print the jobs and their progress")
+    return parser.parse_args(args)
+
+
+def run_jobs_command(args: argparse.Namespace):
+    job_queue = JobQueue(database_path=args.database)
+    if args.jobs_command == "submit":
+        job_id = job_queue.submit(
+            model_id=args.model_id,
+            num_samples=args.num_samples,
+            priority=args.priority,
+            max_attempts=args.max_attempts,
+            output_path=args.output_path,
+            **args.kwargs,
+        )
+        print(job_id)
+    elif args.jobs_command == "work":
+        JobWorker(
+            job_queue=job_queue, install_dependencies=args.install_dependencies
+        ).run(max_jobs=args.max_jobs, is_waiting_for_jobs=args.wait)
+    elif args.jobs_command == "status":
+        for job in job_queue.get_jobs():
+            print(
+                f"{job['job_id']}\t{job['model_id']}\t{job['status']}\t"
+                f"{job['num_completed_samples']}/{job['num_samples']}\t"
+                f"priority={job['priority']}\tattempts={job['attempts']}/{job['max_attempts']}\t"
+                f"{job['error'] or ''}"
+            )
+        print(json.dumps(job_queue.get_progress()))
+
+
+def main(args: list = None):
+    args = parse_args(args)
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "serve":
+        config_manager = None
+        if args.config is not None:
+            with open(args.config) as f:
+                config_manager = ConfigManager(config_dict=json.load(f))
+        server = GenerationServer(
+            generators=Generators(config_manager=config_manager),
+            max_batch_size=args.max_batch_size,
+            max_wait_seconds=args.max_wait_ms / 1000,
+            install_dependencies=args.install_dependencies,
+        )
+        for model_id in args.model_ids:
+            server.get_batcher(model_id)
+        server.serve_forever(port=args.port, address=args.address)
+    elif args.command == "jobs":
+        run_jobs_command(args)
+
+
+if __name__ == "__main__":
+    main()
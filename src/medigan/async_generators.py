@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" `AsyncGenerators` class providing an asyncio API of `Generators` for async applications such as web services.
+
+For example, the downloads of several models are overlapped and samples are generated without blocking the event loop:
+
+    async with AsyncGenerators() as async_generators:
+        await async_generators.aprefetch(model_ids=["00001", "00002"])
+        samples = await async_generators.agenerate(model_id="00001", num_samples=4, save_images=False, timeout=60)
+"""
+
+# Import python native libs
+from __future__ import absolute_import
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from pathlib import Path
+
+# Import library internal modules
+from .constants import (
+    CONFIG_FILE_KEY_EXECUTION,
+    CONFIG_FILE_KEY_MODEL_EXTENSION,
+    CONFIG_FILE_KEY_MODEL_NAME,
+    CONFIG_FILE_KEY_PACKAGE_LINK,
+    CONFIG_FILE_KEY_PACKAGE_NAME,
+    DEFAULT_ASYNC_COMPUTE_WORKERS,
+    DEFAULT_ASYNC_DOWNLOAD_WORKERS,
+    MODEL_FOLDER,
+    PACKAGE_EXTENSION,
+)
+from .execute_model.model_executor import ModelExecutor
+from .generators import Generators
+from .utils import Utils
+
+
+class AsyncGenerators:
+    """`AsyncGenerators` class: Awaitable model downloads, model initialization, and sample generation.
+
+    Model package downloads run on a pool of download threads, hence the downloads of several models overlap with each
+    other and with sample generation. Model imports and generate calls run on the compute `executor`. All methods
+    accept a `timeout` in seconds and can be cancelled like any asyncio task. A cancelled download is stopped and its
+    partially downloaded file is removed. A generate call that has already started cannot be interrupted and finishes
+    in the background, while a queued generate call is not started.
+
+    Parameters
+    ----------
+    generators: Generators
+        the `Generators` instance whose config and model executors are used. If None, a `Generators` instance is
+        initialized.
+    executor: Executor
+        the executor running model imports and generate calls. If None, a thread pool with
+        `DEFAULT_ASYNC_COMPUTE_WORKERS` threads is used.
+    max_concurrent_downloads: int
+        the maximum number of model packages that are downloaded at the same time
+    install_dependencies: bool
+        flag indicating whether a generative model's dependencies are automatically installed
+
+    Attributes
+    ----------
+    generators: Generators
+        the `Generators` instance whose config and model executors are used
+    """
+
+    def __init__(
+        self,
+        generators: Generators = None,
+        executor: Executor = None,
+        max_concurrent_downloads: int = DEFAULT_ASYNC_DOWNLOAD_WORKERS,
+        install_dependencies: bool = False,
+    ):
+        self.generators = Generators() if generators is None else generators
+        self._is_executor_owned = executor is None
+        self.executor = (
+            ThreadPoolExecutor(
+                max_workers=DEFAULT_ASYNC_COMPUTE_WORKERS,
+                thread_name_prefix="medigan-compute",
+            )
+            if executor is None
+            else executor
+        )
+        self._download_executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_downloads, thread_name_prefix="medigan-download"
+        )
+        self.install_dependencies = install_dependencies
+        # One lock per model id, so that concurrent requests for a model download and import it only once.
+        self._locks = {}
+        # The futures submitted to the download executor and the owned compute executor, which `close` cancels.
+        self._futures = set()
+        self._futures_lock = threading.Lock()
+
+    def _get_lock(self, model_id: str) -> asyncio.Lock:
+        if model_id not in self._locks:
+            self._locks[model_id] = asyncio.Lock()
+        return self._locks[model_id]
+
+    def _forget_future(self, future: Future):
+        with self._futures_lock:
+            self._futures.discard(future)
+
+    async def _run_in_executor(self, executor: Executor, function, **kwargs):
+        """Await `function(**kwargs)` on `executor`, keeping its future for `close` if it runs on an owned executor."""
+
+        future = executor.submit(functools.partial(function, **kwargs))
+        if executor is self._download_executor or self._is_executor_owned:
+            with self._futures_lock:
+                self._futures.add(future)
+            future.add_done_callback(self._forget_future)
+        return await asyncio.wrap_future(future)
+
+    @staticmethod
+    def _download_package(
+        model_id: str, execution_config: dict, cancel_event: threading.Event
+    ) -> Path:
+        """Download the model package archive unless it (or its unpacked content) is already in the model folder."""
+
+        package_name = execution_config[CONFIG_FILE_KEY_PACKAGE_NAME]
+        weights_file_name = f"{execution_config[CONFIG_FILE_KEY_MODEL_NAME]}{execution_config[CONFIG_FILE_KEY_MODEL_EXTENSION]}"
+        # The same locations as checked by `ModelExecutor.is_model_already_unpacked`.
+        for unpacked_weights_path in [
+            Path(f"{MODEL_FOLDER}/{model_id}/{package_name}/{weights_file_name}"),
+            Path(f"{MODEL_FOLDER}/{model_id}/{weights_file_name}"),
+        ]:
+            if unpacked_weights_path.is_file():
+                return unpacked_weights_path
+        assert Utils.mkdirs(
+            path_as_string=f"{MODEL_FOLDER}/{model_id}"
+        ), f"{model_id}: The model folder was not found nor created in {MODEL_FOLDER}/{model_id}."
+        package_path = Path(
+            f"{MODEL_FOLDER}/{model_id}/{package_name}{PACKAGE_EXTENSION}"
+        )
+        package_link = execution_config[CONFIG_FILE_KEY_PACKAGE_LINK]
+        if not package_path.is_file():
+            if Utils.is_url_valid(the_url=package_link):
+                Utils.download_file(
+                    download_link=package_link,
+                    path_as_string=package_path,
+                    cancel_event=cancel_event,
+                )
+            else:
+                Utils.is_file_located_or_downloaded(
+                    path_as_string=package_path, download_link=package_link
+                )
+        return package_path
+
+    async def _aprefetch_model(self, model_id: str) -> Path:
+        model_id = self.generators.config_manager.match_model_id(
+            provided_model_id=model_id
+        )
+        execution_config = self.generators.config_manager.get_config_by_id(
+            model_id=model_id, config_key=CONFIG_FILE_KEY_EXECUTION
+        )
+        cancel_event = threading.Event()
+        try:
+            return await self._run_in_executor(
+                self._download_executor,
+                self._download_package,
+                model_id=model_id,
+                execution_config=execution_config,
+                cancel_event=cancel_event,
+            )
+        except asyncio.CancelledError:
+            # Stop the download thread, which would otherwise continue after the task has been cancelled.
+            cancel_event.set()
+            raise
+
+    async def aprefetch(self, model_ids: list, timeout: float = None) -> list:
+        """Download the packages of the models concurrently without importing the models.
+
+        Parameters
+        ----------
+        model_ids: list
+            the ids of the models whose packages are downloaded
+        timeout: float
+            the time in seconds after which the downloads are cancelled and an `asyncio.TimeoutError` is raised
+
+        Returns
+        -------
+        list
+            the paths to the model packages (or to the model weights, if the packages are already unpacked)
+        """
+
+        async def prefetch_model(model_id: str) -> Path:
+            async with self._get_lock(model_id):
+                return await self._aprefetch_model(model_id)
+
+        return await asyncio.wait_for(
+            asyncio.gather(*[prefetch_model(model_id) for model_id in model_ids]),
+            timeout=timeout,
+        )
+
+    async def aget_model_executor(
+        self, model_id: str, timeout: float = None
+    ) -> ModelExecutor:
+        """Return the `ModelExecutor` of `model_id`, downloading and importing the model if needed.
+
+        Parameters
+        ----------
+        model_id: str
+            The generative model's unique id
+        timeout: float
+            the time in seconds after which an `asyncio.TimeoutError` is raised
+
+        Returns
+        -------
+        ModelExecutor
+            `ModelExecutor` class instance corresponding to the `model_id`
+        """
+
+        async def get_model_executor() -> ModelExecutor:
+            async with self._get_lock(model_id):
+                model_executor = self.generators.find_model_executor_by_id(
+                    model_id=model_id
+                )
+                if model_executor is not None:
+                    return model_executor
+                await self._aprefetch_model(model_id)
+                return await self._run_in_executor(
+                    self.executor,
+                    self.generators.get_model_executor,
+                    model_id=model_id,
+                    install_dependencies=self.install_dependencies,
+                )
+
+        return await asyncio.wait_for(get_model_executor(), timeout=timeout)
+
+    async def agenerate(
+        self,
+        model_id: str,
+        num_samples: int = 30,
+        output_path: str = None,
+        save_images: bool = True,
+        timeout: float = None,
+        **kwargs,
+    ):
+        """Generate samples with the model corresponding to the `model_id` without blocking the event loop.
+
+        Parameters
+        ----------
+        model_id: str
+            The generative model's unique id
+        num_samples: int
+            the number of samples that will be generated
+        output_path: str
+            the path as str to the output folder where the generated samples will be stored
+        save_images: bool
+            flag indicating whether generated samples are returned (i.e. as list of numpy arrays) or rather stored in file system (i.e in `output_path`)
+        timeout: float
+            the time in seconds (including download and import of the model) after which an `asyncio.TimeoutError` is
+            raised
+        **kwargs
+            arbitrary number of keyword arguments passed to `ModelExecutor.generate`
+
+        Returns
+        -------
+        list
+            Returns images as list of numpy arrays if `save_images` is False.
+        """
+
+        async def generate():
+            model_executor = await self.aget_model_executor(model_id=model_id)
+            return await self._run_in_executor(
+                self.executor,
+                model_executor.generate,
+                num_samples=num_samples,
+                output_path=output_path,
+                save_images=save_images,
+                **kwargs,
+            )
+
+        return await asyncio.wait_for(generate(), timeout=timeout)
+
+    def close(self):
+        """Shut down the download threads and, if created by this instance, the compute executor.
+
+        Queued downloads, model imports, and generate calls are cancelled, while running ones finish in the background.
+        """
+
+        # The futures are cancelled here, as `shutdown(cancel_futures=True)` requires python 3.9.
+        with self._futures_lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+        self._download_executor.shutdown(wait=False)
+        if self._is_executor_owned:
+            self.executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return (
+            f"AsyncGenerators(generators={self.generators}, executor={self.executor})"
+        )
@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" `ModelBenchmark` class and command line interface measuring the generation performance of medigan models.
+
+Run e.g. `python -m medigan.benchmark --model_ids 00001 00002 --batch_sizes 1 8 32 --output results.json`.
+"""
+
+# Import python native libs
+from __future__ import absolute_import
+
+import argparse
+import json
+import logging
+import platform
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+# Import pypi libs
+import numpy as np
+
+# Import library internal modules
+from .config_manager import ConfigManager
+from .constants import (
+    CONFIG_FILE_KEY_EXECUTION,
+    DEFAULT_BENCHMARK_BATCH_SIZES,
+    DEFAULT_BENCHMARK_NUM_BATCHES,
+    DEFAULT_BENCHMARK_RESULTS_FILE,
+)
+from .execute_model.model_executor import ModelExecutor
+from .utils import Utils
+
+
+class ModelBenchmark:
+    """`ModelBenchmark` class: Measures the time and memory needed by generative models to generate samples.
+
+    For each model, the benchmark measures the time to download (if not yet cached) and import the model package, the
+    time to first sample, the extra latency of the first generate call (i.e. loading the weights and e.g. initializing
+    CUDA), the latency distribution and throughput of the generate calls per batch size, and the peak memory. The
+    results contain the medigan, python, and platform versions so that they can be compared across versions via
+    `compare`. Note that the peak resident set size (RSS) is that of the whole process, hence models are best
+    benchmarked one per process if their memory is compared. The peak RSS per batch size is only measured on Linux,
+    where it can be reset, and else None.
+
+    Parameters
+    ----------
+    config_manager: ConfigManager
+        Provides the execution configs of the benchmarked models. If None, a `ConfigManager` is initialized.
+    batch_sizes: list
+        the batch sizes for which the latency and throughput of the generate calls are measured
+    num_batches: int
+        the number of timed generate calls per batch size
+    num_warmup_batches: int
+        the number of untimed generate calls per batch size before the timed calls
+    install_dependencies: bool
+        flag indicating whether a generative model's dependencies are automatically installed
+
+    Attributes
+    ----------
+    results: dict
+        the results of the models benchmarked so far by model id
+    """
+
+    def __init__(
+        self,
+        config_manager: ConfigManager = None,
+        batch_sizes: list = None,
+        num_batches: int = DEFAULT_BENCHMARK_NUM_BATCHES,
+        num_warmup_batches: int = 1,
+        install_dependencies: bool = False,
+    ):
+        self.config_manager = (
+            ConfigManager() if config_manager is None else config_manager
+        )
+        self.batch_sizes = (
+            DEFAULT_BENCHMARK_BATCH_SIZES if batch_sizes is None else batch_sizes
+        )
+        self.num_batches = num_batches
+        self.num_warmup_batches = num_warmup_batches
+        self.install_dependencies = install_dependencies
+        self.results = {}
+
+    @staticmethod
+    def get_latency_summary(latencies: list) -> dict:
+        """Return the mean, standard deviation, minimum, maximum, and percentiles of `latencies` in seconds."""
+
+        latencies = np.asarray(latencies, dtype=np.float64)
+        return {
+            "mean": float(latencies.mean()),
+            "std": float(latencies.std()),
+            "min": float(latencies.min()),
+            "p50": float(np.percentile(latencies, 50)),
+            "p90": float(np.percentile(latencies, 90)),
+            "p99": float(np.percentile(latencies, 99)),
+            "max": float(latencies.max()),
+        }
+
+    @staticmethod
+    def get_environment() -> dict:
+        """Return the medigan, python, numpy, and (if installed) torch versions and the platform of this process."""
+
+        try:
+            from importlib.metadata import version
+
+            medigan_version = version("medigan")
+        except Exception:
+            # medigan is e.g. imported from the source tree and not installed as package.
+            medigan_version = None
+        environment = {
+            "medigan_version": medigan_version,
+            "python_version": platform.python_version(),
+            "numpy_version": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        }
+        try:
+            import torch
+
+            environment.update(
+                torch_version=torch.__version__,
+                cuda_device=torch.cuda.get_device_name()
+                if torch.cuda.is_available()
+                else None,
+            )
+        except ImportError:
+            logging.debug("torch not installed. Its version is not recorded.")
+        return environment
+
+    @staticmethod
+    def _reset_cuda_peak_memory():
+        try:
+            import torch
+
+            if torch.cuda.is_available():
+                torch.cuda.reset_peak_memory_stats()
+        except ImportError:
+            pass
+
+    @staticmethod
+    def _get_cuda_peak_memory_mb() -> float:
+        try:
+            import torch
+
+            if torch.cuda.is_available():
+                return torch.cuda.max_memory_allocated() / 1024**2
+        except ImportError:
+            pass
+        return None
+
+    def benchmark_model(
+        self,
+        model_id: str,
+        execution_config: dict = None,
+        seed: int = 0,
+        **kwargs,
+    ) -> dict:
+        """Benchmark the generation of the model `model_id` and return its results.
+
+        Parameters
+        ----------
+        model_id: str
+            The generative model's unique id
+        execution_config: dict
+            the part of the model's config below the 'execution' key. If None, it is retrieved from the
+            `config_manager`, which allows benchmarking local models (e.g. the templates) that are not in the config.
+        seed: int
+            the seed set before the generate calls of each batch size
+        **kwargs
+            arbitrary number of keyword arguments passed to the model's sample generation function
+
+        Returns
+        -------
+        dict
+            the benchmark results of the model
+        """
+
+        if execution_config is None:
+            model_id = self.config_manager.match_model_id(provided_model_id=model_id)
+            execution_config = self.config_manager.get_config_by_id(
+                model_id=model_id, config_key=CONFIG_FILE_KEY_EXECUTION
+            )
+        peak_rss_mb_before = Utils.get_peak_rss_mb()
+        start_time = time.perf_counter()
+        model_executor = ModelExecutor(
+            model_id=model_id,
+            execution_config=execution_config,
+            download_package=True,
+            install_dependencies=self.install_dependencies,
+        )
+        import_time = time.perf_counter() - start_time
+        logging.info("%s: Model package set up in %.3fs.", model_id, import_time)
+
+        output_path = tempfile.mkdtemp(prefix=f"medigan_benchmark_{model_id}_")
+        try:
+            gen = model_executor.generate(
+                output_path=output_path,
+                save_images=False,
+                is_gen_function_returned=True,
+                **kwargs,
+            )
+            Utils.set_random_seed(seed)
+            self._reset_cuda_peak_memory()
+            start_time = time.perf_counter()
+            gen(num_samples=1)
+            time_to_first_sample = time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            gen(num_samples=1)
+            weight_load_time = max(
+                time_to_first_sample - (time.perf_counter() - start_time), 0.0
+            )
+            batch_size_results = {}
+            # The peak RSS is reset per batch size, hence the peak of the whole benchmark is tracked separately.
+            peak_rss_mbs = [Utils.get_peak_rss_mb()]
+            for batch_size in self.batch_sizes:
+                # Without a reset (i.e. elsewhere than on Linux), the peak RSS of the process since its start is the
+                # same for all batch sizes after the largest one and hence not reported per batch size.
+                is_peak_rss_measured = Utils.reset_peak_rss()
+                Utils.set_random_seed(seed)
+                for _ in range(self.num_warmup_batches):
+                    gen(num_samples=batch_size)
+                latencies = []
+                for _ in range(self.num_batches):
+                    start_time = time.perf_counter()
+                    gen(num_samples=batch_size)
+                    latencies.append(time.perf_counter() - start_time)
+                peak_rss_mbs.append(Utils.get_peak_rss_mb())
+                batch_size_results[str(batch_size)] = {
+                    "latency": self.get_latency_summary(latencies),
+                    "samples_per_second": batch_size * len(latencies) / sum(latencies),
+                    "peak_rss_mb": peak_rss_mbs[-1] if is_peak_rss_measured else None,
+                }
+                logging.info(
+                    "%s: batch_size=%s: %.2f samples/s.",
+                    model_id,
+                    batch_size,
+                    batch_size_results[str(batch_size)]["samples_per_second"],
+                )
+        finally:
+            shutil.rmtree(output_path, ignore_errors=True)
+
+        results = {
+            "import_time": import_time,
+            "time_to_first_sample": time_to_first_sample,
+            "weight_load_time": weight_load_time,
+            "num_batches": self.num_batches,
+            "batch_sizes": batch_size_results,
+            "peak_rss_mb_before": peak_rss_mb_before,
+            "peak_rss_mb": None
+            if None in peak_rss_mbs
+            else max(peak_rss_mbs + [Utils.get_peak_rss_mb()]),
+            "cuda_peak_memory_mb": self._get_cuda_peak_memory_mb(),
+        }
+        self.results[model_id] = results
+        return results
+
+    def run(self, model_ids: list = None, **kwargs) -> dict:
+        """Benchmark the models `model_ids` (all models in the config if None) and return the results.
+
+        A model that fails (e.g. because of missing dependencies) is logged and recorded with its error instead of
+        aborting the remaining benchmarks.
+
+        Returns
+        -------
+        dict
+            the environment, the benchmark settings, and the results by model id
+        """
+
+        model_ids = (
+            list(self.config_manager.config_dict) if model_ids is None else model_ids
+        )
+        for model_id in model_ids:
+            try:
+                self.benchmark_model(model_id=model_id, **kwargs)
+            except Exception as e:
+                logging.error("%s: Benchmark failed: %s", model_id, e)
+                self.results[model_id] = {"error": str(e)}
+        return self.get_results()
+
+    def get_results(self) -> dict:
+        """Return the environment, the benchmark settings, and the results of the models benchmarked so far."""
+
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "environment": self.get_environment(),
+            "settings": {
+                "batch_sizes": self.batch_sizes,
+                "num_batches": self.num_batches,
+                "num_warmup_batches": self.num_warmup_batches,
+            },
+            "models": self.results,
+        }
+
+    def save(self, path: str = DEFAULT_BENCHMARK_RESULTS_FILE) -> str:
+        """Write the results of the models benchmarked so far to the JSON file `path` and return `path`."""
+
+        with open(path, "w") as f:
+            json.dump(self.get_results(), f, indent=2)
+        logging.info("Saved the benchmark results to %s", path)
+        return path
+
+    @staticmethod
+    def compare(results: dict, baseline_results: dict) -> dict:
+        """Return the throughput of `results` relative to `baseline_results` by model id and batch size.
+
+        A value above 1 means that the model generates more samples per second than in the baseline, e.g. the results
+        of a previous medigan version. Models and batch sizes that are not in both results are skipped.
+        """
+
+        comparison = {}
+        for model_id, model_results in results["models"].items():
+            baseline_model_results = baseline_results["models"].get(model_id, {})
+            if "batch_sizes" not in model_results or (
+                "batch_sizes" not in baseline_model_results
+            ):
+                continue
+            comparison[model_id] = {
+                batch_size: batch_size_results["samples_per_second"]
+                / baseline_model_results["batch_sizes"][batch_size][
+                    "samples_per_second"
+                ]
+                for batch_size, batch_size_results in model_results[
+                    "batch_sizes"
+                ].items()
+                if batch_size in baseline_model_results["batch_sizes"]
+            }
+        return comparison
+
+    def __repr__(self):
+        return (
+            f"ModelBenchmark(batch_sizes={self.batch_sizes}, num_batches={self.num_batches}, "
+            f"benchmarked_models={list(self.results)})"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the generation performance of medigan models."
+    )
+    parser.add_argument(
+        "--model_ids",
+        type=str,
+        default=None,
+        nargs="+",
+        help="Model ids to benchmark. If not provided, all models in the config are benchmarked.",
+    )
+    parser.add_argument(
+        "--batch_sizes",
+        type=int,
+        default=DEFAULT_BENCHMARK_BATCH_SIZES,
+        nargs="+",
+        help="Batch sizes for which latency and throughput are measured",
+    )
+    parser.add_argument(
+        "--num_batches",
+        type=int,
+        default=DEFAULT_BENCHMARK_NUM_BATCHES,
+        help="Number of timed generate calls per batch size",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=DEFAULT_BENCHMARK_RESULTS_FILE,
+        help="JSON file to which the results are written",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default=None,
+        help="JSON file with previous results whose throughput is compared with the new results",
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default=None,
+        help="JSON file with model configs (in the format of global.json) to use instead of the medigan config, "
+        "e.g. to benchmark local models offline",
+    )
+    parser.add_argument(
+        "--install_dependencies",
+        action="store_true",
+        help="Automatically install the dependencies of the models",
+    )
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    config_manager = None
+    if args.config is not None:
+        with open(args.config) as f:
+            config_manager = ConfigManager(config_dict=json.load(f))
+    model_benchmark = ModelBenchmark(
+        config_manager=config_manager,
+        batch_sizes=args.batch_sizes,
+        num_batches=args.num_batches,
+        install_dependencies=args.install_dependencies,
+    )
+    results = model_benchmark.run(model_ids=args.model_ids)
+    model_benchmark.save(path=args.output)
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline_results = json.load(f)
+        print(
+            json.dumps(
+                ModelBenchmark.compare(results, baseline_results),
+                indent=2,
+            )
+        )
@@ -29,6 +29,7 @@ from .constants import (
     CONFIG_FILE_NAME_AND_EXTENSION,
     CONFIG_FILE_URL,
 )
+from .tracing import get_tracer
 from .utils import Utils
 
 
@@ -78,33 +79,38 @@ class ConfigManager:
         bool
             a boolean flag indicating true only if the config file was loaded successfully.
         """
-        if self.config_dict is None:
-            assert Utils.mkdirs(
-                path_as_string=CONFIG_FILE_FOLDER
-            ), f"The config folder was not found nor created in {CONFIG_FILE_FOLDER}."
-            config_file_path = Path(
-                f"{CONFIG_FILE_FOLDER}/{CONFIG_FILE_NAME_AND_EXTENSION}"
-            )
-            try:
-                if not Utils.is_file_located_or_downloaded(
-                    path_as_string=config_file_path,
-                    download_if_not_found=True,
-                    download_link=CONFIG_FILE_URL,
-                    is_new_download_forced=is_new_download_forced,
-                ):
-                    error_string = (
-                        f"The config file {CONFIG_FILE_NAME_AND_EXTENSION} was not found in {config_file_path} "
-                        f"nor downloaded from {CONFIG_FILE_URL}."
-                    )
-                    logging.error(error_string)
-                    raise FileNotFoundError(error_string)
-            except Exception as e:
-                raise e
-            self.config_dict = Utils.read_in_json(path_as_string=config_file_path)
-            logging.debug(f"The parsed config dict: {self.config_dict} ")
-            self.model_ids = [config for config in self.config_dict]
-            logging.debug(f"The model_ids found in the config dict: {self.model_ids} ")
-            self.is_config_loaded = True
+        with get_tracer().span("config_manager.load_config_file") as span:
+            if self.config_dict is None:
+                assert Utils.mkdirs(
+                    path_as_string=CONFIG_FILE_FOLDER
+                ), f"The config folder was not found nor created in {CONFIG_FILE_FOLDER}."
+                config_file_path = Path(
+                    f"{CONFIG_FILE_FOLDER}/{CONFIG_FILE_NAME_AND_EXTENSION}"
+                )
+                try:
+                    if not Utils.is_file_located_or_downloaded(
+                        path_as_string=config_file_path,
+                        download_if_not_found=True,
+                        download_link=CONFIG_FILE_URL,
+                        is_new_download_forced=is_new_download_forced,
+                    ):
+                        error_string = (
+                            f"The config file {CONFIG_FILE_NAME_AND_EXTENSION} was not found in {config_file_path} "
+                            f"nor downloaded from {CONFIG_FILE_URL}."
+                        )
+                        logging.error(error_string)
+                        raise FileNotFoundError(error_string)
+                except Exception as e:
+                    raise e
+                self.config_dict = Utils.read_in_json(path_as_string=config_file_path)
+                logging.debug("The parsed config dict: %s ", self.config_dict)
+                self.model_ids = [config for config in self.config_dict]
+                logging.debug(
+                    "The model_ids found in the config dict: %s ", self.model_ids
+                )
+                self.is_config_loaded = True
+                span.set_attribute("num_models", len(self.model_ids))
+                span.set_attribute("bytes", config_file_path.stat().st_size)
         return self.is_config_loaded
 
     def get_config_by_id(self, model_id: str, config_key: str = None) -> dict:
@@ -166,7 +172,8 @@ class ConfigManager:
             model_id=model_id, metadata=metadata, is_local_model=is_local_model
         ):
             logging.debug(
-                f"{model_id}: Metadata was not added to config. Reason: metadata was not valid. Please revise and try again."
+                "%s: Metadata was not added to config. Reason: metadata was not valid. Please revise and try again.",
+                model_id,
             )
             return False
         if (
@@ -174,7 +181,10 @@ class ConfigManager:
             and not overwrite_existing_metadata
         ):
             logging.warning(
-                f"{model_id}: Metadata was not added to config. Reason: For {model_id} there is already an entry in the metadata and 'overwrite_existing_metadata' was set to {overwrite_existing_metadata}."
+                "%s: Metadata was not added to config. Reason: For %s there is already an entry in the metadata and 'overwrite_existing_metadata' was set to %s.",
+                model_id,
+                model_id,
+                overwrite_existing_metadata,
             )
             return False
         self.config_dict.update(metadata)
@@ -184,11 +194,17 @@ class ConfigManager:
                 output_path=f"{CONFIG_FILE_FOLDER}/{CONFIG_FILE_NAME_AND_EXTENSION}",
             )
             logging.info(
-                f"{model_id}: Model metadata was added and config file ({CONFIG_FILE_FOLDER}/{CONFIG_FILE_NAME_AND_EXTENSION}) was successfully updated."
+                "%s: Model metadata was added and config file (%s/%s) was successfully updated.",
+                model_id,
+                CONFIG_FILE_FOLDER,
+                CONFIG_FILE_NAME_AND_EXTENSION,
             )
         else:
             logging.info(
-                f"{model_id}: Model metadata was successfully added. Note: config file ({CONFIG_FILE_FOLDER}/{CONFIG_FILE_NAME_AND_EXTENSION}) was NOT updated."
+                "%s: Model metadata was successfully added. Note: config file (%s/%s) was NOT updated.",
+                model_id,
+                CONFIG_FILE_FOLDER,
+                CONFIG_FILE_NAME_AND_EXTENSION,
             )
         return True
 
@@ -307,7 +323,7 @@ class ConfigManager:
                 keys in metadata for keys in expected_key_list
             ), f"{model_id}: Error validating metadata. metadata did not contain one of '{expected_key_list}'. Metadata : {metadata}"
         except Exception as e:
-            logging.info(f"Metadata for model '{model_id}' was not valid: {e}")
+            logging.info("Metadata for model '%s' was not valid: %s", model_id, e)
             return False
         return True
 
@@ -340,7 +356,10 @@ class ConfigManager:
             for model_id in self.model_ids:
                 if model_id[0:5] == str(provided_model_id):
                     logging.debug(
-                        f"model_id[0:5]={model_id[0:5]}, provided_model_id={provided_model_id}. Matched: {model_id}"
+                        "model_id[0:5]=%s, provided_model_id=%s. Matched: %s",
+                        model_id[0:5],
+                        provided_model_id,
+                        model_id,
                     )
                     return model_id
         return provided_model_id
@@ -144,3 +144,156 @@ GITHUB_REPO = "RichardObi/medigan"  # "RichardObi/medigan-models"
 
 """ The assignee of the Github Issue when adding a model to medigan"""
 GITHUB_ASSIGNEE = "RichardObi"
+
+""" Name and extension of the manifest file that records the completed batches of a resumable generation job. """
+GENERATION_MANIFEST_FILE_NAME = "manifest.jsonl"
+
+""" The block size in bytes used when reading files to calculate their checksums. """
+CHECKSUM_BLOCK_SIZE = 1024 * 1024
+
+""" The output format that packs generated samples into WebDataset-compatible tar shards. """
+OUTPUT_FORMAT_TAR = "tar"
+
+""" The output format that packs generated samples into chunked datasets of an hdf5 file (requires h5py). """
+OUTPUT_FORMAT_HDF5 = "hdf5"
+
+""" The output format that packs generated samples into chunked arrays of a zarr store (requires zarr). """
+OUTPUT_FORMAT_ZARR = "zarr"
+
+""" The default number of samples per tar shard or per chunk of an hdf5 or zarr store. """
+DEFAULT_SAMPLES_PER_SHARD = 1000
+
+""" The output format that appends generated samples to one contiguous, memory-mappable .npy file per field. """
+OUTPUT_FORMAT_NPY = "npy"
+
+""" The time in seconds without slider changes after which the model visualizer generates a new image. """
+VISUALIZER_DEBOUNCE_INTERVAL = 0.15
+
+""" The interval in milliseconds in which the model visualizer polls for slider changes and generated images. """
+VISUALIZER_POLL_INTERVAL_MS = 30
+
+""" The default maximum number of latent vectors passed to a model in one call during latent space exploration. """
+DEFAULT_LATENT_BATCH_SIZE = 64
+
+""" The default maximum number of rendered frames of a latent traversal that wait to be encoded. """
+DEFAULT_FRAME_BUFFER_SIZE = 64
+
+""" The default frames per second of rendered latent traversal videos. """
+DEFAULT_FRAMES_PER_SECOND = 10
+
+""" The file extensions of the image files that are loaded e.g. for evaluation. """
+IMAGE_FILE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".npy"]
+
+""" The default number of images per batch that are loaded and embedded at once during evaluation. """
+DEFAULT_EVALUATION_BATCH_SIZE = 64
+
+""" The default maximum number of feature vectors per image set that are kept for the KID calculation. """
+DEFAULT_MAX_KID_SAMPLES = 10000
+
+""" The number of feature vectors per subset used in the KID calculation. """
+KID_SUBSET_SIZE = 1000
+
+""" The number of subsets used in the KID calculation. """
+KID_NUM_SUBSETS = 100
+
+""" The name of the Frechet Inception Distance metric. """
+METRIC_FID = "fid"
+
+""" The name of the Kernel Inception Distance metric. """
+METRIC_KID = "kid"
+
+""" The name of the torchvision InceptionV3 feature extractor loaded from a local state dict. """
+FEATURE_EXTRACTOR_INCEPTION_V3 = "inception_v3"
+
+""" The name of the feature extractor loaded from a local TorchScript model file. """
+FEATURE_EXTRACTOR_TORCHSCRIPT = "torchscript"
+
+""" The folder in which the feature statistics of reference image folders are cached for evaluation. """
+REFERENCE_STATISTICS_FOLDER = "reference_statistics"
+
+""" The default number of threads that decode and resize images in parallel when loading image folders. """
+DEFAULT_IMAGE_LOADER_NUM_WORKERS = 8
+
+""" The names of the manifold metrics (improved precision and recall, density, and coverage) of generated samples. """
+METRIC_PRECISION = "precision"
+METRIC_RECALL = "recall"
+METRIC_DENSITY = "density"
+METRIC_COVERAGE = "coverage"
+
+""" The default rank of the nearest neighbour defining the radius of each feature vector in the manifold metrics. """
+DEFAULT_NEAREST_K = 5
+
+""" The default number of feature vectors whose distances to all others are computed at once (bounding memory). """
+DEFAULT_DISTANCE_BLOCK_SIZE = 1024
+
+""" The default batch sizes for which the generation throughput of a model is benchmarked. """
+DEFAULT_BENCHMARK_BATCH_SIZES = [1, 8, 32]
+
+""" The default number of timed generate calls per batch size in a benchmark. """
+DEFAULT_BENCHMARK_NUM_BATCHES = 5
+
+""" The default file to which the benchmark results are written. """
+DEFAULT_BENCHMARK_RESULTS_FILE = "benchmark_results.json"
+
+""" The value of `batch_size` that lets medigan tune the batch size of a model's generate calls automatically. """
+BATCH_SIZE_AUTO = "auto"
+
+""" The file in which the automatically tuned batch sizes are cached by model id, image size, and device. """
+BATCH_SIZE_CACHE_FILE = "batch_size_cache.json"
+
+""" The largest batch size that is probed when tuning the batch size automatically. """
+DEFAULT_MAX_AUTO_BATCH_SIZE = 256
+
+""" The maximum fraction of the device memory that a tuned batch size may use. """
+DEFAULT_MAX_MEMORY_FRACTION = 0.8
+
+""" The default port of the local HTTP endpoint exposing medigan's metrics in the Prometheus text format. """
+DEFAULT_METRICS_PORT = 8000
+
+""" The default upper bounds in seconds of the buckets of latency histograms. """
+DEFAULT_LATENCY_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+""" The default port of the local HTTP generation server started via `python -m medigan serve`. """
+DEFAULT_SERVER_PORT = 8100
+
+""" The default maximum number of samples of concurrent requests that the generation server generates in one call. """
+DEFAULT_SERVER_MAX_BATCH_SIZE = 32
+
+""" The default time in seconds that the generation server waits for further requests to add to a batch. """
+DEFAULT_SERVER_MAX_WAIT_SECONDS = 0.01
+
+""" The default number of threads of `AsyncGenerators` running the model package downloads concurrently. """
+DEFAULT_ASYNC_DOWNLOAD_WORKERS = 4
+
+""" The default number of threads of `AsyncGenerators` running model imports and generate calls. """
+DEFAULT_ASYNC_COMPUTE_WORKERS = 2
+
+""" The default number of worker processes of a `WorkerPool` serving generate requests with preloaded models. """
+DEFAULT_NUM_POOL_WORKERS = 2
+
+""" The default number of shared memory slots through which the workers of a `WorkerPool` return generated batches. """
+DEFAULT_RING_BUFFER_SLOTS = 8
+
+""" The default number of samples (and as many masks) of a model's `image_size` that fit into one ring buffer slot. """
+DEFAULT_SAMPLES_PER_SLOT = 32
+
+""" The prefix of the folders in a distributed generation job's `output_path` that hold the outputs of each rank. """
+DISTRIBUTED_RANK_FOLDER_PREFIX = "rank_"
+
+""" The file that a rank writes into its folder once it has generated all of its batches. """
+DISTRIBUTED_RANK_COMPLETED_FILE_NAME = "rank_completed.json"
+
+""" The default time in seconds that the ranks of a distributed job wait for the other ranks to complete. """
+DEFAULT_DISTRIBUTED_TIMEOUT = 24 * 60 * 60
+
+""" The default SQLite database file of the `JobQueue` of batched generation jobs. """
+DEFAULT_JOB_DATABASE = "jobs.sqlite3"
+
+""" The default number of times a failed generation job of a `JobQueue` is run before it is marked as failed. """
+DEFAULT_JOB_MAX_ATTEMPTS = 3
+
+""" The interval in seconds in which a `JobWorker` reports the progress of its running job to the `JobQueue`. """
+DEFAULT_JOB_HEARTBEAT_SECONDS = 10
+
+""" The time in seconds after which a running job without heartbeat (e.g. of a killed worker) is run again. """
+DEFAULT_JOB_STALE_SECONDS = 300
@@ -90,7 +90,7 @@ class GithubModelUploader(BaseModelUploader):
         # First use pyGithub to create a Github instance based on san access token
         g = Github(self.access_token)
         repo = g.get_repo(GITHUB_REPO)
-        logging.debug(f"Repo: {repo}")
+        logging.debug("Repo: %s", repo)
 
         # Create metadata for github issue
         title = f"{GITHUB_TITLE}: {self.model_id}"
@@ -108,7 +108,10 @@ class GithubModelUploader(BaseModelUploader):
             title=title, body=body, assignee=GITHUB_ASSIGNEE
         )
         logging.info(
-            f"{self.model_id}: Successfully created github issue in '{GITHUB_REPO}': '{github_issue.html_url}'"
+            "%s: Successfully created github issue in '%s': '%s'",
+            self.model_id,
+            GITHUB_REPO,
+            github_issue.html_url,
         )
         return github_issue.html_url
 
@@ -140,7 +143,12 @@ class GithubModelUploader(BaseModelUploader):
             ]
         except Exception as e:
             logging.debug(
-                f"{self.model_id}: Package Link could not be located in metadata for key {self.model_id}.{CONFIG_FILE_KEY_EXECUTION}.{CONFIG_FILE_KEY_PACKAGE_LINK}: {e}"
+                "%s: Package Link could not be located in metadata for key %s.%s.%s: %s",
+                self.model_id,
+                self.model_id,
+                CONFIG_FILE_KEY_EXECUTION,
+                CONFIG_FILE_KEY_PACKAGE_LINK,
+                e,
             )
 
         # Check if the package link in the metadata contains a valid URL
@@ -166,10 +174,18 @@ class GithubModelUploader(BaseModelUploader):
                 ] = package_link
             except Exception as e:
                 logging.warning(
-                    f"{self.model_id}: Package Link could not be update in metadata for key {self.model_id}.{CONFIG_FILE_KEY_EXECUTION}.{CONFIG_FILE_KEY_PACKAGE_LINK}: {e}"
+                    "%s: Package Link could not be update in metadata for key %s.%s.%s: %s",
+                    self.model_id,
+                    self.model_id,
+                    CONFIG_FILE_KEY_EXECUTION,
+                    CONFIG_FILE_KEY_PACKAGE_LINK,
+                    e,
                 )
             logging.debug(
-                f"{self.model_id}: Before creating github issue, updated package link from '{current_pl}' to '{package_link}'"
+                "%s: Before creating github issue, updated package link from '%s' to '%s'",
+                self.model_id,
+                current_pl,
+                package_link,
             )
         return metadata
 
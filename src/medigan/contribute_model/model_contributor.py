@@ -106,7 +106,8 @@ class ModelContributor:
                 i
             ].isdigit(), f"Your model_id's ({model_id}) character '{model_id[i]}' at position {i} is not a digit. The first 5 characters should be digits as in '00001_GANTYPE_MODALITY'. Please adjust."
         logging.info(
-            f"The provided model_id is valid and will now be used to refer to the contributed model in medigan: {model_id}"
+            "The provided model_id is valid and will now be used to refer to the contributed model in medigan: %s",
+            model_id,
         )
         return True
 
@@ -127,7 +128,8 @@ class ModelContributor:
             filename=INIT_PY_FILE,
         ), f"{self.model_id}: No __init__.py was found in your path {init_py_path}. Please revise. Note: You can find an __init__.py example in /templates in https://github.com/RichardObi/medigan"
         logging.info(
-            f"The provided path to your model's __init__.py function was valid and points to a __init__.py file: {init_py_path}"
+            "The provided path to your model's __init__.py function was valid and points to a __init__.py file: %s",
+            init_py_path,
         )
         return True
 
@@ -194,7 +196,8 @@ class ModelContributor:
                     CONFIG_FILE_KEY_PACKAGE_LINK
                 ] = self.package_path
                 logging.info(
-                    f"The model weights path is valid and was added to the metadata of your model: {self.package_path}"
+                    "The model weights path is valid and was added to the metadata of your model: %s",
+                    self.package_path,
                 )
                 return self.metadata
         raise FileNotFoundError(
@@ -210,7 +213,8 @@ class ModelContributor:
             sys.path.insert(1, str(self.package_path).replace(self.package_name, ""))
             importlib.import_module(name=self.package_name)
             logging.info(
-                f"Model import test successful: The model was successfully imported using importlib: {self.package_name}"
+                "Model import test successful: The model was successfully imported using importlib: %s",
+                self.package_name,
             )
         except Exception as e:
             raise Exception(
@@ -432,7 +436,7 @@ class ModelContributor:
             filename=self.model_id,
         )
         logging.info(
-            f"{self.model_id}: Your model's metadata was stored in {output_path}."
+            "%s: Your model's metadata was stored in %s.", self.model_id, output_path
         )
 
         if fill_more_fields_interactively:
@@ -446,7 +450,10 @@ class ModelContributor:
                 filename=self.model_id,
             )
             logging.info(
-                f"{self.model_id}: Your model's metadata was updated. Find it in {output_path}/{self.model_id}.json"
+                "%s: Your model's metadata was updated. Find it in %s/%s.json",
+                self.model_id,
+                output_path,
+                self.model_id,
             )
 
         self.metadata = metadata_final
@@ -484,8 +491,12 @@ class ModelContributor:
             return False
         else:
             logging.debug(
-                f"{self.model_id}: Key value pair ({key}:{metadata.get(key)}) already exists in metadata for key "
-                f"'{nested_key}'. Not prompting user to insert value for this key."
+                "%s: Key value pair (%s:%s) already exists in metadata for key "
+                "'%s'. Not prompting user to insert value for this key.",
+                self.model_id,
+                key,
+                metadata.get(key),
+                nested_key,
             )
             return True
 
@@ -584,7 +595,10 @@ class ModelContributor:
                             metadata=temp_metadata,
                         )
                 logging.debug(
-                    f"{self.model_id}: You provided this key-value pair: {key}={value_assigned}"
+                    "%s: You provided this key-value pair: %s=%s",
+                    self.model_id,
+                    key,
+                    value_assigned,
                 )
                 metadata.update({key: value_assigned})
         return metadata
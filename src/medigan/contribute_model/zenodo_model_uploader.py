@@ -139,7 +139,9 @@ class ZenodoModelUploader(BaseModelUploader):
             # folder of the model package
             package_parent_path = str(Path(package_path).parent)
             logging.info(
-                f"Archiving the model package as zip archive: base_name={package_parent_path+ '/' + package_name}, root_dir={package_path + '/'} "
+                "Archiving the model package as zip archive: base_name=%s, root_dir=%s ",
+                package_parent_path + "/" + package_name,
+                package_path + "/",
             )
             filename = shutil.make_archive(
                 base_name=package_parent_path + "/" + package_name,
@@ -152,7 +154,9 @@ class ZenodoModelUploader(BaseModelUploader):
             filename = Path(package_path).name
             file_path = package_path
         logging.info(
-            f"Model was successfully archived as zip archive: filename={filename}, file_path={file_path} "
+            "Model was successfully archived as zip archive: filename=%s, file_path=%s ",
+            filename,
+            file_path,
         )
         return filename, file_path
 
@@ -274,10 +278,15 @@ class ZenodoModelUploader(BaseModelUploader):
                 f"{self.model_id}: Error ({r.status_code}!=202) during Zenodo ('{publish_url}') upload (step 4: publishing uploaded model): {r.json()}"
             )
         logging.info(
-            f"{self.model_id}: Successfully pushed model to Zenodo with DOI '{r.json()['doi']}': '{r.json()['links']['record_html']}"
+            "%s: Successfully pushed model to Zenodo with DOI '%s': '%s",
+            self.model_id,
+            r.json()["doi"],
+            r.json()["links"]["record_html"],
         )
         logging.debug(
-            f"{self.model_id}: Full Zenodo API response after successful publishing of model: {r.json()}"
+            "%s: Full Zenodo API response after successful publishing of model: %s",
+            self.model_id,
+            r.json(),
         )
         return r
 
@@ -322,7 +331,7 @@ class ZenodoModelUploader(BaseModelUploader):
 
         # create empty upload to Zenodo to get deposition_id and bucket_url
         response = self.empty_upload()
-        logging.debug(f"API Response after creating empty upload template: {response}")
+        logging.debug("API Response after creating empty upload template: %s", response)
 
         # Get the deposition id from the response
         deposition_id = response.json()["id"]
@@ -331,7 +340,9 @@ class ZenodoModelUploader(BaseModelUploader):
         bucket_url = response.json()["links"]["bucket"]
 
         logging.info(
-            f"Starting Zenodo upload of model with deposition_id {deposition_id} to {bucket_url}"
+            "Starting Zenodo upload of model with deposition_id %s to %s",
+            deposition_id,
+            bucket_url,
         )
         response = self.upload(
             file_path=file_path,
@@ -339,7 +350,7 @@ class ZenodoModelUploader(BaseModelUploader):
             bucket_url=bucket_url,
         )
         logging.debug(
-            f"API Response after uploading model to '{bucket_url}': {response}"
+            "API Response after uploading model to '%s': %s", bucket_url, response
         )
 
         # get the model description i.e. model type, metadata info, etc.
@@ -357,13 +368,15 @@ class ZenodoModelUploader(BaseModelUploader):
         # upload the model zip file and its descriptive data
         response = self.upload_descriptive_data(deposition_id=deposition_id, data=data)
         logging.debug(
-            f"API Response after uploading descriptive model data: {response}"
+            "API Response after uploading descriptive model data: %s", response
         )
 
         # publish to Zenodo. Model will get DOI after this step and become part of Zenodo's permanent record.
         response = self.publish(deposition_id=deposition_id)
         logging.debug(
-            f"API Response after publishing the deposition {deposition_id} on Zenodo: {response}"
+            "API Response after publishing the deposition %s on Zenodo: %s",
+            deposition_id,
+            response,
         )
         return response.json()["links"]["record_html"]  # zenodo_record_url
 
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" Functions calculating the Frechet distance (FID) and kernel distance (KID) between two feature distributions. """
+
+# Import python native libs
+from __future__ import absolute_import
+
+import logging
+
+# Import pypi libs
+import numpy as np
+
+# Import library internal modules
+from ..constants import KID_NUM_SUBSETS, KID_SUBSET_SIZE
+
+
+def _sqrtm_psd(matrix: np.ndarray) -> np.ndarray:
+    """Return the square root of a symmetric positive semi-definite matrix via its eigendecomposition."""
+
+    eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+    return (eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))) @ eigenvectors.T
+
+
+def frechet_distance(
+    mean_1: np.ndarray,
+    covariance_1: np.ndarray,
+    mean_2: np.ndarray,
+    covariance_2: np.ndarray,
+) -> float:
+    """Calculate the Frechet distance between two multivariate gaussians given by their means and covariances.
+
+    The trace of the matrix square root of covariance_1 @ covariance_2 is computed as the trace of the square root of
+    the symmetric matrix sqrt(covariance_1) @ covariance_2 @ sqrt(covariance_1), which has the same eigenvalues and
+    can be computed with symmetric eigendecompositions (no scipy needed and no complex parts to discard).
+
+    Parameters
+    ----------
+    mean_1: np.ndarray
+        the mean of the first distribution
+    covariance_1: np.ndarray
+        the covariance matrix of the first distribution
+    mean_2: np.ndarray
+        the mean of the second distribution
+    covariance_2: np.ndarray
+        the covariance matrix of the second distribution
+
+    Returns
+    -------
+    float
+        the Frechet distance, i.e. the FID if the statistics are those of inception features
+    """
+
+    mean_1, mean_2 = np.atleast_1d(mean_1), np.atleast_1d(mean_2)
+    covariance_1, covariance_2 = np.atleast_2d(covariance_1), np.atleast_2d(
+        covariance_2
+    )
+    if mean_1.shape != mean_2.shape or covariance_1.shape != covariance_2.shape:
+        raise ValueError(
+            f"The statistics have different dimensions: {mean_1.shape} and {mean_2.shape}."
+        )
+    sqrt_covariance_1 = _sqrtm_psd(covariance_1)
+    product = sqrt_covariance_1 @ covariance_2 @ sqrt_covariance_1
+    eigenvalues = np.linalg.eigvalsh((product + product.T) / 2)
+    trace_sqrt_product = np.sqrt(np.clip(eigenvalues, 0, None)).sum()
+    difference = mean_1 - mean_2
+    return float(
+        difference @ difference
+        + np.trace(covariance_1)
+        + np.trace(covariance_2)
+        - 2 * trace_sqrt_product
+    )
+
+
+def kernel_inception_distance(
+    features_1: np.ndarray,
+    features_2: np.ndarray,
+    subset_size: int = KID_SUBSET_SIZE,
+    num_subsets: int = KID_NUM_SUBSETS,
+    seed: int = None,
+) -> [float, float]:
+    """Calculate the kernel distance (KID) between two sets of feature vectors.
+
+    The unbiased squared maximum mean discrepancy with the polynomial kernel k(x, y) = (x·y / d + 1)³ is averaged over
+    `num_subsets` random subsets of `subset_size` feature vectors of each set.
+
+    Parameters
+    ----------
+    features_1: np.ndarray
+        the feature vectors of the first set of shape (N1, d)
+    features_2: np.ndarray
+        the feature vectors of the second set of shape (N2, d)
+    subset_size: int
+        the number of feature vectors per subset. Reduced to min(N1, N2) if the sets are smaller.
+    num_subsets: int
+        the number of subsets
+    seed: int
+        the seed of the random number generator used to draw the subsets
+
+    Returns
+    -------
+    list
+        the mean and the standard deviation of the KID over the subsets
+    """
+
+    features_1 = np.asarray(features_1, dtype=np.float64)
+    features_2 = np.asarray(features_2, dtype=np.float64)
+    num_features = features_1.shape[1]
+    subset_size = min(subset_size, len(features_1), len(features_2))
+    if subset_size < 2:
+        raise ValueError(
+            f"The KID requires at least 2 feature vectors per set, but got {len(features_1)} and {len(features_2)}."
+        )
+    if subset_size < KID_SUBSET_SIZE:
+        logging.debug(
+            "Calculating the KID with a reduced subset size of %s.", subset_size
+        )
+    rng = np.random.default_rng(seed)
+    scores = np.zeros(num_subsets)
+    for i in range(num_subsets):
+        x = features_1[rng.choice(len(features_1), subset_size, replace=False)]
+        y = features_2[rng.choice(len(features_2), subset_size, replace=False)]
+        kernel_xx = (x @ x.T / num_features + 1) ** 3
+        kernel_yy = (y @ y.T / num_features + 1) ** 3
+        kernel_xy = (x @ y.T / num_features + 1) ** 3
+        scores[i] = (
+            (kernel_xx.sum() - np.trace(kernel_xx))
+            + (kernel_yy.sum() - np.trace(kernel_yy))
+        ) / (subset_size * (subset_size - 1)) - 2 * kernel_xy.mean()
+    return float(scores.mean()), float(scores.std())
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" Feature extractor classes embedding batches of images with torch models loaded from local weights files. """
+
+# Import python native libs
+from __future__ import absolute_import
+
+import logging
+import os
+
+# Import pypi libs
+import numpy as np
+import torch
+
+# Import library internal modules
+from ..constants import FEATURE_EXTRACTOR_INCEPTION_V3, FEATURE_EXTRACTOR_TORCHSCRIPT
+
+
+class FeatureExtractor:
+    """`FeatureExtractor` class: Embeds batches of uint8 images with a torch model into feature vectors.
+
+    The images are converted to float tensors of shape (N, 3, image_size, image_size), scaled to [0, 1], normalized
+    with `mean` and `std`, and passed through `model` without gradient computation. Any `torch.nn.Module` that maps
+    such tensors to (N, d) features (or to feature maps that are flattened) can be plugged in.
+
+    Parameters
+    ----------
+    model: torch.nn.Module
+        the torch model returning the features of a batch of images
+    image_size: int
+        the height and width of the model input. Images of different sizes are resized bilinearly.
+    mean: tuple
+        the per-channel mean used to normalize the images scaled to [0, 1]
+    std: tuple
+        the per-channel standard deviation used to normalize the images scaled to [0, 1]
+    device: str
+        the torch device on which the features are extracted. If None, cuda is used if available.
+    extractor_id: str
+        the id identifying the feature extractor e.g. in cached reference statistics
+
+    Attributes
+    ----------
+    model: torch.nn.Module
+        the torch model returning the features of a batch of images
+    device: torch.device
+        the torch device on which the features are extracted
+    """
+
+    def __init__(
+        self,
+        model: torch.nn.Module,
+        image_size: int = 299,
+        mean: tuple = (0.5, 0.5, 0.5),
+        std: tuple = (0.5, 0.5, 0.5),
+        device: str = None,
+        extractor_id: str = "custom",
+    ):
+        if device is None:
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = torch.device(device)
+        self.model = model.eval().to(self.device)
+        self.image_size = image_size
+        self.mean = torch.tensor(mean, dtype=torch.float32, device=self.device).view(
+            1, -1, 1, 1
+        )
+        self.std = torch.tensor(std, dtype=torch.float32, device=self.device).view(
+            1, -1, 1, 1
+        )
+        self.extractor_id = extractor_id
+
+    @classmethod
+    def from_torchscript(cls, weights_path: str, **kwargs):
+        """Create a `FeatureExtractor` from a TorchScript model file (e.g. created with `torch.jit.save`)."""
+
+        if not os.path.isfile(weights_path):
+            raise FileNotFoundError(
+                f"The TorchScript feature extractor {weights_path} does not exist."
+            )
+        kwargs.setdefault(
+            "extractor_id",
+            f"{FEATURE_EXTRACTOR_TORCHSCRIPT}:{os.path.basename(weights_path)}",
+        )
+        return cls(model=torch.jit.load(weights_path, map_location="cpu"), **kwargs)
+
+    def preprocess(self, images: np.ndarray) -> torch.Tensor:
+        """Convert a batch of uint8 images of shape (N, H, W, 3) to the normalized model input tensor."""
+
+        images = np.asarray(images)
+        if images.ndim == 3:
+            images = np.stack([images] * 3, axis=3)
+        elif images.shape[3] == 1:
+            images = np.repeat(images, 3, axis=3)
+        tensor = torch.from_numpy(np.ascontiguousarray(images)).to(self.device)
+        tensor = tensor.permute(0, 3, 1, 2).float() / 255.0
+        if tensor.shape[2:] != (self.image_size, self.image_size):
+            tensor = torch.nn.functional.interpolate(
+                tensor,
+                size=(self.image_size, self.image_size),
+                mode="bilinear",
+                align_corners=False,
+            )
+        return (tensor - self.mean) / self.std
+
+    def extract(self, images: np.ndarray) -> np.ndarray:
+        """Return the float32 feature vectors of shape (N, d) of a batch of uint8 images of shape (N, H, W, 3)."""
+
+        with torch.no_grad():
+            features = self.model(self.preprocess(images))
+        if isinstance(features, (tuple, list)):
+            features = features[0]
+        return features.reshape(len(features), -1).float().cpu().numpy()
+
+    def __call__(self, images: np.ndarray) -> np.ndarray:
+        return self.extract(images)
+
+    def __repr__(self):
+        return (
+            f"FeatureExtractor(extractor_id={self.extractor_id}, image_size={self.image_size}, "
+            f"device={self.device})"
+        )
+
+
+class InceptionV3FeatureExtractor(FeatureExtractor):
+    """`InceptionV3FeatureExtractor` class: The 2048-dimensional pool features of torchvision's InceptionV3.
+
+    The weights are loaded from a local state dict file (e.g. ImageNet or RadImageNet InceptionV3 weights converted to
+    torchvision's `inception_v3` layout), hence no weights are downloaded. Requires torchvision.
+
+    Parameters
+    ----------
+    weights_path: str
+        the path to the state dict file of the InceptionV3 model
+    device: str
+        the torch device on which the features are extracted. If None, cuda is used if available.
+    """
+
+    def __init__(self, weights_path: str, device: str = None):
+        try:
+            from torchvision.models import inception_v3
+        except ImportError as e:
+            raise ImportError(
+                f"The InceptionV3 feature extractor requires torchvision. Please install it via 'pip install "
+                f"torchvision' or use FeatureExtractor.from_torchscript with a local TorchScript model: {e}"
+            )
+        if not os.path.isfile(weights_path):
+            raise FileNotFoundError(
+                f"The InceptionV3 weights file {weights_path} does not exist."
+            )
+        model = inception_v3(weights=None, aux_logits=True, init_weights=False)
+        state_dict = torch.load(weights_path, map_location="cpu")
+        missing_keys, unexpected_keys = model.load_state_dict(state_dict, strict=False)
+        if missing_keys:
+            raise ValueError(
+                f"The InceptionV3 weights file {weights_path} is missing the parameters: {missing_keys}"
+            )
+        logging.debug(
+            "Ignoring unexpected InceptionV3 parameters in %s: %s",
+            weights_path,
+            unexpected_keys,
+        )
+        # The classification layer is replaced to return the 2048-dimensional pooled features.
+        model.fc = torch.nn.Identity()
+        super().__init__(
+            model=model,
+            image_size=299,
+            device=device,
+            extractor_id=f"{FEATURE_EXTRACTOR_INCEPTION_V3}:{os.path.basename(weights_path)}",
+        )
+
+
+def get_feature_extractor(
+    name: str = FEATURE_EXTRACTOR_INCEPTION_V3,
+    weights_path: str = None,
+    device: str = None,
+) -> FeatureExtractor:
+    """Return the feature extractor called `name` ("inception_v3" or "torchscript") with weights from `weights_path`."""
+
+    if weights_path is None:
+        raise ValueError(
+            f"Please provide the local weights_path of the '{name}' feature extractor."
+        )
+    if name == FEATURE_EXTRACTOR_INCEPTION_V3:
+        return InceptionV3FeatureExtractor(weights_path=weights_path, device=device)
+    elif name == FEATURE_EXTRACTOR_TORCHSCRIPT:
+        return FeatureExtractor.from_torchscript(
+            weights_path=weights_path, device=device
+        )
+    raise ValueError(
+        f"Feature extractor '{name}' is not supported. Please use one of "
+        f"{[FEATURE_EXTRACTOR_INCEPTION_V3, FEATURE_EXTRACTOR_TORCHSCRIPT]} or pass a FeatureExtractor instance."
+    )
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" `FeatureStatistics` and `FeatureReservoir` classes accumulating feature embeddings of image batches in bounded memory. """
+
+# Import python native libs
+from __future__ import absolute_import
+
+# Import pypi libs
+import numpy as np
+
+
+class FeatureStatistics:
+    """`FeatureStatistics` class: Streaming mean and covariance of feature vectors.
+
+    Batches of features are merged into the running statistics with the parallel variant of Welford's algorithm
+    (Chan et al.), which is numerically stable and needs O(d²) memory for d-dimensional features independent of the
+    number of feature vectors N.
+
+    Parameters
+    ----------
+    num_features: int
+        the dimensionality d of the feature vectors
+
+    Attributes
+    ----------
+    num_samples: int
+        the number of feature vectors accumulated so far
+    mean: np.ndarray
+        the mean feature vector of shape (d,)
+    """
+
+    def __init__(self, num_features: int):
+        self.num_features = num_features
+        self.num_samples = 0
+        self.mean = np.zeros(num_features, dtype=np.float64)
+        self._sum_of_squares = np.zeros((num_features, num_features), dtype=np.float64)
+
+    def update(self, features: np.ndarray):
+        """Merge a batch of feature vectors of shape (batch size, d) into the running statistics."""
+
+        features = np.asarray(features, dtype=np.float64).reshape(-1, self.num_features)
+        batch_size = len(features)
+        if batch_size == 0:
+            return
+        batch_mean = features.mean(axis=0)
+        centered_features = features - batch_mean
+        delta = batch_mean - self.mean
+        num_samples = self.num_samples + batch_size
+        self._sum_of_squares += centered_features.T @ centered_features + np.outer(
+            delta, delta
+        ) * (self.num_samples * batch_size / num_samples)
+        self.mean += delta * (batch_size / num_samples)
+        self.num_samples = num_samples
+
+    @property
+    def covariance(self) -> np.ndarray:
+        """The unbiased covariance matrix of shape (d, d) of the accumulated feature vectors."""
+
+        if self.num_samples < 2:
+            raise ValueError(
+                f"The covariance requires at least 2 feature vectors, but only {self.num_samples} were accumulated."
+            )
+        return self._sum_of_squares / (self.num_samples - 1)
+
+    def save(self, path: str, **metadata):
+        """Save the statistics (and optional metadata values) to a `.npz` file at `path`."""
+
+        np.savez(
+            path,
+            num_samples=self.num_samples,
+            mean=self.mean,
+            sum_of_squares=self._sum_of_squares,
+            **metadata,
+        )
+
+    @classmethod
+    def load(cls, path: str):
+        """Load and return the statistics saved in the `.npz` file at `path`."""
+
+        with np.load(path) as data:
+            statistics = cls(num_features=len(data["mean"]))
+            statistics.num_samples = int(data["num_samples"])
+            statistics.mean = data["mean"]
+            statistics._sum_of_squares = data["sum_of_squares"]
+        return statistics
+
+    def __repr__(self):
+        return f"FeatureStatistics(num_features={self.num_features}, num_samples={self.num_samples})"
+
+    def __len__(self):
+        return self.num_samples
+
+
+class FeatureReservoir:
+    """`FeatureReservoir` class: Uniform random subset of at most `max_size` streamed feature vectors.
+
+    Reservoir sampling keeps each of the N streamed feature vectors with equal probability while holding at most
+    `max_size` vectors in memory, which bounds the memory of subset-based metrics such as KID.
+
+    Parameters
+    ----------
+    num_features: int
+        the dimensionality d of the feature vectors
+    max_size: int
+        the maximum number of feature vectors kept in the reservoir. If None, all feature vectors are kept.
+    seed: int
+        the seed of the random number generator used for sampling
+
+    Attributes
+    ----------
+    features: np.ndarray
+        the feature vectors in the reservoir of shape (min(N, max_size), d), or (N, d) if `max_size` is None
+    num_seen: int
+        the number of feature vectors streamed so far
+    """
+
+    def __init__(self, num_features: int, max_size: int, seed: int = None):
+        self.num_features = num_features
+        self.max_size = max_size
+        self.num_seen = 0
+        self._features = np.zeros(
+            (0 if max_size is None else max_size, num_features), dtype=np.float32
+        )
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, features: np.ndarray):
+        """Stream a batch of feature vectors of shape (batch size, d) through the reservoir."""
+
+        features = np.asarray(features, dtype=np.float32).reshape(-1, self.num_features)
+        if self.max_size is None:
+            num_seen = self.num_seen + len(features)
+            if num_seen > len(self._features):
+                # The capacity is doubled, hence each feature vector is copied a constant number of times on average.
+                grown_features = np.zeros(
+                    (max(num_seen, 2 * len(self._features)), self.num_features),
+                    dtype=np.float32,
+                )
+                grown_features[: self.num_seen] = self._features[: self.num_seen]
+                self._features = grown_features
+            self._features[self.num_seen : num_seen] = features
+            self.num_seen = num_seen
+            return
+        num_free = max(0, min(len(features), self.max_size - self.num_seen))
+        self._features[self.num_seen : self.num_seen + num_free] = features[:num_free]
+        remaining_features = features[num_free:]
+        if len(remaining_features) > 0:
+            # Feature vector i of the stream replaces a random reservoir entry with probability max_size / (i + 1).
+            stream_indices = (
+                self.num_seen + num_free + np.arange(len(remaining_features))
+            )
+            reservoir_indices = (
+                self._rng.random(len(remaining_features)) * (stream_indices + 1)
+            ).astype(np.int64)
+            is_kept = reservoir_indices < self.max_size
+            self._features[reservoir_indices[is_kept]] = remaining_features[is_kept]
+        self.num_seen += len(features)
+
+    @classmethod
+    def from_features(
+        cls, features: np.ndarray, num_seen: int, max_size: int, seed: int = None
+    ):
+        """Restore a reservoir from its (e.g. cached) feature vectors and the number of streamed feature vectors.
+
+        A negative `max_size`, as stored for reservoirs without a maximum size, is treated like None.
+        """
+
+        features = np.asarray(features, dtype=np.float32)
+        if max_size is not None and max_size < 0:
+            max_size = None
+        reservoir = cls(num_features=features.shape[1], max_size=max_size, seed=seed)
+        if max_size is None:
+            reservoir._features = features.copy()
+        else:
+            reservoir._features[: len(features)] = features[:max_size]
+        reservoir.num_seen = num_seen
+        return reservoir
+
+    @property
+    def is_subsampled(self) -> bool:
+        """Check if the reservoir holds only a subset of the streamed feature vectors."""
+
+        return self.max_size is not None and self.num_seen > self.max_size
+
+    @property
+    def features(self) -> np.ndarray:
+        return self._features[: len(self)]
+
+    def __repr__(self):
+        return (
+            f"FeatureReservoir(num_features={self.num_features}, max_size={self.max_size}, "
+            f"num_seen={self.num_seen})"
+        )
+
+    def __len__(self):
+        return (
+            self.num_seen
+            if self.max_size is None
+            else min(self.num_seen, self.max_size)
+        )
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" Functions calculating precision, recall, density, and coverage of generated feature embeddings in bounded memory. """
+
+# Import python native libs
+from __future__ import absolute_import
+
+import logging
+
+# Import pypi libs
+import numpy as np
+
+# Import library internal modules
+from ..constants import (
+    DEFAULT_DISTANCE_BLOCK_SIZE,
+    DEFAULT_NEAREST_K,
+    METRIC_COVERAGE,
+    METRIC_DENSITY,
+    METRIC_PRECISION,
+    METRIC_RECALL,
+)
+
+
+def _squared_distances(x: np.ndarray, y: np.ndarray, y_squared_norms: np.ndarray):
+    """Return the (len(x), len(y)) matrix of squared euclidean distances between the rows of x and y."""
+
+    squared_distances = (
+        np.einsum("ij,ij->i", x, x)[:, None] + y_squared_norms[None, :] - 2 * x @ y.T
+    )
+    return np.maximum(squared_distances, 0, out=squared_distances)
+
+
+def compute_nearest_neighbour_radii(
+    features: np.ndarray,
+    nearest_k: int = DEFAULT_NEAREST_K,
+    block_size: int = DEFAULT_DISTANCE_BLOCK_SIZE,
+    is_approximate: bool = False,
+) -> np.ndarray:
+    """Return the squared distance of each feature vector to its `nearest_k`-th nearest neighbour within `features`.
+
+    The distances are computed in blocks of `block_size` rows, hence the memory is O(block_size · N) instead of
+    O(N²) for N feature vectors. If `is_approximate` is True and faiss is installed, the nearest neighbours are
+    searched with an approximate HNSW index instead.
+
+    Parameters
+    ----------
+    features: np.ndarray
+        the feature vectors of shape (N, d)
+    nearest_k: int
+        the rank of the neighbour that defines the radius (the feature vector itself is not counted)
+    block_size: int
+        the number of feature vectors whose distances to all others are computed at once
+    is_approximate: bool
+        flag indicating whether an approximate nearest neighbour index (faiss) is used if available
+
+    Returns
+    -------
+    np.ndarray
+        the squared radii of shape (N,)
+    """
+
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    if len(features) <= nearest_k:
+        raise ValueError(
+            f"The {nearest_k}-nearest neighbour radii require more than {nearest_k} feature vectors, "
+            f"but only {len(features)} were provided."
+        )
+    if is_approximate:
+        try:
+            import faiss
+        except ImportError:
+            logging.warning(
+                "faiss is not installed. The nearest neighbour radii are computed exactly in blocks instead. "
+                "Install faiss (e.g. 'pip install faiss-cpu') for approximate nearest neighbour search."
+            )
+        else:
+            index = faiss.IndexHNSWFlat(features.shape[1], 32)
+            index.add(features)
+            squared_distances, _ = index.search(features, nearest_k + 1)
+            return np.maximum(squared_distances[:, nearest_k], 0)
+
+    squared_norms = np.einsum("ij,ij->i", features, features)
+    radii = np.empty(len(features), dtype=np.float32)
+    for start in range(0, len(features), block_size):
+        squared_distances = _squared_distances(
+            features[start : start + block_size], features, squared_norms
+        )
+        # The smallest distance of each row is the distance of the feature vector to itself.
+        radii[start : start + block_size] = np.partition(
+            squared_distances, nearest_k, axis=1
+        )[:, nearest_k]
+    return radii
+
+
+def manifold_metrics(
+    real_features: np.ndarray,
+    fake_features: np.ndarray,
+    nearest_k: int = DEFAULT_NEAREST_K,
+    block_size: int = DEFAULT_DISTANCE_BLOCK_SIZE,
+    is_approximate: bool = False,
+) -> dict:
+    """Calculate improved precision and recall (Kynkäänniemi et al.) and density and coverage (Naeem et al.).
+
+    The manifold of a feature set is estimated as the union of spheres around each feature vector with the radius to
+    its `nearest_k`-th nearest neighbour. Precision is the fraction of fake samples inside the real manifold, recall
+    the fraction of real samples inside the fake manifold, density the mean number of real spheres containing a fake
+    sample divided by `nearest_k`, and coverage the fraction of real spheres that contain at least one fake sample.
+    All four metrics are accumulated in one blocked pass over the fake-to-real distances with O(block_size · N)
+    memory. A low recall or coverage indicates mode collapse.
+
+    Parameters
+    ----------
+    real_features: np.ndarray
+        the feature vectors of the real (reference) samples of shape (N, d)
+    fake_features: np.ndarray
+        the feature vectors of the generated samples of shape (M, d)
+    nearest_k: int
+        the rank of the nearest neighbour defining the radius of each sphere
+    block_size: int
+        the number of fake feature vectors whose distances to all real feature vectors are computed at once
+    is_approximate: bool
+        flag indicating whether the nearest neighbour radii are searched with an approximate faiss index if available
+
+    Returns
+    -------
+    dict
+        the precision, recall, density, and coverage
+    """
+
+    real_features = np.ascontiguousarray(real_features, dtype=np.float32)
+    fake_features = np.ascontiguousarray(fake_features, dtype=np.float32)
+    real_radii = compute_nearest_neighbour_radii(
+        real_features,
+        nearest_k=nearest_k,
+        block_size=block_size,
+        is_approximate=is_approximate,
+    )
+    fake_radii = compute_nearest_neighbour_radii(
+        fake_features,
+        nearest_k=nearest_k,
+        block_size=block_size,
+        is_approximate=is_approximate,
+    )
+    real_squared_norms = np.einsum("ij,ij->i", real_features, real_features)
+    num_fake_in_real_manifold = 0
+    num_real_spheres_containing_fake = 0
+    is_real_in_fake_manifold = np.zeros(len(real_features), dtype=bool)
+    min_squared_distance_to_fake = np.full(len(real_features), np.inf, dtype=np.float32)
+    for start in range(0, len(fake_features), block_size):
+        # Squared distances of a block of fake samples (rows) to all real samples (columns).
+        squared_distances = _squared_distances(
+            fake_features[start : start + block_size],
+            real_features,
+            real_squared_norms,
+        )
+        is_in_real_sphere = squared_distances <= real_radii[None, :]
+        num_fake_in_real_manifold += np.count_nonzero(is_in_real_sphere.any(axis=1))
+        num_real_spheres_containing_fake += np.count_nonzero(is_in_real_sphere)
+        is_real_in_fake_manifold |= (
+            squared_distances <= fake_radii[start : start + block_size, None]
+        ).any(axis=0)
+        np.minimum(
+            min_squared_distance_to_fake,
+            squared_distances.min(axis=0),
+            out=min_squared_distance_to_fake,
+        )
+    return {
+        METRIC_PRECISION: num_fake_in_real_manifold / len(fake_features),
+        METRIC_RECALL: float(is_real_in_fake_manifold.mean()),
+        METRIC_DENSITY: num_real_spheres_containing_fake
+        / (nearest_k * len(fake_features)),
+        METRIC_COVERAGE: float((min_squared_distance_to_fake <= real_radii).mean()),
+    }
@@ -0,0 +1,462 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" `ModelEvaluator` class computing FID and KID between image sets by streaming them through a feature extractor. """
+
+# Import python native libs
+from __future__ import absolute_import
+
+import logging
+import os
+
+# Import pypi libs
+import numpy as np
+from tqdm import tqdm
+
+# Import library internal modules
+from ..constants import (
+    DEFAULT_EVALUATION_BATCH_SIZE,
+    DEFAULT_IMAGE_LOADER_NUM_WORKERS,
+    DEFAULT_MAX_KID_SAMPLES,
+    DEFAULT_NEAREST_K,
+    METRIC_COVERAGE,
+    METRIC_DENSITY,
+    METRIC_FID,
+    METRIC_KID,
+    METRIC_PRECISION,
+    METRIC_RECALL,
+    REFERENCE_STATISTICS_FOLDER,
+)
+from ..image_loader import ImageLoader
+from ..metrics import CACHE_HITS, CACHE_MISSES
+from .distribution_metrics import frechet_distance, kernel_inception_distance
+from .feature_statistics import FeatureReservoir, FeatureStatistics
+from .manifold_metrics import manifold_metrics
+from .reference_statistics_cache import ReferenceStatisticsCache
+
+""" The metrics that are calculated if no metrics are specified. """
+DEFAULT_METRICS = [METRIC_FID, METRIC_KID]
+
+""" The metrics calculated from the nearest neighbour manifolds of the real and generated feature vectors. """
+MANIFOLD_METRICS = [METRIC_PRECISION, METRIC_RECALL, METRIC_DENSITY, METRIC_COVERAGE]
+
+
+class ModelEvaluator:
+    """`ModelEvaluator` class: Computes distribution metrics between two image sets in bounded memory.
+
+    Images are streamed in batches through the feature extractor. The features of each batch are merged into running
+    `FeatureStatistics` (for FID) and a `FeatureReservoir` (for KID, precision, recall, density, and coverage) and
+    then discarded, hence the memory needed for FID and KID is O(d²) for d-dimensional features rather than O(N·d)
+    for N images. The manifold metrics are calculated on the feature vectors of all images unless
+    `max_manifold_samples` is set, as their nearest neighbour radii shrink on subsampled feature vectors.
+
+    Parameters
+    ----------
+    feature_extractor: FeatureExtractor
+        the feature extractor embedding batches of uint8 images of shape (N, H, W, 3)
+    batch_size: int
+        the number of images per batch that is loaded and embedded at once
+    max_kid_samples: int
+        the maximum number of feature vectors per image set that are kept for the KID
+    max_manifold_samples: int
+        the maximum number of feature vectors per image set that are kept for the manifold metrics (precision,
+        recall, density, and coverage). If None, the feature vectors of all images are kept.
+    seed: int
+        the seed used for reservoir sampling and for drawing the KID subsets
+    reference_statistics_path: str
+        the folder in which the feature statistics of reference image folders are cached. If None, the statistics
+        of reference images are not cached.
+    num_workers: int
+        the number of threads decoding and resizing images in parallel while loading image folders
+    nearest_k: int
+        the rank of the nearest neighbour defining the radius of each feature vector in the manifold metrics
+    is_approximate_knn: bool
+        flag indicating whether the nearest neighbours of the manifold metrics are searched with an approximate
+        faiss index (if faiss is installed) instead of exact blocked distance computation
+
+    Attributes
+    ----------
+    feature_extractor: FeatureExtractor
+        the feature extractor embedding batches of uint8 images of shape (N, H, W, 3)
+    reference_statistics_cache: ReferenceStatisticsCache
+        the cache of the feature statistics of reference image folders or None if caching is disabled
+    """
+
+    def __init__(
+        self,
+        feature_extractor,
+        batch_size: int = DEFAULT_EVALUATION_BATCH_SIZE,
+        max_kid_samples: int = DEFAULT_MAX_KID_SAMPLES,
+        max_manifold_samples: int = None,
+        seed: int = None,
+        reference_statistics_path: str = REFERENCE_STATISTICS_FOLDER,
+        num_workers: int = DEFAULT_IMAGE_LOADER_NUM_WORKERS,
+        nearest_k: int = DEFAULT_NEAREST_K,
+        is_approximate_knn: bool = False,
+    ):
+        self.feature_extractor = feature_extractor
+        self.batch_size = batch_size
+        self.max_kid_samples = max_kid_samples
+        self.max_manifold_samples = max_manifold_samples
+        self.seed = seed
+        self.num_workers = num_workers
+        self.nearest_k = nearest_k
+        self.is_approximate_knn = is_approximate_knn
+        self.reference_statistics_cache = (
+            None
+            if reference_statistics_path is None
+            else ReferenceStatisticsCache(cache_path=reference_statistics_path)
+        )
+
+    @staticmethod
+    def _is_reservoir_needed(metrics: list = None) -> bool:
+        """Check if the feature vectors (and not only their statistics) are needed to calculate the `metrics`."""
+
+        return metrics is None or any(
+            metric == METRIC_KID or metric in MANIFOLD_METRICS for metric in metrics
+        )
+
+    def _get_reservoir_size(self, metrics: list = None) -> int:
+        """Return the maximum number of feature vectors kept in the reservoir for the `metrics` (None if unbounded)."""
+
+        if metrics is None or not any(metric in MANIFOLD_METRICS for metric in metrics):
+            return self.max_kid_samples
+        if self.max_manifold_samples is None:
+            return None
+        return max(self.max_manifold_samples, self.max_kid_samples)
+
+    def get_image_loader(
+        self, path: str, is_normalized: bool = False, limit: int = None
+    ) -> ImageLoader:
+        """Return an `ImageLoader` streaming the images in `path` resized to the feature extractor's input size."""
+
+        return ImageLoader(
+            path=path,
+            image_size=self.feature_extractor.image_size,
+            batch_size=self.batch_size,
+            is_normalized=is_normalized,
+            limit=limit,
+            num_workers=self.num_workers,
+        )
+
+    def accumulate(
+        self, batches, metrics: list = None
+    ) -> [FeatureStatistics, FeatureReservoir]:
+        """Embed batches of images and accumulate the feature statistics and (if needed) a feature reservoir.
+
+        Parameters
+        ----------
+        batches: iterable
+            iterable of uint8 image batches of shape (N, H, W, 3), e.g. an `ImageLoader`
+        metrics: list
+            the metrics that are calculated from the accumulated features. The reservoir is only filled if the KID
+            or a manifold metric is one of them. If None, FID and KID are assumed.
+
+        Returns
+        -------
+        list
+            the `FeatureStatistics` and the `FeatureReservoir` (None if not needed) of the embedded images
+        """
+
+        is_reservoir_filled = self._is_reservoir_needed(metrics)
+        statistics = None
+        reservoir = None
+        for batch in tqdm(batches, desc="Extracting features"):
+            features = self.feature_extractor.extract(batch)
+            if statistics is None:
+                statistics = FeatureStatistics(num_features=features.shape[1])
+                if is_reservoir_filled:
+                    reservoir = FeatureReservoir(
+                        num_features=features.shape[1],
+                        max_size=self._get_reservoir_size(metrics),
+                        seed=self.seed,
+                    )
+            statistics.update(features)
+            if reservoir is not None:
+                reservoir.update(features)
+        if statistics is None:
+            raise ValueError("No images were provided to extract features from.")
+        if (
+            metrics is not None
+            and any(metric in MANIFOLD_METRICS for metric in metrics)
+            and reservoir.is_subsampled
+        ):
+            logging.warning(
+                "The manifold metrics are calculated on a random subset of %s of the %s feature vectors "
+                "(max_manifold_samples=%s), which shrinks their nearest neighbour radii.",
+                len(reservoir),
+                reservoir.num_seen,
+                self.max_manifold_samples,
+            )
+        return statistics, reservoir
+
+    def get_reference_statistics(
+        self,
+        path: str,
+        metrics: list = None,
+        is_normalized: bool = False,
+        limit: int = None,
+    ) -> [FeatureStatistics, FeatureReservoir]:
+        """Return the feature statistics (and reservoir) of reference images, reusing cached statistics if valid.
+
+        Parameters
+        ----------
+        path: str
+            the path to the reference image folder or to a `.npz` file with precomputed statistics (e.g. saved via
+            `FeatureStatistics.save` or cached by a `ReferenceStatisticsCache`)
+        metrics: list
+            the metrics that are calculated. The KID and the manifold metrics require the cached
+            feature reservoir. If None, FID and KID.
+        is_normalized: bool
+            flag indicating whether each image is min-max normalized to the range [0, 255]
+        limit: int
+            the maximum number of images loaded from the folder. If None, all images are loaded.
+
+        Returns
+        -------
+        list
+            the `FeatureStatistics` and the `FeatureReservoir` (None if not needed or not available)
+        """
+
+        if os.path.isfile(path) and path.endswith(".npz"):
+            with np.load(path) as data:
+                reservoir = (
+                    FeatureReservoir.from_features(
+                        features=data["reservoir_features"],
+                        num_seen=int(data["reservoir_num_seen"]),
+                        max_size=int(data["reservoir_max_size"]),
+                    )
+                    if "reservoir_features" in data
+                    else None
+                )
+            return FeatureStatistics.load(path), reservoir
+
+        image_loader = self.get_image_loader(
+            path=path, is_normalized=is_normalized, limit=limit
+        )
+        if self.reference_statistics_cache is None:
+            return self.accumulate(image_loader, metrics=metrics)
+        cache_kwargs = {
+            "path": path,
+            "filenames": image_loader.filenames,
+            "extractor_id": self.feature_extractor.extractor_id,
+            "preprocessing": {
+                "image_size": image_loader.image_size,
+                "is_normalized": is_normalized,
+                "max_reservoir_samples": self._get_reservoir_size(metrics),
+            },
+        }
+        cached = self.reference_statistics_cache.load(
+            is_reservoir_needed=self._is_reservoir_needed(metrics),
+            **cache_kwargs,
+        )
+        if cached is not None:
+            CACHE_HITS.inc(cache="reference_statistics")
+            return cached
+        CACHE_MISSES.inc(cache="reference_statistics")
+        statistics, reservoir = self.accumulate(image_loader, metrics=metrics)
+        self.reference_statistics_cache.save(
+            statistics=statistics, reservoir=reservoir, **cache_kwargs
+        )
+        return statistics, reservoir
+
+    def accumulate_generated(
+        self, batches, metrics: list = None, is_normalized: bool = False
+    ) -> [FeatureStatistics, FeatureReservoir]:
+        """Accumulate the features of generated sample batches, e.g. yielded by `ModelExecutor.generate_batches`.
+
+        Each batch is preprocessed like the images loaded from folders (resized to the feature extractor's input size
+        and converted to three-channel uint8 images), embedded, and discarded.
+
+        Parameters
+        ----------
+        batches: iterable
+            iterable of generated sample batches, i.e. of lists or arrays of images or of (samples, masks,
+            other_imaging_output, labels) tuples of which the samples are evaluated
+        metrics: list
+            the metrics that are calculated from the accumulated features. If None, FID and KID are assumed.
+        is_normalized: bool
+            flag indicating whether each image is min-max normalized to the range [0, 255]
+
+        Returns
+        -------
+        list
+            the `FeatureStatistics` and the `FeatureReservoir` (None if not needed) of the generated samples
+        """
+
+        def preprocessed_batches():
+            for batch in batches:
+                samples = batch[0] if isinstance(batch, tuple) else batch
+                yield np.stack(
+                    [
+                        ImageLoader.preprocess_image(
+                            image=sample,
+                            image_size=self.feature_extractor.image_size,
+                            is_normalized=is_normalized,
+                        )
+                        for sample in samples
+                    ]
+                )
+
+        return self.accumulate(preprocessed_batches(), metrics=metrics)
+
+    def evaluate_generated(
+        self,
+        reference_path: str,
+        batches,
+        metrics: list = None,
+        is_normalized: bool = False,
+    ) -> dict:
+        """Calculate the `metrics` between reference images and generated sample batches streamed from memory.
+
+        Parameters
+        ----------
+        reference_path: str
+            the path to the reference image folder or to a `.npz` file with precomputed reference statistics
+        batches: iterable
+            iterable of generated sample batches, e.g. yielded by `ModelExecutor.generate_batches`
+        metrics: list
+            the metrics to calculate, i.e. any of "fid", "kid", "precision", "recall", "density", and "coverage". If
+            None, FID and KID are calculated.
+        is_normalized: bool
+            flag indicating whether each image is min-max normalized to the range [0, 255]
+
+        Returns
+        -------
+        dict
+            the metric values and the numbers of reference (num_samples_1) and generated (num_samples_2) samples
+        """
+
+        statistics_1, reservoir_1 = self.get_reference_statistics(
+            path=reference_path, metrics=metrics, is_normalized=is_normalized
+        )
+        statistics_2, reservoir_2 = self.accumulate_generated(
+            batches, metrics=metrics, is_normalized=is_normalized
+        )
+        return self.calculate_metrics(
+            statistics_1=statistics_1,
+            statistics_2=statistics_2,
+            reservoir_1=reservoir_1,
+            reservoir_2=reservoir_2,
+            metrics=metrics,
+        )
+
+    def calculate_metrics(
+        self,
+        statistics_1: FeatureStatistics,
+        statistics_2: FeatureStatistics,
+        reservoir_1: FeatureReservoir = None,
+        reservoir_2: FeatureReservoir = None,
+        metrics: list = None,
+    ) -> dict:
+        """Calculate the `metrics` between two sets of accumulated features.
+
+        The supported metrics are "fid", "kid", and the manifold metrics "precision", "recall", "density", and
+        "coverage", for which the first set is treated as the real and the second set as the generated samples.
+
+        Returns
+        -------
+        dict
+            the metric values (and the KID standard deviation as "kid_std") and the numbers of samples per set
+        """
+
+        metrics = DEFAULT_METRICS if metrics is None else metrics
+        results = {
+            "num_samples_1": statistics_1.num_samples,
+            "num_samples_2": statistics_2.num_samples,
+        }
+        if any(metric in MANIFOLD_METRICS for metric in metrics):
+            if reservoir_1 is None or reservoir_2 is None:
+                raise ValueError(
+                    "The manifold metrics require the feature reservoirs of both image sets."
+                )
+            manifold_results = manifold_metrics(
+                real_features=reservoir_1.features,
+                fake_features=reservoir_2.features,
+                nearest_k=self.nearest_k,
+                is_approximate=self.is_approximate_knn,
+            )
+        for metric in metrics:
+            if metric == METRIC_FID:
+                results[METRIC_FID] = frechet_distance(
+                    mean_1=statistics_1.mean,
+                    covariance_1=statistics_1.covariance,
+                    mean_2=statistics_2.mean,
+                    covariance_2=statistics_2.covariance,
+                )
+            elif metric == METRIC_KID:
+                if reservoir_1 is None or reservoir_2 is None:
+                    raise ValueError(
+                        "The KID requires the feature reservoirs of both image sets."
+                    )
+                (
+                    results[METRIC_KID],
+                    results[f"{METRIC_KID}_std"],
+                ) = kernel_inception_distance(
+                    features_1=reservoir_1.features,
+                    features_2=reservoir_2.features,
+                    seed=self.seed,
+                )
+            elif metric in MANIFOLD_METRICS:
+                results[metric] = manifold_results[metric]
+            else:
+                raise ValueError(
+                    f"Metric '{metric}' is not supported. Please use one of "
+                    f"{[METRIC_FID, METRIC_KID] + MANIFOLD_METRICS}."
+                )
+        logging.info("Evaluation results: %s", results)
+        return results
+
+    def evaluate(
+        self,
+        path_1: str,
+        path_2: str,
+        metrics: list = None,
+        is_normalized: bool = False,
+        limit: int = None,
+    ) -> dict:
+        """Calculate the `metrics` (e.g. "fid", "kid", "precision", or "recall") between the images of two folders.
+
+        Parameters
+        ----------
+        path_1: str
+            the path to the reference image folder, e.g. containing real images. Its feature statistics are cached
+            and reused in later evaluations as long as the folder contents do not change. Can also be a `.npz` file
+            with precomputed statistics.
+        path_2: str
+            the path to the second image folder, e.g. containing synthetic images
+        metrics: list
+            the metrics to calculate, i.e. any of "fid", "kid", "precision", "recall", "density", and "coverage". If
+            None, FID and KID are calculated.
+        is_normalized: bool
+            flag indicating whether each image is min-max normalized to the range [0, 255]
+        limit: int
+            the maximum number of images loaded per folder. If None, all images are loaded.
+
+        Returns
+        -------
+        dict
+            the metric values and the numbers of samples per image set
+        """
+
+        statistics_1, reservoir_1 = self.get_reference_statistics(
+            path=path_1, metrics=metrics, is_normalized=is_normalized, limit=limit
+        )
+        statistics_2, reservoir_2 = self.accumulate(
+            self.get_image_loader(
+                path=path_2, is_normalized=is_normalized, limit=limit
+            ),
+            metrics=metrics,
+        )
+        return self.calculate_metrics(
+            statistics_1=statistics_1,
+            statistics_2=statistics_2,
+            reservoir_1=reservoir_1,
+            reservoir_2=reservoir_2,
+            metrics=metrics,
+        )
+
+    def __repr__(self):
+        return (
+            f"ModelEvaluator(feature_extractor={self.feature_extractor}, batch_size={self.batch_size}, "
+            f"max_kid_samples={self.max_kid_samples})"
+        )
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" `ReferenceStatisticsCache` class caching the feature statistics of reference image folders in `.npz` files. """
+
+# Import python native libs
+from __future__ import absolute_import
+
+import hashlib
+import json
+import logging
+import os
+
+# Import pypi libs
+import numpy as np
+
+# Import library internal modules
+from ..constants import REFERENCE_STATISTICS_FOLDER
+from .feature_statistics import FeatureReservoir, FeatureStatistics
+
+
+class ReferenceStatisticsCache:
+    """`ReferenceStatisticsCache` class: Stores and reuses the feature statistics of reference (e.g. real) images.
+
+    The reference images are usually the same across all model comparisons, hence their features only need to be
+    extracted once. A cache file is identified by the reference folder, the feature extractor id, and a hash of the
+    preprocessing parameters. It stores the feature mean and covariance, the number of images, the KID feature
+    reservoir (if computed), and a manifest hash of the names, sizes, and modification times of the reference images.
+    If the folder contents change, the manifest hash no longer matches and the cached statistics are recomputed.
+
+    Parameters
+    ----------
+    cache_path: str
+        the path to the folder in which the cache files are stored
+
+    Attributes
+    ----------
+    cache_path: str
+        the path to the folder in which the cache files are stored
+    """
+
+    def __init__(self, cache_path: str = REFERENCE_STATISTICS_FOLDER):
+        self.cache_path = cache_path
+
+    @staticmethod
+    def get_manifest_hash(path: str, filenames: list) -> str:
+        """Return a hash of the names, sizes, and modification times of the files `filenames` in `path`."""
+
+        manifest = hashlib.sha256()
+        for filename in filenames:
+            stat = os.stat(os.path.join(path, filename))
+            manifest.update(f"{filename}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+        return manifest.hexdigest()
+
+    @staticmethod
+    def get_preprocessing_hash(preprocessing: dict) -> str:
+        """Return a hash of the preprocessing parameters (e.g. image size and normalization) of the images."""
+
+        return hashlib.sha256(
+            json.dumps(preprocessing, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def get_cache_file_path(
+        self, path: str, extractor_id: str, preprocessing: dict
+    ) -> str:
+        """Return the path to the cache file of the reference folder `path`."""
+
+        key = hashlib.sha256(
+            json.dumps(
+                [
+                    os.path.abspath(path),
+                    extractor_id,
+                    self.get_preprocessing_hash(preprocessing),
+                ]
+            ).encode()
+        ).hexdigest()[:16]
+        folder_name = os.path.basename(os.path.normpath(path))
+        return os.path.join(self.cache_path, f"{folder_name}_{key}.npz")
+
+    def load(
+        self,
+        path: str,
+        filenames: list,
+        extractor_id: str,
+        preprocessing: dict,
+        is_reservoir_needed: bool = False,
+    ) -> [FeatureStatistics, FeatureReservoir]:
+        """Return the cached statistics and reservoir of the reference folder or None if they are missing or stale.
+
+        Parameters
+        ----------
+        path: str
+            the path to the reference image folder
+        filenames: list
+            the names of the reference images that are evaluated
+        extractor_id: str
+            the id of the feature extractor
+        preprocessing: dict
+            the preprocessing parameters of the images
+        is_reservoir_needed: bool
+            flag indicating whether the KID feature reservoir is needed. If so and it is not cached, None is returned.
+
+        Returns
+        -------
+        list
+            the cached `FeatureStatistics` and `FeatureReservoir` (None if not cached) or None
+        """
+
+        cache_file_path = self.get_cache_file_path(
+            path=path, extractor_id=extractor_id, preprocessing=preprocessing
+        )
+        if not os.path.isfile(cache_file_path):
+            return None
+        with np.load(cache_file_path) as data:
+            if str(data["manifest_hash"]) != self.get_manifest_hash(path, filenames):
+                logging.info(
+                    "The reference images in %s changed since their statistics were cached in "
+                    "%s. The statistics are recomputed.",
+                    path,
+                    cache_file_path,
+                )
+                return None
+            if is_reservoir_needed and "reservoir_features" not in data:
+                return None
+            reservoir = None
+            if "reservoir_features" in data:
+                reservoir = FeatureReservoir.from_features(
+                    features=data["reservoir_features"],
+                    num_seen=int(data["reservoir_num_seen"]),
+                    max_size=int(data["reservoir_max_size"]),
+                )
+        logging.info(
+            "Using cached reference statistics of %s: %s", path, cache_file_path
+        )
+        return FeatureStatistics.load(cache_file_path), reservoir
+
+    def save(
+        self,
+        path: str,
+        filenames: list,
+        extractor_id: str,
+        preprocessing: dict,
+        statistics: FeatureStatistics,
+        reservoir: FeatureReservoir = None,
+    ) -> str:
+        """Save the statistics (and reservoir) of the reference folder and return the path to the cache file."""
+
+        cache_file_path = self.get_cache_file_path(
+            path=path, extractor_id=extractor_id, preprocessing=preprocessing
+        )
+        os.makedirs(self.cache_path, exist_ok=True)
+        metadata = {
+            "manifest_hash": self.get_manifest_hash(path, filenames),
+            "extractor_id": extractor_id,
+            "preprocessing_hash": self.get_preprocessing_hash(preprocessing),
+            "reference_path": os.path.abspath(path),
+        }
+        if reservoir is not None:
+            metadata.update(
+                reservoir_features=reservoir.features,
+                reservoir_num_seen=reservoir.num_seen,
+                reservoir_max_size=-1
+                if reservoir.max_size is None
+                else reservoir.max_size,
+            )
+        # Write to a temporary file first so that an interrupted save does not leave a corrupt cache file.
+        temporary_file_path = f"{cache_file_path}.tmp.npz"
+        statistics.save(temporary_file_path, **metadata)
+        os.replace(temporary_file_path, cache_file_path)
+        logging.debug(
+            "Cached the reference statistics of %s in %s", path, cache_file_path
+        )
+        return cache_file_path
+
+    def __repr__(self):
+        return f"ReferenceStatisticsCache(cache_path={self.cache_path})"
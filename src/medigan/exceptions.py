@@ -4,3 +4,7 @@
 
 # TODO Add custom exceptions for improved exception handling.
 # See requests.exceptions for reference.
+
+
+class DownloadCancelledError(Exception):
+    """Raised if a download is cancelled (e.g. by a cancelled asyncio task) before it has completed."""
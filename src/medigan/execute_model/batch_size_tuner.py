@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" `BatchSizeTuner` class probing and caching the batch size with the highest generation throughput per model. """
+
+# Import python native libs
+from __future__ import absolute_import
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+# Import library internal modules
+from ..constants import (
+    BATCH_SIZE_CACHE_FILE,
+    DEFAULT_MAX_AUTO_BATCH_SIZE,
+    DEFAULT_MAX_MEMORY_FRACTION,
+)
+from ..metrics import CACHE_HITS, CACHE_MISSES
+from ..utils import Utils
+
+
+class BatchSizeTuner:
+    """`BatchSizeTuner` class: Finds the batch size that maximizes a model's generation throughput within memory limits.
+
+    Starting with a warm-up call, the generate function is called with batch sizes 1, 2, 4, ... up to
+    `max_batch_size`. The probing stops if the model runs out of memory, if the peak memory (CUDA memory or, on cpu
+    under Linux, the process' resident set size) of a probe exceeds `max_memory_fraction` of the device memory, or if
+    doubling the batch size twice in a row did not increase the throughput by at least `min_speedup`. The batch size
+    with the highest throughput is chosen and cached per model id, image size, and device in a JSON file, hence the
+    probing only runs once per model and machine.
+
+    Parameters
+    ----------
+    cache_path: str
+        the path to the JSON file in which the tuned batch sizes are cached. If None, they are not cached.
+    max_batch_size: int
+        the largest batch size that is probed
+    max_memory_fraction: float
+        the maximum fraction of the device memory that the generate calls of the chosen batch size may use
+    min_speedup: float
+        the minimum relative throughput increase for which doubling the batch size counts as an improvement
+
+    Attributes
+    ----------
+    cache_path: str
+        the path to the JSON file in which the tuned batch sizes are cached
+    """
+
+    def __init__(
+        self,
+        cache_path: str = BATCH_SIZE_CACHE_FILE,
+        max_batch_size: int = DEFAULT_MAX_AUTO_BATCH_SIZE,
+        max_memory_fraction: float = DEFAULT_MAX_MEMORY_FRACTION,
+        min_speedup: float = 1.05,
+    ):
+        self.cache_path = cache_path
+        self.max_batch_size = max_batch_size
+        self.max_memory_fraction = max_memory_fraction
+        self.min_speedup = min_speedup
+
+    @staticmethod
+    def get_device() -> str:
+        """Return the name of the device the models run on, i.e. the CUDA device name if available or "cpu"."""
+
+        try:
+            import torch
+
+            if torch.cuda.is_available():
+                return f"cuda:{torch.cuda.get_device_name()}"
+        except ImportError:
+            pass
+        return "cpu"
+
+    @staticmethod
+    def get_cache_key(model_id: str, image_size, device: str) -> str:
+        """Return the key of the tuned batch size of `model_id` for `image_size` on `device` in the cache file."""
+
+        return f"{model_id}|{image_size}|{device}"
+
+    def load_cache(self) -> dict:
+        """Return the cached batch sizes by cache key or an empty dict if there is no (valid) cache file."""
+
+        if self.cache_path is None or not os.path.isfile(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except ValueError as e:
+            logging.warning(
+                "The batch size cache %s could not be read and is ignored: %s",
+                self.cache_path,
+                e,
+            )
+            return {}
+
+    def _save_to_cache(self, cache_key: str, entry: dict):
+        cache = self.load_cache()
+        cache[cache_key] = entry
+        cache_folder = os.path.dirname(self.cache_path)
+        if cache_folder:
+            os.makedirs(cache_folder, exist_ok=True)
+        # Write to a temporary file first so that an interrupted save does not leave a corrupt cache file.
+        temporary_file_path = f"{self.cache_path}.tmp"
+        with open(temporary_file_path, "w") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(temporary_file_path, self.cache_path)
+
+    @staticmethod
+    def _is_out_of_memory_error(error: Exception) -> bool:
+        return isinstance(error, MemoryError) or (
+            isinstance(error, RuntimeError) and "out of memory" in str(error).lower()
+        )
+
+    @staticmethod
+    def _get_cuda_device_index(device: str) -> int:
+        """Return the index of a CUDA `device` such as "cuda:1", or of the current CUDA device if `device` is a name."""
+
+        import torch
+
+        index = device.split(":", 1)[1] if ":" in device else ""
+        return int(index) if index.isdigit() else torch.cuda.current_device()
+
+    def _reset_memory_stats(self, device: str) -> bool:
+        """Reset the peak memory of `device` and return whether the peak memory of the next probe can be measured."""
+
+        if device.startswith("cuda"):
+            import torch
+
+            torch.cuda.empty_cache()
+            torch.cuda.reset_peak_memory_stats(self._get_cuda_device_index(device))
+            return True
+        # On cpu, the peak resident set size can only be reset on Linux. Elsewhere, it is the peak since the start of
+        # the process, which is the same for all probes after the largest one and hence not measured.
+        return Utils.reset_peak_rss()
+
+    def _get_memory_usage_mb(self, device: str) -> [float, float]:
+        """Return the peak memory used since the last reset and the total memory of `device` in MB."""
+
+        if device.startswith("cuda"):
+            import torch
+
+            device_index = self._get_cuda_device_index(device)
+            return (
+                torch.cuda.max_memory_allocated(device_index) / 1024**2,
+                torch.cuda.get_device_properties(device_index).total_memory / 1024**2,
+            )
+        return Utils.get_peak_rss_mb(), Utils.get_total_memory_mb()
+
+    def tune(self, generate_function, device: str = None) -> [int, list]:
+        """Probe increasing batch sizes and return the one with the highest throughput and the probe results.
+
+        Parameters
+        ----------
+        generate_function
+            a function that generates the number of samples it is called with (e.g. `gen(num_samples=...)`)
+        device: str
+            the device the model runs on. If None, it is determined via `get_device`.
+
+        Returns
+        -------
+        list
+            the best batch size and a list of dicts with the batch size, samples per second, and peak memory of each
+            probe
+        """
+
+        device = self.get_device() if device is None else device
+        # The warm-up call e.g. loads the weights, which should not be counted as latency of the first batch size.
+        generate_function(1)
+        probes = []
+        best_batch_size, best_samples_per_second = 1, 0.0
+        num_probes_without_speedup = 0
+        batch_size = 1
+        while batch_size <= self.max_batch_size:
+            is_memory_measured = self._reset_memory_stats(device)
+            try:
+                start_time = time.perf_counter()
+                generate_function(batch_size)
+                latency = time.perf_counter() - start_time
+            except Exception as e:
+                if not self._is_out_of_memory_error(e):
+                    raise e
+                logging.info(
+                    "Batch size tuning: Out of memory with batch size %s.", batch_size
+                )
+                self._reset_memory_stats(device)
+                break
+            peak_memory_mb, total_memory_mb = (
+                self._get_memory_usage_mb(device)
+                if is_memory_measured
+                else (None, None)
+            )
+            samples_per_second = batch_size / max(latency, 1e-9)
+            probes.append(
+                {
+                    "batch_size": batch_size,
+                    "samples_per_second": samples_per_second,
+                    "peak_memory_mb": peak_memory_mb,
+                }
+            )
+            logging.debug("Batch size tuning: %s", probes[-1])
+            if (
+                peak_memory_mb is not None
+                and total_memory_mb is not None
+                and peak_memory_mb > self.max_memory_fraction * total_memory_mb
+            ):
+                logging.info(
+                    "Batch size tuning: Batch size %s used %.0f of %.0f MB memory, which exceeds the limit of %.0f%%.",
+                    batch_size,
+                    peak_memory_mb,
+                    total_memory_mb,
+                    self.max_memory_fraction * 100,
+                )
+                break
+            if samples_per_second >= best_samples_per_second * self.min_speedup:
+                num_probes_without_speedup = 0
+            else:
+                num_probes_without_speedup += 1
+            if samples_per_second > best_samples_per_second:
+                best_batch_size, best_samples_per_second = (
+                    batch_size,
+                    samples_per_second,
+                )
+            if num_probes_without_speedup >= 2:
+                break
+            batch_size *= 2
+        return best_batch_size, probes
+
+    def get_batch_size(
+        self, model_id: str, image_size, generate_function, device: str = None
+    ) -> int:
+        """Return the cached batch size of `model_id` for `image_size` on `device` or tune and cache it.
+
+        Parameters
+        ----------
+        model_id: str
+            The generative model's unique id
+        image_size
+            the size of the generated images, which is part of the cache key
+        generate_function
+            a function that generates the number of samples it is called with
+        device: str
+            the device the model runs on. If None, it is determined via `get_device`.
+
+        Returns
+        -------
+        int
+            the batch size with the highest measured throughput
+        """
+
+        device = self.get_device() if device is None else device
+        cache_key = self.get_cache_key(
+            model_id=model_id, image_size=image_size, device=device
+        )
+        cached_entry = self.load_cache().get(cache_key)
+        if cached_entry is not None:
+            CACHE_HITS.inc(cache="batch_size")
+            logging.debug(
+                "%s: Using the cached batch size %s for %s.",
+                model_id,
+                cached_entry["batch_size"],
+                cache_key,
+            )
+            return cached_entry["batch_size"]
+        CACHE_MISSES.inc(cache="batch_size")
+        logging.info(
+            "%s: Tuning the batch size for image size %s on %s. This runs once per model "
+            "and machine.",
+            model_id,
+            image_size,
+            device,
+        )
+        batch_size, probes = self.tune(
+            generate_function=generate_function, device=device
+        )
+        logging.info("%s: The tuned batch size is %s.", model_id, batch_size)
+        if self.cache_path is not None:
+            self._save_to_cache(
+                cache_key=cache_key,
+                entry={
+                    "batch_size": batch_size,
+                    "probes": probes,
+                    "timestamp": datetime.now().isoformat(),
+                },
+            )
+        return batch_size
+
+    def __repr__(self):
+        return (
+            f"BatchSizeTuner(cache_path={self.cache_path}, max_batch_size={self.max_batch_size}, "
+            f"max_memory_fraction={self.max_memory_fraction})"
+        )
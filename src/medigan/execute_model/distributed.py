@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" Sharding of generation jobs across the ranks of a distributed job and merging of the ranks' manifests.
+
+Each rank (process) of a distributed job calls `ModelExecutor.generate(..., is_distributed=True)` with the same
+`output_path`, `num_samples`, `batch_size`, and `seed`. The rank and world size are read from an initialized
+`torch.distributed` process group or from the `RANK` and `WORLD_SIZE` environment variables (as set e.g. by torchrun),
+hence no coordinator service is needed. The `output_path` must be on a file system shared by all ranks.
+"""
+
+# Import python native libs
+from __future__ import absolute_import
+
+import json
+import logging
+import os
+import time
+
+# Import library internal modules
+from ..constants import (
+    DEFAULT_DISTRIBUTED_TIMEOUT,
+    DISTRIBUTED_RANK_COMPLETED_FILE_NAME,
+    DISTRIBUTED_RANK_FOLDER_PREFIX,
+    GENERATION_MANIFEST_FILE_NAME,
+)
+
+
+def _get_torch_distributed():
+    """Return the `torch.distributed` module if a process group is initialized, else None."""
+
+    try:
+        import torch.distributed as dist
+    except ImportError:
+        return None
+    if dist.is_available() and dist.is_initialized():
+        return dist
+    return None
+
+
+def get_rank_and_world_size() -> [int, int]:
+    """Return the rank of this process and the number of ranks of the distributed job.
+
+    The values are taken from an initialized `torch.distributed` process group, else from the `RANK` and `WORLD_SIZE`
+    (or the SLURM `SLURM_PROCID` and `SLURM_NTASKS`) environment variables. Without any of them, the job has one rank.
+    """
+
+    dist = _get_torch_distributed()
+    if dist is not None:
+        return dist.get_rank(), dist.get_world_size()
+    for rank_variable, world_size_variable in [
+        ("RANK", "WORLD_SIZE"),
+        ("SLURM_PROCID", "SLURM_NTASKS"),
+    ]:
+        if rank_variable in os.environ and world_size_variable in os.environ:
+            return int(os.environ[rank_variable]), int(os.environ[world_size_variable])
+    return 0, 1
+
+
+def get_rank_batch_nums(num_batches: int, rank: int, world_size: int) -> range:
+    """Return the contiguous range of the batches of a job with `num_batches` batches that `rank` generates."""
+
+    if not 0 <= rank < world_size:
+        raise ValueError(f"The rank {rank} is not in the world size {world_size}.")
+    return range(
+        rank * num_batches // world_size, (rank + 1) * num_batches // world_size
+    )
+
+
+def get_rank_output_path(output_path: str, rank: int) -> str:
+    """Return the folder in `output_path` in which `rank` stores its outputs and manifest."""
+
+    return os.path.join(output_path, f"{DISTRIBUTED_RANK_FOLDER_PREFIX}{rank:05d}")
+
+
+def get_job_header(
+    num_samples: int, batch_size: int, seed: int, world_size: int
+) -> dict:
+    """Return the parameters that identify a distributed job and that all of its ranks share."""
+
+    return {
+        "num_samples": num_samples,
+        "batch_size": batch_size,
+        "seed": seed,
+        "world_size": world_size,
+    }
+
+
+def _get_rank_completed_file_path(rank_output_path: str) -> str:
+    return os.path.join(rank_output_path, DISTRIBUTED_RANK_COMPLETED_FILE_NAME)
+
+
+def remove_rank_completed_marker(rank_output_path: str):
+    """Remove the completion record that an earlier job left in the rank's folder, if any."""
+
+    try:
+        os.remove(_get_rank_completed_file_path(rank_output_path=rank_output_path))
+    except FileNotFoundError:
+        pass
+
+
+def mark_rank_completed(
+    rank_output_path: str, job_header: dict, num_batches: int, num_samples: int
+):
+    """Record in the rank's folder that the rank has generated all of its batches of the job of `job_header`."""
+
+    file_path = _get_rank_completed_file_path(rank_output_path=rank_output_path)
+    temporary_file_path = f"{file_path}.tmp"
+    with open(temporary_file_path, "w") as f:
+        json.dump(
+            {
+                "job": job_header,
+                "num_batches": num_batches,
+                "num_samples": num_samples,
+                "completed_at": time.time(),
+            },
+            f,
+        )
+    os.replace(temporary_file_path, file_path)
+
+
+def is_rank_completed(rank_output_path: str, job_header: dict) -> bool:
+    """Return whether the rank has recorded in its folder that it completed its part of the job of `job_header`."""
+
+    try:
+        with open(
+            _get_rank_completed_file_path(rank_output_path=rank_output_path)
+        ) as f:
+            return json.load(f).get("job") == job_header
+    except (FileNotFoundError, ValueError):
+        return False
+
+
+def wait_for_ranks(
+    output_path: str,
+    job_header: dict,
+    timeout: float = DEFAULT_DISTRIBUTED_TIMEOUT,
+    poll_interval: float = 1,
+):
+    """Wait until all ranks have marked their part of the job of `job_header` in `output_path` as completed.
+
+    Completion records of other jobs (e.g. of an earlier run into the same `output_path`) are ignored. If a
+    `torch.distributed` process group is initialized, its barrier is used instead of polling the file system.
+
+    Raises
+    ------
+    TimeoutError
+        if not all ranks have completed within `timeout` seconds (None waits indefinitely)
+    """
+
+    dist = _get_torch_distributed()
+    if dist is not None:
+        dist.barrier()
+        return
+    start_time = time.time()
+    while True:
+        missing_ranks = [
+            rank
+            for rank in range(job_header["world_size"])
+            if not is_rank_completed(
+                rank_output_path=get_rank_output_path(
+                    output_path=output_path, rank=rank
+                ),
+                job_header=job_header,
+            )
+        ]
+        if not missing_ranks:
+            return
+        if timeout is not None and time.time() - start_time > timeout:
+            raise TimeoutError(
+                f"The ranks {missing_ranks} did not complete their part of the job in {output_path} "
+                f"within {timeout} seconds."
+            )
+        logging.debug("Waiting for the ranks %s to complete.", missing_ranks)
+        time.sleep(poll_interval)
+
+
+def merge_rank_manifests(output_path: str, world_size: int) -> str:
+    """Merge the manifests of all ranks into one manifest in `output_path` and return its path.
+
+    The merged manifest has the format of a `GenerationManifest` with the file names relative to `output_path`, i.e.
+    prefixed with the folders of the ranks. Its header additionally holds the `world_size`.
+    """
+
+    header, entries = None, []
+    for rank in range(world_size):
+        rank_output_path = get_rank_output_path(output_path=output_path, rank=rank)
+        with open(os.path.join(rank_output_path, GENERATION_MANIFEST_FILE_NAME)) as f:
+            rank_records = [json.loads(line) for line in f if line.strip()]
+        if header is None:
+            header = dict(rank_records[0], world_size=world_size)
+        for entry in rank_records[1:]:
+            for file in entry["files"]:
+                file["name"] = os.path.join(
+                    os.path.basename(rank_output_path), file["name"]
+                )
+            entry["rank"] = rank
+            entries.append(entry)
+    manifest_path = os.path.join(output_path, GENERATION_MANIFEST_FILE_NAME)
+    temporary_file_path = f"{manifest_path}.tmp"
+    with open(temporary_file_path, "w") as f:
+        for record in [header] + sorted(entries, key=lambda entry: entry["batch"]):
+            f.write(json.dumps(record) + "\n")
+    os.replace(temporary_file_path, manifest_path)
+    logging.info(
+        "Merged the manifests of %s ranks (%s batches) into %s.",
+        world_size,
+        len(entries),
+        manifest_path,
+    )
+    return manifest_path
+
+
+def complete_rank(
+    output_path: str,
+    rank: int,
+    job_header: dict,
+    num_batches: int,
+    num_samples: int,
+    timeout: float = DEFAULT_DISTRIBUTED_TIMEOUT,
+) -> str:
+    """Mark the part of `rank` as completed and, on rank 0, merge the manifests once all ranks have completed.
+
+    Returns
+    -------
+    str
+        the path to the merged manifest on rank 0, else None
+    """
+
+    mark_rank_completed(
+        rank_output_path=get_rank_output_path(output_path=output_path, rank=rank),
+        job_header=job_header,
+        num_batches=num_batches,
+        num_samples=num_samples,
+    )
+    # With a torch.distributed process group, all ranks take part in the barrier. Else, only rank 0 waits.
+    if rank != 0 and _get_torch_distributed() is None:
+        return None
+    wait_for_ranks(output_path=output_path, job_header=job_header, timeout=timeout)
+    if rank != 0:
+        return None
+    return merge_rank_manifests(
+        output_path=output_path, world_size=job_header["world_size"]
+    )
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" `GenerationManifest` class recording the completed batches of a resumable sample generation job. """
+
+# Import python native libs
+from __future__ import absolute_import
+
+import json
+import logging
+import os
+import random
+import shutil
+import time
+
+# Import library internal modules
+from ..constants import CHECKSUM_BLOCK_SIZE, GENERATION_MANIFEST_FILE_NAME
+from ..utils import Utils
+
+
+class GenerationManifest:
+    """`GenerationManifest` class: Checkpoint manifest of a batch-wise generation job stored in its `output_path`.
+
+    The manifest is a json lines file. The first line describes the job (model_id, num_samples, batch_size, seed) and
+    each following line describes one completed batch (batch index, seed, files, and their checksums). Lines are only
+    appended, which keeps the cost of checkpointing a batch constant, and a partially written last line (e.g. due to a
+    crash while writing) is ignored when the manifest is loaded again.
+
+    Parameters
+    ----------
+    output_path: str
+        the path as str to the output folder of the generation job in which the manifest is stored
+    model_id: str
+        The generative model's unique id
+    num_samples: int
+        the number of samples that are generated in the job
+    batch_size: int
+        the batch size of the job
+    seed: int
+        the base seed of the job. If None, the seed of an existing manifest or a new random seed is used.
+    is_checksum_verified: bool
+        flag indicating whether, on restart, the checksums of the files of completed batches are verified.
+    is_read_only: bool
+        flag indicating whether the existing manifest in `output_path` is only read (e.g. to report the progress of a
+        running job). The job parameters are then taken from its header instead of being checked against it, and a
+        `FileNotFoundError` is raised if there is no manifest.
+
+    Attributes
+    ----------
+    manifest_path: str
+        the path as str to the manifest file
+    seed: int
+        the base seed of the job. The seed of each batch is derived from it via `get_batch_seed`.
+    completed_batches: dict
+        the completed batch entries of the manifest keyed by batch index
+    is_resumed: bool
+        flag indicating whether the manifest already existed i.e. whether a previous run of the job is resumed
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        model_id: str,
+        num_samples: int,
+        batch_size: int,
+        seed: int = None,
+        is_checksum_verified: bool = True,
+        is_read_only: bool = False,
+    ):
+        self.output_path = output_path
+        self.model_id = model_id
+        self.num_samples = num_samples
+        self.batch_size = batch_size
+        self.seed = seed
+        self.is_checksum_verified = is_checksum_verified
+        self.is_read_only = is_read_only
+        self.manifest_path = os.path.join(output_path, GENERATION_MANIFEST_FILE_NAME)
+        self.completed_batches = {}
+        self.is_resumed = False
+        self._checksums = {}
+        self._load_or_create()
+
+    def _load_or_create(self):
+        """Load the manifest from `manifest_path` if it exists, else create it with the job header."""
+
+        if self.is_read_only:
+            header, entries = self._read_lines()
+            self.num_samples = header["num_samples"]
+            self.batch_size = header["batch_size"]
+            self.seed = header["seed"]
+            self.is_resumed = True
+            for entry in entries:
+                self.completed_batches[entry["batch"]] = entry
+        elif os.path.isfile(self.manifest_path):
+            header, entries = self._read_lines()
+            for key, value in [
+                ("model_id", self.model_id),
+                ("num_samples", self.num_samples),
+                ("batch_size", self.batch_size),
+            ]:
+                if header.get(key) != value:
+                    raise ValueError(
+                        f"{self.model_id}: The manifest in {self.manifest_path} belongs to a different generation job "
+                        f"({key}={header.get(key)} instead of {value}). Please use a different output_path or remove "
+                        f"the manifest to restart the job from scratch."
+                    )
+            if self.seed is not None and self.seed != header["seed"]:
+                logging.warning(
+                    "%s: Ignoring seed %s. Resuming the job with the seed %s "
+                    "stored in its manifest (%s).",
+                    self.model_id,
+                    self.seed,
+                    header["seed"],
+                    self.manifest_path,
+                )
+            self.seed = header["seed"]
+            self.is_resumed = True
+            for entry in entries:
+                self.completed_batches[entry["batch"]] = entry
+            logging.info(
+                "%s: Resuming generation job from %s. "
+                "%s batches were already completed.",
+                self.model_id,
+                self.manifest_path,
+                len(self.completed_batches),
+            )
+        else:
+            if self.seed is None:
+                self.seed = random.randint(0, 2**31 - 1)
+            self._append_line(
+                {
+                    "model_id": self.model_id,
+                    "num_samples": self.num_samples,
+                    "batch_size": self.batch_size,
+                    "seed": self.seed,
+                    "created_at": time.time(),
+                }
+            )
+
+    def _read_lines(self) -> [dict, list]:
+        """Read and return the header and the batch entries of the manifest file."""
+
+        header = None
+        entries = []
+        with open(self.manifest_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may have been partially written when the job was interrupted.
+                    logging.warning(
+                        "%s: Skipping unreadable line in manifest %s: %s",
+                        self.model_id,
+                        self.manifest_path,
+                        line,
+                    )
+                    continue
+                if header is None:
+                    header = record
+                else:
+                    entries.append(record)
+        if header is None:
+            raise ValueError(
+                f"{self.model_id}: The manifest in {self.manifest_path} has no valid header line."
+            )
+        return header, entries
+
+    def _append_line(self, record: dict):
+        """Append one json record to the manifest file and flush it to disk."""
+
+        with open(self.manifest_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _get_checksum(self, file_path: str) -> str:
+        """Return the checksum of a file, reusing it if the file (e.g. a shard of several batches) is unchanged."""
+
+        stat = os.stat(file_path)
+        key = (file_path, stat.st_mtime_ns, stat.st_size)
+        if key not in self._checksums:
+            self._checksums[key] = Utils.calculate_checksum(
+                file_path, block_size=CHECKSUM_BLOCK_SIZE
+            )
+        return self._checksums[key]
+
+    def get_num_completed_samples(self) -> int:
+        """Return the number of samples of all completed batches."""
+
+        return sum(entry["num_samples"] for entry in self.completed_batches.values())
+
+    def get_batch_seed(self, batch_num: int) -> int:
+        """Return the deterministic seed of the batch `batch_num`."""
+
+        return self.seed + batch_num
+
+    def is_batch_completed(self, batch_num: int) -> bool:
+        """Check if a batch is recorded in the manifest and if all of its files are present (and unchanged)."""
+
+        entry = self.completed_batches.get(batch_num)
+        if entry is None:
+            return False
+        for file in entry["files"]:
+            file_path = os.path.join(self.output_path, file["name"])
+            if not os.path.exists(file_path) or (
+                self.is_checksum_verified
+                and self._get_checksum(file_path) != file["sha256"]
+            ):
+                logging.warning(
+                    "%s: File %s of completed batch %s is missing or was "
+                    "modified. The batch will be generated again.",
+                    self.model_id,
+                    file_path,
+                    batch_num,
+                )
+                for stale_file in entry["files"]:
+                    stale_file_path = os.path.join(self.output_path, stale_file["name"])
+                    if os.path.isdir(stale_file_path):
+                        shutil.rmtree(stale_file_path)
+                    elif os.path.exists(stale_file_path):
+                        os.remove(stale_file_path)
+                del self.completed_batches[batch_num]
+                return False
+        return True
+
+    def add_batch(self, batch_num: int, num_samples: int, filenames: list):
+        """Checkpoint a completed batch and the checksums of its files (relative to `output_path`) in the manifest."""
+
+        entry = {
+            "batch": batch_num,
+            "seed": self.get_batch_seed(batch_num),
+            "num_samples": num_samples,
+            "files": [
+                {
+                    "name": filename,
+                    "sha256": self._get_checksum(
+                        os.path.join(self.output_path, filename)
+                    ),
+                }
+                for filename in filenames
+            ],
+            "completed_at": time.time(),
+        }
+        self._append_line(entry)
+        self.completed_batches[batch_num] = entry
+
+    def remove_untracked_outputs(self, prefixes: tuple = ("batch_", "shard-")):
+        """Remove leftovers (files and folders starting with one of `prefixes`) of batches that were not completed."""
+
+        tracked_files = {
+            file["name"]
+            for entry in self.completed_batches.values()
+            for file in entry["files"]
+        }
+        for filename in os.listdir(self.output_path):
+            if filename.startswith(prefixes) and filename not in tracked_files:
+                path = os.path.join(self.output_path, filename)
+                logging.debug(
+                    "%s: Removing output of an incomplete batch: %s",
+                    self.model_id,
+                    path,
+                )
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+
+    def __repr__(self):
+        return (
+            f"GenerationManifest(manifest_path={self.manifest_path}, model_id={self.model_id}, "
+            f"num_samples={self.num_samples}, batch_size={self.batch_size}, seed={self.seed}, "
+            f"completed_batches={len(self.completed_batches)})"
+        )
+
+    def __len__(self):
+        return len(self.completed_batches)
@@ -5,19 +5,24 @@
 # Import python native libs
 from __future__ import absolute_import
 
+import copy
 import importlib
 import logging
 import os
+import threading
 import time
+import uuid
 
 # Import pypi libs
 from pathlib import Path
+from typing import Union
 
 import pkg_resources
 from tqdm import tqdm
 
 # Import library internal modules
 from ..constants import (
+    BATCH_SIZE_AUTO,
     CONFIG_FILE_KEY_DEPENDENCIES,
     CONFIG_FILE_KEY_GENERATE,
     CONFIG_FILE_KEY_GENERATE_ARGS,
@@ -34,17 +39,51 @@ from ..constants import (
     CONFIG_FILE_KEY_MODEL_NAME,
     CONFIG_FILE_KEY_PACKAGE_LINK,
     CONFIG_FILE_KEY_PACKAGE_NAME,
+    DEFAULT_DISTRIBUTED_TIMEOUT,
     DEFAULT_OUTPUT_FOLDER,
+    DEFAULT_SAMPLES_PER_SHARD,
     MODEL_FOLDER,
     PACKAGE_EXTENSION,
 )
-from ..utils import Utils
+from ..metrics import (
+    CACHE_HITS,
+    CACHE_MISSES,
+    GENERATE_CALL_DURATION,
+    GENERATE_FAILURES,
+    SAMPLES_GENERATED,
+)
+from ..tracing import get_tracer
+from ..utils import ArraySummary, Utils
+from .batch_size_tuner import BatchSizeTuner
+from .distributed import (
+    complete_rank,
+    get_job_header,
+    get_rank_and_world_size,
+    get_rank_batch_nums,
+    get_rank_output_path,
+    remove_rank_completed_marker,
+)
+from .generation_manifest import GenerationManifest
 from .install_model_dependencies import install_model
+from .sample_writers import get_sample_writer
+
+# Locks by model id serializing the download, unzipping, and import of a model package, also across ModelExecutor
+# instances of the same model.
+_package_locks = {}
+_package_locks_lock = threading.Lock()
+
+
+def _get_package_lock(model_id: str) -> threading.Lock:
+    with _package_locks_lock:
+        return _package_locks.setdefault(model_id, threading.Lock())
 
 
 class ModelExecutor:
     """`ModelExecutor` class: Find config links to download models, init models as python packages, run generate methods.
 
+    A `ModelExecutor` can be used from multiple threads: its model package is set up by one thread at a time and each
+    generate call prepares its own copy of the generate method's keyword arguments.
+
     Parameters
     ----------
     model_id: str
@@ -89,6 +128,8 @@ class ModelExecutor:
         Path as string to the generative model's python package containing an `__init__.py` file
     deserialized_model_as_lib
         The generative model's package imported as python library. Generate method inside this library can be called.
+    batch_size_tuner: BatchSizeTuner
+        Tunes and caches the batch size of the generate calls if `generate` is called with `batch_size="auto"`
     """
 
     def __init__(
@@ -114,6 +155,10 @@ class ModelExecutor:
         self.serialised_model_file_path = None
         self.package_path = None
         self.deserialized_model_as_lib = None
+        self.batch_size_tuner = BatchSizeTuner()
+        self._num_generate_calls = 0
+        self._lock = threading.Lock()
+        self._batch_size_lock = threading.Lock()
         self._setup_model_package()
 
     def _setup_model_package(self):
@@ -139,26 +184,43 @@ class ModelExecutor:
                 CONFIG_FILE_KEY_GENERATE
             ][CONFIG_FILE_KEY_GENERATE_ARGS_INPUT_LATENT_VECTOR_SIZE]
 
-        self._check_package_resources()
-        if not self.is_model_already_unpacked():
-            self._get_and_store_package()
-        self._import_package_as_lib()
+        # Only one thread downloads, unzips, and imports the package, while other threads wait and reuse the result.
+        with _get_package_lock(self.model_id):
+            with get_tracer().span(
+                "model_executor.check_package_resources", model_id=self.model_id
+            ):
+                self._check_package_resources()
+            if self.is_model_already_unpacked():
+                CACHE_HITS.inc(cache="model_package")
+            else:
+                CACHE_MISSES.inc(cache="model_package")
+                with get_tracer().span(
+                    "model_executor.get_and_store_package", model_id=self.model_id
+                ):
+                    self._get_and_store_package()
+            self._import_package_as_lib()
 
     def _check_package_resources(self):
         """Check if the dependencies inside the generative model's package are installed in the current setup."""
 
         logging.debug(
-            f"{self.model_id}: Now checking availability of dependencies of model: {self.dependencies}"
+            "%s: Now checking availability of dependencies of model: %s",
+            self.model_id,
+            self.dependencies,
         )
         try:
             pkg_resources.require(self.dependencies)
             logging.debug(
-                f"{self.model_id}: All necessary dependencies for model are available: {self.dependencies}"
+                "%s: All necessary dependencies for model are available: %s",
+                self.model_id,
+                self.dependencies,
             )
         except Exception as e:
             if self.install_dependencies:
                 logging.info(
-                    f"{self.model_id}: Now installing dependencies using pip for model {self.dependencies}. This may take a few minutes."
+                    "%s: Now installing dependencies using pip for model %s. This may take a few minutes.",
+                    self.model_id,
+                    self.dependencies,
                 )
                 install_model(
                     model_id=self.model_id, execution_config=self.execution_config
@@ -195,7 +257,9 @@ class ModelExecutor:
                 raise e
             self.package_path = package_path
         logging.info(
-            f"{self.model_id}: Model package should now be available in: {self.package_path}."
+            "%s: Model package should now be available in: %s.",
+            self.model_id,
+            self.package_path,
         )
 
     def is_model_already_unpacked(self) -> bool:
@@ -223,8 +287,10 @@ class ModelExecutor:
         """Unzip and import the generative model's python package using importlib."""
 
         logging.debug(
-            f"{self.model_id}: Now importing model package ({self.package_name}) as lib using "
-            f"importlib from {self.package_path}."
+            "%s: Now importing model package (%s) as lib using importlib from %s.",
+            self.model_id,
+            self.package_name,
+            self.package_path,
         )
         is_model_already_unpacked = self.is_model_already_unpacked()
         # if is_model_already_unpacked == True, then the package was already unzipped previously.
@@ -241,15 +307,22 @@ class ModelExecutor:
             )
         else:
             logging.debug(
-                f"{self.model_id}: Either no file found (== {self.package_path.is_file()}) or package "
-                f"already unarchived (=={is_model_already_unpacked}) in {self.package_path}. "
-                f"No action was taken."
+                "%s: Either no file found (== %s) or package "
+                "already unarchived (==%s) in %s. "
+                "No action was taken.",
+                self.model_id,
+                self.package_path.is_file(),
+                is_model_already_unpacked,
+                self.package_path,
             )
         try:
             # Installing generative model as python library
-            self.deserialized_model_as_lib = importlib.import_module(
-                name=f"{MODEL_FOLDER}.{self.model_id}.{self.package_name}"
-            )
+            with get_tracer().span(
+                "model_executor.import_module", model_id=self.model_id
+            ):
+                self.deserialized_model_as_lib = importlib.import_module(
+                    name=f"{MODEL_FOLDER}.{self.model_id}.{self.package_name}"
+                )
             if not hasattr(
                 self.deserialized_model_as_lib, f"{self.generate_method_name}"
             ):
@@ -259,9 +332,12 @@ class ModelExecutor:
         except ModuleNotFoundError:
             try:
                 # Fallback: The zip's content might have been unzipped in the model_id folder without generating the package_name subfolder.
-                self.deserialized_model_as_lib = importlib.import_module(
-                    name=f"{MODEL_FOLDER}.{self.model_id}"
-                )
+                with get_tracer().span(
+                    "model_executor.import_module", model_id=self.model_id
+                ):
+                    self.deserialized_model_as_lib = importlib.import_module(
+                        name=f"{MODEL_FOLDER}.{self.model_id}"
+                    )
                 if not hasattr(
                     self.deserialized_model_as_lib, f"{self.generate_method_name}"
                 ):
@@ -276,10 +352,18 @@ class ModelExecutor:
                 self.serialised_model_file_path = f"{MODEL_FOLDER}/{self.model_id}/{self.model_name}{self.model_extension}"
             except Exception as e:
                 logging.error(
-                    f"{self.model_id}: Error occurred while trying to import "
-                    f"'{MODEL_FOLDER}.{self.model_id}.{self.package_name}'."
-                    f"Fallback import of '{MODEL_FOLDER}.{self.model_id}' also failed. "
-                    f"Please make sure the module '{MODEL_FOLDER}' is not imported from elsewhere in your syspath: {e}"
+                    "%s: Error occurred while trying to import "
+                    "'%s.%s.%s'."
+                    "Fallback import of '%s.%s' also failed. "
+                    "Please make sure the module '%s' is not imported from elsewhere in your syspath: %s",
+                    self.model_id,
+                    MODEL_FOLDER,
+                    self.model_id,
+                    self.package_name,
+                    MODEL_FOLDER,
+                    self.model_id,
+                    MODEL_FOLDER,
+                    e,
                 )
                 raise e
 
@@ -289,7 +373,15 @@ class ModelExecutor:
         output_path: str = None,
         save_images: bool = True,
         is_gen_function_returned: bool = False,
-        batch_size: int = 32,
+        batch_size: Union[int, str] = 32,
+        is_resumable: bool = False,
+        seed: int = None,
+        output_format: str = None,
+        samples_per_shard: int = DEFAULT_SAMPLES_PER_SHARD,
+        compression: str = None,
+        is_distributed: bool = False,
+        distributed_timeout: float = DEFAULT_DISTRIBUTED_TIMEOUT,
+        abort_event: threading.Event = None,
         **kwargs,
     ):
         """Generate samples using the generative model or return the model's generate function.
@@ -307,8 +399,37 @@ class ModelExecutor:
             flag indicating whether generated samples are returned (i.e. as list of numpy arrays) or rather stored in file system (i.e in `output_path`)
         is_gen_function_returned: bool
             flag indicating whether, instead of generating samples, the sample generation function will be returned
-        batch_size: int
-            the batch size for the sample generation function
+        batch_size: Union[int, str]
+            the batch size for the sample generation function. If "auto", the batch size with the highest throughput
+            that fits into memory is probed on the first call and cached per model id, image size, and device.
+        is_resumable: bool
+            flag indicating whether, if `save_images` is True, the completed batches are checkpointed in a manifest in
+            `output_path`. Calling `generate` again with the same `output_path` then skips the completed batches.
+        seed: int
+            the base seed from which the random seed of each batch is derived. If None and `is_resumable` is True, a
+            random base seed is drawn and stored in the manifest.
+        output_format: str
+            if `save_images` is True, the format in which the samples are stored in `output_path`. If None, the model
+            stores its samples as files (e.g. png). Else, the samples, masks, and labels returned by the model are
+            packed into "tar" (WebDataset) shards, or into an "hdf5" or "zarr" store.
+        samples_per_shard: int
+            the number of samples per tar shard or per chunk of the hdf5/zarr store, if `output_format` is not None
+        compression: str
+            the compression of the tar shards ("gz") or of the hdf5 store (e.g. "gzip", "lzf"), if `output_format` is
+            not None. If None, tar shards are uncompressed, hdf5 stores use "gzip", and zarr stores use zarr's default.
+        is_distributed: bool
+            flag indicating whether, if `save_images` is True, this process is one rank of a distributed job whose
+            rank and world size are read from `torch.distributed` or the `RANK` and `WORLD_SIZE` environment variables.
+            Each rank generates a contiguous range of the job's batches into its own folder in `output_path` (which
+            must be shared by all ranks) and checkpoints them in its own manifest. The batch seeds are derived from
+            `seed`, which all ranks need to share, as in a single-process job. Once all ranks have completed, rank 0
+            merges their manifests into a manifest in `output_path`.
+        distributed_timeout: float
+            if `is_distributed` is True, the time in seconds that rank 0 waits for the other ranks to complete before
+            a `TimeoutError` is raised. If None, rank 0 waits indefinitely.
+        abort_event: threading.Event
+            if `save_images` is True, an event that is checked before each batch. Once it is set, the generation stops
+            with a `RuntimeError` and the batches completed so far are kept as when the job is interrupted.
         **kwargs
             arbitrary number of keyword arguments passed to the model's sample generation function
 
@@ -325,14 +446,12 @@ class ModelExecutor:
         """
 
         if output_path is None:
-            output_path = f"{DEFAULT_OUTPUT_FOLDER}/{self.model_id}/{time.time()}/"
+            output_path = self.get_default_output_path()
         assert Utils.mkdirs(
             path_as_string=output_path
         ), f"{self.model_id}: The output folder was not found nor created in {output_path}."
         try:
-            generate_method = getattr(
-                self.deserialized_model_as_lib, f"{self.generate_method_name}"
-            )
+            generate_method = self._get_generate_method()
             prepared_kwargs = self._prepare_generate_method_args(
                 model_file=self.serialised_model_file_path,
                 num_samples=num_samples,
@@ -340,59 +459,411 @@ class ModelExecutor:
                 save_images=save_images,
                 **kwargs,
             )
-            logging.debug(f"The generate function's parameters are: {prepared_kwargs}")
+            logging.debug(
+                "The generate function's parameters are: %s",
+                ArraySummary(prepared_kwargs, max_items=20),
+            )
             if is_gen_function_returned:
 
                 def gen(**some_other_kwargs):
                     logging.debug(
-                        f"Generate method called with the following params. (i) default: {prepared_kwargs}, "
-                        f"(ii) custom: {some_other_kwargs}"
+                        "Generate method called with the following params. (i) default: %s, "
+                        "(ii) custom: %s",
+                        ArraySummary(prepared_kwargs, max_items=20),
+                        ArraySummary(some_other_kwargs, max_items=20),
                     )
-                    prepared_kwargs.update(some_other_kwargs)
-                    return generate_method(**prepared_kwargs)
+                    # Each call gets its own kwargs, hence concurrent calls do not see each other's kwargs.
+                    return generate_method(**{**prepared_kwargs, **some_other_kwargs})
 
                 return gen
             elif save_images:
-                sample_index = 1
-                prepared_kwargs.update({"num_samples": batch_size})
-                for batch_num in tqdm(range(0, num_samples // batch_size + 1)):
-                    if batch_num == num_samples // batch_size:
-                        batch_size = num_samples % batch_size
-                        prepared_kwargs.update({"num_samples": batch_size})
-
-                    batch_path = (
-                        os.path.join(output_path, "batch_" + str(batch_num)) + "/"
+                if is_distributed and (seed is None or batch_size == BATCH_SIZE_AUTO):
+                    raise ValueError(
+                        f"{self.model_id}: A distributed job needs a seed and a fixed batch size shared by all "
+                        f"ranks, but got seed={seed} and batch_size={batch_size}."
+                    )
+                batch_size = self._resolve_batch_size(
+                    batch_size=batch_size,
+                    generate_method=generate_method,
+                    prepared_kwargs=prepared_kwargs,
+                )
+                batches = list(
+                    enumerate(self._get_batch_sizes(num_samples, batch_size))
+                )
+                if is_distributed:
+                    rank, world_size = get_rank_and_world_size()
+                    rank_batch_nums = get_rank_batch_nums(
+                        num_batches=len(batches), rank=rank, world_size=world_size
+                    )
+                    batches = [batches[batch_num] for batch_num in rank_batch_nums]
+                    job_output_path = output_path
+                    output_path = get_rank_output_path(
+                        output_path=output_path, rank=rank
                     )
-
-                    # Generate the path in case it is not yet available.
                     assert Utils.mkdirs(
-                        path_as_string=batch_path
-                    ), f"{self.model_id}: The batch path was not found nor created in {batch_path}."
-
-                    prepared_kwargs.update({"output_path": batch_path})
-
-                    generate_method(**prepared_kwargs)
-
-                    for filename in os.listdir(batch_path):
-                        os.rename(
-                            os.path.join(batch_path, filename),
-                            os.path.join(
-                                output_path, "batch_" + str(batch_num) + "_" + filename
-                            ),
+                        path_as_string=output_path
+                    ), f"{self.model_id}: The rank's output folder was not found nor created in {output_path}."
+                    # A completion record of an earlier run into the same folder must not count for this run.
+                    remove_rank_completed_marker(rank_output_path=output_path)
+                    # Each rank checkpoints its batches, so that the ranks' manifests can be merged.
+                    is_resumable = True
+                    logging.info(
+                        "%s: Rank %s of %s generates the batches %s to %s in %s.",
+                        self.model_id,
+                        rank,
+                        world_size,
+                        rank_batch_nums.start,
+                        rank_batch_nums.stop - 1,
+                        output_path,
+                    )
+                manifest = None
+                if is_resumable:
+                    manifest = GenerationManifest(
+                        output_path=output_path,
+                        model_id=self.model_id,
+                        num_samples=num_samples,
+                        batch_size=batch_size,
+                        seed=seed,
+                    )
+                    if manifest.is_resumed:
+                        manifest.remove_untracked_outputs()
+                    logging.info(
+                        "%s: Checkpointing completed batches in %s. "
+                        "To resume this job, call generate again with output_path=%s.",
+                        self.model_id,
+                        manifest.manifest_path,
+                        output_path,
+                    )
+                sample_writer = None
+                if output_format is not None:
+                    sample_writer = get_sample_writer(
+                        output_format=output_format,
+                        output_path=output_path,
+                        samples_per_shard=samples_per_shard,
+                        compression=compression,
+                    )
+                    sample_writer.open(
+                        num_samples_to_keep=None
+                        if manifest is None
+                        else manifest.get_num_completed_samples()
+                    )
+                    # The model returns the samples, which are then packed into the store by the sample writer.
+                    prepared_kwargs.update({"save_images": False})
+                try:
+                    for batch_num, current_batch_size in tqdm(batches):
+                        self._check_aborted(
+                            abort_event=abort_event, output_path=output_path
                         )
-                        sample_index += 1
-
-                    os.rmdir(batch_path)
+                        if current_batch_size == 0:
+                            continue
+                        if manifest is not None:
+                            if manifest.is_batch_completed(batch_num):
+                                continue
+                            Utils.set_random_seed(manifest.get_batch_seed(batch_num))
+                        elif seed is not None:
+                            Utils.set_random_seed(seed + batch_num)
+
+                        if sample_writer is None:
+                            batch_records = self._generate_batch_into_folder(
+                                generate_method=generate_method,
+                                prepared_kwargs=prepared_kwargs,
+                                output_path=output_path,
+                                batch_num=batch_num,
+                                batch_size=current_batch_size,
+                            )
+                        else:
+                            prepared_kwargs.update({"num_samples": current_batch_size})
+                            (
+                                samples,
+                                masks,
+                                other_imaging_output,
+                                labels,
+                            ) = Utils.split_images_masks_and_labels(
+                                data=generate_method(**prepared_kwargs),
+                                num_samples=current_batch_size,
+                            )
+                            with get_tracer().span(
+                                "sample_writer.write",
+                                model_id=self.model_id,
+                                writer=type(sample_writer).__name__,
+                                num_samples=len(samples),
+                            ) as span:
+                                batch_records = sample_writer.write(
+                                    batch_num=batch_num,
+                                    samples=samples,
+                                    masks=masks,
+                                    other_imaging_output=other_imaging_output,
+                                    labels=labels,
+                                )
+                                span.set_attribute(
+                                    "bytes",
+                                    sum(
+                                        getattr(sample, "nbytes", 0)
+                                        for sample in samples
+                                    ),
+                                )
+                        self._add_batch_records_to_manifest(manifest, batch_records)
+                    # The last shard is only written when the writer is closed.
+                    self._check_aborted(
+                        abort_event=abort_event, output_path=output_path
+                    )
+                except Exception as e:
+                    if sample_writer is not None:
+                        sample_writer.close(is_aborted=True)
+                    raise e
+                if sample_writer is not None:
+                    self._add_batch_records_to_manifest(manifest, sample_writer.close())
+                if is_distributed:
+                    complete_rank(
+                        output_path=job_output_path,
+                        rank=rank,
+                        job_header=get_job_header(
+                            num_samples=num_samples,
+                            batch_size=batch_size,
+                            seed=seed,
+                            world_size=world_size,
+                        ),
+                        num_batches=len(batches),
+                        num_samples=manifest.get_num_completed_samples(),
+                        timeout=distributed_timeout,
+                    )
             else:
+                if seed is not None:
+                    Utils.set_random_seed(seed)
                 return generate_method(**prepared_kwargs)
 
         except Exception as e:
             logging.error(
-                f"{self.model_id}: Error while trying to generate images with model "
-                f"{self.serialised_model_file_path}: {e}"
+                "%s: Error while trying to generate images with model %s: %s",
+                self.model_id,
+                self.serialised_model_file_path,
+                e,
             )
             raise e
 
+    def generate_batches(
+        self,
+        num_samples: int = 20,
+        batch_size: Union[int, str] = 32,
+        seed: int = None,
+        **kwargs,
+    ):
+        """Generate samples batch by batch in memory and yield each batch without storing any files.
+
+        Parameters
+        ----------
+        num_samples: int
+            the number of samples that will be generated
+        batch_size: Union[int, str]
+            the number of samples generated per call of the model's generate function. If "auto", the batch size is
+            tuned as in `generate`.
+        seed: int
+            the base seed from which the random seed of each batch is derived. If None, the batches are not seeded.
+        **kwargs
+            arbitrary number of keyword arguments passed to the model's sample generation function
+
+        Returns
+        -------
+        generator
+            yields the samples, masks, other_imaging_output, and labels of each batch as returned by
+            `Utils.split_images_masks_and_labels`
+        """
+
+        generate_method = self._get_generate_method()
+        prepared_kwargs = self._prepare_generate_method_args(
+            model_file=self.serialised_model_file_path,
+            num_samples=batch_size,
+            output_path=self.get_default_output_path(),
+            save_images=False,
+            **kwargs,
+        )
+        batch_size = self._resolve_batch_size(
+            batch_size=batch_size,
+            generate_method=generate_method,
+            prepared_kwargs=prepared_kwargs,
+        )
+        for batch_num, current_batch_size in enumerate(
+            self._get_batch_sizes(num_samples, batch_size)
+        ):
+            if current_batch_size == 0:
+                continue
+            if seed is not None:
+                Utils.set_random_seed(seed + batch_num)
+            prepared_kwargs.update({"num_samples": current_batch_size})
+            yield Utils.split_images_masks_and_labels(
+                data=generate_method(**prepared_kwargs),
+                num_samples=current_batch_size,
+            )
+
+    def get_default_output_path(self) -> str:
+        """Return a new output folder path in the default output folder that is unique also across threads."""
+
+        return f"{DEFAULT_OUTPUT_FOLDER}/{self.model_id}/{time.time()}_{uuid.uuid4().hex[:8]}/"
+
+    def _get_generate_method(self):
+        """Return the model's generate method wrapped such that each call is traced as a span and counted in metrics.
+
+        The first call of a model's generate method usually also loads the model weights, hence its span is marked
+        with `is_first_call`.
+        """
+
+        generate_method = getattr(
+            self.deserialized_model_as_lib, f"{self.generate_method_name}"
+        )
+
+        def traced_generate_method(**kwargs):
+            num_samples = kwargs.get(CONFIG_FILE_KEY_GENERATE_ARGS_NUM_SAMPLES)
+            with self._lock:
+                is_first_call = self._num_generate_calls == 0
+                self._num_generate_calls += 1
+            with get_tracer().span(
+                "model_executor.generate_call",
+                model_id=self.model_id,
+                num_samples=num_samples,
+                is_first_call=is_first_call,
+            ):
+                start_time = time.perf_counter()
+                try:
+                    output = generate_method(**kwargs)
+                except Exception:
+                    GENERATE_FAILURES.inc(model_id=self.model_id)
+                    raise
+                GENERATE_CALL_DURATION.observe(
+                    time.perf_counter() - start_time, model_id=self.model_id
+                )
+                SAMPLES_GENERATED.inc(
+                    self._get_num_returned_samples(
+                        output=output, num_samples=num_samples
+                    ),
+                    model_id=self.model_id,
+                )
+                return output
+
+        return traced_generate_method
+
+    @staticmethod
+    def _get_num_returned_samples(output, num_samples: int) -> int:
+        """Return the number of samples in the `output` of a call of the model's generate method.
+
+        If the output is None, the model has stored its samples in the output folder itself without reporting their
+        number, hence the requested `num_samples` are counted.
+        """
+
+        if output is None:
+            return num_samples or 0
+        if isinstance(output, dict):
+            samples = output.get("samples")
+            return 0 if samples is None else len(samples)
+        # Models may wrap their list of samples into another list.
+        while (
+            isinstance(output, list)
+            and len(output) == 1
+            and isinstance(output[0], list)
+        ):
+            output = output[0]
+        try:
+            return len(output)
+        except TypeError:
+            return 0
+
+    def _resolve_batch_size(
+        self, batch_size, generate_method, prepared_kwargs: dict
+    ) -> int:
+        """Return `batch_size` or, if it is "auto", the batch size tuned (or cached) by the `batch_size_tuner`."""
+
+        if batch_size != BATCH_SIZE_AUTO:
+            return batch_size
+        # The probing calls return their samples instead of storing them in the output folder.
+        probe_kwargs = dict(prepared_kwargs)
+        probe_kwargs.update({CONFIG_FILE_KEY_GENERATE_ARGS_SAVE_IMAGES: False})
+
+        def generate_function(num_samples: int):
+            probe_kwargs.update(
+                {CONFIG_FILE_KEY_GENERATE_ARGS_NUM_SAMPLES: num_samples}
+            )
+            return generate_method(**probe_kwargs)
+
+        # Concurrent calls wait for the first call to tune the batch size and then read it from the cache.
+        with self._batch_size_lock:
+            return self.batch_size_tuner.get_batch_size(
+                model_id=self.model_id,
+                image_size=prepared_kwargs.get(
+                    CONFIG_FILE_KEY_IMAGE_SIZE, self.image_size
+                ),
+                generate_function=generate_function,
+            )
+
+    def _generate_batch_into_folder(
+        self,
+        generate_method,
+        prepared_kwargs: dict,
+        output_path: str,
+        batch_num: int,
+        batch_size: int,
+    ) -> list:
+        """Let the model store one batch of samples in a batch folder and move the files into the `output_path`.
+
+        Returns
+        -------
+        list
+            a list with the record `(batch_num, batch_size, filenames)` of the generated batch
+        """
+
+        batch_path = os.path.join(output_path, "batch_" + str(batch_num)) + "/"
+
+        # Generate the path in case it is not yet available.
+        assert Utils.mkdirs(
+            path_as_string=batch_path
+        ), f"{self.model_id}: The batch path was not found nor created in {batch_path}."
+
+        prepared_kwargs.update({"num_samples": batch_size, "output_path": batch_path})
+
+        generate_method(**prepared_kwargs)
+
+        batch_filenames = []
+        with get_tracer().span(
+            "model_executor.move_batch_files", model_id=self.model_id
+        ) as span:
+            for filename in os.listdir(batch_path):
+                batch_filename = "batch_" + str(batch_num) + "_" + filename
+                os.rename(
+                    os.path.join(batch_path, filename),
+                    os.path.join(output_path, batch_filename),
+                )
+                batch_filenames.append(batch_filename)
+            span.set_attribute("num_files", len(batch_filenames))
+
+        os.rmdir(batch_path)
+        return [(batch_num, batch_size, batch_filenames)]
+
+    @staticmethod
+    def _add_batch_records_to_manifest(manifest: GenerationManifest, records: list):
+        """Checkpoint the records `(batch_num, num_samples, filenames)` of durably stored batches in the manifest."""
+
+        if manifest is not None:
+            for batch_num, num_samples, filenames in records:
+                manifest.add_batch(
+                    batch_num=batch_num, num_samples=num_samples, filenames=filenames
+                )
+
+    def _check_aborted(self, abort_event: threading.Event, output_path: str):
+        """Raise a `RuntimeError` if the `abort_event` of the generation into `output_path` is set."""
+
+        if abort_event is not None and abort_event.is_set():
+            raise RuntimeError(
+                f"{self.model_id}: The generation into {output_path} was aborted."
+            )
+
+    @staticmethod
+    def _get_batch_sizes(num_samples: int, batch_size: int) -> list:
+        """Return the size of each batch needed to generate `num_samples` samples with batches of `batch_size`.
+
+        The last batch contains the remainder of `num_samples` and may hence be of size 0.
+        """
+
+        num_full_batches = num_samples // batch_size
+        return [batch_size] * num_full_batches + [num_samples % batch_size]
+
     def _prepare_generate_method_args(
         self,
         model_file: str,
@@ -437,8 +908,11 @@ class ModelExecutor:
 
         prepared_kwargs: dict = {}
         # get keys of mandatory custom dictionary input args and assign the default value from config to values of keys
+        # The default values are copied, so that a generate call modifying them does not affect other calls.
         prepared_kwargs.update(
-            self.generate_method_args[CONFIG_FILE_KEY_GENERATE_ARGS_CUSTOM]
+            copy.deepcopy(
+                self.generate_method_args[CONFIG_FILE_KEY_GENERATE_ARGS_CUSTOM]
+            )
         )
 
         # update: If one of these keys was provided in **kwargs, then change default value to value provided in **kwargs
@@ -464,12 +938,20 @@ class ModelExecutor:
                 raise KeyError
         except KeyError as e:
             logging.warning(
-                f"{self.model_id}: Warning: In this model's generate args ({self.generate_method_args}), some "
-                f"required generate method keys ({CONFIG_FILE_KEY_GENERATE_ARGS_MODEL_FILE}, "
-                f"{CONFIG_FILE_KEY_GENERATE_ARGS_NUM_SAMPLES}, {CONFIG_FILE_KEY_GENERATE_ARGS_OUTPUT_PATH}, "
-                f"{CONFIG_FILE_KEY_GENERATE_ARGS_SAVE_IMAGES}) are missing: {e}. A value for this key will be "
-                f"provided nevertheless when calling the model's generate method ({self.generate_method_name})'. "
-                f"This could hence cause an error."
+                "%s: Warning: In this model's generate args (%s), some "
+                "required generate method keys (%s, "
+                "%s, %s, "
+                "%s) are missing: %s. A value for this key will be "
+                "provided nevertheless when calling the model's generate method (%s)'. "
+                "This could hence cause an error.",
+                self.model_id,
+                self.generate_method_args,
+                CONFIG_FILE_KEY_GENERATE_ARGS_MODEL_FILE,
+                CONFIG_FILE_KEY_GENERATE_ARGS_NUM_SAMPLES,
+                CONFIG_FILE_KEY_GENERATE_ARGS_OUTPUT_PATH,
+                CONFIG_FILE_KEY_GENERATE_ARGS_SAVE_IMAGES,
+                e,
+                self.generate_method_name,
             )
         # Adding the always necessary base parameters to kwargs. They are updated if erroneously
         # introduced via the user-provided kwargs.
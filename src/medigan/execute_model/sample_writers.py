@@ -0,0 +1,586 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" Sample writer classes that pack generated samples, masks, and labels into sharded or chunked dataset stores. """
+
+# Import python native libs
+from __future__ import absolute_import
+
+import io
+import json
+import logging
+import os
+import struct
+import tarfile
+import time
+
+import numpy as np
+
+# Import library internal modules
+from ..constants import (
+    DEFAULT_SAMPLES_PER_SHARD,
+    OUTPUT_FORMAT_HDF5,
+    OUTPUT_FORMAT_NPY,
+    OUTPUT_FORMAT_TAR,
+    OUTPUT_FORMAT_ZARR,
+)
+from ..utils import Utils
+
+""" The names of the data fields returned by `Utils.split_images_masks_and_labels` that are stored as arrays. """
+ARRAY_FIELDS = ["samples", "masks", "other_imaging_output"]
+
+
+class BaseSampleWriter:
+    """`BaseSampleWriter` class: Writes batches of generated data points into a dataset store in `output_path`.
+
+    Subclasses return, for each batch that is durably written, a record `(batch_num, num_samples, filenames)` that can
+    be checkpointed in a `GenerationManifest`. `filenames` are relative to `output_path`.
+
+    Parameters
+    ----------
+    output_path: str
+        the path as str to the output folder in which the dataset store is created
+    samples_per_shard: int
+        the number of samples per shard (tar) or per chunk (hdf5, zarr)
+    compression: str
+        the compression applied to the store. Its meaning depends on the store format.
+
+    Attributes
+    ----------
+    output_path: str
+        the path as str to the output folder in which the dataset store is created
+    samples_per_shard: int
+        the number of samples per shard (tar) or per chunk (hdf5, zarr)
+    compression: str
+        the compression applied to the store. Its meaning depends on the store format.
+    num_samples_written: int
+        the number of samples written into the store
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        samples_per_shard: int = DEFAULT_SAMPLES_PER_SHARD,
+        compression: str = None,
+    ):
+        self.output_path = output_path
+        self.samples_per_shard = samples_per_shard
+        self.compression = compression
+        self.num_samples_written = 0
+
+    def open(self, num_samples_to_keep: int = None):
+        """Open the store. Previously written samples beyond `num_samples_to_keep` (or all, if None) are discarded."""
+
+        raise NotImplementedError
+
+    def write(
+        self,
+        batch_num: int,
+        samples: list,
+        masks: list = None,
+        other_imaging_output: list = None,
+        labels: list = None,
+    ) -> list:
+        """Write one batch of data points and return the records of the batches that are now durably stored."""
+
+        raise NotImplementedError
+
+    def close(self, is_aborted: bool = False) -> list:
+        """Close the store and return the records of the batches that were durably stored while closing.
+
+        If `is_aborted`, data that is not yet durably stored is discarded instead.
+        """
+
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(is_aborted=exc_type is not None)
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(output_path={self.output_path}, samples_per_shard={self.samples_per_shard}, "
+            f"compression={self.compression}, num_samples_written={self.num_samples_written})"
+        )
+
+    def __len__(self):
+        return self.num_samples_written
+
+
+class TarShardWriter(BaseSampleWriter):
+    """`TarShardWriter` class: Writes data points as WebDataset-compatible tar shards.
+
+    Each data point is stored under a common key (`<shard index>-<index in shard>`) as `<key>.sample.npy`, `<key>.mask.npy`,
+    `<key>.other_imaging_output.npy`, and `<key>.label.txt` members. A shard is first written to a temporary file and
+    only renamed to `shard-<index>.tar` once it is complete. Shards are closed at batch boundaries as soon as they
+    contain at least `samples_per_shard` samples. `compression` can be None or "gz" (`.tar.gz` shards).
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        samples_per_shard: int = DEFAULT_SAMPLES_PER_SHARD,
+        compression: str = None,
+    ):
+        super().__init__(
+            output_path=output_path,
+            samples_per_shard=samples_per_shard,
+            compression=compression,
+        )
+        if compression not in [None, "gz"]:
+            raise ValueError(
+                f"Compression '{compression}' is not supported for tar shards. Use None or 'gz'."
+            )
+        self.extension = ".tar" if compression is None else ".tar.gz"
+        self.shard_index = 0
+        self.tar_file = None
+        self.shard_batches = []
+        self.num_samples_in_shard = 0
+
+    def open(self, num_samples_to_keep: int = None):
+        """Open the writer. When resuming, new shards are numbered after the shards already present in `output_path`.
+
+        Shards that are present are complete, as incomplete shards are never renamed to their final name. If
+        `num_samples_to_keep` is None, the shards (and incomplete shards) of a previous job are removed instead.
+        """
+
+        if num_samples_to_keep is None:
+            # Without a manifest, the job is not resumed. Shards of a previous job must not end up in its dataset.
+            for filename in os.listdir(self.output_path):
+                if filename.startswith("shard-"):
+                    logging.info(
+                        "Removing the existing shard %s from %s.",
+                        filename,
+                        self.output_path,
+                    )
+                    os.remove(os.path.join(self.output_path, filename))
+            self.shard_index = 0
+            self.num_samples_written = 0
+            return
+        existing_shard_indices = [
+            int(filename[len("shard-") :].split(".")[0])
+            for filename in os.listdir(self.output_path)
+            if filename.startswith("shard-") and filename.endswith(self.extension)
+        ]
+        self.shard_index = max(existing_shard_indices, default=-1) + 1
+        self.num_samples_written = num_samples_to_keep
+
+    def _get_shard_name(self) -> str:
+        return f"shard-{self.shard_index:06d}{self.extension}"
+
+    def _add_member(self, name: str, payload: bytes):
+        tar_info = tarfile.TarInfo(name=name)
+        tar_info.size = len(payload)
+        tar_info.mtime = time.time()
+        self.tar_file.addfile(tar_info, io.BytesIO(payload))
+
+    def write(
+        self,
+        batch_num: int,
+        samples: list,
+        masks: list = None,
+        other_imaging_output: list = None,
+        labels: list = None,
+    ) -> list:
+        if self.tar_file is None:
+            self.tar_file = tarfile.open(
+                os.path.join(self.output_path, self._get_shard_name() + ".tmp"),
+                "w" if self.compression is None else "w:gz",
+            )
+        for i in range(len(samples)):
+            key = f"{self.shard_index:06d}-{self.num_samples_in_shard:06d}"
+            for field, values in zip(
+                ["sample", "mask", "other_imaging_output"],
+                [samples, masks, other_imaging_output],
+            ):
+                if values is not None and i < len(values):
+                    buffer = io.BytesIO()
+                    np.save(buffer, np.asarray(values[i]), allow_pickle=False)
+                    self._add_member(f"{key}.{field}.npy", buffer.getvalue())
+            if labels is not None and i < len(labels):
+                self._add_member(f"{key}.label.txt", str(labels[i]).encode("utf-8"))
+            self.num_samples_written += 1
+            self.num_samples_in_shard += 1
+        self.shard_batches.append((batch_num, len(samples)))
+        if self.num_samples_in_shard >= self.samples_per_shard:
+            return self._close_shard()
+        return []
+
+    def _close_shard(self) -> list:
+        """Close the current shard, rename it to its final name, and return the records of the batches it contains."""
+
+        if self.tar_file is None:
+            return []
+        self.tar_file.close()
+        shard_name = self._get_shard_name()
+        os.replace(
+            os.path.join(self.output_path, shard_name + ".tmp"),
+            os.path.join(self.output_path, shard_name),
+        )
+        logging.debug(
+            "Wrote %s samples into shard %s.", self.num_samples_in_shard, shard_name
+        )
+        records = [
+            (batch_num, num_samples, [shard_name])
+            for batch_num, num_samples in self.shard_batches
+        ]
+        self.tar_file = None
+        self.shard_batches = []
+        self.num_samples_in_shard = 0
+        self.shard_index += 1
+        return records
+
+    def close(self, is_aborted: bool = False) -> list:
+        if is_aborted:
+            if self.tar_file is not None:
+                # The incomplete shard keeps its temporary name and is removed when a resumable job is resumed.
+                self.tar_file.close()
+                self.tar_file = None
+            return []
+        return self._close_shard()
+
+
+class ArrayStoreWriter(BaseSampleWriter):
+    """`ArrayStoreWriter` class: Base class for array stores (hdf5, zarr, npy) with one appendable array per field.
+
+    Each of the fields in `ARRAY_FIELDS` is stored as one array of shape (num_samples, *sample_shape) chunked along
+    the first axis with `samples_per_shard` samples per chunk. Labels are stored as array of strings. All samples of a
+    field hence need to have the same shape. Batches are durable once written, which is why `write` returns their
+    record immediately.
+    """
+
+    store_name = None
+
+    def __init__(
+        self,
+        output_path: str,
+        samples_per_shard: int = DEFAULT_SAMPLES_PER_SHARD,
+        compression: str = None,
+    ):
+        super().__init__(
+            output_path=output_path,
+            samples_per_shard=samples_per_shard,
+            compression=compression,
+        )
+        self.store_path = os.path.join(output_path, self.store_name)
+        self.store = None
+
+    def _get_field_names(self) -> list:
+        raise NotImplementedError
+
+    def _create_array(self, field: str, values: np.ndarray):
+        raise NotImplementedError
+
+    def _append(self, field: str, values: np.ndarray):
+        raise NotImplementedError
+
+    def _resize(self, field: str, num_samples: int):
+        raise NotImplementedError
+
+    def _get_length(self, field: str) -> int:
+        raise NotImplementedError
+
+    def _delete(self, field: str):
+        raise NotImplementedError
+
+    def open(self, num_samples_to_keep: int = None):
+        self._open_store()
+        if num_samples_to_keep is None:
+            # Without a manifest, the job is not resumed. Samples of a previous job must not end up in its dataset.
+            for field in self._get_field_names():
+                logging.info(
+                    "Overwriting '%s' of the existing store %s.", field, self.store_path
+                )
+                self._delete(field)
+            self.num_samples_written = 0
+            return
+        for field in self._get_field_names():
+            if self._get_length(field) < num_samples_to_keep:
+                raise ValueError(
+                    f"The store {self.store_path} contains fewer samples ({self._get_length(field)}) in '{field}' "
+                    f"than were recorded as completed ({num_samples_to_keep})."
+                )
+            # Discard samples of batches that were not completed before the generation job was interrupted.
+            self._resize(field=field, num_samples=num_samples_to_keep)
+        self.num_samples_written = num_samples_to_keep
+
+    def _open_store(self):
+        raise NotImplementedError
+
+    def write(
+        self,
+        batch_num: int,
+        samples: list,
+        masks: list = None,
+        other_imaging_output: list = None,
+        labels: list = None,
+    ) -> list:
+        field_names = self._get_field_names()
+        for field, values in zip(
+            ARRAY_FIELDS + ["labels"],
+            [samples, masks, other_imaging_output, labels],
+        ):
+            if values is None or len(values) == 0:
+                continue
+            if field == "labels":
+                values = np.asarray(values).astype(str)
+            else:
+                values = np.stack(values) if isinstance(values, list) else values
+            if field not in field_names:
+                self._create_array(field=field, values=values)
+            self._append(field=field, values=values)
+        self.num_samples_written += len(samples)
+        return [(batch_num, len(samples), [])]
+
+    def close(self, is_aborted: bool = False) -> list:
+        self.store = None
+        return []
+
+
+class HDF5Writer(ArrayStoreWriter):
+    """`HDF5Writer` class: Writes data points into chunked and compressed datasets of one hdf5 file.
+
+    Requires the optional dependency `h5py`. `compression` is passed to h5py and defaults to "gzip".
+    """
+
+    store_name = "samples.h5"
+
+    def _open_store(self):
+        try:
+            import h5py
+        except ImportError as e:
+            raise ImportError(
+                f"The output format '{OUTPUT_FORMAT_HDF5}' requires h5py. Please install it via 'pip install h5py'. {e}"
+            )
+        self.store = h5py.File(self.store_path, "a")
+        self._string_dtype = h5py.string_dtype()
+
+    def _get_field_names(self) -> list:
+        return list(self.store.keys())
+
+    def _create_array(self, field: str, values: np.ndarray):
+        self.store.create_dataset(
+            field,
+            shape=(0,) + values.shape[1:],
+            maxshape=(None,) + values.shape[1:],
+            chunks=(self.samples_per_shard,) + values.shape[1:],
+            dtype=self._string_dtype if field == "labels" else values.dtype,
+            compression="gzip" if self.compression is None else self.compression,
+        )
+
+    def _append(self, field: str, values: np.ndarray):
+        dataset = self.store[field]
+        start = dataset.shape[0]
+        dataset.resize(start + len(values), axis=0)
+        dataset[start:] = values.astype(object) if field == "labels" else values
+        self.store.flush()
+
+    def _resize(self, field: str, num_samples: int):
+        self.store[field].resize(num_samples, axis=0)
+
+    def _get_length(self, field: str) -> int:
+        return self.store[field].shape[0]
+
+    def _delete(self, field: str):
+        del self.store[field]
+
+    def close(self, is_aborted: bool = False) -> list:
+        if self.store is not None:
+            self.store.close()
+        return super().close(is_aborted=is_aborted)
+
+
+class ZarrWriter(ArrayStoreWriter):
+    """`ZarrWriter` class: Writes data points into chunked and compressed arrays of one zarr group.
+
+    Requires the optional dependency `zarr`. Chunks are compressed with zarr's default compressor.
+    """
+
+    store_name = "samples.zarr"
+
+    def _open_store(self):
+        try:
+            import zarr
+        except ImportError as e:
+            raise ImportError(
+                f"The output format '{OUTPUT_FORMAT_ZARR}' requires zarr. Please install it via 'pip install zarr'. {e}"
+            )
+        self.store = zarr.open_group(self.store_path, mode="a")
+
+    def _get_field_names(self) -> list:
+        return [name for name in self.store.array_keys()]
+
+    def _create_array(self, field: str, values: np.ndarray):
+        # zarr>=3 provides create_array, while zarr<3 provides create_dataset.
+        create_array = getattr(self.store, "create_array", None)
+        if create_array is None:
+            create_array = self.store.create_dataset
+        create_array(
+            name=field,
+            shape=(0,) + values.shape[1:],
+            chunks=(self.samples_per_shard,) + values.shape[1:],
+            dtype=str if field == "labels" else values.dtype,
+        )
+
+    def _append(self, field: str, values: np.ndarray):
+        self.store[field].append(values, axis=0)
+
+    def _resize(self, field: str, num_samples: int):
+        array = self.store[field]
+        array.resize((num_samples,) + array.shape[1:])
+
+    def _get_length(self, field: str) -> int:
+        return self.store[field].shape[0]
+
+    def _delete(self, field: str):
+        del self.store[field]
+
+
+class NumpyWriter(ArrayStoreWriter):
+    """`NumpyWriter` class: Writes each field into one contiguous `.npy` file that can be memory-mapped.
+
+    Batches are appended to `<field>.npy` files in `output_path` and the shape in the `.npy` header is updated after
+    each batch. The header is reserved with enough space for the shape to grow, which avoids rewriting (copying) the
+    data. Labels are appended to `labels.jsonl` and converted into a fixed-width string array `labels.npy` on `close`.
+    The files can be read zero-copy via `np.load(path, mmap_mode="r")`, e.g. by `MemmapSyntheticDataset`.
+    `samples_per_shard` and `compression` are not used, as `.npy` files are neither chunked nor compressed.
+    """
+
+    store_name = ""
+
+    """ The size in bytes reserved for the `.npy` header, which must be a multiple of 64. """
+    header_length = 256
+
+    def _get_path(self, field: str) -> str:
+        if field == "labels":
+            return os.path.join(self.store_path, "labels.jsonl")
+        return os.path.join(self.store_path, f"{field}.npy")
+
+    def _open_store(self):
+        assert Utils.mkdirs(
+            path_as_string=self.store_path
+        ), f"The output folder was not found nor created in {self.store_path}."
+        self.store = {}
+
+    def _get_field_names(self) -> list:
+        return [
+            field
+            for field in ARRAY_FIELDS + ["labels"]
+            if os.path.isfile(self._get_path(field))
+        ]
+
+    def _write_header(self, f, dtype: np.dtype, shape: tuple):
+        """Write the `.npy` (version 1.0) header of an array with `dtype` and `shape` padded to `header_length`."""
+
+        header = repr(
+            {
+                "descr": np.lib.format.dtype_to_descr(dtype),
+                "fortran_order": False,
+                "shape": tuple(shape),
+            }
+        ).encode("latin1")
+        magic = np.lib.format.magic(1, 0)
+        padding = self.header_length - len(magic) - 2 - len(header) - 1
+        if padding < 0:
+            raise ValueError(
+                f"The shape {shape} of the array with dtype {dtype} is too large for a .npy header of "
+                f"{self.header_length} bytes."
+            )
+        f.seek(0)
+        f.write(
+            magic
+            + struct.pack("<H", self.header_length - len(magic) - 2)
+            + header
+            + b" " * padding
+            + b"\n"
+        )
+
+    def _read_header(self, field: str) -> [np.dtype, tuple]:
+        with open(self._get_path(field), "rb") as f:
+            np.lib.format.read_magic(f)
+            shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+        return dtype, shape
+
+    def _create_array(self, field: str, values: np.ndarray):
+        if field == "labels":
+            open(self._get_path(field), "w").close()
+            return
+        with open(self._get_path(field), "wb") as f:
+            self._write_header(f, values.dtype, (0,) + values.shape[1:])
+
+    def _append(self, field: str, values: np.ndarray):
+        if field == "labels":
+            with open(self._get_path(field), "a") as f:
+                f.writelines(json.dumps(str(label)) + "\n" for label in values)
+            return
+        dtype, shape = self._read_header(field)
+        if values.shape[1:] != shape[1:] or values.dtype != dtype:
+            raise ValueError(
+                f"Cannot append samples of shape {values.shape[1:]} and dtype {values.dtype} to '{field}' with "
+                f"shape {shape[1:]} and dtype {dtype}. All samples of a field need the same shape and dtype."
+            )
+        with open(self._get_path(field), "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(values).tobytes())
+            self._write_header(f, dtype, (shape[0] + len(values),) + shape[1:])
+
+    def _resize(self, field: str, num_samples: int):
+        if field == "labels":
+            with open(self._get_path(field)) as f:
+                lines = f.readlines()[:num_samples]
+            with open(self._get_path(field), "w") as f:
+                f.writelines(lines)
+            return
+        dtype, shape = self._read_header(field)
+        with open(self._get_path(field), "r+b") as f:
+            f.truncate(
+                self.header_length
+                + num_samples * int(np.prod(shape[1:], dtype=np.int64)) * dtype.itemsize
+            )
+            self._write_header(f, dtype, (num_samples,) + shape[1:])
+
+    def _get_length(self, field: str) -> int:
+        if field == "labels":
+            with open(self._get_path(field)) as f:
+                return sum(1 for _ in f)
+        return self._read_header(field)[1][0]
+
+    def _delete(self, field: str):
+        os.remove(self._get_path(field))
+        if field == "labels" and os.path.isfile(
+            os.path.join(self.store_path, "labels.npy")
+        ):
+            os.remove(os.path.join(self.store_path, "labels.npy"))
+
+    def close(self, is_aborted: bool = False) -> list:
+        if self.store is not None and os.path.isfile(self._get_path("labels")):
+            with open(self._get_path("labels")) as f:
+                labels = [json.loads(line) for line in f]
+            np.save(os.path.join(self.store_path, "labels.npy"), np.asarray(labels))
+        return super().close(is_aborted=is_aborted)
+
+
+def get_sample_writer(
+    output_format: str,
+    output_path: str,
+    samples_per_shard: int = DEFAULT_SAMPLES_PER_SHARD,
+    compression: str = None,
+) -> BaseSampleWriter:
+    """Return the sample writer corresponding to `output_format` ("tar", "hdf5", "zarr", or "npy")."""
+
+    writers = {
+        OUTPUT_FORMAT_TAR: TarShardWriter,
+        OUTPUT_FORMAT_HDF5: HDF5Writer,
+        OUTPUT_FORMAT_ZARR: ZarrWriter,
+        OUTPUT_FORMAT_NPY: NumpyWriter,
+    }
+    if output_format not in writers:
+        raise ValueError(
+            f"Output format '{output_format}' is not supported. Please choose one of {list(writers)}."
+        )
+    return writers[output_format](
+        output_path=output_path,
+        samples_per_shard=samples_per_shard,
+        compression=compression,
+    )
@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
 # ! /usr/bin/env python
-""" `SyntheticDataset` allows to return a generative model as torch dataset. """
+""" `SyntheticDataset` and `MemmapSyntheticDataset` allow to return a generative model as torch dataset. """
 
+import os
+
+import numpy as np
 from torch.utils.data import Dataset
 
+from ..metrics import DATASET_ITEMS
+
 
 class SyntheticDataset(Dataset):
     """A synthetic dataset containing data generated by a model of medigan
@@ -49,15 +54,17 @@ class SyntheticDataset(Dataset):
         self.labels = labels
         self.transform = transform
 
+    def _get_item(self, values, index):
+        """Return the item at `index` of `values` (e.g. samples) or None if `values` is None."""
+
+        return values[index] if values is not None else None
+
     def __getitem__(self, index):
-        x = self.samples[index]
-        y = self.labels[index] if self.labels is not None else None
-        mask = self.masks[index] if self.masks is not None else None
-        other_imaging_output = (
-            self.other_imaging_output[index]
-            if self.other_imaging_output is not None
-            else None
-        )
+        DATASET_ITEMS.inc(dataset=type(self).__name__)
+        x = self._get_item(self.samples, index)
+        y = self._get_item(self.labels, index)
+        mask = self._get_item(self.masks, index)
+        other_imaging_output = self._get_item(self.other_imaging_output, index)
 
         if self.transform:
             if mask is not None:
@@ -82,3 +89,77 @@ class SyntheticDataset(Dataset):
 
     def __len__(self):
         return len(self.samples)
+
+
+class MemmapSyntheticDataset(SyntheticDataset):
+    """A synthetic dataset indexing zero-copy into memory-mapped `.npy` files generated by a model of medigan
+
+    The dataset reads the `samples.npy`, `masks.npy`, `other_imaging_output.npy`, and `labels.npy` files written with
+    `output_format="npy"` (see `NumpyWriter`). The files are memory-mapped lazily in each process. Hence, DataLoader
+    workers share the pages of the files via the OS page cache instead of duplicating python lists of arrays, and
+    pickling the dataset for worker processes only pickles the `path`. Only the indexed item is copied out of the
+    memory map.
+
+    Parameters
+    ----------
+    path: str
+        the path to the folder containing the `.npy` files
+    transform:
+        torch compose transform functions that are applied to the torch dataset.
+
+    Attributes
+    ----------
+    path: str
+        the path to the folder containing the `.npy` files
+    transform:
+        torch compose transform functions that are applied to the torch dataset.
+    """
+
+    def __init__(self, path: str, transform=None):
+        self.path = path
+        self.transform = transform
+        self._arrays = {}
+        if not os.path.isfile(os.path.join(path, "samples.npy")):
+            raise FileNotFoundError(
+                f"No samples.npy file was found in {path}. Please generate samples with output_format='npy' first."
+            )
+
+    def _get_array(self, field: str):
+        """Memory-map and return the array of a field or None if the field was not generated by the model."""
+
+        if field not in self._arrays:
+            file_path = os.path.join(self.path, f"{field}.npy")
+            self._arrays[field] = (
+                np.load(file_path, mmap_mode="r") if os.path.isfile(file_path) else None
+            )
+        return self._arrays[field]
+
+    @property
+    def samples(self):
+        return self._get_array("samples")
+
+    @property
+    def masks(self):
+        return self._get_array("masks")
+
+    @property
+    def other_imaging_output(self):
+        return self._get_array("other_imaging_output")
+
+    @property
+    def labels(self):
+        return self._get_array("labels")
+
+    def _get_item(self, values, index):
+        if values is None:
+            return None
+        if values.dtype.kind == "U":
+            return str(values[index])
+        # Copy the item out of the read-only memory map, as torch tensors and transforms expect writable arrays.
+        return np.array(values[index])
+
+    def __getstate__(self):
+        # Memory maps are opened again in each (worker) process instead of being pickled as copies.
+        state = self.__dict__.copy()
+        state["_arrays"] = {}
+        return state
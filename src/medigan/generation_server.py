@@ -0,0 +1,510 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" Local HTTP generation server keeping models warm and batching concurrent requests dynamically.
+
+Start the server e.g. via `python -m medigan serve --model_ids 00001 --port 8100` and request samples via
+
+    from medigan.generation_server import GenerationClient
+
+    samples = GenerationClient("http://127.0.0.1:8100").generate(model_id="00001", num_samples=4)["samples"]
+
+The server imports each model once. Concurrent requests for the same model and generate kwargs are coalesced into one
+generate call of up to `max_batch_size` samples, for which the server waits at most `max_wait_seconds` after the first
+request, and the generated samples are split back to the requests.
+"""
+
+# Import python native libs
+from __future__ import absolute_import
+
+import io
+import json
+import logging
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Import pypi libs
+import numpy as np
+
+# Import library internal modules
+from .constants import (
+    DEFAULT_SERVER_MAX_BATCH_SIZE,
+    DEFAULT_SERVER_MAX_WAIT_SECONDS,
+    DEFAULT_SERVER_PORT,
+)
+from .execute_model.model_executor import ModelExecutor
+from .metrics import get_registry
+from .utils import Utils
+
+SERVER_REQUESTS = get_registry().counter(
+    "medigan_server_requests_total",
+    "Number of generation requests received by the generation server",
+    ["model_id"],
+)
+SERVER_BATCH_SIZE = get_registry().histogram(
+    "medigan_server_batch_size",
+    "Number of samples per batched generate call of the generation server",
+    ["model_id"],
+    buckets=[1, 2, 4, 8, 16, 32, 64, 128, 256],
+)
+
+
+class GenerationRequest:
+    """A request for `num_samples` samples generated with `kwargs`, whose result is set on its `future`."""
+
+    def __init__(self, num_samples: int, kwargs: dict):
+        self.num_samples = num_samples
+        self.kwargs = kwargs
+        # Requests can only be batched if the model's generate function is called with the same kwargs.
+        self.key = json.dumps(kwargs, sort_keys=True, default=repr)
+        self.future = Future()
+
+
+class DynamicBatcher:
+    """`DynamicBatcher` class: Coalesces concurrent generation requests for one model into batched generate calls.
+
+    A worker thread takes the oldest request and adds further requests with the same kwargs until the batch holds
+    `max_batch_size` samples or `max_wait_seconds` have passed. The model's generate function is then called once for
+    all samples of the batch and the samples, masks, other imaging output, and labels are split back to the requests.
+    Requests with other kwargs are kept in order for the following batches. Requests for more than `max_batch_size`
+    samples are generated in a batch of their own.
+
+    Parameters
+    ----------
+    model_executor: ModelExecutor
+        the warm `ModelExecutor` whose generate function is called by the worker thread
+    max_batch_size: int
+        the maximum number of samples generated per call of the model's generate function
+    max_wait_seconds: float
+        the maximum time the worker thread waits for further requests after the first request of a batch
+    """
+
+    def __init__(
+        self,
+        model_executor: ModelExecutor,
+        max_batch_size: int = DEFAULT_SERVER_MAX_BATCH_SIZE,
+        max_wait_seconds: float = DEFAULT_SERVER_MAX_WAIT_SECONDS,
+    ):
+        self.model_executor = model_executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._queue = queue.Queue()
+        self._deferred_requests = deque()
+        self._is_closed = False
+        self._worker = threading.Thread(
+            target=self._run,
+            name=f"medigan-batcher-{model_executor.model_id}",
+            daemon=True,
+        )
+        self._worker.start()
+
+    def submit(self, num_samples: int, **kwargs) -> Future:
+        """Queue a request for `num_samples` samples and return a `Future` of its dict of generated outputs."""
+
+        if self._is_closed:
+            raise RuntimeError(
+                f"{self.model_executor.model_id}: The batcher has been closed."
+            )
+        if num_samples < 1:
+            raise ValueError(f"num_samples must be positive, but is {num_samples}.")
+        request = GenerationRequest(num_samples=num_samples, kwargs=kwargs)
+        self._queue.put(request)
+        return request.future
+
+    def close(self):
+        """Stop the worker thread after the queued requests have been processed."""
+
+        self._is_closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    def _get_next_request(self, timeout: float = None):
+        if self._deferred_requests:
+            return self._deferred_requests.popleft()
+        return self._queue.get(timeout=timeout)
+
+    def _collect_batch(self, first_request: GenerationRequest) -> list:
+        batch = [first_request]
+        num_samples = first_request.num_samples
+        deadline = time.perf_counter() + self.max_wait_seconds
+        # Deferred requests arrived before the queued ones, hence they are considered first.
+        for request in list(self._deferred_requests):
+            if (
+                request.key == first_request.key
+                and num_samples + request.num_samples <= self.max_batch_size
+            ):
+                self._deferred_requests.remove(request)
+                batch.append(request)
+                num_samples += request.num_samples
+        while num_samples < self.max_batch_size:
+            remaining_seconds = deadline - time.perf_counter()
+            if remaining_seconds <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining_seconds)
+            except queue.Empty:
+                break
+            if request is None:
+                # Re-queue the stop signal so that the worker stops after this batch.
+                self._queue.put(None)
+                break
+            if (
+                request.key == first_request.key
+                and num_samples + request.num_samples <= self.max_batch_size
+            ):
+                batch.append(request)
+                num_samples += request.num_samples
+            else:
+                self._deferred_requests.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            request = self._get_next_request()
+            if request is None:
+                # Deferred requests are returned before the stop signal, hence all requests have been processed.
+                return
+            batch = self._collect_batch(first_request=request)
+            try:
+                self._generate_batch(batch)
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _generate_batch(self, batch: list):
+        model_id = self.model_executor.model_id
+        num_samples = sum(request.num_samples for request in batch)
+        # Preparing the arguments is cheap compared to the generation. They are not cached, as the kwargs are
+        # supplied by the clients and a cache keyed by them would grow without limit.
+        prepared_kwargs = self.model_executor._prepare_generate_method_args(
+            model_file=self.model_executor.serialised_model_file_path,
+            num_samples=num_samples,
+            output_path=self.model_executor.get_default_output_path(),
+            save_images=False,
+            **batch[0].kwargs,
+        )
+        logging.debug(
+            "%s: Generating %s samples for %s batched requests.",
+            model_id,
+            num_samples,
+            len(batch),
+        )
+        SERVER_BATCH_SIZE.observe(num_samples, model_id=model_id)
+        outputs = Utils.split_images_masks_and_labels(
+            data=self.model_executor._get_generate_method()(**prepared_kwargs),
+            num_samples=num_samples,
+        )
+        num_returned_samples = 0 if outputs[0] is None else len(outputs[0])
+        start_index = 0
+        for request in batch:
+            end_index = start_index + request.num_samples
+            if end_index > num_returned_samples:
+                request.future.set_exception(
+                    RuntimeError(
+                        f"{model_id}: The model returned {num_returned_samples} instead of {num_samples} samples."
+                    )
+                )
+                start_index = end_index
+                continue
+            request.future.set_result(
+                {
+                    name: None if output is None else output[start_index:end_index]
+                    for name, output in zip(
+                        ["samples", "masks", "other_imaging_output", "labels"], outputs
+                    )
+                }
+            )
+            start_index = end_index
+
+    def __repr__(self):
+        return (
+            f"DynamicBatcher(model_id={self.model_executor.model_id}, max_batch_size={self.max_batch_size}, "
+            f"max_wait_seconds={self.max_wait_seconds})"
+        )
+
+
+class GenerationServer:
+    """`GenerationServer` class: Serves samples of warm models over HTTP, batching concurrent requests per model.
+
+    Endpoints:
+        POST /generate with a JSON body {"model_id": str, "num_samples": int, "kwargs": dict} returns the generated
+        "samples", "masks", "other_imaging_output", and "labels" (those that the model returns) as .npz file.
+        GET /health returns the ids of the warm models as JSON.
+        GET /metrics returns medigan's metrics in the Prometheus text exposition format.
+
+    Parameters
+    ----------
+    generators: Generators
+        the `Generators` instance providing the model executors. If None, a `Generators` instance is initialized.
+    max_batch_size: int
+        the maximum number of samples generated per call of a model's generate function
+    max_wait_seconds: float
+        the maximum time to wait for further requests after the first request of a batch
+    install_dependencies: bool
+        flag indicating whether a generative model's dependencies are automatically installed
+
+    Attributes
+    ----------
+    batchers: dict
+        the `DynamicBatcher` instances by model id
+    """
+
+    def __init__(
+        self,
+        generators=None,
+        max_batch_size: int = DEFAULT_SERVER_MAX_BATCH_SIZE,
+        max_wait_seconds: float = DEFAULT_SERVER_MAX_WAIT_SECONDS,
+        install_dependencies: bool = False,
+    ):
+        if generators is None:
+            from .generators import Generators
+
+            generators = Generators()
+        self.generators = generators
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.install_dependencies = install_dependencies
+        self.batchers = {}
+        self._lock = threading.Lock()
+        self._http_server = None
+
+    def get_batcher(self, model_id: str) -> DynamicBatcher:
+        """Return the `DynamicBatcher` of `model_id`, importing the model if it is not warm yet."""
+
+        with self._lock:
+            if model_id in self.batchers:
+                return self.batchers[model_id]
+        # The model may be downloaded and imported for minutes, during which requests for warm models are served.
+        # Concurrent requests for the same model wait for the same import in `Generators.get_model_executor`.
+        model_executor = self.generators.get_model_executor(
+            model_id=model_id, install_dependencies=self.install_dependencies
+        )
+        with self._lock:
+            if model_id not in self.batchers:
+                self.batchers[model_id] = DynamicBatcher(
+                    model_executor=model_executor,
+                    max_batch_size=self.max_batch_size,
+                    max_wait_seconds=self.max_wait_seconds,
+                )
+            return self.batchers[model_id]
+
+    def generate(self, model_id: str, num_samples: int = 1, **kwargs) -> dict:
+        """Generate `num_samples` samples of `model_id` in a batch with concurrent requests and return the outputs.
+
+        Parameters
+        ----------
+        model_id: str
+            The generative model's unique id
+        num_samples: int
+            the number of samples that will be generated
+        **kwargs
+            arbitrary number of keyword arguments passed to the model's sample generation function
+
+        Returns
+        -------
+        dict
+            the "samples", "masks", "other_imaging_output", and "labels" of the request (None if not returned by the
+            model)
+        """
+
+        SERVER_REQUESTS.inc(model_id=model_id)
+        future = self.get_batcher(model_id).submit(num_samples=num_samples, **kwargs)
+        return future.result()
+
+    def start(
+        self, port: int = DEFAULT_SERVER_PORT, address: str = "127.0.0.1"
+    ) -> ThreadingHTTPServer:
+        """Serve the endpoints at `http://{address}:{port}` in a daemon thread and return the HTTP server.
+
+        If `port` is 0, a free port is chosen, which is available via `server.server_address[1]`.
+        """
+
+        self._http_server = ThreadingHTTPServer(
+            (address, port), self._get_request_handler_class()
+        )
+        self._http_server.daemon_threads = True
+        threading.Thread(target=self._http_server.serve_forever, daemon=True).start()
+        logging.info(
+            "Serving medigan models at http://%s:%s", *self._http_server.server_address
+        )
+        return self._http_server
+
+    def serve_forever(
+        self, port: int = DEFAULT_SERVER_PORT, address: str = "127.0.0.1"
+    ):
+        """Serve the endpoints at `http://{address}:{port}` until interrupted."""
+
+        self.start(port=port, address=address)
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            logging.info("Stopping the medigan generation server.")
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stop the HTTP server and the batchers' worker threads."""
+
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+            self._http_server = None
+        with self._lock:
+            batchers = list(self.batchers.values())
+            self.batchers = {}
+        for batcher in batchers:
+            batcher.close()
+
+    @staticmethod
+    def to_npz_bytes(outputs: dict) -> bytes:
+        """Return the generated outputs that are not None as bytes of an .npz file.
+
+        Labels that do not form a numeric or string array (e.g. mixed types) are sent as strings. Object arrays would
+        be pickled into the .npz file, which clients cannot load without `allow_pickle`, hence a `ValueError` is
+        raised for any other output that does not form a numeric array.
+        """
+
+        arrays = {}
+        for name, output in outputs.items():
+            if output is None:
+                continue
+            try:
+                array = np.asarray(output)
+            except ValueError:
+                # Ragged outputs cannot be converted to an array without object dtype.
+                array = np.asarray(output, dtype=object)
+            if array.dtype == object and name == "labels":
+                array = np.asarray([str(label) for label in output])
+            if array.dtype == object:
+                raise ValueError(
+                    f"The {name} do not form an array of one shape and dtype and cannot be sent without pickling."
+                )
+            arrays[name] = array
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+
+    def _get_request_handler_class(self):
+        server = self
+
+        class GenerationRequestHandler(BaseHTTPRequestHandler):
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_json(self, status: int, content: dict):
+                self._send(
+                    status, json.dumps(content).encode("utf-8"), "application/json"
+                )
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/health":
+                    self._send_json(200, {"models": list(server.batchers)})
+                elif path == "/metrics":
+                    self._send(
+                        200,
+                        get_registry().expose().encode("utf-8"),
+                        "text/plain; version=0.0.4; charset=utf-8",
+                    )
+                else:
+                    self._send_json(404, {"error": f"Unknown path {path}"})
+
+            def do_POST(self):
+                if self.path.split("?")[0] != "/generate":
+                    self._send_json(404, {"error": f"Unknown path {self.path}"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    model_id = request["model_id"]
+                    num_samples = int(request.get("num_samples", 1))
+                    kwargs = request.get("kwargs") or {}
+                    if num_samples < 1:
+                        raise ValueError(
+                            f"num_samples must be at least 1, but is {num_samples}."
+                        )
+                    if not isinstance(kwargs, dict):
+                        raise TypeError("kwargs must be a JSON object.")
+                except (ValueError, KeyError, TypeError) as e:
+                    self._send_json(400, {"error": f"Invalid request: {e}"})
+                    return
+                try:
+                    body = server.to_npz_bytes(
+                        server.generate(
+                            model_id=model_id, num_samples=num_samples, **kwargs
+                        )
+                    )
+                except Exception as e:
+                    logging.error("%s: Request failed: %s", model_id, e)
+                    self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+                    return
+                self._send(200, body, "application/x-npz")
+
+            def log_message(self, format, *args):
+                logging.debug("Generation server: " + format, *args)
+
+        return GenerationRequestHandler
+
+    def __repr__(self):
+        return (
+            f"GenerationServer(models={list(self.batchers)}, max_batch_size={self.max_batch_size}, "
+            f"max_wait_seconds={self.max_wait_seconds})"
+        )
+
+
+class GenerationClient:
+    """`GenerationClient` class: Requests samples from a `GenerationServer`.
+
+    Parameters
+    ----------
+    url: str
+        the url of the generation server, e.g. "http://127.0.0.1:8100"
+    timeout: float
+        the timeout in seconds of a request
+    """
+
+    def __init__(
+        self, url: str = f"http://127.0.0.1:{DEFAULT_SERVER_PORT}", timeout: float = 600
+    ):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def generate(self, model_id: str, num_samples: int = 1, **kwargs) -> dict:
+        """Request `num_samples` samples of `model_id` and return the generated outputs as dict of numpy arrays.
+
+        Raises
+        ------
+        RuntimeError
+            if the server could not handle the request
+        """
+
+        request = urllib.request.Request(
+            f"{self.url}/generate",
+            data=json.dumps(
+                {"model_id": model_id, "num_samples": num_samples, "kwargs": kwargs}
+            ).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                content = response.read()
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(
+                f"{model_id}: The generation server returned {e.code}: {e.read().decode('utf-8')}"
+            ) from e
+        with np.load(io.BytesIO(content)) as npz_file:
+            return {name: npz_file[name] for name in npz_file.files}
+
+    def __repr__(self):
+        return f"GenerationClient(url={self.url})"
@@ -6,18 +6,38 @@
 from __future__ import absolute_import
 
 import logging
+import math
+import threading
 
 from torch.utils.data import DataLoader, Dataset
+from tqdm import tqdm
 
 # Import library internal modules
 from .config_manager import ConfigManager
-from .constants import CONFIG_FILE_KEY_EXECUTION, MODEL_ID
+from .constants import (
+    CONFIG_FILE_KEY_EXECUTION,
+    DEFAULT_BENCHMARK_NUM_BATCHES,
+    DEFAULT_EVALUATION_BATCH_SIZE,
+    DEFAULT_FRAME_BUFFER_SIZE,
+    DEFAULT_FRAMES_PER_SECOND,
+    DEFAULT_LATENT_BATCH_SIZE,
+    FEATURE_EXTRACTOR_INCEPTION_V3,
+    MODEL_ID,
+    OUTPUT_FORMAT_NPY,
+    REFERENCE_STATISTICS_FOLDER,
+    VISUALIZER_DEBOUNCE_INTERVAL,
+)
 from .contribute_model.model_contributor import ModelContributor
+from .evaluate_model.feature_extractors import get_feature_extractor
+from .evaluate_model.model_evaluator import ModelEvaluator
 from .execute_model.model_executor import ModelExecutor
-from .execute_model.synthetic_dataset import SyntheticDataset
+from .execute_model.synthetic_dataset import MemmapSyntheticDataset, SyntheticDataset
+from .latent_explorer import LatentExplorer
+from .latent_renderer import LatentTraversalRenderer
 from .model_visualizer import ModelVisualizer
 from .select_model.model_selector import ModelSelector
-from .utils import Utils
+from .tracing import get_tracer
+from .utils import ArraySummary, Utils
 
 # Import pypi libs
 
@@ -37,7 +57,7 @@ class Generators:
         Flag indicating, if True, that one `ModelExecutor` for each `model_id` in the config dict should be
         initialized triggered by creation of `Generators` class instance. Note that, if False, the `Generators` class
         will only initialize a `ModelExecutor` on the fly when need be i.e. when the generate method for the respective
-        model is called.
+        model is called. `Generators` can be used from multiple threads, which then share one `ModelExecutor` per model.
 
     Attributes
     ----------
@@ -59,13 +79,13 @@ class Generators:
     ):
         if config_manager is None:
             self.config_manager = ConfigManager()
-            logging.debug(f"Initialized ConfigManager instance: {self.config_manager}")
+            logging.debug("Initialized ConfigManager instance: %s", self.config_manager)
         else:
             self.config_manager = config_manager
 
         if model_selector is None:
             self.model_selector = ModelSelector(config_manager=self.config_manager)
-            logging.debug(f"Initialized ModelSelector instance: {self.model_selector}")
+            logging.debug("Initialized ModelSelector instance: %s", self.model_selector)
         else:
             self.model_selector = model_selector
 
@@ -79,6 +99,13 @@ class Generators:
         else:
             self.model_contributors = model_contributors
 
+        # ModelVisualizer instances by model_id keeping the models' generate functions warm between visualizations.
+        self.model_visualizers = {}
+
+        # Locks by model_id, so that concurrent threads initialize the ModelExecutor of a model only once.
+        self._model_executor_locks = {}
+        self._lock = threading.Lock()
+
         if initialize_all_models:
             self.add_all_model_executors()
 
@@ -428,19 +455,24 @@ class Generators:
         )
         if len(matching_models) < 1:
             logging.warning(
-                f"For your input, there were {len(matching_models)} matching models, while at least 1 is needed. "
-                f"Please adjust either your metric your search value inputs {values} to find at least one match."
+                "For your input, there were %s matching models, while at least 1 is needed. "
+                "Please adjust either your metric your search value inputs %s to find at least one match.",
+                len(matching_models),
+                values,
             )
         else:
             matching_model_ids = [model.model_id for model in matching_models]
-            logging.debug(f"matching_model_ids: {matching_model_ids}")
+            logging.debug("matching_model_ids: %s", matching_model_ids)
             ranked_models = self.model_selector.rank_models_by_performance(
                 model_ids=matching_model_ids, metric=metric, order=order
             )
             if len(ranked_models) < 1:
                 logging.warning(
-                    f"None ({len(ranked_models)}) of the {len(matching_model_ids)} found matching models, had a valid metric entry for {metric}. "
-                    f"Please adjust your metric to enable ranking of the found models."
+                    "None (%s) of the %s found matching models, had a valid metric entry for %s. "
+                    "Please adjust your metric to enable ranking of the found models.",
+                    len(ranked_models),
+                    len(matching_model_ids),
+                    metric,
                 )
         return ranked_models
 
@@ -510,9 +542,12 @@ class Generators:
 
         # Let's generate with the best-ranked model
         logging.info(
-            f"For your input, there were {len(ranked_models)} models found and ranked. "
-            f"The highest ranked model ({highest_ranking_model_id}) will now be used for generation: "
-            f"{ranked_models[0]}"
+            "For your input, there were %s models found and ranked. "
+            "The highest ranked model (%s) will now be used for generation: "
+            "%s",
+            len(ranked_models),
+            highest_ranking_model_id,
+            ranked_models[0],
         )
 
         return self.generate(
@@ -577,21 +612,28 @@ class Generators:
         )
         if len(matching_models) > 1:
             logging.error(
-                f"For your input, there were more than 1 matching model ({len(matching_models)}). "
-                f"Please choose one of the models (see model_ids below) or use find_models_rank_and_generate() instead."
-                f"Alternatively, you may also further specify additional search values apart from the provided ones "
-                f"to find exactly one model: {values}. The matching models were the following: \n {matching_models}"
+                "For your input, there were more than 1 matching model (%s). "
+                "Please choose one of the models (see model_ids below) or use find_models_rank_and_generate() instead."
+                "Alternatively, you may also further specify additional search values apart from the provided ones "
+                "to find exactly one model: %s. The matching models were the following: \n %s",
+                len(matching_models),
+                values,
+                matching_models,
             )
         elif len(matching_models) < 1:
             logging.error(
-                f"For your input, there were {len(matching_models)} matching models, while 1 is needed. "
-                f"Please adjust your search value inputs {values} to find at least one match."
+                "For your input, there were %s matching models, while 1 is needed. "
+                "Please adjust your search value inputs %s to find at least one match.",
+                len(matching_models),
+                values,
             )
         else:
             # Exactly one matching model. Let's generate with this model
             logging.info(
-                f"For your input, there was {len(matching_models)} model matched. "
-                f"This model will now be used for generation: {matching_models}"
+                "For your input, there was %s model matched. "
+                "This model will now be used for generation: %s",
+                len(matching_models),
+                matching_models,
             )
             matched_model_id = matching_models[0].model_id
             return self.generate(
@@ -666,14 +708,21 @@ class Generators:
         None
         """
 
-        if not self.is_model_executor_already_added(model_id):
-            model_executor = ModelExecutor(
-                model_id=model_id,
-                execution_config=execution_config,
-                download_package=True,
-                install_dependencies=install_dependencies,
-            )
-            self.model_executors.append(model_executor)
+        with self._get_model_executor_lock(model_id):
+            # Threads that waited for the lock find the ModelExecutor added by the thread that held it.
+            if not self.is_model_executor_already_added(model_id):
+                model_executor = ModelExecutor(
+                    model_id=model_id,
+                    execution_config=execution_config,
+                    download_package=True,
+                    install_dependencies=install_dependencies,
+                )
+                self.model_executors.append(model_executor)
+
+    def _get_model_executor_lock(self, model_id: str) -> threading.Lock:
+        model_id = self.config_manager.match_model_id(provided_model_id=model_id)
+        with self._lock:
+            return self._model_executor_locks.setdefault(model_id, threading.Lock())
 
     def is_model_executor_already_added(self, model_id) -> bool:
         """Check whether the `ModelExecutor` instance of this model_id is already in `self.model_executors` list.
@@ -693,7 +742,8 @@ class Generators:
 
         if self.find_model_executor_by_id(model_id=model_id) is None:
             logging.debug(
-                f"{model_id}: The model has not yet been added to the model_executor list."
+                "%s: The model has not yet been added to the model_executor list.",
+                model_id,
             )
             return False
         return True
@@ -749,7 +799,9 @@ class Generators:
             return self.find_model_executor_by_id(model_id=model_id)
         except Exception as e:
             logging.error(
-                f"{model_id}: This model could not be added to model_executor list: {e}"
+                "%s: This model could not be added to model_executor list: %s",
+                model_id,
+                e,
             )
             raise e
 
@@ -790,16 +842,20 @@ class Generators:
 
         model_id = self.config_manager.match_model_id(provided_model_id=model_id)
 
-        model_executor = self.get_model_executor(
-            model_id=model_id, install_dependencies=install_dependencies
-        )
-        return model_executor.generate(
-            num_samples=num_samples,
-            output_path=output_path,
-            save_images=save_images,
-            is_gen_function_returned=is_gen_function_returned,
-            **kwargs,
-        )
+        with get_tracer().span(
+            "generators.generate", model_id=model_id, num_samples=num_samples
+        ):
+            with get_tracer().span("generators.get_model_executor", model_id=model_id):
+                model_executor = self.get_model_executor(
+                    model_id=model_id, install_dependencies=install_dependencies
+                )
+            return model_executor.generate(
+                num_samples=num_samples,
+                output_path=output_path,
+                save_images=save_images,
+                is_gen_function_returned=is_gen_function_returned,
+                **kwargs,
+            )
 
     def get_generate_function(
         self,
@@ -868,7 +924,8 @@ class Generators:
         model_contributor = self.get_model_contributor_by_id(model_id=model_id)
         if model_contributor is not None:
             logging.warning(
-                f"{model_id}: For this model_id, there already exists a ModelContributor. None was added. Returning the existing one."
+                "%s: For this model_id, there already exists a ModelContributor. None was added. Returning the existing one.",
+                model_id,
             )
         else:
             model_contributor = ModelContributor(
@@ -1135,10 +1192,15 @@ class Generators:
         )  # {f'Generated samples: {samples}' if samples is not None else ''}"
 
         logging.info(
-            f"{model_id}: The test of "
-            f"{'this new local user model' if is_local_model else 'this existing medigan model'} "
-            f"was successful, as model created the expected number ({num_samples}) of synthetic "
-            f"samples."
+            "%s: The test of "
+            "%s "
+            "was successful, as model created the expected number (%s) of synthetic "
+            "samples.",
+            model_id,
+            "this new local user model"
+            if is_local_model
+            else "this existing medigan model",
+            num_samples,
         )
 
     def contribute(
@@ -1225,7 +1287,7 @@ class Generators:
                 output_path=output_path,
             )
         logging.debug(
-            f"{model_id}: The following model metadata was created: {metadata}"
+            "%s: The following model metadata was created: %s", model_id, metadata
         )
 
         try:
@@ -1237,8 +1299,10 @@ class Generators:
             )
         except Exception as e:
             logging.error(
-                f"{model_id}: Error while testing this local model. "
-                f"Please revise and run model contribute() again. {e}"
+                "%s: Error while testing this local model. "
+                "Please revise and run model contribute() again. %s",
+                model_id,
+                e,
             )
             raise e
 
@@ -1391,6 +1455,7 @@ class Generators:
         num_samples: int = 100,
         install_dependencies: bool = False,
         transform=None,
+        memmap_path: str = None,
         **kwargs,
     ) -> Dataset:
         """Get synthetic data in a torch Dataset for specified medigan model.
@@ -1407,6 +1472,10 @@ class Generators:
                flag indicating whether a generative model's dependencies are automatically installed. Else error is raised if missing dependencies are detected.
             transform
                 the torch data transformation functions to be applied to the data in the dataset.
+           memmap_path: str
+               if not None, the samples are generated batch-wise into one contiguous `.npy` file per field in this
+               (preferably new or empty) folder and a `MemmapSyntheticDataset` indexing zero-copy into these files is
+               returned. DataLoader workers then share the memory-mapped pages instead of copying the samples.
            **kwargs
                arbitrary number of keyword arguments passed to the model's sample generation function (e.g. the input path for image-to-image translation models in medigan).
 
@@ -1416,6 +1485,18 @@ class Generators:
             a torch.utils.data.Dataset object with data generated by model corresponding to `model_id`.
         """
 
+        if memmap_path is not None:
+            self.generate(
+                model_id=model_id,
+                num_samples=num_samples,
+                output_path=memmap_path,
+                save_images=True,
+                install_dependencies=install_dependencies,
+                output_format=OUTPUT_FORMAT_NPY,
+                **kwargs,
+            )
+            return MemmapSyntheticDataset(path=memmap_path, transform=transform)
+
         data = self.generate(
             model_id=model_id,
             num_samples=num_samples,
@@ -1425,7 +1506,7 @@ class Generators:
             **kwargs,
         )
 
-        logging.debug(f"data: {data}")
+        logging.debug("data: %s", ArraySummary(data))
 
         (
             samples,
@@ -1434,7 +1515,11 @@ class Generators:
             labels,
         ) = Utils.split_images_masks_and_labels(data=data, num_samples=num_samples)
         logging.debug(
-            f"samples: {samples} \n masks: {masks} \n other_imaging_output: {other_imaging_output} \n labels: {labels}"
+            "samples: %s \n masks: %s \n other_imaging_output: %s \n labels: %s",
+            ArraySummary(samples),
+            ArraySummary(masks),
+            ArraySummary(other_imaging_output),
+            ArraySummary(labels),
         )
 
         return SyntheticDataset(
@@ -1445,12 +1530,145 @@ class Generators:
             transform=transform,
         )
 
+    def evaluate(
+        self,
+        model_id: str,
+        reference_stats: str,
+        num_samples: int = 1000,
+        metrics: list = None,
+        feature_extractor=FEATURE_EXTRACTOR_INCEPTION_V3,
+        feature_extractor_weights_path: str = None,
+        batch_size: int = DEFAULT_EVALUATION_BATCH_SIZE,
+        seed: int = None,
+        is_normalized: bool = False,
+        reference_statistics_path: str = REFERENCE_STATISTICS_FOLDER,
+        device: str = None,
+        install_dependencies: bool = False,
+        **kwargs,
+    ) -> dict:
+        """Evaluate a model by streaming its generated batches straight into feature extraction and metric accumulation.
+
+        No images are written to disk: each generated batch is embedded by the feature extractor, merged into the
+        running feature statistics, and discarded.
+
+        Parameters
+        ----------
+        model_id: str
+            The generative model's unique id
+        reference_stats: str
+            the path to a folder with reference (e.g. real) images or to a `.npz` file with precomputed reference
+            statistics. The statistics of reference folders are cached in `reference_statistics_path`.
+        num_samples: int
+            the number of samples that are generated and evaluated
+        metrics: list
+            the metrics to calculate, i.e. any of "fid", "kid", "precision", "recall", "density", and
+            "coverage". If None, FID and KID are calculated.
+        feature_extractor: Union[str, FeatureExtractor]
+            a `FeatureExtractor` instance or the name of the feature extractor ("inception_v3" or "torchscript")
+        feature_extractor_weights_path: str
+            the local path to the weights of the feature extractor if `feature_extractor` is a name
+        batch_size: int
+            the number of samples generated and embedded per batch
+        seed: int
+            the base seed from which the random seed of each generated batch is derived
+        is_normalized: bool
+            flag indicating whether each image is min-max normalized to the range [0, 255]
+        reference_statistics_path: str
+            the folder in which the statistics of reference image folders are cached. If None, they are not cached.
+        device: str
+            the torch device of the feature extractor. If None, cuda is used if available.
+        install_dependencies: bool
+            flag indicating whether a generative model's dependencies are automatically installed. Else error is raised if missing dependencies are detected.
+        **kwargs
+            arbitrary number of keyword arguments passed to the model's sample generation function
+
+        Returns
+        -------
+        dict
+            the metric values and the numbers of reference (num_samples_1) and generated (num_samples_2) samples
+        """
+
+        if isinstance(feature_extractor, str):
+            feature_extractor = get_feature_extractor(
+                name=feature_extractor,
+                weights_path=feature_extractor_weights_path,
+                device=device,
+            )
+        model_executor = self.get_model_executor(
+            model_id=model_id, install_dependencies=install_dependencies
+        )
+        model_evaluator = ModelEvaluator(
+            feature_extractor=feature_extractor,
+            batch_size=batch_size,
+            seed=seed,
+            reference_statistics_path=reference_statistics_path,
+        )
+        return model_evaluator.evaluate_generated(
+            reference_path=reference_stats,
+            batches=tqdm(
+                model_executor.generate_batches(
+                    num_samples=num_samples, batch_size=batch_size, seed=seed, **kwargs
+                ),
+                total=math.ceil(num_samples / batch_size),
+                desc=f"{model_executor.model_id}: Generating batches",
+            ),
+            metrics=metrics,
+            is_normalized=is_normalized,
+        )
+
+    def benchmark(
+        self,
+        model_ids: list = None,
+        batch_sizes: list = None,
+        num_batches: int = DEFAULT_BENCHMARK_NUM_BATCHES,
+        output_path: str = None,
+        install_dependencies: bool = False,
+        **kwargs,
+    ) -> dict:
+        """Benchmark the import time, time to first sample, latency, throughput, and memory of models' generation.
+
+        Parameters
+        ----------
+        model_ids: list
+            the ids of the models that are benchmarked. If None, all models in the config are benchmarked.
+        batch_sizes: list
+            the batch sizes for which the latency and throughput of the generate calls are measured
+        num_batches: int
+            the number of timed generate calls per batch size
+        output_path: str
+            the JSON file to which the results are written. If None, the results are only returned.
+        install_dependencies: bool
+            flag indicating whether a generative model's dependencies are automatically installed. Else error is raised if missing dependencies are detected.
+        **kwargs
+            arbitrary number of keyword arguments passed to the models' sample generation functions
+
+        Returns
+        -------
+        dict
+            the environment, the benchmark settings, and the results by model id
+        """
+
+        # Imported here so that running `python -m medigan.benchmark` does not import the module twice.
+        from .benchmark import ModelBenchmark
+
+        model_benchmark = ModelBenchmark(
+            config_manager=self.config_manager,
+            batch_sizes=batch_sizes,
+            num_batches=num_batches,
+            install_dependencies=install_dependencies,
+        )
+        results = model_benchmark.run(model_ids=model_ids, **kwargs)
+        if output_path is not None:
+            model_benchmark.save(path=output_path)
+        return results
+
     def visualize(
         self,
         model_id: str,
         slider_grouper: int = 10,
         auto_close: bool = False,
         install_dependencies: bool = False,
+        debounce_interval: float = VISUALIZER_DEBOUNCE_INTERVAL,
     ) -> None:
         """Initialize and run `ModelVisualizer` of this model_id if it is available.
         It allows to visualize a sample from the model's output.
@@ -1466,18 +1684,124 @@ class Generators:
             Flag for closing the user interface automatically after time. Used while testing.
         install_dependencies: bool
             flag indicating whether a generative model's dependencies are automatically installed. Else error is raised if missing dependencies are detected.
+        debounce_interval: float
+            Time in seconds without slider changes after which a new image is generated.
 
         """
 
         model_id = self.config_manager.match_model_id(provided_model_id=model_id)
 
-        config = self.get_config_by_id(model_id=model_id)
+        if model_id not in self.model_visualizers:
+            config = self.get_config_by_id(model_id=model_id)
+            model_executor = self.get_model_executor(
+                model_id=model_id, install_dependencies=install_dependencies
+            )
+            self.model_visualizers[model_id] = ModelVisualizer(
+                model_executor=model_executor, config=config
+            )
+
+        self.model_visualizers[model_id].visualize(
+            slider_grouper=slider_grouper,
+            auto_close=auto_close,
+            debounce_interval=debounce_interval,
+        )
+
+    def get_latent_explorer(
+        self,
+        model_id: str,
+        max_batch_size: int = DEFAULT_LATENT_BATCH_SIZE,
+        condition=None,
+        install_dependencies: bool = False,
+    ) -> LatentExplorer:
+        """Initialize and return the `LatentExplorer` of this model_id for batched latent space exploration.
+
+        The `LatentExplorer` provides latent interpolation (linear and slerp), interpolation grids, sweeps of latent
+        dimensions, and neighbourhood sampling. All latent vectors of an exploration are stacked into a single
+        `input_latent_vector` that is passed to the model in chunks of at most `max_batch_size` vectors.
+
+        Parameters
+        ----------
+        model_id: str
+            The generative model's unique id
+        max_batch_size: int
+            The maximum number of latent vectors passed to the model's generate function in one call
+        condition: Union[int, float]
+            Value of the conditional input to the model. If None, the model's default condition is used (if any).
+        install_dependencies: bool
+            flag indicating whether a generative model's dependencies are automatically installed. Else error is raised if missing dependencies are detected.
+
+        Returns
+        -------
+        LatentExplorer
+            `LatentExplorer` class instance corresponding to the `model_id`
+        """
+
         model_executor = self.get_model_executor(
             model_id=model_id, install_dependencies=install_dependencies
         )
+        return LatentExplorer(
+            model_executor=model_executor,
+            max_batch_size=max_batch_size,
+            condition=condition,
+        )
 
-        ModelVisualizer(model_executor=model_executor, config=config).visualize(
-            slider_grouper=slider_grouper, auto_close=auto_close
+    def render_latent_traversal(
+        self,
+        model_id: str,
+        output_path: str,
+        latents=None,
+        conditions=None,
+        fps: int = DEFAULT_FRAMES_PER_SECOND,
+        max_batch_size: int = DEFAULT_LATENT_BATCH_SIZE,
+        frame_buffer_size: int = DEFAULT_FRAME_BUFFER_SIZE,
+        install_dependencies: bool = False,
+        **kwargs,
+    ) -> str:
+        """Render a traversal through the latent space of this model_id headlessly to an MP4/GIF video or PNG grid.
+
+        In contrast to `visualize`, no GUI backend is needed. The frames are generated in batches and streamed
+        through a bounded frame buffer to the encoder that is selected by the extension of `output_path`.
+
+        Parameters
+        ----------
+        model_id: str
+            The generative model's unique id
+        output_path: str
+            the path to the output file ending in .mp4, .gif (both require imageio), or .png (tiled image grid)
+        latents: np.ndarray
+            array of latent vectors, one per frame. If None, a looped path through four random keyframes is used.
+        conditions: Union[int, float, list]
+            the condition of all frames or a sequence with one condition per frame. Only for conditional models.
+        fps: int
+            the frames per second of MP4 and GIF videos
+        max_batch_size: int
+            The maximum number of frames generated in one call of the model's generate function
+        frame_buffer_size: int
+            The maximum number of generated frames waiting to be encoded
+        install_dependencies: bool
+            flag indicating whether a generative model's dependencies are automatically installed. Else error is raised if missing dependencies are detected.
+        **kwargs
+            arbitrary number of keyword arguments passed to `LatentTraversalRenderer.render` and to the model's generate function
+
+        Returns
+        -------
+        str
+            the path to the output file
+        """
+
+        latent_explorer = self.get_latent_explorer(
+            model_id=model_id,
+            max_batch_size=max_batch_size,
+            install_dependencies=install_dependencies,
+        )
+        return LatentTraversalRenderer(
+            latent_explorer=latent_explorer, frame_buffer_size=frame_buffer_size
+        ).render(
+            output_path=output_path,
+            latents=latents,
+            conditions=conditions,
+            fps=fps,
+            **kwargs,
         )
 
     def __repr__(self):
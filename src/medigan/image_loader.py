@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" `ImageLoader` class streaming the images of a folder in fixed-size, resized batches. """
+
+# Import python native libs
+from __future__ import absolute_import
+
+import logging
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Import pypi libs
+import numpy as np
+
+# Import library internal modules
+from .constants import (
+    DEFAULT_EVALUATION_BATCH_SIZE,
+    DEFAULT_IMAGE_LOADER_NUM_WORKERS,
+    IMAGE_FILE_EXTENSIONS,
+)
+
+
+class ImageLoader:
+    """`ImageLoader` class: Iterates over the images of a folder in batches of resized, three-channel uint8 arrays.
+
+    Only the current and the next batch are held in memory, hence arbitrarily large image folders can be streamed
+    e.g. into feature extraction or into models that consume an input folder. The images of a batch are decoded and
+    resized by a pool of `num_workers` threads (opencv and pillow release the GIL while decoding) directly into a
+    preallocated batch array, and the next batch is decoded while the current one is being consumed. Images are
+    decoded with opencv if it is installed and with pillow otherwise. `.npy` files (as written by some medigan
+    models) are loaded with numpy.
+
+    Parameters
+    ----------
+    path: str
+        the path to the folder containing the images
+    image_size: int
+        the height and width to which each image is resized. If None, the images are not resized and must all have
+        the same size.
+    batch_size: int
+        the number of images per batch
+    is_normalized: bool
+        flag indicating whether each image is min-max normalized to the range [0, 255]
+    limit: int
+        the maximum number of images that are loaded. If None, all images are loaded.
+    num_workers: int
+        the number of threads decoding images in parallel. If 0, the images are decoded in the calling thread.
+
+    Attributes
+    ----------
+    filenames: list
+        the sorted names of the image files in the folder
+    """
+
+    def __init__(
+        self,
+        path: str,
+        image_size: int = None,
+        batch_size: int = DEFAULT_EVALUATION_BATCH_SIZE,
+        is_normalized: bool = False,
+        limit: int = None,
+        num_workers: int = DEFAULT_IMAGE_LOADER_NUM_WORKERS,
+    ):
+        self.path = path
+        self.image_size = image_size
+        self.batch_size = batch_size
+        self.is_normalized = is_normalized
+        self.num_workers = num_workers
+        self.filenames = self.get_image_filenames(path=path)[:limit]
+
+    @staticmethod
+    def get_image_filenames(path: str) -> list:
+        """Return the sorted names of the files in `path` that have one of the `IMAGE_FILE_EXTENSIONS`."""
+
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"The image folder {path} does not exist.")
+        return sorted(
+            filename
+            for filename in os.listdir(path)
+            if filename.lower().endswith(tuple(IMAGE_FILE_EXTENSIONS))
+        )
+
+    def load_image(self, filename: str) -> np.ndarray:
+        """Decode, resize, normalize, and return one image as uint8 array of shape (height, width, 3)."""
+
+        file_path = os.path.join(self.path, filename)
+        if filename.lower().endswith(".npy"):
+            image = np.load(file_path)
+        else:
+            image = self._decode(file_path)
+        return self.preprocess_image(
+            image=image, image_size=self.image_size, is_normalized=self.is_normalized
+        )
+
+    @staticmethod
+    def preprocess_image(
+        image: np.ndarray, image_size: int = None, is_normalized: bool = False
+    ) -> np.ndarray:
+        """Resize, normalize, and return an image (e.g. a decoded or generated one) as uint8 array of shape (h, w, 3).
+
+        Images that are not of type uint8 (e.g. float images returned by a model) are min-max normalized to [0, 255].
+        """
+
+        image = np.asarray(image)
+        if image.ndim == 3 and image.shape[2] == 1:
+            image = image[:, :, 0]
+        if is_normalized or image.dtype != np.uint8:
+            image = image.astype(np.float32)
+            image_range = image.max() - image.min()
+            image = (
+                (image - image.min()) / image_range * 255.0
+                if image_range > 0
+                else np.zeros_like(image)
+            )
+            image = image.astype(np.uint8)
+        if image_size is not None and image.shape[:2] != (image_size, image_size):
+            image = ImageLoader._resize(image, image_size)
+        if image.ndim == 2:
+            image = np.stack([image] * 3, axis=2)
+        elif image.shape[2] == 4:
+            image = image[:, :, :3]
+        return image
+
+    @staticmethod
+    def _decode(file_path: str) -> np.ndarray:
+        try:
+            import cv2
+        except ImportError:
+            from PIL import Image
+
+            with Image.open(file_path) as image:
+                return np.asarray(image)
+        image = cv2.imread(file_path, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ValueError(f"The image {file_path} could not be decoded.")
+        if image.ndim == 3:
+            # opencv decodes color images to BGR(A) channel order.
+            image = image[:, :, [2, 1, 0, 3][: image.shape[2]]]
+        return image
+
+    @staticmethod
+    def _resize(image: np.ndarray, image_size: int) -> np.ndarray:
+        try:
+            import cv2
+        except ImportError:
+            from PIL import Image
+
+            return np.asarray(
+                Image.fromarray(image).resize(
+                    (image_size, image_size), resample=Image.BILINEAR
+                )
+            )
+        return cv2.resize(
+            image, (image_size, image_size), interpolation=cv2.INTER_LINEAR
+        )
+
+    def _load_batch(self, filenames: list, executor: ThreadPoolExecutor = None):
+        """Return a function that waits for and returns the batch of `filenames` decoded into a preallocated array."""
+
+        if self.image_size is not None:
+            batch = np.empty(
+                (len(filenames), self.image_size, self.image_size, 3), dtype=np.uint8
+            )
+            first_index = 0
+        else:
+            # Without a target size, the batch shape is given by the first image.
+            first_image = self.load_image(filenames[0])
+            batch = np.empty((len(filenames), *first_image.shape), dtype=np.uint8)
+            batch[0] = first_image
+            first_index = 1
+
+        def load_into_batch(index: int):
+            batch[index] = self.load_image(filenames[index])
+
+        indices = range(first_index, len(filenames))
+        if executor is None:
+            for index in indices:
+                load_into_batch(index)
+            return lambda: batch
+        futures = [executor.submit(load_into_batch, index) for index in indices]
+
+        def wait_for_batch():
+            for future in futures:
+                # Re-raises the exception of a worker thread, e.g. if an image could not be decoded.
+                future.result()
+            return batch
+
+        return wait_for_batch
+
+    def __iter__(self):
+        filename_batches = [
+            self.filenames[start : start + self.batch_size]
+            for start in range(0, len(self.filenames), self.batch_size)
+        ]
+        if not filename_batches:
+            return
+        executor = (
+            ThreadPoolExecutor(
+                max_workers=min(self.num_workers, max(len(self.filenames), 1))
+            )
+            if self.num_workers > 0
+            else None
+        )
+        try:
+            next_batch = self._load_batch(filename_batches[0], executor)
+            for i in range(len(filename_batches)):
+                current_batch = next_batch
+                if i + 1 < len(filename_batches):
+                    # Decode the next batch while the current batch is being consumed.
+                    next_batch = self._load_batch(filename_batches[i + 1], executor)
+                batch = current_batch()
+                logging.debug(
+                    "Loaded a batch of %s images with shape %s from %s",
+                    len(batch),
+                    batch.shape,
+                    self.path,
+                )
+                yield batch
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+    def __len__(self):
+        return math.ceil(len(self.filenames) / self.batch_size)
+
+    def __repr__(self):
+        return (
+            f"ImageLoader(path={self.path}, image_size={self.image_size}, batch_size={self.batch_size}, "
+            f"num_workers={self.num_workers}, num_images={len(self.filenames)})"
+        )
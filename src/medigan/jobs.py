@@ -0,0 +1,636 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" `JobQueue` and `JobWorker` classes scheduling batched generation jobs of many models on one or several machines.
+
+Jobs are stored in a SQLite database, hence several worker processes (e.g. started with `python -m medigan jobs work`)
+can pull jobs from the same queue:
+
+    job_queue = JobQueue("jobs.sqlite3")
+    job_queue.submit(model_id="00001", num_samples=1000, priority=1, batch_size=32)
+    job_queue.submit(model_id="00002", num_samples=500)
+    JobWorker(job_queue=job_queue).run()
+    print(job_queue.get_progress())
+"""
+
+# Import python native libs
+from __future__ import absolute_import
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Import library internal modules
+from .constants import (
+    DEFAULT_JOB_DATABASE,
+    DEFAULT_JOB_HEARTBEAT_SECONDS,
+    DEFAULT_JOB_MAX_ATTEMPTS,
+    DEFAULT_JOB_STALE_SECONDS,
+    DEFAULT_OUTPUT_FOLDER,
+    DISTRIBUTED_RANK_FOLDER_PREFIX,
+)
+from .execute_model.generation_manifest import GenerationManifest
+from .generators import Generators
+
+JOB_STATUS_PENDING = "pending"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_COMPLETED = "completed"
+JOB_STATUS_FAILED = "failed"
+JOB_STATUS_CANCELLED = "cancelled"
+
+# The arguments of `Generators.generate` that are set by the worker for each job.
+RESERVED_JOB_KWARGS = [
+    "model_id",
+    "num_samples",
+    "save_images",
+    "is_gen_function_returned",
+    "is_resumable",
+    "install_dependencies",
+]
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    model_id TEXT NOT NULL,
+    num_samples INTEGER NOT NULL,
+    kwargs TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    output_path TEXT,
+    num_completed_samples INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    worker_id TEXT,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+)
+"""
+
+_CREATE_INDEX = (
+    "CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, priority, job_id)"
+)
+
+
+def get_num_completed_samples(output_path: str, is_distributed: bool = False) -> int:
+    """Return the number of samples of the completed batches in the manifest of a resumable job in `output_path`.
+
+    The batches of a distributed job are counted in the manifests of the folders of all of its ranks.
+    """
+
+    if is_distributed:
+        if not os.path.isdir(output_path):
+            return 0
+        manifest_paths = [
+            os.path.join(output_path, name)
+            for name in sorted(os.listdir(output_path))
+            if name.startswith(DISTRIBUTED_RANK_FOLDER_PREFIX)
+        ]
+    else:
+        manifest_paths = [output_path]
+    num_completed_samples = 0
+    for manifest_path in manifest_paths:
+        try:
+            num_completed_samples += GenerationManifest(
+                output_path=manifest_path,
+                model_id=None,
+                num_samples=None,
+                batch_size=None,
+                is_read_only=True,
+            ).get_num_completed_samples()
+        except (FileNotFoundError, ValueError):
+            # The manifest has not been written yet.
+            continue
+    return num_completed_samples
+
+
+class JobQueue:
+    """`JobQueue` class: Persistent priority queue of generation jobs in a SQLite database.
+
+    Workers claim the pending job with the highest priority. Among jobs of the same priority, a job of the model the
+    worker has used for its previous job is preferred, so that the worker's model stays warm, and else the oldest job
+    is claimed. A failed job is claimed again until it has been run `max_attempts` times. Running jobs whose worker has
+    not reported progress for `stale_seconds` (e.g. because the worker was killed) are claimed again as well.
+
+    Parameters
+    ----------
+    database_path: str
+        the path as str to the SQLite database file, which is created if it does not exist
+
+    Attributes
+    ----------
+    database_path: str
+        the path as str to the SQLite database file
+    """
+
+    def __init__(self, database_path: str = DEFAULT_JOB_DATABASE):
+        self.database_path = str(database_path)
+        database_folder = os.path.dirname(os.path.abspath(self.database_path))
+        os.makedirs(database_folder, exist_ok=True)
+        with self._transaction() as connection:
+            connection.execute(_CREATE_TABLE)
+            connection.execute(_CREATE_INDEX)
+        connection = sqlite3.connect(self.database_path)
+        try:
+            # Readers (e.g. progress reports) then do not block the workers' writes.
+            connection.execute("PRAGMA journal_mode=WAL")
+        finally:
+            connection.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Yield a connection whose statements run in one transaction that holds the database's write lock."""
+
+        # A new connection per transaction, as sqlite3 connections cannot be shared between threads.
+        connection = sqlite3.connect(
+            self.database_path, timeout=60, isolation_level=None
+        )
+        connection.row_factory = sqlite3.Row
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["kwargs"] = json.loads(job["kwargs"])
+        return job
+
+    def submit(
+        self,
+        model_id: str,
+        num_samples: int,
+        priority: int = 0,
+        max_attempts: int = DEFAULT_JOB_MAX_ATTEMPTS,
+        output_path: str = None,
+        **kwargs,
+    ) -> int:
+        """Add a generation job to the queue and return its job id.
+
+        Parameters
+        ----------
+        model_id: str
+            The generative model's unique id
+        num_samples: int
+            the number of samples that will be generated
+        priority: int
+            the priority of the job. Jobs with higher priority are run first.
+        max_attempts: int
+            the number of times the job is run before it is marked as failed
+        output_path: str
+            the path as str to the output folder where the generated samples will be stored. If None, the samples are
+            stored in a folder of the job in `DEFAULT_OUTPUT_FOLDER`.
+        **kwargs
+            json serializable keyword arguments passed to `Generators.generate`, e.g. `batch_size` or `seed`
+
+        Returns
+        -------
+        int
+            the id of the job
+        """
+
+        reserved_kwargs = [key for key in kwargs if key in RESERVED_JOB_KWARGS]
+        if reserved_kwargs:
+            raise ValueError(
+                f"{model_id}: The arguments {reserved_kwargs} are set by the job worker and cannot be passed to a job."
+            )
+        if max_attempts < 1:
+            raise ValueError(f"{model_id}: max_attempts must be at least 1.")
+        with self._transaction() as connection:
+            job_id = connection.execute(
+                "INSERT INTO jobs (model_id, num_samples, kwargs, priority, status, max_attempts, submitted_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    model_id,
+                    num_samples,
+                    json.dumps(kwargs),
+                    priority,
+                    JOB_STATUS_PENDING,
+                    max_attempts,
+                    time.time(),
+                ),
+            ).lastrowid
+            if output_path is None:
+                output_path = os.path.join(
+                    DEFAULT_OUTPUT_FOLDER, "jobs", f"job_{job_id:06d}"
+                )
+            connection.execute(
+                "UPDATE jobs SET output_path = ? WHERE job_id = ?",
+                (str(output_path), job_id),
+            )
+        logging.debug(
+            "%s: Submitted job %s for %s samples with priority %s.",
+            model_id,
+            job_id,
+            num_samples,
+            priority,
+        )
+        return job_id
+
+    def _requeue_stale_jobs(self, connection: sqlite3.Connection, stale_seconds: float):
+        stale_jobs = connection.execute(
+            "SELECT job_id, attempts, max_attempts FROM jobs WHERE status = ? AND heartbeat_at < ?",
+            (JOB_STATUS_RUNNING, time.time() - stale_seconds),
+        ).fetchall()
+        for job_id, attempts, max_attempts in stale_jobs:
+            logging.warning(
+                "Job %s has not reported progress for %s seconds. Its worker is assumed to be lost.",
+                job_id,
+                stale_seconds,
+            )
+            connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, worker_id = NULL WHERE job_id = ?",
+                (
+                    JOB_STATUS_PENDING
+                    if attempts < max_attempts
+                    else JOB_STATUS_FAILED,
+                    "The worker stopped reporting progress.",
+                    job_id,
+                ),
+            )
+        return len(stale_jobs)
+
+    def requeue_stale_jobs(self, stale_seconds: float = DEFAULT_JOB_STALE_SECONDS):
+        """Make running jobs without progress report for `stale_seconds` pending again and return their number."""
+
+        with self._transaction() as connection:
+            return self._requeue_stale_jobs(connection, stale_seconds=stale_seconds)
+
+    def claim(
+        self,
+        worker_id: str,
+        preferred_model_id: str = None,
+        stale_seconds: float = DEFAULT_JOB_STALE_SECONDS,
+    ) -> dict:
+        """Mark the next pending job as run by `worker_id` and return it, or return None if no job is pending.
+
+        Parameters
+        ----------
+        worker_id: str
+            the id of the worker that runs the job
+        preferred_model_id: str
+            the id of the model whose jobs are claimed before other jobs of the same priority
+        stale_seconds: float
+            the time in seconds after which running jobs without progress report are pending again
+
+        Returns
+        -------
+        dict
+            the job with its `job_id`, `model_id`, `num_samples`, `kwargs`, `output_path`, and `attempts`
+        """
+
+        with self._transaction() as connection:
+            self._requeue_stale_jobs(connection, stale_seconds=stale_seconds)
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE status = ? "
+                "ORDER BY priority DESC, model_id IS ? DESC, job_id LIMIT 1",
+                (JOB_STATUS_PENDING, preferred_model_id),
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            connection.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, worker_id = ?, started_at = ?, "
+                "heartbeat_at = ? WHERE job_id = ?",
+                (JOB_STATUS_RUNNING, worker_id, now, now, row["job_id"]),
+            )
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],)
+            ).fetchone()
+        return self._to_job(row)
+
+    def _update_running_job(
+        self, job_id: int, worker_id: str, assignments: str, values: tuple
+    ) -> bool:
+        """Update a job if it is still run by `worker_id` and return whether it was updated."""
+
+        with self._transaction() as connection:
+            is_updated = (
+                connection.execute(
+                    f"UPDATE jobs SET {assignments} WHERE job_id = ? AND status = ? AND worker_id = ?",
+                    values + (job_id, JOB_STATUS_RUNNING, worker_id),
+                ).rowcount
+                == 1
+            )
+        if not is_updated:
+            logging.warning(
+                "Job %s is no longer run by worker %s. It was probably run again by another worker after "
+                "this worker had stopped reporting progress.",
+                job_id,
+                worker_id,
+            )
+        return is_updated
+
+    def report_progress(
+        self, job_id: int, worker_id: str, num_completed_samples: int
+    ) -> bool:
+        """Record the number of samples of a running job that are generated and that the job's worker is alive."""
+
+        return self._update_running_job(
+            job_id=job_id,
+            worker_id=worker_id,
+            assignments="num_completed_samples = ?, heartbeat_at = ?",
+            values=(num_completed_samples, time.time()),
+        )
+
+    def complete(self, job_id: int, worker_id: str, num_completed_samples: int) -> bool:
+        """Mark a running job as completed."""
+
+        return self._update_running_job(
+            job_id=job_id,
+            worker_id=worker_id,
+            assignments="status = ?, num_completed_samples = ?, error = NULL, finished_at = ?",
+            values=(JOB_STATUS_COMPLETED, num_completed_samples, time.time()),
+        )
+
+    def fail(
+        self,
+        job_id: int,
+        worker_id: str,
+        error: str,
+        num_completed_samples: int = 0,
+    ) -> bool:
+        """Mark a running job as pending again or, if it has been run `max_attempts` times, as failed."""
+
+        return self._update_running_job(
+            job_id=job_id,
+            worker_id=worker_id,
+            assignments="status = CASE WHEN attempts < max_attempts THEN ? ELSE ? END, error = ?, "
+            "num_completed_samples = ?, worker_id = NULL, finished_at = ?",
+            values=(
+                JOB_STATUS_PENDING,
+                JOB_STATUS_FAILED,
+                error,
+                num_completed_samples,
+                time.time(),
+            ),
+        )
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a pending job and return whether it was cancelled. Running jobs are not interrupted."""
+
+        with self._transaction() as connection:
+            return (
+                connection.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ? WHERE job_id = ? AND status = ?",
+                    (JOB_STATUS_CANCELLED, time.time(), job_id, JOB_STATUS_PENDING),
+                ).rowcount
+                == 1
+            )
+
+    def get_job(self, job_id: int) -> dict:
+        """Return the job with `job_id` or None if there is no such job."""
+
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return None if row is None else self._to_job(row)
+
+    def get_jobs(self, status: str = None) -> list:
+        """Return all jobs, or the jobs with `status`, in the order of their submission."""
+
+        with self._transaction() as connection:
+            if status is None:
+                rows = connection.execute("SELECT * FROM jobs ORDER BY job_id")
+            else:
+                rows = connection.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY job_id", (status,)
+                )
+            return [self._to_job(row) for row in rows.fetchall()]
+
+    def get_progress(self) -> dict:
+        """Return the number of jobs per status and the number of requested and generated samples of all jobs.
+
+        Returns
+        -------
+        dict
+            dictionary with the keys `jobs` (the number of jobs per status), `num_samples`, and
+            `num_completed_samples`
+        """
+
+        with self._transaction() as connection:
+            rows = connection.execute(
+                "SELECT status, COUNT(*), SUM(num_samples), SUM(num_completed_samples) FROM jobs GROUP BY status"
+            ).fetchall()
+        return {
+            "jobs": {row[0]: row[1] for row in rows},
+            "num_samples": sum(row[2] for row in rows),
+            "num_completed_samples": sum(row[3] for row in rows),
+        }
+
+    def __len__(self):
+        """Return the number of pending jobs."""
+
+        return self.get_progress()["jobs"].get(JOB_STATUS_PENDING, 0)
+
+    def __repr__(self):
+        return f"JobQueue(database_path={self.database_path})"
+
+
+class JobWorker:
+    """`JobWorker` class: Runs the jobs of a `JobQueue` one after the other with warm models.
+
+    The worker keeps the `ModelExecutor` of each model it has used in its `generators`, hence each model is imported
+    only once per worker, and it prefers the pending jobs of the model of its previous job. Jobs are generated with
+    `is_resumable=True`, so that a job that is run again after a failure skips its already completed batches. While a
+    job is running, the number of generated samples is read from the job's manifest and reported to the queue every
+    `heartbeat_seconds`.
+
+    Parameters
+    ----------
+    job_queue: JobQueue
+        the queue from which jobs are claimed
+    generators: Generators
+        the `Generators` instance whose model executors run the jobs. If None, a `Generators` instance is initialized.
+    worker_id: str
+        the id of the worker stored with its running job. If None, an id based on host name and process id is used.
+    install_dependencies: bool
+        flag indicating whether a generative model's dependencies are automatically installed
+    poll_interval: float
+        the time in seconds between checks for new jobs if the worker waits for jobs
+    heartbeat_seconds: float
+        the interval in seconds in which the progress of the running job is reported
+    stale_seconds: float
+        the time in seconds after which running jobs without progress report (of any worker) are run again
+    """
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        generators: Generators = None,
+        worker_id: str = None,
+        install_dependencies: bool = False,
+        poll_interval: float = 1,
+        heartbeat_seconds: float = DEFAULT_JOB_HEARTBEAT_SECONDS,
+        stale_seconds: float = DEFAULT_JOB_STALE_SECONDS,
+    ):
+        self.job_queue = job_queue
+        self.generators = Generators() if generators is None else generators
+        self.worker_id = (
+            f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+            if worker_id is None
+            else worker_id
+        )
+        self.install_dependencies = install_dependencies
+        self.poll_interval = poll_interval
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def _get_num_completed_samples(job: dict) -> int:
+        return get_num_completed_samples(
+            output_path=job["output_path"],
+            is_distributed=job["kwargs"].get("is_distributed", False),
+        )
+
+    def _report_progress(
+        self, job: dict, is_done: threading.Event, is_lost: threading.Event
+    ):
+        while not is_done.wait(self.heartbeat_seconds):
+            try:
+                if not self.job_queue.report_progress(
+                    job_id=job["job_id"],
+                    worker_id=self.worker_id,
+                    num_completed_samples=self._get_num_completed_samples(job),
+                ):
+                    # Another worker has claimed the job again. Both must not write into its output_path.
+                    logging.error(
+                        "%s: Worker %s lost job %s and stops it after the current batch.",
+                        job["model_id"],
+                        self.worker_id,
+                        job["job_id"],
+                    )
+                    is_lost.set()
+                    return
+            except sqlite3.Error as e:
+                # E.g. a lock timeout while other workers write to the database. The next heartbeat is tried anyway.
+                logging.warning(
+                    "%s: Worker %s could not report the progress of job %s: %s",
+                    job["model_id"],
+                    self.worker_id,
+                    job["job_id"],
+                    e,
+                )
+
+    def run_job(self, job: dict) -> bool:
+        """Generate the samples of a claimed job, record its outcome in the queue, and return whether it succeeded."""
+
+        logging.info(
+            "%s: Worker %s runs job %s (attempt %s of %s) for %s samples in %s.",
+            job["model_id"],
+            self.worker_id,
+            job["job_id"],
+            job["attempts"],
+            job["max_attempts"],
+            job["num_samples"],
+            job["output_path"],
+        )
+        is_done = threading.Event()
+        is_lost = threading.Event()
+        heartbeat_thread = threading.Thread(
+            target=self._report_progress,
+            args=(job, is_done, is_lost),
+            name=f"medigan-job-{job['job_id']}-heartbeat",
+            daemon=True,
+        )
+        heartbeat_thread.start()
+        try:
+            self.generators.generate(
+                model_id=job["model_id"],
+                num_samples=job["num_samples"],
+                output_path=job["output_path"],
+                save_images=True,
+                install_dependencies=self.install_dependencies,
+                is_resumable=True,
+                abort_event=is_lost,
+                **job["kwargs"],
+            )
+        except Exception as e:
+            if is_lost.is_set():
+                return False
+            logging.warning(
+                "%s: Job %s failed in attempt %s of %s: %s",
+                job["model_id"],
+                job["job_id"],
+                job["attempts"],
+                job["max_attempts"],
+                e,
+            )
+            self.job_queue.fail(
+                job_id=job["job_id"],
+                worker_id=self.worker_id,
+                error=f"{type(e).__name__}: {e}",
+                num_completed_samples=self._get_num_completed_samples(job),
+            )
+            return False
+        finally:
+            is_done.set()
+            heartbeat_thread.join()
+        if is_lost.is_set():
+            return False
+        self.job_queue.complete(
+            job_id=job["job_id"],
+            worker_id=self.worker_id,
+            num_completed_samples=self._get_num_completed_samples(job),
+        )
+        return True
+
+    def run(self, max_jobs: int = None, is_waiting_for_jobs: bool = False) -> int:
+        """Run jobs until the queue is empty, `max_jobs` jobs are run, or `stop` is called.
+
+        Parameters
+        ----------
+        max_jobs: int
+            the maximum number of jobs that are run. If None, the number of jobs is not limited.
+        is_waiting_for_jobs: bool
+            flag indicating whether, if no job is pending, the worker waits for new jobs instead of returning
+
+        Returns
+        -------
+        int
+            the number of jobs that were run, including failed attempts
+        """
+
+        num_jobs = 0
+        model_id = None
+        while not self._stop_event.is_set() and (
+            max_jobs is None or num_jobs < max_jobs
+        ):
+            job = self.job_queue.claim(
+                worker_id=self.worker_id,
+                preferred_model_id=model_id,
+                stale_seconds=self.stale_seconds,
+            )
+            if job is None:
+                if not is_waiting_for_jobs:
+                    break
+                self._stop_event.wait(self.poll_interval)
+                continue
+            self.run_job(job)
+            model_id = job["model_id"]
+            num_jobs += 1
+        return num_jobs
+
+    def stop(self):
+        """Stop the worker after its running job."""
+
+        self._stop_event.set()
+
+    def __repr__(self):
+        return f"JobWorker(worker_id={self.worker_id}, job_queue={self.job_queue})"
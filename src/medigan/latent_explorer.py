@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" `LatentExplorer` class providing latent space interpolation, sweeps, and neighbourhood sampling of a model. """
+
+# Import python native libs
+from __future__ import absolute_import
+
+import logging
+
+# Import pypi libs
+import numpy as np
+
+# Import library internal modules
+from .constants import DEFAULT_LATENT_BATCH_SIZE
+from .utils import Utils
+
+
+class LatentExplorer:
+    """`LatentExplorer` class: Generates images for many latent vectors of a model in a few batched calls.
+
+    All latent vectors requested by an exploration (e.g. the 256 vectors of a 16×16 interpolation grid) are stacked
+    into one `input_latent_vector` array that is passed to the model's generate function in chunks of at most
+    `max_batch_size` vectors. Hence, exploring the latent space needs a handful of forward passes instead of one
+    forward pass per latent vector.
+
+    Parameters
+    ----------
+    model_executor: ModelExecutor
+        The generative model's executor object
+    max_batch_size: int
+        The maximum number of latent vectors passed to the model's generate function in one call
+    condition: Union[int, float]
+        Value of the conditional input to the model. If None, the model's default condition is used (if any).
+
+    Attributes
+    ----------
+    model_executor: ModelExecutor
+        The generative model's executor object
+    input_latent_vector_size: int
+        Size of the latent vector used as an input for generation
+    latent_shape: tuple
+        Shape of one latent vector as expected by the model, i.e. (input_latent_vector_size, 1, 1)
+    gen_function: callable
+        The model's generate function that is created once and reused for all generate calls
+    """
+
+    def __init__(
+        self,
+        model_executor,
+        max_batch_size: int = DEFAULT_LATENT_BATCH_SIZE,
+        condition=None,
+    ):
+        self.model_executor = model_executor
+        self.model_id = self.model_executor.model_id
+        self.max_batch_size = max_batch_size
+        self.condition = condition
+
+        self.input_latent_vector_size = (
+            self.model_executor.generate_method_input_latent_vector_size
+        )
+        if not self.input_latent_vector_size:
+            raise ValueError(
+                f"{self.model_id}: Latent space exploration of this model is not supported. Reason: This model does "
+                f"not use a random vector 'z' as input. This is determined via the absence of the "
+                f"'input_latent_vector_size' variable in this model's metadata in config/global.json."
+            )
+        self.latent_shape = (int(self.input_latent_vector_size), 1, 1)
+        self.gen_function = self.model_executor.generate(
+            num_samples=1,
+            save_images=False,
+            is_gen_function_returned=True,
+        )
+
+    def sample_latent_vectors(self, num_samples: int, seed: int = None) -> np.ndarray:
+        """Return `num_samples` latent vectors drawn from a standard normal distribution.
+
+        Parameters
+        ----------
+        num_samples: int
+            the number of latent vectors
+        seed: int
+            the seed of the random number generator. If None, the vectors are not reproducible.
+
+        Returns
+        -------
+        np.ndarray
+            array of latent vectors of shape (num_samples, input_latent_vector_size)
+        """
+
+        return (
+            np.random.default_rng(seed)
+            .standard_normal((num_samples, self.input_latent_vector_size))
+            .astype(np.float32)
+        )
+
+    @staticmethod
+    def interpolate(
+        z_start: np.ndarray,
+        z_end: np.ndarray,
+        num_steps: int = 10,
+        method: str = "linear",
+    ) -> np.ndarray:
+        """Return `num_steps` latent vectors interpolated between (and including) `z_start` and `z_end`.
+
+        Parameters
+        ----------
+        z_start: np.ndarray
+            the first latent vector
+        z_end: np.ndarray
+            the last latent vector
+        num_steps: int
+            the number of latent vectors including `z_start` and `z_end`
+        method: str
+            "linear" for linear interpolation or "slerp" for spherical linear interpolation, which keeps the norm of
+            interpolated gaussian latent vectors close to the norm of the start and end vectors.
+
+        Returns
+        -------
+        np.ndarray
+            array of latent vectors of shape (num_steps, latent vector size)
+        """
+
+        z_start = np.asarray(z_start, dtype=np.float32).ravel()
+        z_end = np.asarray(z_end, dtype=np.float32).ravel()
+        steps = np.linspace(0.0, 1.0, num_steps, dtype=np.float32)[:, None]
+        if method == "linear":
+            return (1.0 - steps) * z_start + steps * z_end
+        elif method == "slerp":
+            cosine = np.dot(z_start, z_end) / (
+                np.linalg.norm(z_start) * np.linalg.norm(z_end)
+            )
+            omega = np.arccos(np.clip(cosine, -1.0, 1.0))
+            if np.isclose(np.sin(omega), 0.0):
+                # The vectors are (anti-)parallel, hence slerp is not defined and we fall back to linear interpolation.
+                return (1.0 - steps) * z_start + steps * z_end
+            return (
+                np.sin((1.0 - steps) * omega) * z_start + np.sin(steps * omega) * z_end
+            ) / np.sin(omega)
+        raise ValueError(
+            f"Interpolation method '{method}' is not supported. Please use 'linear' or 'slerp'."
+        )
+
+    @staticmethod
+    def interpolation_grid(
+        corners: np.ndarray, num_rows: int = 8, num_cols: int = 8
+    ) -> np.ndarray:
+        """Return a grid of latent vectors bilinearly interpolated between four corner latent vectors.
+
+        Parameters
+        ----------
+        corners: np.ndarray
+            array of the four corner latent vectors in the order top left, top right, bottom left, bottom right
+        num_rows: int
+            the number of rows of the grid
+        num_cols: int
+            the number of columns of the grid
+
+        Returns
+        -------
+        np.ndarray
+            array of latent vectors of shape (num_rows * num_cols, latent vector size) in row-major order
+        """
+
+        corners = np.asarray(corners, dtype=np.float32).reshape(4, -1)
+        rows = np.linspace(0.0, 1.0, num_rows, dtype=np.float32)[:, None, None]
+        cols = np.linspace(0.0, 1.0, num_cols, dtype=np.float32)[None, :, None]
+        top = (1.0 - cols) * corners[0] + cols * corners[1]
+        bottom = (1.0 - cols) * corners[2] + cols * corners[3]
+        return ((1.0 - rows) * top + rows * bottom).reshape(num_rows * num_cols, -1)
+
+    def grid_sweep(
+        self,
+        z: np.ndarray = None,
+        dims: tuple = (0, 1),
+        num_rows: int = 8,
+        num_cols: int = 8,
+        value_range: tuple = (-3.0, 3.0),
+    ) -> np.ndarray:
+        """Return a grid of copies of `z` in which two latent dimensions are swept over `value_range`.
+
+        Parameters
+        ----------
+        z: np.ndarray
+            the base latent vector. If None, a random latent vector is used.
+        dims: tuple
+            the indices of the latent dimensions swept along the rows and along the columns of the grid
+        num_rows: int
+            the number of rows of the grid
+        num_cols: int
+            the number of columns of the grid
+        value_range: tuple
+            the minimum and maximum value of the swept latent dimensions
+
+        Returns
+        -------
+        np.ndarray
+            array of latent vectors of shape (num_rows * num_cols, input_latent_vector_size) in row-major order
+        """
+
+        if z is None:
+            z = self.sample_latent_vectors(num_samples=1)[0]
+        latents = np.tile(
+            np.asarray(z, dtype=np.float32).ravel(), (num_rows, num_cols, 1)
+        )
+        latents[:, :, dims[0]] = np.linspace(*value_range, num_rows)[:, None]
+        latents[:, :, dims[1]] = np.linspace(*value_range, num_cols)[None, :]
+        return latents.reshape(num_rows * num_cols, -1)
+
+    def neighbourhood(
+        self,
+        z: np.ndarray,
+        num_samples: int = 16,
+        radius: float = 0.5,
+        seed: int = None,
+    ) -> np.ndarray:
+        """Return `z` followed by `num_samples - 1` latent vectors sampled from a gaussian neighbourhood around `z`.
+
+        Parameters
+        ----------
+        z: np.ndarray
+            the latent vector at the centre of the neighbourhood
+        num_samples: int
+            the number of latent vectors including `z`
+        radius: float
+            the standard deviation of the gaussian noise added to `z`
+        seed: int
+            the seed of the random number generator. If None, the vectors are not reproducible.
+
+        Returns
+        -------
+        np.ndarray
+            array of latent vectors of shape (num_samples, input_latent_vector_size)
+        """
+
+        z = np.asarray(z, dtype=np.float32).ravel()
+        noise = radius * self.sample_latent_vectors(num_samples=num_samples, seed=seed)
+        noise[0] = 0.0
+        return z + noise
+
+    def generate_from_latents(self, latents: np.ndarray, **kwargs) -> np.ndarray:
+        """Generate one image per latent vector by passing the stacked latent vectors to the model in chunks.
+
+        Parameters
+        ----------
+        latents: np.ndarray
+            array of latent vectors of shape (num_samples, input_latent_vector_size) or (num_samples, *latent_shape)
+        **kwargs
+            arbitrary number of keyword arguments passed to the model's generate function
+
+        Returns
+        -------
+        np.ndarray
+            array of the generated images of shape (num_samples, *image shape)
+        """
+
+        latents = np.asarray(latents, dtype=np.float32).reshape(-1, *self.latent_shape)
+        if self.condition is not None:
+            kwargs.setdefault("condition", self.condition)
+        images = []
+        for start in range(0, len(latents), self.max_batch_size):
+            chunk = latents[start : start + self.max_batch_size]
+            output = self.gen_function(
+                num_samples=len(chunk), input_latent_vector=chunk, **kwargs
+            )
+            samples, _, _, _ = Utils.split_images_masks_and_labels(
+                data=output, num_samples=len(chunk)
+            )
+            if len(samples) != len(chunk):
+                raise ValueError(
+                    f"{self.model_id}: The model returned {len(samples)} images for {len(chunk)} latent vectors. "
+                    f"Batched latent space exploration requires one image per latent vector."
+                )
+            images.append(np.asarray(samples))
+        logging.debug(
+            "%s: Generated %s images from latent vectors in %s batched calls.",
+            self.model_id,
+            len(latents),
+            len(images),
+        )
+        return np.concatenate(images)
+
+    @staticmethod
+    def to_grid(
+        images: np.ndarray, num_rows: int, num_cols: int, padding: int = 2
+    ) -> np.ndarray:
+        """Tile a stack of images into one grid image in row-major order.
+
+        Parameters
+        ----------
+        images: np.ndarray
+            array of images of shape (num_rows * num_cols, height, width) or (num_rows * num_cols, height, width, c)
+        num_rows: int
+            the number of rows of the grid
+        num_cols: int
+            the number of columns of the grid
+        padding: int
+            the number of (zero-valued) pixels between neighbouring images
+
+        Returns
+        -------
+        np.ndarray
+            the grid image of shape (num_rows * (height + padding) - padding, num_cols * (width + padding) - padding)
+            followed by the channel dimension if the images have one
+        """
+
+        images = np.asarray(images)
+        if len(images) != num_rows * num_cols:
+            raise ValueError(
+                f"{len(images)} images can not be tiled into a grid of {num_rows}×{num_cols} images."
+            )
+        height, width = images.shape[1:3]
+        grid = np.zeros(
+            (
+                num_rows * (height + padding) - padding,
+                num_cols * (width + padding) - padding,
+                *images.shape[3:],
+            ),
+            dtype=images.dtype,
+        )
+        for index, image in enumerate(images):
+            row, col = divmod(index, num_cols)
+            grid[
+                row * (height + padding) : row * (height + padding) + height,
+                col * (width + padding) : col * (width + padding) + width,
+            ] = image
+        return grid
+
+    def explore_interpolation_grid(
+        self,
+        corners: np.ndarray = None,
+        num_rows: int = 8,
+        num_cols: int = 8,
+        padding: int = 2,
+        seed: int = None,
+        **kwargs,
+    ) -> np.ndarray:
+        """Generate the images of a latent interpolation grid between four corners and return them as a grid image.
+
+        Parameters
+        ----------
+        corners: np.ndarray
+            array of the four corner latent vectors. If None, four random latent vectors are used.
+        num_rows: int
+            the number of rows of the grid
+        num_cols: int
+            the number of columns of the grid
+        padding: int
+            the number of pixels between neighbouring images in the grid image
+        seed: int
+            the seed used to sample the corners if `corners` is None
+        **kwargs
+            arbitrary number of keyword arguments passed to the model's generate function
+
+        Returns
+        -------
+        np.ndarray
+            the grid image
+        """
+
+        if corners is None:
+            corners = self.sample_latent_vectors(num_samples=4, seed=seed)
+        images = self.generate_from_latents(
+            self.interpolation_grid(
+                corners=corners, num_rows=num_rows, num_cols=num_cols
+            ),
+            **kwargs,
+        )
+        return self.to_grid(
+            images=images, num_rows=num_rows, num_cols=num_cols, padding=padding
+        )
+
+    def __repr__(self):
+        return (
+            f"LatentExplorer(model_id={self.model_id}, input_latent_vector_size={self.input_latent_vector_size}, "
+            f"max_batch_size={self.max_batch_size}, condition={self.condition})"
+        )
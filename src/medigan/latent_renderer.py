@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" `LatentTraversalRenderer` class rendering latent space traversals of a model headlessly to videos or image grids. """
+
+# Import python native libs
+from __future__ import absolute_import
+
+import logging
+import math
+import os
+import queue
+import threading
+
+# Import pypi libs
+import numpy as np
+
+# Import library internal modules
+from .constants import DEFAULT_FRAME_BUFFER_SIZE, DEFAULT_FRAMES_PER_SECOND
+
+
+class LatentTraversalRenderer:
+    """`LatentTraversalRenderer` class: Renders a path through the latent space of a model without a GUI backend.
+
+    The frames are generated in batches via a `LatentExplorer` and streamed through a bounded frame buffer to an
+    encoder running on a background thread. Depending on the extension of the output path, the encoder writes an MP4
+    or GIF video (requires imageio and, for MP4, imageio-ffmpeg) or a tiled PNG image grid (requires pillow, which
+    is installed with matplotlib). Neither matplotlib nor a display is needed, hence traversals can be rendered on
+    display-less CPU servers.
+
+    Parameters
+    ----------
+    latent_explorer: LatentExplorer
+        The `LatentExplorer` of the model that generates the frames in batches
+    frame_buffer_size: int
+        The maximum number of generated frames waiting to be encoded
+
+    Attributes
+    ----------
+    latent_explorer: LatentExplorer
+        The `LatentExplorer` of the model that generates the frames in batches
+    is_conditional: bool
+        Flag for models with conditional input
+    """
+
+    def __init__(
+        self, latent_explorer, frame_buffer_size: int = DEFAULT_FRAME_BUFFER_SIZE
+    ):
+        self.latent_explorer = latent_explorer
+        self.model_id = self.latent_explorer.model_id
+        self.frame_buffer_size = frame_buffer_size
+        self.is_conditional = (
+            "condition"
+            in self.latent_explorer.model_executor.generate_method_args["custom"]
+        )
+
+    def get_traversal_path(
+        self,
+        keyframes: np.ndarray = None,
+        num_keyframes: int = 4,
+        frames_per_transition: int = 16,
+        method: str = "slerp",
+        is_loop: bool = True,
+        seed: int = None,
+    ) -> np.ndarray:
+        """Return the latent vectors of a path that is interpolated between consecutive keyframe latent vectors.
+
+        Parameters
+        ----------
+        keyframes: np.ndarray
+            array of keyframe latent vectors. If None, `num_keyframes` random latent vectors are used.
+        num_keyframes: int
+            the number of random keyframes if `keyframes` is None
+        frames_per_transition: int
+            the number of frames from one keyframe (inclusive) to the next keyframe (exclusive)
+        method: str
+            the interpolation method, i.e. "linear" or "slerp"
+        is_loop: bool
+            flag indicating whether the path returns from the last to the first keyframe
+        seed: int
+            the seed used to sample the keyframes if `keyframes` is None
+
+        Returns
+        -------
+        np.ndarray
+            array of latent vectors of shape (num_frames, input_latent_vector_size)
+        """
+
+        if keyframes is None:
+            keyframes = self.latent_explorer.sample_latent_vectors(
+                num_samples=num_keyframes, seed=seed
+            )
+        keyframes = list(np.asarray(keyframes, dtype=np.float32))
+        if is_loop:
+            keyframes.append(keyframes[0])
+        transitions = [
+            self.latent_explorer.interpolate(
+                z_start=z_start,
+                z_end=z_end,
+                num_steps=frames_per_transition + 1,
+                method=method,
+            )[:-1]
+            for z_start, z_end in zip(keyframes[:-1], keyframes[1:])
+        ]
+        if not is_loop:
+            transitions.append(np.asarray(keyframes[-1:]))
+        return np.concatenate(transitions)
+
+    def render(
+        self,
+        output_path: str,
+        latents: np.ndarray = None,
+        conditions=None,
+        fps: int = DEFAULT_FRAMES_PER_SECOND,
+        num_cols: int = None,
+        padding: int = 2,
+        **kwargs,
+    ) -> str:
+        """Generate one frame per latent vector and encode the frames into `output_path`.
+
+        Parameters
+        ----------
+        output_path: str
+            the path to the output file. Its extension (.mp4, .gif, or .png) determines the encoder.
+        latents: np.ndarray
+            array of latent vectors, one per frame. If None, a looped path through four random keyframes is used.
+        conditions: Union[int, float, list]
+            the condition of all frames or a sequence with one condition per frame. Only for conditional models.
+        fps: int
+            the frames per second of MP4 and GIF videos
+        num_cols: int
+            the number of columns of a tiled PNG image grid. If None, the grid is (nearly) square.
+        padding: int
+            the number of pixels between neighbouring frames of a tiled PNG image grid
+        **kwargs
+            arbitrary number of keyword arguments passed to the model's generate function
+
+        Returns
+        -------
+        str
+            the path to the output file
+        """
+
+        if latents is None:
+            latents = self.get_traversal_path()
+        latents = np.asarray(latents, dtype=np.float32)
+        num_frames = len(latents)
+        if conditions is not None and not self.is_conditional:
+            raise ValueError(
+                f"{self.model_id}: Conditions were provided but this model does not have a conditional input."
+            )
+        if conditions is None or np.isscalar(conditions):
+            conditions = [conditions] * num_frames
+        if len(conditions) != num_frames:
+            raise ValueError(
+                f"{self.model_id}: {len(conditions)} conditions were provided for {num_frames} frames."
+            )
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        encoder = get_frame_encoder(
+            output_path=output_path,
+            num_frames=num_frames,
+            fps=fps,
+            num_cols=num_cols,
+            padding=padding,
+        )
+
+        frame_buffer = queue.Queue(maxsize=self.frame_buffer_size)
+        errors = []
+
+        def encode_frames():
+            while True:
+                frame = frame_buffer.get()
+                if frame is None:
+                    break
+                if errors:
+                    # Keep draining the buffer so that the generating thread is not blocked after an error.
+                    continue
+                try:
+                    encoder.add_frame(frame)
+                except Exception as e:
+                    errors.append(e)
+
+        encoding_thread = threading.Thread(target=encode_frames, daemon=True)
+        encoding_thread.start()
+        is_generated = False
+        try:
+            for batch_latents, condition in self._get_batches(latents, conditions):
+                if errors:
+                    break
+                batch_kwargs = (
+                    kwargs if condition is None else dict(kwargs, condition=condition)
+                )
+                images = self.latent_explorer.generate_from_latents(
+                    batch_latents, **batch_kwargs
+                )
+                for image in images:
+                    frame_buffer.put(self._to_frame(image))
+            is_generated = True
+        finally:
+            frame_buffer.put(None)
+            encoding_thread.join()
+            if is_generated and not errors:
+                encoder.close()
+            else:
+                # A partially rendered output must not look like a successful render.
+                encoder.abort()
+        if errors:
+            raise errors[0]
+        logging.info(
+            "%s: Rendered %s frames to %s", self.model_id, num_frames, output_path
+        )
+        return output_path
+
+    def _get_batches(self, latents: np.ndarray, conditions: list):
+        """Yield (latents, condition) batches of at most `max_batch_size` consecutive frames with the same condition."""
+
+        start = 0
+        max_batch_size = self.latent_explorer.max_batch_size
+        for end in range(1, len(latents) + 1):
+            if (
+                end == len(latents)
+                or end - start == max_batch_size
+                or conditions[end] != conditions[start]
+            ):
+                yield latents[start:end], conditions[start]
+                start = end
+
+    @staticmethod
+    def _to_frame(image: np.ndarray) -> np.ndarray:
+        """Convert a generated image to an uint8 frame of shape (height, width) or (height, width, 3)."""
+
+        image = np.asarray(image)
+        if image.ndim == 3 and image.shape[-1] == 1:
+            image = image[..., 0]
+        if image.dtype != np.uint8:
+            if image.size and image.max() <= 1.0:
+                image = image * 255.0
+            image = np.clip(image, 0, 255).astype(np.uint8)
+        return image
+
+    def __repr__(self):
+        return (
+            f"LatentTraversalRenderer(model_id={self.model_id}, is_conditional={self.is_conditional}, "
+            f"frame_buffer_size={self.frame_buffer_size})"
+        )
+
+
+class VideoFrameEncoder:
+    """`VideoFrameEncoder` class: Appends frames to an MP4 or GIF video one by one (requires imageio).
+
+    Parameters
+    ----------
+    output_path: str
+        the path to the video file
+    fps: int
+        the frames per second of the video
+    """
+
+    def __init__(self, output_path: str, fps: int = DEFAULT_FRAMES_PER_SECOND):
+        try:
+            import imageio
+        except ImportError as e:
+            raise ImportError(
+                f"Rendering to {output_path} requires imageio (and imageio-ffmpeg for .mp4). Please install it via "
+                f"'pip install imageio imageio-ffmpeg' or render a tiled .png image instead: {e}"
+            )
+        self.output_path = output_path
+        if output_path.lower().endswith(".gif"):
+            # The gif plugin expects the duration of each frame in milliseconds.
+            self.writer = imageio.v2.get_writer(
+                output_path, mode="I", duration=1000.0 / fps, loop=0
+            )
+        else:
+            self.writer = imageio.v2.get_writer(
+                output_path, fps=fps, macro_block_size=1
+            )
+
+    def add_frame(self, frame: np.ndarray):
+        self.writer.append_data(frame)
+
+    def close(self):
+        self.writer.close()
+
+    def abort(self):
+        """Close the video and remove the partially written file."""
+
+        try:
+            self.writer.close()
+        except Exception as e:
+            logging.debug(
+                "Closing the aborted video %s failed: %s", self.output_path, e
+            )
+        if os.path.isfile(self.output_path):
+            os.remove(self.output_path)
+
+
+class TiledImageEncoder:
+    """`TiledImageEncoder` class: Pastes frames one by one into a grid image that is saved as PNG on `close`.
+
+    Parameters
+    ----------
+    output_path: str
+        the path to the image file
+    num_frames: int
+        the number of frames of the grid
+    num_cols: int
+        the number of columns of the grid. If None, the grid is (nearly) square.
+    padding: int
+        the number of (black) pixels between neighbouring frames
+    """
+
+    def __init__(
+        self, output_path: str, num_frames: int, num_cols: int = None, padding: int = 2
+    ):
+        self.output_path = output_path
+        self.num_frames = num_frames
+        self.num_cols = (
+            num_cols if num_cols is not None else math.ceil(math.sqrt(num_frames))
+        )
+        self.num_rows = math.ceil(num_frames / self.num_cols)
+        self.padding = padding
+        self.grid = None
+        self.num_frames_added = 0
+
+    def add_frame(self, frame: np.ndarray):
+        height, width = frame.shape[:2]
+        if self.grid is None:
+            self.grid = np.zeros(
+                (
+                    self.num_rows * (height + self.padding) - self.padding,
+                    self.num_cols * (width + self.padding) - self.padding,
+                    *frame.shape[2:],
+                ),
+                dtype=np.uint8,
+            )
+        row, col = divmod(self.num_frames_added, self.num_cols)
+        top = row * (height + self.padding)
+        left = col * (width + self.padding)
+        self.grid[top : top + height, left : left + width] = frame
+        self.num_frames_added += 1
+
+    def close(self):
+        if self.grid is None:
+            return
+        from PIL import Image
+
+        Image.fromarray(self.grid).save(self.output_path)
+
+    def abort(self):
+        """Discard the grid. Nothing has been written to `output_path` yet."""
+
+        self.grid = None
+
+
+def get_frame_encoder(
+    output_path: str,
+    num_frames: int,
+    fps: int = DEFAULT_FRAMES_PER_SECOND,
+    num_cols: int = None,
+    padding: int = 2,
+):
+    """Return the frame encoder corresponding to the extension (.mp4, .gif, or .png) of `output_path`."""
+
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension in [".mp4", ".gif"]:
+        return VideoFrameEncoder(output_path=output_path, fps=fps)
+    elif extension == ".png":
+        return TiledImageEncoder(
+            output_path=output_path,
+            num_frames=num_frames,
+            num_cols=num_cols,
+            padding=padding,
+        )
+    raise ValueError(
+        f"Rendering to '{extension}' files is not supported. Please use an output path ending in .mp4, .gif, or .png."
+    )
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" Prometheus-style metrics of medigan (samples generated, latencies, cache hits, downloads, and failures).
+
+medigan updates the metrics of the `MetricsRegistry` returned by `get_registry`, which can be exposed in the
+Prometheus text exposition format, e.g. for long-running generation workers:
+
+    from medigan.metrics import get_registry
+
+    server = get_registry().start_http_server(port=8000)  # serves http://127.0.0.1:8000/metrics
+    ...
+    server.shutdown()
+
+The metrics are kept per process, hence the items served by DataLoader worker processes are counted in the workers.
+"""
+
+# Import python native libs
+from __future__ import absolute_import
+
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Import library internal modules
+from .constants import DEFAULT_LATENCY_BUCKETS, DEFAULT_METRICS_PORT
+
+
+def _format_labels(label_names: tuple, label_values: tuple, extra: str = "") -> str:
+    labels = [
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in zip(label_names, label_values)
+    ]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    """`Counter` class: A monotonically increasing value per combination of label values.
+
+    Parameters
+    ----------
+    name: str
+        the name of the metric, e.g. "medigan_samples_generated_total"
+    documentation: str
+        the help text of the metric
+    label_names: list
+        the names of the labels that distinguish the values of the metric, e.g. ["model_id"]
+    """
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: list = None):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names or [])
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _get_key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"Metric {self.name} expects the labels {self.label_names}, but got {list(labels)}."
+            )
+        return tuple(labels[name] for name in self.label_names)
+
+    def inc(self, value: float = 1, **labels):
+        """Increase the value of the metric for the `labels` by `value`."""
+
+        if value < 0:
+            raise ValueError(f"Counter {self.name} can only be increased.")
+        key = self._get_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def get(self, **labels) -> float:
+        """Return the value of the metric for the `labels`."""
+
+        return self._values.get(self._get_key(labels), 0.0)
+
+    def collect(self) -> list:
+        """Return the lines of the metric in the Prometheus text exposition format."""
+
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._values = {}
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(name={self.name}, label_names={self.label_names})"
+        )
+
+
+class Gauge(Counter):
+    """`Gauge` class: A value per combination of label values that can be set, increased, and decreased."""
+
+    metric_type = "gauge"
+
+    def inc(self, value: float = 1, **labels):
+        """Increase (or, if `value` is negative, decrease) the value of the metric for the `labels` by `value`."""
+
+        key = self._get_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def dec(self, value: float = 1, **labels):
+        """Decrease the value of the metric for the `labels` by `value`."""
+
+        self.inc(-value, **labels)
+
+    def set(self, value: float, **labels):
+        """Set the value of the metric for the `labels` to `value`."""
+
+        key = self._get_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Counter):
+    """`Histogram` class: Counts of observed values (e.g. latencies) in cumulative buckets per label values.
+
+    Parameters
+    ----------
+    name: str
+        the name of the metric, e.g. "medigan_generate_call_duration_seconds"
+    documentation: str
+        the help text of the metric
+    label_names: list
+        the names of the labels that distinguish the values of the metric
+    buckets: list
+        the sorted upper bounds of the buckets. An upper bound of infinity is added.
+    """
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: list = None,
+        buckets: list = None,
+    ):
+        super().__init__(
+            name=name, documentation=documentation, label_names=label_names
+        )
+        self.buckets = sorted(DEFAULT_LATENCY_BUCKETS if buckets is None else buckets)
+        if self.buckets[-1] != float("inf"):
+            self.buckets.append(float("inf"))
+
+    def observe(self, value: float, **labels):
+        """Add the observed `value` for the `labels` to the histogram."""
+
+        key = self._get_key(labels)
+        bucket_index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if key not in self._values:
+                # The non-cumulative bucket counts, the sum, and the count of the observed values.
+                self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            bucket_counts, _, _ = self._values[key]
+            bucket_counts[bucket_index] += 1
+            self._values[key][1] += value
+            self._values[key][2] += 1
+
+    def inc(self, value: float = 1, **labels):
+        raise NotImplementedError(
+            f"Histogram {self.name} records values via observe()."
+        )
+
+    def get(self, **labels) -> dict:
+        """Return the cumulative bucket counts, the sum, and the count of the observed values for the `labels`."""
+
+        key = self._get_key(labels)
+        with self._lock:
+            bucket_counts, total, count = self._values.get(
+                key, [[0] * len(self.buckets), 0.0, 0]
+            )
+            bucket_counts = list(bucket_counts)
+        cumulative_counts, cumulative_count = {}, 0
+        for upper_bound, bucket_count in zip(self.buckets, bucket_counts):
+            cumulative_count += bucket_count
+            cumulative_counts[upper_bound] = cumulative_count
+        return {"buckets": cumulative_counts, "sum": total, "count": count}
+
+    def collect(self) -> list:
+        with self._lock:
+            keys = list(self._values)
+        lines = []
+        for key in keys:
+            values = self.get(**dict(zip(self.label_names, key)))
+            for upper_bound, cumulative_count in values["buckets"].items():
+                labels = _format_labels(
+                    self.label_names, key, f'le="{_format_value(upper_bound)}"'
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative_count}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(values['sum'])}")
+            lines.append(f"{self.name}_count{labels} {values['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """`MetricsRegistry` class: Holds metrics by name and renders them in the Prometheus text exposition format.
+
+    Attributes
+    ----------
+    metrics: dict
+        the registered metrics by name
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, metric_class, name: str, documentation: str, **kwargs):
+        with self._lock:
+            if name not in self.metrics:
+                self.metrics[name] = metric_class(
+                    name=name, documentation=documentation, **kwargs
+                )
+            elif not isinstance(self.metrics[name], metric_class):
+                raise ValueError(
+                    f"Metric {name} is already registered as {type(self.metrics[name]).__name__}."
+                )
+            return self.metrics[name]
+
+    def counter(
+        self, name: str, documentation: str, label_names: list = None
+    ) -> Counter:
+        """Return the counter `name`, which is registered if it does not exist yet."""
+
+        return self._get_or_create(
+            Counter, name, documentation, label_names=label_names
+        )
+
+    def gauge(self, name: str, documentation: str, label_names: list = None) -> Gauge:
+        """Return the gauge `name`, which is registered if it does not exist yet."""
+
+        return self._get_or_create(Gauge, name, documentation, label_names=label_names)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: list = None,
+        buckets: list = None,
+    ) -> Histogram:
+        """Return the histogram `name`, which is registered if it does not exist yet."""
+
+        return self._get_or_create(
+            Histogram, name, documentation, label_names=label_names, buckets=buckets
+        )
+
+    def expose(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+
+        lines = []
+        with self._lock:
+            metrics = list(self.metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        """Reset the values of all metrics (e.g. between tests) while keeping them registered."""
+
+        with self._lock:
+            metrics = list(self.metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+    def start_http_server(
+        self, port: int = DEFAULT_METRICS_PORT, address: str = "127.0.0.1"
+    ) -> ThreadingHTTPServer:
+        """Serve the metrics at `http://{address}:{port}/metrics` in a daemon thread and return the server.
+
+        Call `shutdown()` on the returned server to stop serving. If `port` is 0, a free port is chosen, which is
+        available via `server.server_address[1]`.
+        """
+
+        registry = self
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ["/metrics", "/"]:
+                    self.send_error(404)
+                    return
+                body = registry.expose().encode("utf-8")
+                self.send_response(200)
+                self.send_header(
+                    "Content-Type", "text/plain; version=0.0.4; charset=utf-8"
+                )
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug("Metrics endpoint: " + format, *args)
+
+        server = ThreadingHTTPServer((address, port), MetricsRequestHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logging.info(
+            "Serving medigan metrics at http://%s:%s/metrics",
+            *server.server_address[:2],
+        )
+        return server
+
+    def __repr__(self):
+        return f"MetricsRegistry(metrics={list(self.metrics)})"
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """Return the `MetricsRegistry` instance updated by medigan."""
+
+    return _registry
+
+
+SAMPLES_GENERATED = _registry.counter(
+    "medigan_samples_generated_total",
+    "Number of samples generated by the generate calls of a model",
+    ["model_id"],
+)
+GENERATE_CALL_DURATION = _registry.histogram(
+    "medigan_generate_call_duration_seconds",
+    "Duration of the calls of a model's generate method",
+    ["model_id"],
+)
+GENERATE_FAILURES = _registry.counter(
+    "medigan_generate_failures_total",
+    "Number of calls of a model's generate method that raised an exception",
+    ["model_id"],
+)
+DOWNLOADED_BYTES = _registry.counter(
+    "medigan_downloaded_bytes_total", "Number of bytes downloaded (configs and models)"
+)
+DOWNLOAD_FAILURES = _registry.counter(
+    "medigan_download_failures_total", "Number of failed downloads"
+)
+CACHE_HITS = _registry.counter(
+    "medigan_cache_hits_total",
+    "Number of lookups found in a cache (e.g. model packages, reference statistics, tuned batch sizes)",
+    ["cache"],
+)
+CACHE_MISSES = _registry.counter(
+    "medigan_cache_misses_total",
+    "Number of lookups not found in a cache",
+    ["cache"],
+)
+DATASET_ITEMS = _registry.counter(
+    "medigan_dataset_items_total",
+    "Number of items returned by the synthetic torch datasets",
+    ["dataset"],
+)
@@ -2,10 +2,97 @@
 # ! /usr/bin/env python
 """ `ModelVisualizer` class providing visualizing corresponding model input and model output changes. """
 
+import logging
+import threading
+import time
+
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.widgets import Button, Slider
 
+from .constants import VISUALIZER_DEBOUNCE_INTERVAL, VISUALIZER_POLL_INTERVAL_MS
+
+
+class LatestRequestWorker:
+    """`LatestRequestWorker` class: Runs a function on a background thread keeping only the latest pending request.
+
+    Requests that are submitted while the function is running replace each other, i.e. once the function returns,
+    it is only called again with the most recent request. This keeps an interactive user interface responsive even if
+    the function (e.g. a generative model on a CPU-only machine) is slower than the rate of incoming requests.
+
+    Parameters
+    ----------
+    function: callable
+        the function that is called with the keyword arguments of a request
+
+    Attributes
+    ----------
+    function: callable
+        the function that is called with the keyword arguments of a request
+    """
+
+    def __init__(self, function):
+        self.function = function
+        self._condition = threading.Condition()
+        self._pending_request = None
+        self._result = None
+        self._request_id = 0
+        self._is_stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, **kwargs) -> int:
+        """Submit a request replacing a pending one and return its request id."""
+
+        with self._condition:
+            self._request_id += 1
+            self._pending_request = (self._request_id, kwargs)
+            self._condition.notify()
+            return self._request_id
+
+    def pop_result(self) -> tuple:
+        """Return and remove the (request_id, output, exception) tuple of the latest finished request or None."""
+
+        with self._condition:
+            result, self._result = self._result, None
+            return result
+
+    def wait_for_result(self, timeout: float = None) -> tuple:
+        """Wait for the next finished request and return and remove its result, or return None after `timeout`."""
+
+        with self._condition:
+            self._condition.wait_for(lambda: self._result is not None, timeout=timeout)
+            result, self._result = self._result, None
+            return result
+
+    def stop(self):
+        """Stop the background thread after the currently running request."""
+
+        with self._condition:
+            self._is_stopped = True
+            self._pending_request = None
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending_request is None and not self._is_stopped:
+                    self._condition.wait()
+                if self._is_stopped:
+                    return
+                request_id, kwargs = self._pending_request
+                self._pending_request = None
+            try:
+                result = (request_id, self.function(**kwargs), None)
+            except Exception as e:
+                result = (request_id, None, e)
+            with self._condition:
+                self._result = result
+                self._condition.notify_all()
+
+    def __repr__(self):
+        return f"LatestRequestWorker(function={self.function}, is_stopped={self._is_stopped})"
+
 
 class ModelVisualizer:
     """`ModelVisualizer` class: Visualises synthetic data through a user interface. Depending on a model,
@@ -31,6 +118,8 @@ class ModelVisualizer:
         Value of the conditinal input to the model
     max_input_value: float
         Absolute value used for setting latent values input range
+    gen_function: callable
+        The model's generate function that is created once and reused for all slider changes
     """
 
     def __init__(self, model_executor, config: None):
@@ -61,17 +150,27 @@ class ModelVisualizer:
                 "condition"
             ]
 
-    def visualize(self, slider_grouper: int = 10, auto_close=False):
+    def visualize(
+        self,
+        slider_grouper: int = 10,
+        auto_close=False,
+        debounce_interval: float = VISUALIZER_DEBOUNCE_INTERVAL,
+    ):
         """
         Visualize the model's output. This method is called by the user.
         It opens up a user interface with available controls.
 
+        Slider events are coalesced: a new image is only requested once the sliders have not changed for
+        `debounce_interval` seconds and it is generated on a background thread that only keeps the latest request.
+
         Parameters
         ----------
         slider_grouper: int
             Number of input parameters to group together within one slider.
         auto_close: bool
             Flag for closing the user interface automatically after time. Used while testing.
+        debounce_interval: float
+            Time in seconds without slider changes after which a new image is generated.
 
         Returns
         -------
@@ -81,12 +180,16 @@ class ModelVisualizer:
             self.num_samples, self.input_latent_vector_size, 1, 1
         ).astype(np.float32)
 
-        mask = None
-
+        # The initial image is the first request of the worker that then generates the images of the slider changes.
+        worker = LatestRequestWorker(function=self.gen_function)
         if self.conditional:
-            output = self.gen_function(condition=self.condition, input_latent_vector=z)
+            worker.submit(condition=self.condition, input_latent_vector=z.copy())
         else:
-            output = self.gen_function(input_latent_vector=z)
+            worker.submit(input_latent_vector=z.copy())
+        _, output, exception = worker.wait_for_result()
+        if exception is not None:
+            worker.stop()
+            raise exception
 
         image, mask = self._unpack_output(output)
 
@@ -180,7 +283,7 @@ class ModelVisualizer:
                 "z{}".format(i + 1),
                 -self.max_input_value,
                 self.max_input_value,
-                valinit=float(z[0][i]),
+                valinit=z[0][i * slider_grouper].item(),
                 initcolor="none",
                 valfmt="%.2f",
             )
@@ -203,21 +306,50 @@ class ModelVisualizer:
 
         ax_legend.text(0.0, 0.0, text, fontsize=8, va="top", linespacing=2)
 
-        # The function to be called anytime a slider's value changes
-        def update(val):
+        # Time of the last slider change that has not been submitted to the worker yet (None if there is none).
+        state = {"last_change": None, "latest_request_id": 0}
+
+        def update_latent_vector():
             for i, slider in enumerate(sliders):
-                for j in range(10):
-                    z[0][i + j] = slider.val
+                for j in range(i * slider_grouper, (i + 1) * slider_grouper):
+                    z[0][j] = slider.val
 
+        # The function to be called anytime a slider's value changes. It only records the change (debouncing).
+        def update(val):
+            state["last_change"] = time.monotonic()
+
+        def submit_request():
+            update_latent_vector()
+            # The worker gets a copy as the sliders keep changing z while the model runs.
             if self.conditional:
                 self.condition = condition_slider.val
-                output = self.gen_function(
-                    condition=self.condition, input_latent_vector=z
+                state["latest_request_id"] = worker.submit(
+                    condition=self.condition, input_latent_vector=z.copy()
                 )
-                condition_ax.set_title("Input condition: " + output[0][1])
             else:
-                output = self.gen_function(input_latent_vector=z)
-
+                state["latest_request_id"] = worker.submit(input_latent_vector=z.copy())
+
+        # Polled on the UI thread: submits debounced changes and displays finished outputs.
+        def poll():
+            if (
+                state["last_change"] is not None
+                and time.monotonic() - state["last_change"] >= debounce_interval
+            ):
+                state["last_change"] = None
+                submit_request()
+            result = worker.pop_result()
+            if result is None:
+                return
+            request_id, output, exception = result
+            if exception is not None:
+                logging.error(
+                    "%s: Generating the image for visualization failed: %s",
+                    self.model_id,
+                    exception,
+                )
+                return
+            if self.conditional:
+                condition_ax.set_title("Input condition: " + output[0][1])
             image, mask = self._unpack_output(output)
             if mask is not None:
                 display_mask.set_data(mask)
@@ -232,20 +364,28 @@ class ModelVisualizer:
 
         self.offset_old = 0
 
+        def set_slider_val_silently(slider, val):
+            # Setting a slider value would otherwise trigger one update per slider.
+            slider.eventson = False
+            slider.set_val(val)
+            slider.eventson = True
+
         def update_offset(val):
             diff = offset_slider.val - self.offset_old
             self.offset_old = offset_slider.val
 
-            for i, slider in enumerate(sliders):
-                if slider.val + diff > self.max_input_value:
-                    slider.set_val(self.max_input_value)
-                elif slider.val + diff < -self.max_input_value:
-                    slider.set_val(-self.max_input_value)
-                else:
-                    slider.set_val(slider.val + diff)
-
-                for j in range(10):
-                    z[0][i + j] = slider.val
+            for slider in sliders:
+                set_slider_val_silently(
+                    slider,
+                    float(
+                        np.clip(
+                            slider.val + diff,
+                            -self.max_input_value,
+                            self.max_input_value,
+                        )
+                    ),
+                )
+            update(val)
 
         offset_slider.on_changed(update_offset)
 
@@ -256,25 +396,37 @@ class ModelVisualizer:
         seed_button = Button(seedax, "Seed", hovercolor="0.975")
 
         def reset(event):
-            offset_slider.reset()
+            set_slider_val_silently(offset_slider, offset_slider.valinit)
+            self.offset_old = offset_slider.valinit
             for slider in sliders:
-                slider.reset()
+                set_slider_val_silently(slider, slider.valinit)
+            update(event)
 
         def new_seed(event):
             z = np.random.randn(
                 self.num_samples, self.input_latent_vector_size, 1, 1
             ).astype(np.float32)
-            for slider in sliders:
-                slider.valinit = z[0][sliders.index(slider)]
+            for i, slider in enumerate(sliders):
+                slider.valinit = z[0][i * slider_grouper].item()
             reset(event)
 
         reset_button.on_clicked(reset)
         seed_button.on_clicked(new_seed)
-        update(0)
+
+        timer = fig.canvas.new_timer(interval=VISUALIZER_POLL_INTERVAL_MS)
+        timer.add_callback(poll)
+        timer.start()
+
+        def stop(event):
+            timer.stop()
+            worker.stop()
+
+        fig.canvas.mpl_connect("close_event", stop)
         if auto_close:
             plt.show(block=False)
             plt.pause(1)
             plt.close()
+            stop(None)
         else:
             plt.show()
 
@@ -114,7 +114,9 @@ class ModelMatchCandidate:
                 found_target_values = set(self.get_all_matching_elements())
                 if all(elem in found_target_values for elem in self.target_values):
                     logging.debug(
-                        f"values: {self.target_values} AND found_target_values_list: {found_target_values}"
+                        "values: %s AND found_target_values_list: %s",
+                        self.target_values,
+                        found_target_values,
                     )
                     self.is_match = True
             elif self.target_values_operator == "XOR":
@@ -130,7 +132,7 @@ class ModelMatchCandidate:
                     == 1
                 ):
                     self.is_match = True
-        logging.debug(f"This ModelMatchCandidate was found to be a match: ({self}).")
+        logging.debug("This ModelMatchCandidate was found to be a match: (%s).", self)
         return self.is_match
 
     def __str__(self):
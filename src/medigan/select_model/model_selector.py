@@ -37,7 +37,7 @@ class ModelSelector:
     ):
         if config_manager is None:
             self.config_manager = ConfigManager()
-            logging.debug(f"Initialized ConfigManager instance: {self.config_manager}")
+            logging.debug("Initialized ConfigManager instance: %s", self.config_manager)
         else:
             self.config_manager = config_manager
         self.model_selection_dicts = []
@@ -55,8 +55,9 @@ class ModelSelector:
             }
             self.model_selection_dicts.append(model_selector_dict)
         logging.debug(
-            f"These were the available model selection dicts that were added to the ModelSelector: "
-            f"{self.model_selection_dicts}."
+            "These were the available model selection dicts that were added to the ModelSelector: "
+            "%s.",
+            self.model_selection_dicts,
         )
 
     def get_selection_criteria_by_id(
@@ -80,14 +81,16 @@ class ModelSelector:
             if selection_dict[MODEL_ID] == model_id:
                 if is_model_id_removed:
                     logging.debug(
-                        f"For model {model_id}, the following selection dicts was found:"
-                        f" {selection_dict[CONFIG_FILE_KEY_SELECTION]}."
+                        "For model %s, the following selection dicts was found:" " %s.",
+                        model_id,
+                        selection_dict[CONFIG_FILE_KEY_SELECTION],
                     )
                     return selection_dict[CONFIG_FILE_KEY_SELECTION]
                 else:
                     logging.debug(
-                        f"For model {model_id}, the following selection dicts was found:"
-                        f" {selection_dict}."
+                        "For model %s, the following selection dicts was found:" " %s.",
+                        model_id,
+                        selection_dict,
                     )
                     return selection_dict
         return None
@@ -121,7 +124,7 @@ class ModelSelector:
                 else:
                     selection_dict_list.append(selection_dict)
         logging.debug(
-            f"The following selection dicts were found: {selection_dict_list}."
+            "The following selection dicts were found: %s.", selection_dict_list
         )
         return selection_dict_list
 
@@ -151,7 +154,9 @@ class ModelSelector:
                     if key not in key_list:
                         key_list.append(key)
         logging.debug(
-            f"For model {model_id}, the following selection keys were in its selection config: {key_list}."
+            "For model %s, the following selection keys were in its selection config: %s.",
+            model_id,
+            key_list,
         )
         return key_list
 
@@ -185,8 +190,10 @@ class ModelSelector:
                 selection_config = Utils.deep_get(base_dict=selection_config, key=key)
                 values_for_key.append(selection_config)
         logging.debug(
-            f"For key {key}, the following values were found across the models' selection "
-            f"dicts {values_for_key}."
+            "For key %s, the following values were found across the models' selection "
+            "dicts %s.",
+            key,
+            values_for_key,
         )
         return values_for_key
 
@@ -243,15 +250,19 @@ class ModelSelector:
                             is_model_match = True
             except KeyError as e:
                 logging.debug(
-                    f"Model {selection_dict[MODEL_ID]} was discarded as it does not have the specified keys "
-                    f"in its selection dict: {selection_dict}"
+                    "Model %s was discarded as it does not have the specified keys "
+                    "in its selection dict: %s",
+                    selection_dict[MODEL_ID],
+                    selection_dict,
                 )
                 pass
             if is_model_match:
                 model_id = selection_dict[MODEL_ID]
                 model_dict = {MODEL_ID: model_id, key1: value1}
                 logging.debug(
-                    f"Model {model_id} was a match for the specified key value pair: {model_dict}"
+                    "Model %s was a match for the specified key value pair: %s",
+                    model_id,
+                    model_dict,
                 )
                 model_dict_list.append(model_dict)
         return model_dict_list
@@ -310,13 +321,17 @@ class ModelSelector:
                     model_id = selection_dict[MODEL_ID]
                     model_metric_dict = {MODEL_ID: model_id, metric: metric_value}
                     logging.debug(
-                        f"Model {model_id} was a match for the specified metric value: {model_metric_dict}"
+                        "Model %s was a match for the specified metric value: %s",
+                        model_id,
+                        model_metric_dict,
                     )
                     model_metric_dict_list.append(model_metric_dict)
             except KeyError as e:
                 logging.debug(
-                    f"Model {selection_dict[MODEL_ID]} was discarded as it does not have the specified keys "
-                    f"in its selection dict: {selection_dict}"
+                    "Model %s was discarded as it does not have the specified keys "
+                    "in its selection dict: %s",
+                    selection_dict[MODEL_ID],
+                    selection_dict,
                 )
                 pass
         if order == "asc":
@@ -367,7 +382,7 @@ class ModelSelector:
             is_case_sensitive=is_case_sensitive,
         )
         matching_model_ids = [model.model_id for model in matching_models]
-        logging.debug(f"matching_model_ids: {matching_model_ids}")
+        logging.debug("matching_model_ids: %s", matching_model_ids)
         return self.rank_models_by_performance(
             model_ids=matching_model_ids, metric=metric, order=order
         )
@@ -411,7 +426,7 @@ class ModelSelector:
         if not is_case_sensitive:
             # Removing case-sensitivity search requirement by replacing with lowercase values list
             values = Utils.list_to_lowercase(target_list=values)
-            logging.debug(f"Processed search values: {values}")
+            logging.debug("Processed search values: %s", values)
         for selection_dict in self.model_selection_dicts:
             selection_config = selection_dict[CONFIG_FILE_KEY_SELECTION]
             model_match_candidate = ModelMatchCandidate(
@@ -427,7 +442,7 @@ class ModelSelector:
             )
             if model_match_candidate.check_if_is_match():
                 logging.debug(
-                    f"Found a matching ModelMatchCandidate: {model_match_candidate}"
+                    "Found a matching ModelMatchCandidate: %s", model_match_candidate
                 )
                 matching_models.append(model_match_candidate)
         return matching_models
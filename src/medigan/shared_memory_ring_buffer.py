@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" `SharedMemoryRingBuffer` class transporting generated arrays between processes without pickling them. """
+
+# Import python native libs
+from __future__ import absolute_import
+
+import logging
+import multiprocessing
+import queue
+from multiprocessing import shared_memory
+
+# Import pypi libs
+import numpy as np
+
+# Arrays are placed at offsets aligned to cache lines inside a slot.
+SLOT_ALIGNMENT = 64
+
+
+class SharedMemoryRingBuffer:
+    """`SharedMemoryRingBuffer` class: Fixed-size slots in one shared memory block that are reused round-robin.
+
+    The process that creates the ring buffer owns it and passes it to worker processes (e.g. as argument of a
+    `multiprocessing.Process`), which attach to the same shared memory block. A worker acquires a free slot, writes the
+    arrays of a generated batch directly into the slot, and sends the slot index and the array offsets, shapes, and
+    dtypes to the owner. The owner creates numpy views of the arrays in the slot, i.e. without copying them, and releases
+    the slot once the views are no longer used, after which the slot is reused by the workers.
+
+    Parameters
+    ----------
+    num_slots: int
+        the number of slots
+    slot_shape: tuple
+        the shape of the array of `dtype` that fills one slot, e.g. (batch_size, height, width, channels). Arrays of
+        any shape and dtype can be written into a slot as long as their total size fits.
+    dtype: str
+        the dtype of the array that fills one slot
+    context
+        the multiprocessing context whose queue holds the indices of the free slots. If None, the default context is
+        used.
+
+    Attributes
+    ----------
+    slot_nbytes: int
+        the size of a slot in bytes
+    """
+
+    def __init__(
+        self,
+        num_slots: int,
+        slot_shape: tuple,
+        dtype: str = "uint8",
+        context=None,
+    ):
+        self.num_slots = num_slots
+        slot_nbytes = int(np.prod(slot_shape)) * np.dtype(dtype).itemsize
+        # Slots start at aligned offsets as well.
+        self.slot_nbytes = -(-slot_nbytes // SLOT_ALIGNMENT) * SLOT_ALIGNMENT
+        self._shared_memory = shared_memory.SharedMemory(
+            create=True, size=max(num_slots * self.slot_nbytes, 1)
+        )
+        self._is_owner = True
+        context = multiprocessing.get_context() if context is None else context
+        self._free_slots = context.Queue()
+        for slot_index in range(num_slots):
+            self._free_slots.put(slot_index)
+
+    @property
+    def name(self) -> str:
+        return self._shared_memory.name
+
+    def __getstate__(self):
+        # Only the name of the shared memory block is pickled. Other processes attach to the block by its name.
+        return {
+            "num_slots": self.num_slots,
+            "slot_nbytes": self.slot_nbytes,
+            "name": self.name,
+            "free_slots": self._free_slots,
+        }
+
+    def __setstate__(self, state: dict):
+        self.num_slots = state["num_slots"]
+        self.slot_nbytes = state["slot_nbytes"]
+        self._shared_memory = shared_memory.SharedMemory(name=state["name"])
+        self._is_owner = False
+        self._free_slots = state["free_slots"]
+
+    def write(self, arrays: list, timeout: float = 0.01) -> tuple:
+        """Copy the `arrays` into a free slot and return the slot index and the (offset, shape, dtype) of each array.
+
+        Returns None if no slot becomes free within `timeout` seconds or if the arrays do not fit into a slot, so that
+        the caller can fall back to another transport instead of waiting for the owner to release a slot.
+        """
+
+        offsets, offset = [], 0
+        for array in arrays:
+            offset = -(-offset // SLOT_ALIGNMENT) * SLOT_ALIGNMENT
+            offsets.append(offset)
+            offset += array.nbytes
+        if offset > self.slot_nbytes:
+            logging.debug(
+                "The arrays (%s bytes) do not fit into a ring buffer slot (%s bytes).",
+                offset,
+                self.slot_nbytes,
+            )
+            return None
+        try:
+            slot_index = self._free_slots.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        descriptors = []
+        for array, offset in zip(arrays, offsets):
+            view = self.get_view(
+                slot_index=slot_index,
+                offset=offset,
+                shape=array.shape,
+                dtype=array.dtype.str,
+            )
+            view[...] = array
+            descriptors.append((offset, array.shape, array.dtype.str))
+        return slot_index, descriptors
+
+    def get_view(
+        self, slot_index: int, offset: int, shape: tuple, dtype: str
+    ) -> np.ndarray:
+        """Return a numpy view (not a copy) of the array with `shape` and `dtype` at `offset` in the slot."""
+
+        return np.ndarray(
+            shape,
+            dtype=dtype,
+            buffer=self._shared_memory.buf,
+            offset=slot_index * self.slot_nbytes + offset,
+        )
+
+    def release(self, slot_index: int):
+        """Mark the slot as free, after which its content is overwritten by the next write."""
+
+        self._free_slots.put(slot_index)
+
+    def close(self):
+        """Close the shared memory block in this process and, if this process created it, remove it."""
+
+        if self._is_owner:
+            self._shared_memory.unlink()
+        try:
+            self._shared_memory.close()
+        except BufferError:
+            # The memory is freed once the views of its slots that are still in use are garbage collected.
+            logging.debug(
+                "The ring buffer %s is closed while views of its slots are still in use.",
+                self.name,
+            )
+
+    def __repr__(self):
+        return f"SharedMemoryRingBuffer(name={self.name}, num_slots={self.num_slots}, slot_nbytes={self.slot_nbytes})"
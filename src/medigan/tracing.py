@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" Tracing of the stages of medigan's model lifecycle (config loading, download, import, generation, and writing).
+
+Stages are wrapped in spans, which record their duration, their parent span, and attributes such as bytes and sample
+counts. Finished spans are passed to the sinks registered on the `Tracer`, e.g.
+
+    from medigan.tracing import InMemorySpanSink, get_tracer
+
+    sink = InMemorySpanSink()
+    get_tracer().add_sink(sink)
+    generators.generate(model_id="00001", num_samples=10)
+    print(sink.get_durations())
+
+Without registered sinks, spans are not created and tracing has negligible overhead.
+"""
+
+# Import python native libs
+from __future__ import absolute_import
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+
+class Span:
+    """`Span` class: A timed stage of medigan's model lifecycle with its attributes.
+
+    Parameters
+    ----------
+    name: str
+        the name of the stage, e.g. "model_executor.import_module"
+    trace_id: str
+        the id shared by all spans of one top-level operation
+    parent_id: str
+        the id of the enclosing span or None if the span is a top-level span
+    attributes: dict
+        the attributes of the span, e.g. the model id or the number of downloaded bytes
+
+    Attributes
+    ----------
+    span_id: str
+        the unique id of the span
+    start_time: float
+        the wall clock time in seconds at which the span started
+    duration: float
+        the duration of the span in seconds (None until the span has ended)
+    error: str
+        the error raised inside the span or None
+    """
+
+    def __init__(
+        self, name: str, trace_id: str, parent_id: str = None, attributes: dict = None
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attributes = {} if attributes is None else attributes
+        self.start_time = time.time()
+        self.duration = None
+        self.error = None
+        self._start_counter = time.perf_counter()
+
+    def set_attribute(self, key: str, value):
+        """Set the attribute `key` of the span to `value`."""
+
+        self.attributes[key] = value
+
+    def add(self, key: str, value: float = 1):
+        """Add `value` to the numeric attribute `key` of the span, e.g. to count bytes or samples."""
+
+        self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def end(self, error: Exception = None):
+        """Record the duration of the span and the `error` that ended it, if any."""
+
+        self.duration = time.perf_counter() - self._start_counter
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> dict:
+        """Return the span as JSON-serializable dict."""
+
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def __repr__(self):
+        return f"Span(name={self.name}, duration={self.duration}, attributes={self.attributes})"
+
+
+class _NoOpSpan:
+    """Stand-in for `Span` that is returned if no sinks are registered, so that instrumented code needs no checks."""
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def add(self, key: str, value: float = 1):
+        pass
+
+
+class InMemorySpanSink:
+    """`InMemorySpanSink` class: Keeps the finished spans in a list, e.g. for tests or interactive profiling.
+
+    Attributes
+    ----------
+    spans: list
+        the finished spans in the order in which they ended
+    """
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def get_durations(self) -> dict:
+        """Return the total duration in seconds of the finished spans by span name."""
+
+        durations = {}
+        with self._lock:
+            for span in self.spans:
+                durations[span.name] = durations.get(span.name, 0.0) + span.duration
+        return durations
+
+    def clear(self):
+        with self._lock:
+            self.spans = []
+
+    def __len__(self):
+        return len(self.spans)
+
+
+class JsonLinesSpanSink:
+    """`JsonLinesSpanSink` class: Appends each finished span as one JSON line to a file.
+
+    Parameters
+    ----------
+    path: str
+        the path to the JSON lines file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+    def __repr__(self):
+        return f"JsonLinesSpanSink(path={self.path})"
+
+
+class OpenTelemetrySpanSink:
+    """`OpenTelemetrySpanSink` class: Re-emits finished spans to an OpenTelemetry tracer, i.e. to its exporters.
+
+    Requires the `opentelemetry-api` package (and e.g. `opentelemetry-sdk` with an exporter configured on the tracer
+    provider). The medigan span ids are added as attributes, as OpenTelemetry assigns its own ids.
+
+    Parameters
+    ----------
+    tracer_provider
+        the OpenTelemetry tracer provider. If None, the globally configured tracer provider is used.
+    """
+
+    def __init__(self, tracer_provider=None):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "The OpenTelemetrySpanSink requires the opentelemetry-api package. Please install it via "
+                "'pip install opentelemetry-api opentelemetry-sdk'."
+            ) from e
+        self._tracer = trace.get_tracer("medigan", tracer_provider=tracer_provider)
+
+    def export(self, span: Span):
+        attributes = {
+            key: value
+            if isinstance(value, (bool, int, float, str))
+            else json.dumps(value, default=str)
+            for key, value in span.attributes.items()
+        }
+        attributes.update(
+            {
+                "medigan.trace_id": span.trace_id,
+                "medigan.span_id": span.span_id,
+                "medigan.parent_id": span.parent_id or "",
+            }
+        )
+        start_time_ns = int(span.start_time * 1e9)
+        otel_span = self._tracer.start_span(
+            span.name, start_time=start_time_ns, attributes=attributes
+        )
+        if span.error is not None:
+            otel_span.set_attribute("error", span.error)
+        otel_span.end(end_time=start_time_ns + int(span.duration * 1e9))
+
+
+class Tracer:
+    """`Tracer` class: Creates nested spans per thread and passes finished spans to the registered sinks.
+
+    Parameters
+    ----------
+    sinks: list
+        the sinks (objects with an `export(span)` method) to which finished spans are passed
+
+    Attributes
+    ----------
+    sinks: list
+        the registered sinks
+    """
+
+    def __init__(self, sinks: list = None):
+        self.sinks = [] if sinks is None else list(sinks)
+        self._local = threading.local()
+
+    @property
+    def is_enabled(self) -> bool:
+        return len(self.sinks) > 0
+
+    def add_sink(self, sink):
+        """Register a `sink` to which finished spans are passed."""
+
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink):
+        """Unregister a previously added `sink`."""
+
+        self.sinks.remove(sink)
+
+    def get_current_span(self) -> Span:
+        """Return the innermost active span of the calling thread or None."""
+
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Context manager timing the enclosed stage as span `name` with `attributes` and yielding the span.
+
+        The span is a child of the active span of the calling thread. If an exception is raised inside the span, it
+        is recorded in the span and re-raised.
+        """
+
+        if not self.sinks:
+            yield _NoOpSpan()
+            return
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        parent = self.get_current_span()
+        span = Span(
+            name=name,
+            trace_id=uuid.uuid4().hex if parent is None else parent.trace_id,
+            parent_id=None if parent is None else parent.span_id,
+            attributes=attributes,
+        )
+        self._local.stack.append(span)
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._local.stack.pop()
+            span.end(error=error)
+            for sink in list(self.sinks):
+                try:
+                    sink.export(span)
+                except Exception as e:
+                    logging.warning(
+                        "Tracing sink %s failed to export %s: %s", sink, span, e
+                    )
+
+    def __repr__(self):
+        return f"Tracer(sinks={self.sinks})"
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Return the `Tracer` instance used by medigan to trace its stages."""
+
+    return _tracer
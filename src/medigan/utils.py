@@ -2,10 +2,13 @@
 # ! /usr/bin/env python
 """ `Utils` class providing generalized reusable functions for I/O, parsing, sorting, type conversions, etc. """
 # Import python native libs
+import hashlib
 import json
 import logging
 import os
+import random
 import shutil
+import sys
 import time
 import zipfile
 from distutils.dir_util import copy_tree
@@ -18,6 +21,54 @@ import numpy as np
 import requests
 from tqdm import tqdm
 
+# Import library internal modules
+from .exceptions import DownloadCancelledError
+from .metrics import DOWNLOAD_FAILURES, DOWNLOADED_BYTES
+from .tracing import get_tracer
+
+
+class ArraySummary:
+    """`ArraySummary` class: Log argument that is formatted as the shapes and dtypes of arrays instead of their values.
+
+    Pass it as a %-style argument, e.g. `logging.debug("data: %s", ArraySummary(data))`. The summary is only built if
+    the log record is emitted, and arrays are never converted to strings, which takes seconds for large batches.
+    Lists, tuples, and dicts are summarized recursively up to `max_items` items.
+
+    Parameters
+    ----------
+    value
+        the array, tensor, list, tuple, dict, or other object that is summarized
+    max_items: int
+        the maximum number of items of a list, tuple, or dict that are summarized
+    """
+
+    def __init__(self, value, max_items: int = 3):
+        self.value = value
+        self.max_items = max_items
+
+    def summarize(self, value) -> str:
+        if hasattr(value, "shape") and hasattr(value, "dtype"):
+            return f"{type(value).__name__}(shape={tuple(value.shape)}, dtype={value.dtype})"
+        if isinstance(value, (list, tuple)):
+            items = ", ".join(self.summarize(item) for item in value[: self.max_items])
+            if len(value) > self.max_items:
+                items += ", ..."
+            return f"{type(value).__name__}(len={len(value)}: {items})"
+        if isinstance(value, dict):
+            items = ", ".join(
+                f"{key!r}: {self.summarize(item)}"
+                for key, item in list(value.items())[: self.max_items]
+            )
+            if len(value) > self.max_items:
+                items += ", ..."
+            return f"dict(len={len(value)}: {{{items}}})"
+        return repr(value)
+
+    def __str__(self):
+        return self.summarize(self.value)
+
+    __repr__ = __str__
+
 
 class Utils:
     """Utils class containing reusable static methods."""
@@ -37,7 +88,7 @@ class Utils:
                 return True
             except Exception as e:
                 logging.error(
-                    f"Error while creating folders for path {path_as_string}: {e}"
+                    "Error while creating folders for path %s: %s", path_as_string, e
                 )
                 return False
         return True
@@ -57,11 +108,16 @@ class Utils:
                 # download_if_not_found is prioritized over is_new_download_forced in this case, as users likely
                 # prefer to avoid automated downloads altogether when setting download_if_not_found to False.
                 logging.warning(
-                    f"File {path_as_string} was not found ({not path_as_string.is_file()}) or download "
-                    f"was forced ({is_new_download_forced}). However, downloading it from {download_link} "
-                    f"was not allowed: download_if_not_found == {download_if_not_found}. This may cause an "
-                    f"error, as the file might be outdated or missing, while being used in subsequent "
-                    f"workflows."
+                    "File %s was not found (%s) or download "
+                    "was forced (%s). However, downloading it from %s "
+                    "was not allowed: download_if_not_found == %s. This may cause an "
+                    "error, as the file might be outdated or missing, while being used in subsequent "
+                    "workflows.",
+                    path_as_string,
+                    not path_as_string.is_file(),
+                    is_new_download_forced,
+                    download_link,
+                    download_if_not_found,
                 )
                 return False
             else:
@@ -83,56 +139,92 @@ class Utils:
 
     @staticmethod
     def download_file(
-        download_link: str, path_as_string: str, file_extension: str = ".json"
+        download_link: str,
+        path_as_string: str,
+        file_extension: str = ".json",
+        cancel_event=None,
     ):
-        """download a file using the `requests` lib and store in `path_as_string`"""
+        """download a file using the `requests` lib and store in `path_as_string`
 
-        logging.debug(f"Now downloading file {path_as_string} from {download_link} ...")
+        If the optional `threading.Event` `cancel_event` is set during the download, the partially downloaded file is
+        removed and a `DownloadCancelledError` is raised.
+        """
+
+        logging.debug(
+            "Now downloading file %s from %s ...", path_as_string, download_link
+        )
         try:
-            for i in range(10):
-                response = requests.get(
-                    download_link, allow_redirects=True, stream=True
-                )
-                total_size_in_bytes = int(
-                    response.headers.get("content-length", 0)
-                )  # / (32 * 1024)  # 32*1024 bytes received by requests.
-                logging.debug(total_size_in_bytes)
-                block_size = 1024
-                progress_bar = tqdm(
-                    total=total_size_in_bytes,
-                    unit="B",
-                    unit_scale=True,
-                    position=0,
-                    leave=True,
-                    ascii=True,
-                )
-                progress_bar.set_description(f"Downloading {download_link}")
-                with open(path_as_string, "wb") as file:
-                    for data in response.iter_content(block_size):
-                        progress_bar.update(len(data))
-                        file.write(data)
-                    logging.debug(
-                        f"Received response {response}: Retrieved file from {download_link} and wrote it "
-                        f"to {path_as_string}."
+            with get_tracer().span(
+                "utils.download_file", url=str(download_link)
+            ) as span:
+                for i in range(10):
+                    span.set_attribute("attempts", i + 1)
+                    num_downloaded_bytes = 0
+                    response = requests.get(
+                        download_link, allow_redirects=True, stream=True
                     )
-                try:
-                    if not (
-                        download_link.endswith(file_extension)
-                        and Path(path_as_string).is_file()
-                        and str(path_as_string).endswith(file_extension)
-                    ):
-                        # If we do not download a json file (global.json), we assume a zip and want to check if the downloaded zip is valid.
-                        zipfile.ZipFile(path_as_string, "r")
-                    break
-                except Exception as e:
-                    print(e)
-                    logging.debug(
-                        f"Download failed. Retrying download from {download_link}"
+                    total_size_in_bytes = int(
+                        response.headers.get("content-length", 0)
+                    )  # / (32 * 1024)  # 32*1024 bytes received by requests.
+                    logging.debug(total_size_in_bytes)
+                    block_size = 1024
+                    progress_bar = tqdm(
+                        total=total_size_in_bytes,
+                        unit="B",
+                        unit_scale=True,
+                        position=0,
+                        leave=True,
+                        ascii=True,
                     )
+                    progress_bar.set_description(f"Downloading {download_link}")
+                    with open(path_as_string, "wb") as file:
+                        for data in response.iter_content(block_size):
+                            if cancel_event is not None and cancel_event.is_set():
+                                break
+                            progress_bar.update(len(data))
+                            file.write(data)
+                            span.add("bytes", len(data))
+                            num_downloaded_bytes += len(data)
+                        logging.debug(
+                            "Received response %s: Retrieved file from %s and wrote it "
+                            "to %s.",
+                            response,
+                            download_link,
+                            path_as_string,
+                        )
+                    DOWNLOADED_BYTES.inc(num_downloaded_bytes)
+                    if cancel_event is not None and cancel_event.is_set():
+                        response.close()
+                        progress_bar.close()
+                        os.remove(path_as_string)
+                        raise DownloadCancelledError(
+                            f"The download from {download_link} was cancelled."
+                        )
+                    try:
+                        if not (
+                            download_link.endswith(file_extension)
+                            and Path(path_as_string).is_file()
+                            and str(path_as_string).endswith(file_extension)
+                        ):
+                            # If we do not download a json file (global.json), we assume a zip and want to check if the downloaded zip is valid.
+                            zipfile.ZipFile(path_as_string, "r")
+                        break
+                    except Exception as e:
+                        print(e)
+                        logging.debug(
+                            "Download failed. Retrying download from %s", download_link
+                        )
 
+        except DownloadCancelledError as e:
+            logging.info("%s", e)
+            raise e
         except Exception as e:
+            DOWNLOAD_FAILURES.inc()
             logging.error(
-                f"Error while trying to download/copy from {download_link} to {path_as_string}:{e}"
+                "Error while trying to download/copy from %s to %s:%s",
+                download_link,
+                path_as_string,
+                e,
             )
             raise e
 
@@ -146,7 +238,7 @@ class Utils:
                 return json_file
         except Exception as e:
             logging.error(
-                f"Error while reading in json file from {path_as_string}: {e}"
+                "Error while reading in json file from %s: %s", path_as_string, e
             )
             raise e
 
@@ -155,10 +247,16 @@ class Utils:
         """unzip a .zip archive in the `target_path`"""
 
         try:
-            with zipfile.ZipFile(source_path, "r") as zip_ref:
+            with get_tracer().span(
+                "utils.unzip_archive", archive=str(source_path)
+            ) as span, zipfile.ZipFile(source_path, "r") as zip_ref:
                 zip_ref.extractall(target_path)
+                span.set_attribute("num_files", len(zip_ref.infolist()))
+                span.set_attribute(
+                    "bytes", sum(info.file_size for info in zip_ref.infolist())
+                )
         except Exception as e:
-            logging.error(f"Error while unzipping {source_path}: {e}")
+            logging.error("Error while unzipping %s: %s", source_path, e)
             raise e
 
     @staticmethod
@@ -175,7 +273,8 @@ class Utils:
             return package_path_unzipped
         elif Path(package_path).is_dir():
             logging.info(
-                f"Your package path ({package_path}) does already point to a directory. It was not unzipped."
+                "Your package path (%s) does already point to a directory. It was not unzipped.",
+                package_path,
             )
             return package_path
         else:
@@ -193,7 +292,9 @@ class Utils:
             else:
                 copy_tree(src=source_path, dst=target_path)
         except Exception as e:
-            logging.error(f"Error while copying {source_path} to {target_path}: {e}")
+            logging.error(
+                "Error while copying %s to %s: %s", source_path, target_path, e
+            )
             raise e
 
     @staticmethod
@@ -228,7 +329,9 @@ class Utils:
             return base_dict
         except TypeError as e:
             logging.debug(
-                f"No key ({key}) found in base_dict ({base_dict}) for this model. Fallback: Returning None."
+                "No key (%s) found in base_dict (%s) for this model. Fallback: Returning None.",
+                key,
+                base_dict,
             )
         return None
 
@@ -244,21 +347,149 @@ class Utils:
             return False
 
     @staticmethod
-    def has_more_than_n_diff_pixel_values(img: np.ndarray, n: int = 4) -> bool:
-        """This function checks whether an image contains more than n different pixel values.
+    def calculate_checksum(path_as_string: str, block_size: int = 1024 * 1024) -> str:
+        """Calculate the sha256 checksum of a file or, if `path_as_string` is a folder, of all files inside it."""
+
+        sha256 = hashlib.sha256()
+        if Path(path_as_string).is_dir():
+            file_paths = sorted(
+                os.path.join(root, filename)
+                for root, _, filenames in os.walk(path_as_string)
+                for filename in filenames
+            )
+        else:
+            file_paths = [path_as_string]
+        for file_path in file_paths:
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(block_size), b""):
+                    sha256.update(block)
+        return sha256.hexdigest()
+
+    @staticmethod
+    def set_random_seed(seed: int):
+        """Seed the random number generators of python, numpy and, if installed, torch."""
+
+        random.seed(seed)
+        np.random.seed(seed % 2**32)
+        try:
+            import torch
+
+            torch.manual_seed(seed)
+        except ImportError:
+            logging.debug("torch not installed. Only seeded python and numpy: %s", seed)
+
+    @staticmethod
+    def get_peak_rss_mb() -> float:
+        """Return the peak resident set size of the current process in MB or None if it cannot be measured.
 
-        This helps to differentiate between segmentation masks and actual images.
+        The peak is the maximum since the start of the process or, on Linux, since the last `reset_peak_rss` call.
         """
 
-        import torch
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) / 1024
+        except (OSError, ValueError, IndexError):
+            pass
+        try:
+            import resource
+        except ImportError:
+            # The resource module is not available on Windows.
+            return None
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux.
+        return peak_rss / 1024**2 if sys.platform == "darwin" else peak_rss / 1024
+
+    @staticmethod
+    def reset_peak_rss() -> bool:
+        """Reset the peak resident set size of the current process to its current size and return whether it was reset.
+
+        This is only supported on Linux. Elsewhere, the peak resident set size is the peak since the start of the process.
+        """
 
-        torch_img = torch.from_numpy(img)
-        pixel_values_set = set(torch_img.flatten().tolist())
-        if len(pixel_values_set) > n:
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
             return True
-        else:
+        except OSError:
             return False
 
+    @staticmethod
+    def get_total_memory_mb() -> float:
+        """Return the physical memory of the machine in MB or None if it cannot be determined."""
+
+        try:
+            return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024**2
+        except (AttributeError, ValueError, OSError):
+            # os.sysconf is not available on Windows.
+            return None
+
+    @staticmethod
+    def has_more_than_n_diff_pixel_values(
+        img: np.ndarray, n: int = 4, chunk_size: int = 65536
+    ) -> bool:
+        """This function checks whether an image contains more than n different pixel values.
+
+        This helps to differentiate between segmentation masks and actual images. The pixels are streamed in chunks of
+        `chunk_size` values and the check exits as soon as more than n different values have been seen, which, for
+        actual images, usually happens within the first chunk.
+        """
+
+        pixel_values = np.asarray(img).ravel()
+        distinct_values = np.empty(0, dtype=pixel_values.dtype)
+        for start in range(0, len(pixel_values), chunk_size):
+            distinct_values = np.union1d(
+                distinct_values, pixel_values[start : start + chunk_size]
+            )
+            if len(distinct_values) > n:
+                return True
+        return False
+
+    @staticmethod
+    def have_more_than_n_diff_pixel_values(
+        images: np.ndarray, n: int = 4, chunk_size: int = 65536
+    ) -> np.ndarray:
+        """Batched variant of `has_more_than_n_diff_pixel_values` checking each image of a stack of images at once.
+
+        The first `chunk_size` pixels of all images are checked first. Only the images that do not contain more than n
+        different values within them, e.g. segmentation masks, are then checked on all of their pixels.
+
+        Parameters
+        ----------
+        images: np.ndarray
+            stack of images with the image index as first dimension
+        n: int
+            the maximum number of different pixel values of an image that is considered to be a segmentation mask
+        chunk_size: int
+            the number of pixels per image that are checked before the remaining pixels are checked
+
+        Returns
+        -------
+        np.ndarray
+            boolean array with one entry per image indicating whether it contains more than n different pixel values
+        """
+
+        images = np.asarray(images)
+        pixel_values = images.reshape(len(images), -1)
+        num_pixels = pixel_values.shape[1]
+        result = np.zeros(len(images), dtype=bool)
+        undecided_indices = np.arange(len(images))
+        for stop in [min(chunk_size, num_pixels), num_pixels]:
+            if len(undecided_indices) == 0:
+                break
+            sorted_pixel_values = np.sort(
+                pixel_values[undecided_indices, :stop], axis=1
+            )
+            num_distinct_values = 1 + np.count_nonzero(
+                np.diff(sorted_pixel_values, axis=1), axis=1
+            )
+            result[undecided_indices] = num_distinct_values > n
+            undecided_indices = undecided_indices[num_distinct_values <= n]
+            if stop == num_pixels:
+                break
+        return result
+
     @staticmethod
     def split_images_masks_and_labels(
         data: list, num_samples: int, max_nested_arrays: int = 2
@@ -272,8 +503,18 @@ class Utils:
 
         For example, this extendable function assumes that, in data, a mask follows the image that it
         corresponds to or vice versa.
+
+        Alternatively, a model can return a dict of batched data, e.g. {"samples": N×H×W×C np.ndarray,
+        "masks": N×H×W×C np.ndarray, "other_imaging_output": ..., "labels": list or np.ndarray of N labels}.
+        The stacked arrays are then passed through as they are without any per-sample python work (see
+        `split_batched_images_masks_and_labels`).
         """
 
+        if isinstance(data, dict):
+            return Utils.split_batched_images_masks_and_labels(
+                data=data, num_samples=num_samples
+            )
+
         samples = []
         masks = []
         other_imaging_output = []
@@ -288,7 +529,7 @@ class Utils:
                 break
 
         for data_point in data:
-            logging.debug(f"data_point: {data_point}")
+            logging.debug("data_point: %s", ArraySummary(data_point))
             if isinstance(data_point, tuple):
                 for i, item in enumerate(data_point):
                     if isinstance(item, np.ndarray) and i == 0:
@@ -309,6 +550,48 @@ class Utils:
         labels = None if len(labels) == 0 else labels
         return samples, masks, other_imaging_output, labels
 
+    @staticmethod
+    def split_batched_images_masks_and_labels(
+        data: dict, num_samples: int = None
+    ) -> [np.ndarray, np.ndarray, np.ndarray, list]:
+        """Returns the samples, masks, other_imaging_output, and labels of a dict of batched data returned by a model
+
+        The dict is expected to contain the stacked samples (np.ndarray with the sample index as first dimension) under
+        the key "samples" and optionally stacked masks, stacked other imaging output, and a sequence of labels under the
+        keys "masks", "other_imaging_output", and "labels". Missing keys and None values are returned as None.
+        """
+
+        if data.get("samples") is None:
+            raise ValueError(
+                f"The batched data returned by the model does not contain the key 'samples'. Keys: {list(data.keys())}"
+            )
+        samples = np.asarray(data["samples"])
+        masks, other_imaging_output, labels = [
+            None if data.get(key) is None else data[key]
+            for key in ["masks", "other_imaging_output", "labels"]
+        ]
+        if masks is not None:
+            masks = np.asarray(masks)
+        if other_imaging_output is not None:
+            other_imaging_output = np.asarray(other_imaging_output)
+        for key, values in [
+            ("masks", masks),
+            ("other_imaging_output", other_imaging_output),
+            ("labels", labels),
+        ]:
+            if values is not None and len(values) != len(samples):
+                raise ValueError(
+                    f"The batched data returned by the model contains {len(samples)} samples but {len(values)} {key}."
+                )
+        if num_samples is not None and len(samples) != num_samples:
+            logging.warning(
+                "The batched data returned by the model contains %s samples instead of the "
+                "%s samples that were requested.",
+                len(samples),
+                num_samples,
+            )
+        return samples, masks, other_imaging_output, labels
+
     @staticmethod
     def split_images_and_masks_no_ordering(
         data: list, num_samples: int, max_nested_arrays: int = 2
@@ -331,27 +614,50 @@ class Utils:
             if counter >= max_nested_arrays:
                 break
 
+        # The items of the data points in their order and whether they are part of a tuple.
+        items = []
         for data_point in data:
-            logging.debug(f"data_point {data_point}")
+            logging.debug("data_point %s", ArraySummary(data_point))
             if isinstance(data_point, tuple):
-                for i, sample in enumerate(data_point):
-                    if (
-                        isinstance(i, np.ndarray)
-                        and "int" in str(i.dtype)
-                        and not Utils.has_more_than_n_diff_pixel_values(i)
-                    ):
-                        # Check if numpy array that contains integers instead of floats indicates the presence of a mask
-                        masks.append(i)
-                    elif Utils.has_more_than_n_diff_pixel_values(i):
-                        images.append(i)
-            elif (
-                isinstance(data_point, np.ndarray)
-                and "int" in str(data_point.dtype)
-                and not Utils.has_more_than_n_diff_pixel_values(data_point)
-            ):
-                masks.append(data_point)
+                items += [
+                    (sample, True)
+                    for sample in data_point
+                    if isinstance(sample, np.ndarray)
+                ]
             else:
-                images.append(data_point)
+                items.append((data_point, False))
+
+        # Items of tuples are always checked, other items only if they contain integers.
+        # The pixel values of all checked items with the same shape and dtype are counted at once.
+        indices_by_shape_and_dtype = {}
+        for index, (item, is_in_tuple) in enumerate(items):
+            if isinstance(item, np.ndarray) and (
+                is_in_tuple or "int" in str(item.dtype)
+            ):
+                indices_by_shape_and_dtype.setdefault(
+                    (item.shape, item.dtype.str), []
+                ).append(index)
+        has_more_than_n_diff_pixel_values = {}
+        for indices in indices_by_shape_and_dtype.values():
+            has_more_than_n_diff_pixel_values.update(
+                zip(
+                    indices,
+                    Utils.have_more_than_n_diff_pixel_values(
+                        np.stack([items[index][0] for index in indices])
+                    ),
+                )
+            )
+
+        for index, (item, is_in_tuple) in enumerate(items):
+            if (
+                index in has_more_than_n_diff_pixel_values
+                and "int" in str(item.dtype)
+                and not has_more_than_n_diff_pixel_values[index]
+            ):
+                # Check if numpy array that contains integers instead of floats indicates the presence of a mask
+                masks.append(item)
+            elif not is_in_tuple or has_more_than_n_diff_pixel_values[index]:
+                images.append(item)
         masks = None if len(masks) == 0 else masks
         return images, masks
 
@@ -387,7 +693,9 @@ class Utils:
             ):
                 return True
         except Exception as e:
-            logging.warning(f"File ({filename}) was not found in {folder_path}: {e}")
+            logging.warning(
+                "File (%s) was not found in %s: %s", filename, folder_path, e
+            )
             return False
 
     @staticmethod
@@ -429,7 +737,7 @@ class Utils:
                     if v != removable_param_value
                 }
         logging.debug(
-            f"call_without_removable_params final params: {not_removed_params}"
+            "call_without_removable_params final params: %s", not_removed_params
         )
         return my_callable(**not_removed_params)
 
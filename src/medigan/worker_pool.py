@@ -0,0 +1,562 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" `WorkerPool` class keeping worker processes with loaded models alive to serve repeated generation jobs.
+
+Python, torch, and model imports as well as loading the weights are paid once when the pool starts instead of by every
+job:
+
+    with WorkerPool(model_ids=["00001"], num_workers=2) as pool:
+        for _ in range(100):
+            samples = pool.generate(model_id="00001", num_samples=4)["samples"]
+
+The workers are forked from a fork server that has already imported medigan and its dependencies (via the
+"forkserver" start method of multiprocessing or, where it is not available, "spawn"). The workers write the generated
+arrays into the slots of a shared memory ring buffer instead of pickling them through a pipe. With
+`submit(..., is_zero_copy=True)`, the caller receives views of the arrays in the slot without any copy:
+
+    with pool.submit(model_id="00001", num_samples=32, is_zero_copy=True).result() as result:
+        process(result["samples"])  # the slot is reused after the with block
+"""
+
+# Import python native libs
+from __future__ import absolute_import
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import uuid
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+# Import pypi libs
+import numpy as np
+
+# Import library internal modules
+from .config_manager import ConfigManager
+from .constants import (
+    CONFIG_FILE_KEY_EXECUTION,
+    CONFIG_FILE_KEY_IMAGE_SIZE,
+    DEFAULT_NUM_POOL_WORKERS,
+    DEFAULT_RING_BUFFER_SLOTS,
+    DEFAULT_SAMPLES_PER_SLOT,
+)
+from .generators import Generators
+from .shared_memory_ring_buffer import SharedMemoryRingBuffer
+from .utils import Utils
+
+ARRAY_OUTPUT_NAMES = ["samples", "masks", "other_imaging_output"]
+
+
+def _to_shared_memory(array: np.ndarray) -> tuple:
+    """Copy `array` into a new shared memory block and return the block's name, the shape, and the dtype."""
+
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    block.close()
+    return block.name, array.shape, array.dtype.str
+
+
+def _from_shared_memory(name: str, shape: tuple, dtype: str) -> np.ndarray:
+    """Copy the array out of the shared memory block `name` and release the block."""
+
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return np.ndarray(shape, dtype=dtype, buffer=block.buf).copy()
+    finally:
+        block.close()
+        block.unlink()
+
+
+class SharedMemoryResult(dict):
+    """The generated outputs of a task whose arrays are views of a ring buffer slot.
+
+    The views are valid until `release` is called (or the `with` block of the result is left), after which the slot is
+    overwritten by later tasks. Copy arrays that are needed for longer.
+    """
+
+    def __init__(self, outputs: dict, release_function=None):
+        super().__init__(outputs)
+        self._release_function = release_function
+
+    def release(self):
+        """Return the slot holding the arrays to the ring buffer."""
+
+        if self._release_function is not None:
+            release_function, self._release_function = self._release_function, None
+            release_function()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def _run_worker(
+    worker_id: int,
+    model_ids: list,
+    config_dict: dict,
+    install_dependencies: bool,
+    task_queue,
+    result_queue,
+    ring_buffer: SharedMemoryRingBuffer = None,
+):
+    """Load the models and generate samples for the tasks of the `task_queue` until a stop signal (None) arrives."""
+
+    # Workers forked from the same fork server would otherwise share the state of the random number generators.
+    Utils.set_random_seed(int.from_bytes(os.urandom(4), "little"))
+    generators = Generators(
+        config_manager=None
+        if config_dict is None
+        else ConfigManager(config_dict=config_dict)
+    )
+    try:
+        for model_id in model_ids:
+            generators.get_model_executor(
+                model_id=model_id, install_dependencies=install_dependencies
+            )
+    except Exception as e:
+        result_queue.put((None, worker_id, None, f"{type(e).__name__}: {e}"))
+        return
+    result_queue.put((None, worker_id, None, None))
+    while True:
+        task = task_queue.get()
+        if task is None:
+            return
+        task_id, model_id, num_samples, kwargs = task
+        # Tells the pool which worker serves the task in case the worker exits unexpectedly.
+        result_queue.put((task_id, worker_id, None, None))
+        try:
+            model_executor = generators.get_model_executor(
+                model_id=model_id, install_dependencies=install_dependencies
+            )
+            outputs = Utils.split_images_masks_and_labels(
+                data=model_executor.generate(
+                    num_samples=num_samples, save_images=False, **kwargs
+                ),
+                num_samples=num_samples,
+            )
+            arrays = {
+                name: np.stack(output)
+                for name, output in zip(ARRAY_OUTPUT_NAMES, outputs[:3])
+                if output is not None
+            }
+            result = {name: None for name in ARRAY_OUTPUT_NAMES}
+            slot = (
+                None
+                if ring_buffer is None or not arrays
+                else ring_buffer.write(list(arrays.values()))
+            )
+            if slot is not None:
+                slot_index, descriptors = slot
+                result["slot_index"] = slot_index
+                result.update(zip(arrays, descriptors))
+            else:
+                # If no slot is free or the arrays are too large for a slot, each array gets a shared memory block.
+                result.update(
+                    {name: _to_shared_memory(array) for name, array in arrays.items()}
+                )
+            result["labels"] = None if outputs[3] is None else list(outputs[3])
+            result_queue.put((task_id, worker_id, result, None))
+        except Exception as e:
+            result_queue.put((task_id, worker_id, None, f"{type(e).__name__}: {e}"))
+
+
+class WorkerPool:
+    """`WorkerPool` class: Persistent worker processes that keep models loaded and serve generation tasks.
+
+    Each worker loads the models of `model_ids` when the pool starts. Other models are loaded by a worker when it
+    receives its first task for them. Tasks are queued and served by the next idle worker.
+
+    Parameters
+    ----------
+    model_ids: list
+        the ids of the models that each worker loads at startup
+    num_workers: int
+        the number of worker processes
+    config_dict: dict
+        model configs (in the format of global.json) to use instead of the medigan config
+    install_dependencies: bool
+        flag indicating whether a generative model's dependencies are automatically installed
+    start_method: str
+        the multiprocessing start method of the workers. If None, "forkserver" is used where available, else "spawn".
+    num_slots: int
+        the number of slots of the ring buffer through which the workers return generated arrays. If 0, or if no
+        `model_ids` are preloaded, each returned array is passed in a shared memory block of its own.
+    samples_per_slot: int
+        the number of uint8 samples and masks of the largest `image_size` of the `model_ids` that fit into one slot.
+        Larger outputs are passed in shared memory blocks of their own.
+
+    Attributes
+    ----------
+    processes: list
+        the worker processes
+    """
+
+    def __init__(
+        self,
+        model_ids: list = None,
+        num_workers: int = DEFAULT_NUM_POOL_WORKERS,
+        config_dict: dict = None,
+        install_dependencies: bool = False,
+        start_method: str = None,
+        num_slots: int = DEFAULT_RING_BUFFER_SLOTS,
+        samples_per_slot: int = DEFAULT_SAMPLES_PER_SLOT,
+    ):
+        self.model_ids = [] if model_ids is None else list(model_ids)
+        self.num_workers = num_workers
+        self.config_dict = config_dict
+        self.install_dependencies = install_dependencies
+        if start_method is None:
+            start_method = (
+                "forkserver"
+                if "forkserver" in multiprocessing.get_all_start_methods()
+                else "spawn"
+            )
+        self.start_method = start_method
+        self.num_slots = num_slots
+        self.samples_per_slot = samples_per_slot
+        self.ring_buffer = None
+        self.processes = []
+        self._context = multiprocessing.get_context(start_method)
+        self._task_queue = None
+        self._result_queue = None
+        self._futures = {}
+        self._worker_ids = {}
+        self._dead_worker_ids = set()
+        self._lock = threading.Lock()
+        self._result_thread = None
+        self._is_closing = False
+
+    def start(self, timeout: float = None) -> "WorkerPool":
+        """Start the worker processes and wait until each worker has loaded the models of `model_ids`.
+
+        Returns
+        -------
+        WorkerPool
+            the started worker pool
+
+        Raises
+        ------
+        RuntimeError
+            if a worker could not load the models
+        """
+
+        if self.start_method == "forkserver":
+            # The fork server imports medigan and its dependencies once and each worker is forked from it.
+            self._context.set_forkserver_preload([__name__])
+        self._task_queue = self._context.Queue()
+        self._result_queue = self._context.Queue()
+        image_sizes = self._get_image_sizes() if self.num_slots > 0 else []
+        if image_sizes:
+            self.ring_buffer = SharedMemoryRingBuffer(
+                num_slots=self.num_slots,
+                slot_shape=self.get_slot_shape(
+                    image_sizes=image_sizes, samples_per_slot=self.samples_per_slot
+                ),
+                context=self._context,
+            )
+        for worker_id in range(self.num_workers):
+            process = self._context.Process(
+                target=_run_worker,
+                args=(
+                    worker_id,
+                    self.model_ids,
+                    self.config_dict,
+                    self.install_dependencies,
+                    self._task_queue,
+                    self._result_queue,
+                    self.ring_buffer,
+                ),
+                name=f"medigan-worker-{worker_id}",
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+        errors = []
+        for _ in range(self.num_workers):
+            _, worker_id, _, error = self._result_queue.get(timeout=timeout)
+            if error is not None:
+                errors.append(f"Worker {worker_id}: {error}")
+        if errors:
+            self.close()
+            raise RuntimeError(
+                f"The workers could not load the models {self.model_ids}: {errors}"
+            )
+        self._result_thread = threading.Thread(
+            target=self._collect_results, name="medigan-worker-results", daemon=True
+        )
+        self._result_thread.start()
+        logging.info(
+            "Started %s medigan workers (%s) with the models %s.",
+            self.num_workers,
+            self.start_method,
+            self.model_ids,
+        )
+        return self
+
+    def _get_image_sizes(self) -> list:
+        config_manager = (
+            ConfigManager()
+            if self.config_dict is None
+            else ConfigManager(config_dict=self.config_dict)
+        )
+        image_sizes = []
+        for model_id in self.model_ids:
+            try:
+                image_sizes.append(
+                    config_manager.get_config_by_id(
+                        model_id=config_manager.match_model_id(
+                            provided_model_id=model_id
+                        ),
+                        config_key=CONFIG_FILE_KEY_EXECUTION,
+                    )[CONFIG_FILE_KEY_IMAGE_SIZE]
+                )
+            except KeyError:
+                # The workers report the models that cannot be loaded.
+                continue
+        return image_sizes
+
+    @staticmethod
+    def get_slot_shape(image_sizes: list, samples_per_slot: int) -> tuple:
+        """Return the uint8 shape of a ring buffer slot holding `samples_per_slot` samples and masks of `image_sizes`.
+
+        Image sizes without channel dimension are assumed to have up to three channels.
+        """
+
+        height = max(int(image_size[0]) for image_size in image_sizes)
+        width = max(int(image_size[1]) for image_size in image_sizes)
+        num_channels = max(
+            int(image_size[2]) if len(image_size) > 2 else 3
+            for image_size in image_sizes
+        )
+        return 2 * samples_per_slot, height, width, num_channels
+
+    def _collect_results(self):
+        while not self._is_closing:
+            self._check_workers()
+            try:
+                task_id, worker_id, result, error = self._result_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            self._handle_result(
+                task_id=task_id, worker_id=worker_id, result=result, error=error
+            )
+
+    def _check_workers(self):
+        """Fail the tasks of the workers that exited unexpectedly, or all pending tasks if no worker is left."""
+
+        dead_worker_ids = {
+            worker_id
+            for worker_id, process in enumerate(self.processes)
+            if not process.is_alive()
+        }
+        if self._is_closing or dead_worker_ids <= self._dead_worker_ids:
+            return
+        with self._lock:
+            new_dead_worker_ids = dead_worker_ids - self._dead_worker_ids
+            self._dead_worker_ids |= new_dead_worker_ids
+        logging.error(
+            "The medigan workers %s exited unexpectedly.", sorted(new_dead_worker_ids)
+        )
+        self._fail_pending_tasks(
+            RuntimeError("A medigan worker process exited unexpectedly."),
+            worker_ids=None
+            if len(dead_worker_ids) == len(self.processes)
+            else new_dead_worker_ids,
+        )
+
+    def _handle_result(self, task_id: str, worker_id: int, result: dict, error: str):
+        """Resolve the future of the task `task_id` with a worker's `result` or `error`."""
+
+        with self._lock:
+            if result is None and error is None:
+                # The worker started the task.
+                if task_id in self._futures:
+                    self._worker_ids[task_id] = worker_id
+                is_worker_dead = worker_id in self._dead_worker_ids
+            else:
+                self._worker_ids.pop(task_id, None)
+                future, is_zero_copy = self._futures.pop(task_id, (None, False))
+        if result is None and error is None:
+            if is_worker_dead:
+                # The exit of the worker was noticed before the start of the task.
+                self._fail_pending_tasks(
+                    RuntimeError("A medigan worker process exited unexpectedly."),
+                    worker_ids={worker_id},
+                )
+            return
+        if future is None or not future.set_running_or_notify_cancel():
+            # The task was cancelled or has failed already because its worker exited.
+            if result is not None:
+                self._release_result(result=result)
+            return
+        if error is not None:
+            future.set_exception(RuntimeError(error))
+            return
+        try:
+            outputs = self._get_outputs(result=result, is_zero_copy=is_zero_copy)
+        except Exception as e:
+            future.set_exception(e)
+            return
+        future.set_result(outputs)
+
+    def _get_outputs(self, result: dict, is_zero_copy: bool) -> SharedMemoryResult:
+        """Return the outputs of a worker's `result`, releasing its shared memory unless `is_zero_copy` is True."""
+
+        slot_index = result.get("slot_index")
+        outputs = {}
+        for name in ARRAY_OUTPUT_NAMES:
+            if result[name] is None:
+                outputs[name] = None
+            elif slot_index is None:
+                outputs[name] = _from_shared_memory(*result[name])
+            else:
+                offset, shape, dtype = result[name]
+                view = self.ring_buffer.get_view(
+                    slot_index=slot_index, offset=offset, shape=shape, dtype=dtype
+                )
+                outputs[name] = view if is_zero_copy else view.copy()
+        outputs["labels"] = result["labels"]
+        if slot_index is None:
+            return SharedMemoryResult(outputs)
+        if not is_zero_copy:
+            self.ring_buffer.release(slot_index)
+            return SharedMemoryResult(outputs)
+        return SharedMemoryResult(
+            outputs,
+            release_function=lambda: self.ring_buffer.release(slot_index),
+        )
+
+    def _release_result(self, result: dict):
+        """Release the ring buffer slot or the shared memory blocks of a worker's `result` without reading it."""
+
+        slot_index = result.get("slot_index")
+        if slot_index is not None:
+            self.ring_buffer.release(slot_index)
+            return
+        for name in ARRAY_OUTPUT_NAMES:
+            if result[name] is not None:
+                block = shared_memory.SharedMemory(name=result[name][0])
+                block.close()
+                block.unlink()
+
+    def _fail_pending_tasks(self, error: Exception, worker_ids: set = None):
+        """Fail the pending tasks served by the workers of `worker_ids`, or all pending tasks if it is None."""
+
+        with self._lock:
+            task_ids = [
+                task_id
+                for task_id in self._futures
+                if worker_ids is None or self._worker_ids.get(task_id) in worker_ids
+            ]
+            futures = [self._futures.pop(task_id) for task_id in task_ids]
+            for task_id in task_ids:
+                self._worker_ids.pop(task_id, None)
+        for future, _ in futures:
+            if not future.cancelled():
+                future.set_exception(error)
+
+    def _drain_results(self):
+        """Resolve the tasks of the results left in the result queue after the workers stopped."""
+
+        with self._lock:
+            # The ring buffer is closed with the pool, so the arrays are copied out of its slots.
+            self._futures = {
+                task_id: (future, False)
+                for task_id, (future, _) in self._futures.items()
+            }
+        while True:
+            try:
+                task_id, worker_id, result, error = self._result_queue.get(timeout=0.1)
+            except (queue.Empty, EOFError, OSError):
+                return
+            self._handle_result(
+                task_id=task_id, worker_id=worker_id, result=result, error=error
+            )
+
+    def submit(
+        self, model_id: str, num_samples: int = 1, is_zero_copy: bool = False, **kwargs
+    ) -> Future:
+        """Queue a generation task and return a `Future` of its `SharedMemoryResult` dict of generated outputs.
+
+        If `is_zero_copy` is True, the arrays of the result are views of a ring buffer slot (if they fit into one),
+        which must be released via `release()` of the result. Otherwise, the arrays are copies.
+        """
+
+        if self._result_thread is None or self._is_closing:
+            raise RuntimeError("The worker pool is not running. Call start() first.")
+        if self._dead_worker_ids:
+            raise RuntimeError(
+                f"The medigan workers {sorted(self._dead_worker_ids)} exited unexpectedly. Close the pool and start "
+                f"a new one."
+            )
+        task_id = uuid.uuid4().hex
+        future = Future()
+        with self._lock:
+            self._futures[task_id] = (future, is_zero_copy)
+        self._task_queue.put((task_id, model_id, num_samples, kwargs))
+        return future
+
+    def generate(
+        self, model_id: str, num_samples: int = 1, timeout: float = None, **kwargs
+    ) -> dict:
+        """Generate `num_samples` samples of `model_id` in a worker process and return the outputs.
+
+        Parameters
+        ----------
+        model_id: str
+            The generative model's unique id
+        num_samples: int
+            the number of samples that will be generated
+        timeout: float
+            the time in seconds to wait for the result
+        **kwargs
+            arbitrary number of keyword arguments passed to the model's sample generation function
+
+        Returns
+        -------
+        dict
+            the "samples", "masks", and "other_imaging_output" as stacked numpy arrays and the list of "labels" (None if
+            not returned by the model)
+        """
+
+        return self.submit(model_id=model_id, num_samples=num_samples, **kwargs).result(
+            timeout=timeout
+        )
+
+    def close(self):
+        """Stop the worker processes after their current tasks."""
+
+        self._is_closing = True
+        for process in self.processes:
+            if process.is_alive():
+                self._task_queue.put(None)
+        for process in self.processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        if self._result_thread is not None:
+            self._result_thread.join()
+        self._drain_results()
+        self._fail_pending_tasks(RuntimeError("The worker pool was closed."))
+        self.processes = []
+        if self.ring_buffer is not None:
+            self.ring_buffer.close()
+            self.ring_buffer = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return (
+            f"WorkerPool(model_ids={self.model_ids}, num_workers={self.num_workers}, "
+            f"start_method={self.start_method})"
+        )
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" pytest fixtures providing a small numpy-only dummy model that runs offline and without model downloads. """
+
+import copy
+import os
+import shutil
+import sys
+import zipfile
+
+import pytest
+
+DUMMY_MODEL_ID = "99999_DUMMY_TEST_MODEL"
+
+DUMMY_MODEL_INIT_PY = """
+import os
+
+import numpy as np
+
+
+def generate(model_file, num_samples, output_path, save_images, image_size=16, with_masks=False,
+             input_latent_vector=None, condition=None, fail_on_call=None, is_batched_dict=False):
+    if fail_on_call is not None:
+        fail_on_call["calls"] = fail_on_call.get("calls", 0) + 1
+        if fail_on_call["calls"] == fail_on_call["fail_at"]:
+            raise RuntimeError("Dummy model failure")
+    if input_latent_vector is not None:
+        num_samples = len(input_latent_vector)
+        values = np.asarray(input_latent_vector).reshape(num_samples, -1).mean(axis=1)
+        images = np.stack([np.full((image_size, image_size, 1), v) for v in values])
+        images = (np.clip(images, -1, 1) * 127.5 + 127.5).astype(np.uint8)
+    else:
+        images = np.random.randint(0, 256, size=(num_samples, image_size, image_size, 1), dtype=np.uint8)
+    masks = (images > 127).astype(np.uint8) * 255
+    label = "condition_" + str(condition) if condition is not None else "dummy"
+    if save_images:
+        for i in range(num_samples):
+            np.save(os.path.join(output_path, str(i) + ".npy"), images[i])
+            if with_masks:
+                np.save(os.path.join(output_path, str(i) + "_mask.npy"), masks[i])
+        return None
+    if is_batched_dict:
+        return {"samples": images, "masks": masks if with_masks else None, "labels": [label] * num_samples}
+    if with_masks:
+        return [(images[i], masks[i], None, label) for i in range(num_samples)]
+    return [images[i] for i in range(num_samples)]
+"""
+
+DUMMY_EXECUTION_CONFIG = {
+    "package_name": DUMMY_MODEL_ID,
+    "package_link": "no_link",
+    "model_name": "weights",
+    "extension": ".pt",
+    "image_size": [16, 16],
+    "dependencies": ["numpy"],
+    "generate_method": {
+        "name": "generate",
+        "args": {
+            "base": ["model_file", "num_samples", "output_path", "save_images"],
+            "custom": {"image_size": 16},
+        },
+        "input_latent_vector_size": 8,
+    },
+}
+
+
+@pytest.fixture()
+def dummy_model_executor():
+    """Create the dummy model in `models/` and return a `ModelExecutor` for it."""
+
+    from src.medigan.constants import MODEL_FOLDER
+    from src.medigan.execute_model.model_executor import ModelExecutor
+
+    model_path = os.path.join(MODEL_FOLDER, DUMMY_MODEL_ID, DUMMY_MODEL_ID)
+    os.makedirs(model_path, exist_ok=True)
+    with open(os.path.join(model_path, "__init__.py"), "w") as f:
+        f.write(DUMMY_MODEL_INIT_PY)
+    open(os.path.join(model_path, "weights.pt"), "w").close()
+
+    yield ModelExecutor(
+        model_id=DUMMY_MODEL_ID,
+        execution_config=DUMMY_EXECUTION_CONFIG,
+        download_package=False,
+    )
+
+    shutil.rmtree(os.path.join(MODEL_FOLDER, DUMMY_MODEL_ID), ignore_errors=True)
+    for module_name in [
+        f"{MODEL_FOLDER}.{DUMMY_MODEL_ID}",
+        f"{MODEL_FOLDER}.{DUMMY_MODEL_ID}.{DUMMY_MODEL_ID}",
+    ]:
+        sys.modules.pop(module_name, None)
+
+
+ZIPPED_MODEL_ID = "99998_ZIPPED_TEST_MODEL"
+
+
+@pytest.fixture()
+def zipped_model_config(tmp_path):
+    """Create a zipped package of the dummy model and return a config dict linking to it as local file."""
+
+    from src.medigan.constants import MODEL_FOLDER
+
+    archive_path = tmp_path / f"{ZIPPED_MODEL_ID}.zip"
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        archive.writestr(f"{ZIPPED_MODEL_ID}/__init__.py", DUMMY_MODEL_INIT_PY)
+        archive.writestr(f"{ZIPPED_MODEL_ID}/weights.pt", "")
+    execution_config = copy.deepcopy(DUMMY_EXECUTION_CONFIG)
+    execution_config.update(
+        {"package_name": ZIPPED_MODEL_ID, "package_link": str(archive_path)}
+    )
+
+    yield {ZIPPED_MODEL_ID: {"execution": execution_config}}
+
+    shutil.rmtree(os.path.join(MODEL_FOLDER, ZIPPED_MODEL_ID), ignore_errors=True)
+    for module_name in [
+        f"{MODEL_FOLDER}.{ZIPPED_MODEL_ID}",
+        f"{MODEL_FOLDER}.{ZIPPED_MODEL_ID}.{ZIPPED_MODEL_ID}",
+    ]:
+        sys.modules.pop(module_name, None)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the asyncio API of medigan. """
+# run with python -m pytest tests/test_async_generators.py
+
+import asyncio
+import copy
+import functools
+import os
+import shutil
+import sys
+import threading
+import zipfile
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.medigan.async_generators import AsyncGenerators
+from src.medigan.config_manager import ConfigManager
+from src.medigan.constants import DEFAULT_ASYNC_COMPUTE_WORKERS, MODEL_FOLDER
+from src.medigan.exceptions import DownloadCancelledError
+from src.medigan.generators import Generators
+from src.medigan.utils import Utils
+
+from .conftest import DUMMY_MODEL_ID, ZIPPED_MODEL_ID
+
+
+class TestAsyncGenerators:
+    def test_prefetch_and_generate(self, zipped_model_config):
+        async def run():
+            async with AsyncGenerators(
+                generators=Generators(
+                    config_manager=ConfigManager(config_dict=zipped_model_config)
+                )
+            ) as async_generators:
+                package_paths = await async_generators.aprefetch([ZIPPED_MODEL_ID])
+                assert package_paths[0].is_file()
+                results = await asyncio.gather(
+                    *[
+                        async_generators.agenerate(
+                            model_id=ZIPPED_MODEL_ID, num_samples=3, save_images=False
+                        )
+                        for _ in range(4)
+                    ]
+                )
+                assert len(async_generators.generators.model_executors) == 1
+                return results
+
+        results = asyncio.run(run())
+        assert [len(samples) for samples in results] == [3, 3, 3, 3]
+
+    def test_timeout(self, dummy_model_executor):
+        async def run():
+            async with AsyncGenerators(
+                generators=Generators(model_executors=[dummy_model_executor])
+            ) as async_generators:
+                samples = await async_generators.agenerate(
+                    model_id=DUMMY_MODEL_ID, num_samples=2, save_images=False
+                )
+                assert len(samples) == 2
+                with pytest.raises(asyncio.TimeoutError):
+                    await async_generators.agenerate(
+                        model_id=DUMMY_MODEL_ID,
+                        num_samples=2,
+                        save_images=False,
+                        timeout=0,
+                    )
+
+        asyncio.run(run())
+
+    def test_cancelled_download_is_removed(self, tmp_path):
+        (tmp_path / "package.zip").write_bytes(os.urandom(64 * 1024))
+        http_server = ThreadingHTTPServer(
+            ("127.0.0.1", 0),
+            functools.partial(SimpleHTTPRequestHandler, directory=str(tmp_path)),
+        )
+        threading.Thread(target=http_server.serve_forever, daemon=True).start()
+        cancel_event = threading.Event()
+        cancel_event.set()
+        target_path = tmp_path / "downloaded.zip"
+        try:
+            with pytest.raises(DownloadCancelledError):
+                Utils.download_file(
+                    download_link=f"http://127.0.0.1:{http_server.server_address[1]}/package.zip",
+                    path_as_string=target_path,
+                    cancel_event=cancel_event,
+                )
+        finally:
+            http_server.shutdown()
+            http_server.server_close()
+        assert not target_path.exists()
+
+    def test_close_cancels_queued_calls(self, dummy_model_executor):
+        is_released = threading.Event()
+
+        async def run():
+            async_generators = AsyncGenerators(
+                generators=Generators(model_executors=[dummy_model_executor])
+            )
+            tasks = [
+                asyncio.ensure_future(
+                    async_generators._run_in_executor(
+                        async_generators.executor, is_released.wait, timeout=10
+                    )
+                )
+                for _ in range(DEFAULT_ASYNC_COMPUTE_WORKERS + 1)
+            ]
+            await asyncio.sleep(0.1)
+            async_generators.close()
+            is_released.set()
+            return await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = asyncio.run(run())
+        # The running calls finish, while the queued call is cancelled.
+        assert results[:-1] == [True] * DEFAULT_ASYNC_COMPUTE_WORKERS
+        assert isinstance(results[-1], asyncio.CancelledError)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the automatic tuning and caching of the batch size of models' generate calls. """
+# run with python -m pytest tests/test_batch_size_tuner.py
+
+import json
+import os
+import time
+
+import pytest
+
+from src.medigan.execute_model.batch_size_tuner import BatchSizeTuner
+
+from .conftest import DUMMY_MODEL_ID
+
+
+def _fake_generate_function(max_batch_size: int, overhead: float, calls: list):
+    """Return a generate function with a fixed overhead per call that runs out of memory above `max_batch_size`."""
+
+    def generate_function(num_samples: int):
+        calls.append(num_samples)
+        if num_samples > max_batch_size:
+            raise RuntimeError("CUDA out of memory. Tried to allocate 2.00 GiB")
+        time.sleep(overhead + 0.0001 * num_samples)
+        return [None] * num_samples
+
+    return generate_function
+
+
+class TestBatchSizeTuner:
+    def test_tune_stops_at_out_of_memory(self):
+        calls = []
+        batch_size_tuner = BatchSizeTuner(cache_path=None, max_batch_size=64)
+        batch_size, probes = batch_size_tuner.tune(
+            _fake_generate_function(max_batch_size=16, overhead=0.01, calls=calls),
+            device="cpu",
+        )
+        assert batch_size == 16
+        assert [probe["batch_size"] for probe in probes] == [1, 2, 4, 8, 16]
+        assert calls == [1, 1, 2, 4, 8, 16, 32]
+
+    def test_tune_stops_without_speedup(self):
+        calls = []
+        batch_size_tuner = BatchSizeTuner(cache_path=None, max_batch_size=256)
+        # Without overhead per call, larger batch sizes do not increase the throughput.
+        batch_size, probes = batch_size_tuner.tune(
+            _fake_generate_function(max_batch_size=256, overhead=0.0, calls=calls),
+            device="cpu",
+        )
+        assert len(probes) < 9
+        assert batch_size in [probe["batch_size"] for probe in probes]
+
+    @pytest.mark.skipif(
+        not os.path.isfile("/proc/self/clear_refs"),
+        reason="The peak resident set size can only be reset on Linux.",
+    )
+    def test_peak_memory_is_measured_per_probe(self):
+        import numpy as np
+
+        def generate_function(num_samples: int):
+            if num_samples == 4:
+                # Allocate and touch 200 MB, which are freed before the next probe.
+                np.ones(25_000_000).sum()
+            time.sleep(0.01)
+            return [None] * num_samples
+
+        _, probes = BatchSizeTuner(cache_path=None, max_batch_size=8).tune(
+            generate_function, device="cpu"
+        )
+        peak_memory_mb = {
+            probe["batch_size"]: probe["peak_memory_mb"] for probe in probes
+        }
+        assert peak_memory_mb[4] > peak_memory_mb[2] + 150
+        assert peak_memory_mb[8] < peak_memory_mb[4] - 150
+
+    def test_non_memory_errors_are_raised(self):
+        def failing_generate_function(num_samples: int):
+            raise ValueError("Not a memory error")
+
+        with pytest.raises(ValueError):
+            BatchSizeTuner(cache_path=None).tune(failing_generate_function)
+
+    def test_auto_batch_size_is_cached(self, dummy_model_executor, tmp_path):
+        cache_path = str(tmp_path / "batch_size_cache.json")
+        dummy_model_executor.batch_size_tuner = BatchSizeTuner(
+            cache_path=cache_path, max_batch_size=8
+        )
+        dummy_model_executor.generate(
+            num_samples=10,
+            output_path=str(tmp_path / "output"),
+            batch_size="auto",
+        )
+        assert len(os.listdir(str(tmp_path / "output"))) == 10
+        with open(cache_path) as f:
+            cache = json.load(f)
+        cache_key = BatchSizeTuner.get_cache_key(
+            model_id=DUMMY_MODEL_ID,
+            image_size=16,
+            device=BatchSizeTuner.get_device(),
+        )
+        tuned_batch_size = cache[cache_key]["batch_size"]
+        assert 1 <= tuned_batch_size <= 8
+        # The second call uses the cached batch size instead of probing again.
+        cache[cache_key]["batch_size"] = 3
+        with open(cache_path, "w") as f:
+            json.dump(cache, f)
+        batches = list(
+            dummy_model_executor.generate_batches(num_samples=7, batch_size="auto")
+        )
+        assert [len(batch[0]) for batch in batches] == [3, 3, 1]
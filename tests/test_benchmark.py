@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the benchmark of the generation performance of models. """
+# run with python -m pytest tests/test_benchmark.py
+
+import json
+
+from src.medigan.benchmark import ModelBenchmark
+
+from .conftest import DUMMY_EXECUTION_CONFIG, DUMMY_MODEL_ID
+
+
+class TestModelBenchmark:
+    def test_benchmark_model(self, dummy_model_executor, tmp_path):
+        model_benchmark = ModelBenchmark(batch_sizes=[1, 4], num_batches=3)
+        results = model_benchmark.benchmark_model(
+            model_id=DUMMY_MODEL_ID, execution_config=DUMMY_EXECUTION_CONFIG
+        )
+        assert results["import_time"] >= 0 and results["time_to_first_sample"] > 0
+        assert set(results["batch_sizes"]) == {"1", "4"}
+        batch_size_results = results["batch_sizes"]["4"]
+        assert batch_size_results["samples_per_second"] > 0
+        assert (
+            batch_size_results["latency"]["min"]
+            <= batch_size_results["latency"]["p50"]
+            <= batch_size_results["latency"]["max"]
+        )
+        model_benchmark.save(str(tmp_path / "results.json"))
+        with open(str(tmp_path / "results.json")) as f:
+            saved_results = json.load(f)
+        assert saved_results["settings"]["batch_sizes"] == [1, 4]
+        assert DUMMY_MODEL_ID in saved_results["models"]
+        assert "python_version" in saved_results["environment"]
+
+    def test_peak_memory_is_measured_per_batch_size(self, dummy_model_executor):
+        results = ModelBenchmark(
+            batch_sizes=[8, 1], num_batches=1, num_warmup_batches=0
+        ).benchmark_model(
+            model_id=DUMMY_MODEL_ID,
+            execution_config=DUMMY_EXECUTION_CONFIG,
+            # 25 MB per sample
+            image_size=5000,
+        )
+        peak_rss_mb = {
+            batch_size: batch_size_results["peak_rss_mb"]
+            for batch_size, batch_size_results in results["batch_sizes"].items()
+        }
+        assert peak_rss_mb["1"] < peak_rss_mb["8"] - 100
+        assert results["peak_rss_mb"] >= peak_rss_mb["8"]
+
+    def test_failing_model_is_recorded(self):
+        model_benchmark = ModelBenchmark(batch_sizes=[1], num_batches=1)
+        results = model_benchmark.run(
+            model_ids=["not_a_model"], execution_config={"image_size": [16, 16]}
+        )
+        assert "error" in results["models"]["not_a_model"]
+
+    def test_compare(self):
+        results = {"models": {"a": {"batch_sizes": {"1": {"samples_per_second": 20}}}}}
+        baseline_results = {
+            "models": {
+                "a": {"batch_sizes": {"1": {"samples_per_second": 10}}},
+                "b": {"batch_sizes": {"1": {"samples_per_second": 10}}},
+            }
+        }
+        assert ModelBenchmark.compare(results, baseline_results) == {"a": {"1": 2.0}}
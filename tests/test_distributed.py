@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the distributed generation of one job by several ranks. """
+# run with python -m pytest tests/test_distributed.py
+
+import json
+import multiprocessing
+import os
+import socket
+
+import numpy as np
+import pytest
+
+from src.medigan.constants import GENERATION_MANIFEST_FILE_NAME
+from src.medigan.execute_model.distributed import (
+    get_job_header,
+    get_rank_and_world_size,
+    get_rank_batch_nums,
+    get_rank_output_path,
+    mark_rank_completed,
+    wait_for_ranks,
+)
+
+from .conftest import DUMMY_EXECUTION_CONFIG, DUMMY_MODEL_ID
+
+NUM_SAMPLES = 10
+BATCH_SIZE = 3
+SEED = 7
+
+
+def _generate_as_rank(rank: int, world_size: int, output_path: str, port: int):
+    """Generate the part of `rank` of the distributed job, as a process started e.g. by torchrun would do."""
+
+    from src.medigan.execute_model.model_executor import ModelExecutor
+
+    if port is None:
+        os.environ.update({"RANK": str(rank), "WORLD_SIZE": str(world_size)})
+    else:
+        import torch.distributed as dist
+
+        dist.init_process_group(
+            "gloo",
+            init_method=f"tcp://127.0.0.1:{port}",
+            rank=rank,
+            world_size=world_size,
+        )
+    ModelExecutor(
+        model_id=DUMMY_MODEL_ID,
+        execution_config=DUMMY_EXECUTION_CONFIG,
+        download_package=False,
+    ).generate(
+        num_samples=NUM_SAMPLES,
+        output_path=output_path,
+        batch_size=BATCH_SIZE,
+        seed=SEED,
+        is_distributed=True,
+    )
+    if port is not None:
+        dist.destroy_process_group()
+
+
+def _get_free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TestDistributed:
+    def test_sharding(self, monkeypatch):
+        for num_batches in [1, 4, 10]:
+            for world_size in [1, 3, 4]:
+                batch_nums = [
+                    batch_num
+                    for rank in range(world_size)
+                    for batch_num in get_rank_batch_nums(num_batches, rank, world_size)
+                ]
+                assert batch_nums == list(range(num_batches))
+        with pytest.raises(ValueError):
+            get_rank_batch_nums(4, rank=2, world_size=2)
+        monkeypatch.delenv("RANK", raising=False)
+        monkeypatch.delenv("SLURM_PROCID", raising=False)
+        assert get_rank_and_world_size() == (0, 1)
+        monkeypatch.setenv("RANK", "2")
+        monkeypatch.setenv("WORLD_SIZE", "4")
+        assert get_rank_and_world_size() == (2, 4)
+
+    @pytest.mark.parametrize("is_gloo", [False, True])
+    def test_distributed_generate(self, dummy_model_executor, tmp_path, is_gloo):
+        distributed_path = str(tmp_path / "distributed")
+        port = _get_free_port() if is_gloo else None
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(
+                target=_generate_as_rank, args=(rank, 2, distributed_path, port)
+            )
+            for rank in range(2)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=120)
+            assert process.exitcode == 0
+
+        with open(os.path.join(distributed_path, GENERATION_MANIFEST_FILE_NAME)) as f:
+            header, *entries = [json.loads(line) for line in f]
+        assert header["world_size"] == 2
+        assert [entry["batch"] for entry in entries] == [0, 1, 2, 3]
+        assert [entry["rank"] for entry in entries] == [0, 0, 1, 1]
+        assert sum(entry["num_samples"] for entry in entries) == NUM_SAMPLES
+
+        # The samples equal those of a single-process job with the same seed.
+        single_process_path = str(tmp_path / "single_process")
+        dummy_model_executor.generate(
+            num_samples=NUM_SAMPLES,
+            output_path=single_process_path,
+            batch_size=BATCH_SIZE,
+            seed=SEED,
+            is_resumable=True,
+        )
+        for entry in entries:
+            for file in entry["files"]:
+                np.testing.assert_array_equal(
+                    np.load(os.path.join(distributed_path, file["name"])),
+                    np.load(
+                        os.path.join(
+                            single_process_path, os.path.basename(file["name"])
+                        )
+                    ),
+                )
+
+    def test_distributed_generate_needs_seed(self, dummy_model_executor, tmp_path):
+        with pytest.raises(ValueError):
+            dummy_model_executor.generate(
+                num_samples=2, output_path=str(tmp_path), is_distributed=True
+            )
+
+    def test_completion_of_earlier_job_is_ignored(
+        self, dummy_model_executor, tmp_path, monkeypatch
+    ):
+        job_header = get_job_header(
+            num_samples=NUM_SAMPLES, batch_size=BATCH_SIZE, seed=SEED, world_size=2
+        )
+        rank_output_path = get_rank_output_path(output_path=str(tmp_path), rank=1)
+        os.makedirs(rank_output_path)
+        mark_rank_completed(
+            rank_output_path=rank_output_path,
+            job_header=dict(job_header, num_samples=4),
+            num_batches=1,
+            num_samples=2,
+        )
+        monkeypatch.setenv("RANK", "0")
+        monkeypatch.setenv("WORLD_SIZE", "2")
+        with pytest.raises(TimeoutError, match=r"\[1\]"):
+            dummy_model_executor.generate(
+                num_samples=NUM_SAMPLES,
+                output_path=str(tmp_path),
+                batch_size=BATCH_SIZE,
+                seed=SEED,
+                is_distributed=True,
+                distributed_timeout=0.5,
+            )
+        assert not os.path.isfile(os.path.join(tmp_path, GENERATION_MANIFEST_FILE_NAME))
+
+        mark_rank_completed(
+            rank_output_path=rank_output_path,
+            job_header=job_header,
+            num_batches=2,
+            num_samples=5,
+        )
+        wait_for_ranks(output_path=str(tmp_path), job_header=job_header, timeout=0)
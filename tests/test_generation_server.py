@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the local generation server and its dynamic batching of concurrent requests. """
+# run with python -m pytest tests/test_generation_server.py
+
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.medigan.__main__ import parse_args
+from src.medigan.generation_server import (
+    DynamicBatcher,
+    GenerationClient,
+    GenerationServer,
+)
+from src.medigan.generators import Generators
+
+from .conftest import DUMMY_MODEL_ID
+
+
+class TestGenerationServer:
+    def test_concurrent_requests_are_batched(self, dummy_model_executor):
+        batcher = DynamicBatcher(
+            model_executor=dummy_model_executor,
+            max_batch_size=8,
+            max_wait_seconds=0.5,
+        )
+        futures = [batcher.submit(num_samples=2) for _ in range(4)]
+        other_future = batcher.submit(num_samples=1, with_masks=True)
+        results = [future.result(timeout=10) for future in futures]
+        other_result = other_future.result(timeout=10)
+        batcher.close()
+        assert [len(result["samples"]) for result in results] == [2, 2, 2, 2]
+        assert results[0]["masks"] is None
+        assert len(other_result["samples"]) == 1
+        assert len(other_result["masks"]) == 1
+        # The four requests with the same kwargs are coalesced into one generate call.
+        assert dummy_model_executor._num_generate_calls == 2
+
+    def test_failures_are_returned_to_each_request(self, dummy_model_executor):
+        batcher = DynamicBatcher(
+            model_executor=dummy_model_executor, max_wait_seconds=0.2
+        )
+        futures = [
+            batcher.submit(num_samples=1, fail_on_call={"fail_at": 1}) for _ in range(2)
+        ]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="Dummy model failure"):
+                future.result(timeout=10)
+        assert len(batcher.submit(num_samples=3).result(timeout=10)["samples"]) == 3
+        batcher.close()
+        with pytest.raises(RuntimeError):
+            batcher.submit(num_samples=1)
+
+    def test_missing_samples_fail_their_requests(self, dummy_model_executor):
+        batcher = DynamicBatcher(
+            model_executor=dummy_model_executor, max_wait_seconds=0.5
+        )
+        # The dummy model returns one sample per latent vector, i.e. 3 instead of 4 samples.
+        futures = [
+            batcher.submit(
+                num_samples=2,
+                input_latent_vector=[[0.1], [0.2], [0.3]],
+                is_batched_dict=True,
+            )
+            for _ in range(2)
+        ]
+        assert len(futures[0].result(timeout=10)["samples"]) == 2
+        with pytest.raises(RuntimeError, match="returned 3 instead of 4 samples"):
+            futures[1].result(timeout=10)
+        batcher.close()
+
+    def test_outputs_are_sent_without_pickling(self):
+        samples = np.zeros((3, 4, 4, 1), dtype=np.uint8)
+        labels = [{"class": 1}, ["a", "b"], 2]
+        with np.load(
+            io.BytesIO(
+                GenerationServer.to_npz_bytes({"samples": samples, "labels": labels})
+            )
+        ) as npz_file:
+            assert npz_file["samples"].shape == (3, 4, 4, 1)
+            assert list(npz_file["labels"]) == [str(label) for label in labels]
+        with pytest.raises(ValueError, match="without pickling"):
+            GenerationServer.to_npz_bytes(
+                {"samples": [np.zeros((4, 4)), np.zeros((8, 8))]}
+            )
+
+    def test_http_server(self, dummy_model_executor):
+        server = GenerationServer(
+            generators=Generators(model_executors=[dummy_model_executor]),
+            max_wait_seconds=0.2,
+        )
+        http_server = server.start(port=0)
+        try:
+            client = GenerationClient(
+                url=f"http://127.0.0.1:{http_server.server_address[1]}"
+            )
+            with ThreadPoolExecutor(max_workers=6) as executor:
+                results = list(
+                    executor.map(
+                        lambda _: client.generate(
+                            model_id=DUMMY_MODEL_ID, num_samples=2, with_masks=True
+                        ),
+                        range(6),
+                    )
+                )
+            for result in results:
+                assert result["samples"].shape == (2, 16, 16, 1)
+                assert result["masks"].shape == (2, 16, 16, 1)
+                assert list(result["labels"]) == ["dummy", "dummy"]
+            assert dummy_model_executor._num_generate_calls < 6
+            with pytest.raises(RuntimeError, match="500"):
+                client.generate(model_id=DUMMY_MODEL_ID, unknown_argument=1)
+            with pytest.raises(RuntimeError, match="400"):
+                client.generate(model_id=DUMMY_MODEL_ID, num_samples=0)
+        finally:
+            server.stop()
+
+    def test_cold_model_does_not_block_warm_models(self, dummy_model_executor):
+        generators = Generators(model_executors=[dummy_model_executor])
+        server = GenerationServer(generators=generators, max_wait_seconds=0.01)
+        server.get_batcher(DUMMY_MODEL_ID)
+        is_import_started, is_import_released = threading.Event(), threading.Event()
+        get_model_executor = generators.get_model_executor
+
+        def slow_get_model_executor(model_id, install_dependencies=False):
+            if model_id == "cold_model":
+                is_import_started.set()
+                is_import_released.wait(timeout=30)
+                model_id = DUMMY_MODEL_ID
+            return get_model_executor(model_id, install_dependencies)
+
+        generators.get_model_executor = slow_get_model_executor
+        try:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                cold_result = executor.submit(
+                    server.generate, model_id="cold_model", num_samples=1
+                )
+                assert is_import_started.wait(timeout=10)
+                warm_result = executor.submit(
+                    server.generate, model_id=DUMMY_MODEL_ID, num_samples=2
+                )
+                # The warm model is served while the cold model is still imported.
+                assert len(warm_result.result(timeout=10)["samples"]) == 2
+                assert not cold_result.done()
+                is_import_released.set()
+                assert len(cold_result.result(timeout=10)["samples"]) == 1
+        finally:
+            is_import_released.set()
+            server.stop()
+
+    def test_parse_args(self):
+        args = parse_args(["serve", "--model_ids", "00001", "--max_wait_ms", "5"])
+        assert args.command == "serve"
+        assert args.model_ids == ["00001"]
+        assert args.max_wait_ms == 5
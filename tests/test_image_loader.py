@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the parallel, batched loading of image folders. """
+# run with python -m pytest tests/test_image_loader.py
+
+import os
+
+import numpy as np
+import pytest
+
+from src.medigan.image_loader import ImageLoader
+
+
+@pytest.fixture()
+def image_folder(tmp_path):
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    for i in range(10):
+        image = rng.integers(0, 256, (20 + i, 24, 3), dtype=np.uint8)
+        Image.fromarray(image).save(str(tmp_path / f"{i}.png"))
+    np.save(str(tmp_path / "10.npy"), rng.integers(0, 256, (16, 16), dtype=np.uint8))
+    open(str(tmp_path / "notes.txt"), "w").close()
+    return str(tmp_path)
+
+
+class TestImageLoader:
+    @pytest.mark.parametrize("num_workers", [0, 4])
+    def test_batches(self, image_folder, num_workers):
+        image_loader = ImageLoader(
+            path=image_folder, image_size=32, batch_size=4, num_workers=num_workers
+        )
+        batches = list(image_loader)
+        assert len(image_loader) == len(batches) == 3
+        assert [len(batch) for batch in batches] == [4, 4, 3]
+        assert all(batch.shape[1:] == (32, 32, 3) for batch in batches)
+        assert all(batch.dtype == np.uint8 for batch in batches)
+
+    def test_parallel_and_sequential_loading_are_equal(self, image_folder):
+        sequential_batches = list(
+            ImageLoader(path=image_folder, image_size=32, batch_size=4, num_workers=0)
+        )
+        parallel_batches = list(
+            ImageLoader(path=image_folder, image_size=32, batch_size=4, num_workers=4)
+        )
+        for sequential_batch, parallel_batch in zip(
+            sequential_batches, parallel_batches
+        ):
+            assert np.array_equal(sequential_batch, parallel_batch)
+
+    def test_decoding_errors_are_raised(self, image_folder):
+        with open(os.path.join(image_folder, "broken.png"), "w") as f:
+            f.write("not an image")
+        with pytest.raises(Exception):
+            list(ImageLoader(path=image_folder, image_size=32, num_workers=4))
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the priority queue of generation jobs and its workers. """
+# run with python -m pytest tests/test_jobs.py
+
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src.medigan.__main__ import main
+from src.medigan.execute_model.distributed import get_rank_output_path
+from src.medigan.execute_model.generation_manifest import GenerationManifest
+from src.medigan.generators import Generators
+from src.medigan.jobs import (
+    JOB_STATUS_CANCELLED,
+    JOB_STATUS_COMPLETED,
+    JOB_STATUS_FAILED,
+    JOB_STATUS_PENDING,
+    JOB_STATUS_RUNNING,
+    JobQueue,
+    JobWorker,
+    get_num_completed_samples,
+)
+
+from .conftest import DUMMY_MODEL_ID
+
+
+class TestJobs:
+    def test_claim_order(self, tmp_path):
+        job_queue = JobQueue(tmp_path / "jobs.sqlite3")
+        job_a = job_queue.submit(model_id="a", num_samples=1)
+        job_b = job_queue.submit(model_id="b", num_samples=1)
+        job_c = job_queue.submit(model_id="a", num_samples=1)
+        job_d = job_queue.submit(model_id="b", num_samples=1, priority=5)
+        assert len(job_queue) == 4
+        assert job_queue.cancel(job_a)
+        job_e = job_queue.submit(model_id="a", num_samples=1)
+        # The highest priority first, then the jobs of the previous job's model, then the oldest jobs.
+        job_ids = []
+        model_id = None
+        while True:
+            job = job_queue.claim(worker_id="worker", preferred_model_id=model_id)
+            if job is None:
+                break
+            assert job["status"] == JOB_STATUS_RUNNING
+            assert job["attempts"] == 1
+            job_ids.append(job["job_id"])
+            model_id = job["model_id"]
+        assert job_ids == [job_d, job_b, job_c, job_e]
+        assert not job_queue.cancel(job_c)
+        assert job_queue.get_job(job_a)["status"] == JOB_STATUS_CANCELLED
+        with pytest.raises(ValueError):
+            job_queue.submit(model_id="a", num_samples=1, save_images=False)
+
+    def test_stale_jobs(self, tmp_path):
+        job_queue = JobQueue(tmp_path / "jobs.sqlite3")
+        job_id = job_queue.submit(model_id="a", num_samples=1, max_attempts=2)
+        job_queue.claim(worker_id="lost_worker")
+        time.sleep(0.01)
+        assert job_queue.requeue_stale_jobs(stale_seconds=0) == 1
+        job = job_queue.claim(worker_id="worker")
+        assert job["job_id"] == job_id and job["attempts"] == 2
+        # The lost worker can no longer report the job.
+        assert not job_queue.complete(
+            job_id=job_id, worker_id="lost_worker", num_completed_samples=1
+        )
+        time.sleep(0.01)
+        job_queue.requeue_stale_jobs(stale_seconds=0)
+        assert job_queue.get_job(job_id)["status"] == JOB_STATUS_FAILED
+
+    def test_worker(self, dummy_model_executor, tmp_path):
+        job_queue = JobQueue(tmp_path / "jobs.sqlite3")
+        completed_job = job_queue.submit(
+            model_id=DUMMY_MODEL_ID,
+            num_samples=5,
+            output_path=str(tmp_path / "completed"),
+            batch_size=2,
+        )
+        # Fails in the third batch of the first attempt and resumes from it in the second attempt.
+        retried_job = job_queue.submit(
+            model_id=DUMMY_MODEL_ID,
+            num_samples=3,
+            output_path=str(tmp_path / "retried"),
+            batch_size=1,
+            seed=3,
+            fail_on_call={"fail_at": 3},
+        )
+        failed_job = job_queue.submit(
+            model_id=DUMMY_MODEL_ID,
+            num_samples=2,
+            max_attempts=2,
+            output_path=str(tmp_path / "failed"),
+            fail_on_call={"fail_at": 1},
+        )
+        worker = JobWorker(
+            job_queue=job_queue,
+            generators=Generators(model_executors=[dummy_model_executor]),
+            heartbeat_seconds=0.01,
+        )
+        assert worker.run() == 5
+
+        job = job_queue.get_job(completed_job)
+        assert job["status"] == JOB_STATUS_COMPLETED
+        assert job["num_completed_samples"] == 5
+        assert (
+            len(
+                [
+                    name
+                    for name in os.listdir(job["output_path"])
+                    if name.endswith(".npy")
+                ]
+            )
+            == 5
+        )
+        job = job_queue.get_job(retried_job)
+        assert job["status"] == JOB_STATUS_COMPLETED
+        assert job["attempts"] == 2
+        assert job["num_completed_samples"] == 3
+        job = job_queue.get_job(failed_job)
+        assert job["status"] == JOB_STATUS_FAILED
+        assert job["attempts"] == 2
+        assert "Dummy model failure" in job["error"]
+        assert job_queue.get_progress() == {
+            "jobs": {JOB_STATUS_COMPLETED: 2, JOB_STATUS_FAILED: 1},
+            "num_samples": 10,
+            "num_completed_samples": 8,
+        }
+
+    def test_heartbeat_survives_database_errors(
+        self, dummy_model_executor, tmp_path, monkeypatch
+    ):
+        job_queue = JobQueue(tmp_path / "jobs.sqlite3")
+        job_queue.submit(
+            model_id=DUMMY_MODEL_ID, num_samples=1, output_path=str(tmp_path / "job")
+        )
+        worker = JobWorker(
+            job_queue=job_queue,
+            generators=Generators(model_executors=[dummy_model_executor]),
+            heartbeat_seconds=0.01,
+        )
+        reports = []
+
+        def report_progress(**kwargs):
+            reports.append(kwargs)
+            if len(reports) == 1:
+                raise sqlite3.OperationalError("database is locked")
+            return True
+
+        monkeypatch.setattr(job_queue, "report_progress", report_progress)
+        is_done = threading.Event()
+        heartbeat_thread = threading.Thread(
+            target=worker._report_progress,
+            args=(
+                job_queue.claim(worker_id=worker.worker_id),
+                is_done,
+                threading.Event(),
+            ),
+        )
+        heartbeat_thread.start()
+        deadline = time.time() + 10
+        while len(reports) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        is_done.set()
+        heartbeat_thread.join()
+        assert len(reports) >= 2
+
+    def test_worker_stops_lost_job(self, dummy_model_executor, tmp_path, monkeypatch):
+        job_queue = JobQueue(tmp_path / "jobs.sqlite3")
+        job_id = job_queue.submit(
+            model_id=DUMMY_MODEL_ID,
+            num_samples=4,
+            output_path=str(tmp_path / "job"),
+            batch_size=1,
+        )
+        worker = JobWorker(
+            job_queue=job_queue,
+            generators=Generators(model_executors=[dummy_model_executor]),
+            heartbeat_seconds=0.01,
+        )
+        job = job_queue.claim(worker_id=worker.worker_id)
+        time.sleep(0.01)
+        job_queue.requeue_stale_jobs(stale_seconds=0)
+        assert job_queue.claim(worker_id="other_worker")["job_id"] == job_id
+        check_aborted = dummy_model_executor._check_aborted
+
+        def wait_for_heartbeat_and_check_aborted(abort_event, output_path):
+            if abort_event is not None:
+                abort_event.wait(10)
+            check_aborted(abort_event=abort_event, output_path=output_path)
+
+        monkeypatch.setattr(
+            dummy_model_executor,
+            "_check_aborted",
+            wait_for_heartbeat_and_check_aborted,
+        )
+        assert not worker.run_job(job)
+        assert not [
+            name for name in os.listdir(job["output_path"]) if name.endswith(".npy")
+        ]
+        job = job_queue.get_job(job_id)
+        assert job["status"] == JOB_STATUS_RUNNING
+        assert job["worker_id"] == "other_worker"
+
+    def test_num_completed_samples_of_distributed_job(self, tmp_path):
+        for rank, num_samples in [(0, 3), (1, 2)]:
+            rank_output_path = get_rank_output_path(
+                output_path=str(tmp_path), rank=rank
+            )
+            os.makedirs(rank_output_path)
+            GenerationManifest(
+                output_path=rank_output_path,
+                model_id=DUMMY_MODEL_ID,
+                num_samples=5,
+                batch_size=3,
+                seed=1,
+            ).add_batch(batch_num=rank, num_samples=num_samples, filenames=[])
+        os.makedirs(get_rank_output_path(output_path=str(tmp_path), rank=2))
+        assert get_num_completed_samples(str(tmp_path), is_distributed=True) == 5
+        assert get_num_completed_samples(str(tmp_path)) == 0
+        assert (
+            get_num_completed_samples(str(tmp_path / "missing"), is_distributed=True)
+            == 0
+        )
+
+    def test_command_line(self, tmp_path, capsys):
+        database_path = str(tmp_path / "jobs.sqlite3")
+        main(
+            [
+                "jobs",
+                "--database",
+                database_path,
+                "submit",
+                "some_model",
+                "10",
+                "--priority",
+                "2",
+                "--kwargs",
+                '{"batch_size": 4}',
+            ]
+        )
+        job_id = int(capsys.readouterr().out)
+        job = JobQueue(database_path).get_job(job_id)
+        assert job["status"] == JOB_STATUS_PENDING
+        assert job["priority"] == 2
+        assert job["kwargs"] == {"batch_size": 4}
+        main(["jobs", "--database", database_path, "status"])
+        assert "some_model" in capsys.readouterr().out
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the batched latent space exploration of a model. """
+# run with python -m pytest tests/test_latent_explorer.py
+
+import numpy as np
+import pytest
+
+from src.medigan.latent_explorer import LatentExplorer
+
+
+@pytest.fixture()
+def latent_explorer(dummy_model_executor):
+    latent_explorer = LatentExplorer(
+        model_executor=dummy_model_executor, max_batch_size=100
+    )
+    calls = []
+    gen_function = latent_explorer.gen_function
+
+    def counting_gen_function(**kwargs):
+        calls.append(len(kwargs["input_latent_vector"]))
+        return gen_function(**kwargs)
+
+    latent_explorer.gen_function = counting_gen_function
+    latent_explorer.calls = calls
+    return latent_explorer
+
+
+class TestLatentExplorer:
+    def test_interpolate(self):
+        z_start, z_end = np.zeros(8), np.ones(8)
+        latents = LatentExplorer.interpolate(z_start, z_end, num_steps=5)
+        assert latents.shape == (5, 8)
+        assert np.allclose(latents[0], z_start) and np.allclose(latents[-1], z_end)
+        z_start, z_end = np.eye(8)[0], np.eye(8)[1]
+        latents = LatentExplorer.interpolate(z_start, z_end, 5, method="slerp")
+        assert np.allclose(np.linalg.norm(latents, axis=1), 1.0, atol=1e-5)
+        assert np.allclose(latents[-1], z_end, atol=1e-6)
+
+    def test_interpolation_grid(self):
+        corners = np.stack([np.full(8, value) for value in [0.0, 1.0, 2.0, 3.0]])
+        latents = LatentExplorer.interpolation_grid(corners, num_rows=3, num_cols=4)
+        assert latents.shape == (12, 8)
+        assert np.allclose(latents[[0, 3, 8, 11], 0], [0.0, 1.0, 2.0, 3.0])
+
+    def test_explore_interpolation_grid_in_batched_calls(self, latent_explorer):
+        grid = latent_explorer.explore_interpolation_grid(
+            num_rows=16, num_cols=16, padding=1, seed=0
+        )
+        # 256 latent vectors are generated in chunks of at most 100 vectors.
+        assert latent_explorer.calls == [100, 100, 56]
+        assert grid.shape == (16 * 17 - 1, 16 * 17 - 1, 1)
+
+    def test_grid_sweep_and_neighbourhood(self, latent_explorer):
+        latents = latent_explorer.grid_sweep(num_rows=2, num_cols=3)
+        assert latents.shape == (6, 8)
+        assert np.allclose(latents[:, 0], [-3, -3, -3, 3, 3, 3])
+        z = latent_explorer.sample_latent_vectors(num_samples=1, seed=0)[0]
+        latents = latent_explorer.neighbourhood(z, num_samples=10, seed=0)
+        assert np.allclose(latents[0], z)
+        images = latent_explorer.generate_from_latents(latents)
+        assert images.shape == (10, 16, 16, 1)
+        assert latent_explorer.calls == [10]
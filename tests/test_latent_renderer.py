@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the headless rendering of latent space traversals. """
+# run with python -m pytest tests/test_latent_renderer.py
+
+import numpy as np
+import pytest
+
+from src.medigan.latent_explorer import LatentExplorer
+from src.medigan.latent_renderer import LatentTraversalRenderer
+
+
+@pytest.fixture()
+def renderer(dummy_model_executor):
+    latent_explorer = LatentExplorer(
+        model_executor=dummy_model_executor, max_batch_size=8
+    )
+    return LatentTraversalRenderer(latent_explorer=latent_explorer, frame_buffer_size=4)
+
+
+class TestLatentTraversalRenderer:
+    def test_traversal_path(self, renderer):
+        latents = renderer.get_traversal_path(
+            num_keyframes=3, frames_per_transition=5, seed=0
+        )
+        assert latents.shape == (15, 8)
+        latents = renderer.get_traversal_path(
+            num_keyframes=3, frames_per_transition=5, is_loop=False, seed=0
+        )
+        assert latents.shape == (11, 8)
+
+    def test_render_tiled_png(self, renderer, tmp_path):
+        from PIL import Image
+
+        output_path = renderer.render(
+            output_path=str(tmp_path / "traversal.png"),
+            latents=np.zeros((10, 8)),
+            num_cols=5,
+            padding=1,
+        )
+        assert np.asarray(Image.open(output_path)).shape == (2 * 17 - 1, 5 * 17 - 1)
+
+    @pytest.mark.parametrize("extension", ["gif", "mp4"])
+    def test_render_video(self, renderer, tmp_path, extension):
+        imageio = pytest.importorskip("imageio")
+        if extension == "mp4":
+            pytest.importorskip("imageio_ffmpeg")
+        output_path = renderer.render(
+            output_path=str(tmp_path / f"traversal.{extension}"),
+            latents=renderer.get_traversal_path(frames_per_transition=5, seed=0),
+        )
+        assert len(imageio.v2.mimread(output_path)) == 20
+
+    @pytest.mark.parametrize("extension", ["png", "gif"])
+    def test_failed_render_leaves_no_output(self, renderer, tmp_path, extension):
+        if extension == "gif":
+            pytest.importorskip("imageio")
+        output_path = tmp_path / f"traversal.{extension}"
+        with pytest.raises(RuntimeError, match="Dummy model failure"):
+            renderer.render(
+                output_path=str(output_path),
+                latents=np.zeros((20, 8)),
+                fail_on_call={"fail_at": 2},
+            )
+        assert not output_path.exists()
+
+    def test_conditions_require_conditional_model(self, renderer, tmp_path):
+        with pytest.raises(ValueError):
+            renderer.render(
+                output_path=str(tmp_path / "traversal.png"),
+                latents=np.zeros((4, 8)),
+                conditions=1,
+            )
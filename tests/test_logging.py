@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test that logging neither formats nor stringifies generated image arrays. """
+# run with python -m pytest tests/test_logging.py
+
+import logging
+
+import numpy as np
+import pytest
+
+from src.medigan.utils import ArraySummary, Utils
+
+from .conftest import DUMMY_MODEL_ID
+
+
+class ReprCountingArray(np.ndarray):
+    """Array that counts how often it is converted to a string."""
+
+    num_repr_calls = 0
+
+    def __repr__(self):
+        ReprCountingArray.num_repr_calls += 1
+        return super().__repr__()
+
+    def __str__(self):
+        ReprCountingArray.num_repr_calls += 1
+        return super().__str__()
+
+
+@pytest.fixture()
+def counting_model_executor(dummy_model_executor, monkeypatch):
+    """The dummy model executor whose model returns `ReprCountingArray` images."""
+
+    generate = dummy_model_executor.deserialized_model_as_lib.generate
+
+    def counting_generate(**kwargs):
+        data = generate(**kwargs)
+        if data is None:
+            return None
+        return [image.view(ReprCountingArray) for image in data]
+
+    monkeypatch.setattr(
+        dummy_model_executor.deserialized_model_as_lib, "generate", counting_generate
+    )
+    ReprCountingArray.num_repr_calls = 0
+    return dummy_model_executor
+
+
+class TestLogging:
+    def test_array_summary(self):
+        images = [np.zeros((4, 4, 1), dtype=np.uint8)] * 5
+        summary = str(ArraySummary({"samples": images, "labels": None}))
+        assert "ndarray(shape=(4, 4, 1), dtype=uint8)" in summary
+        assert "list(len=5" in summary and "..." in summary
+        assert "'labels': None" in summary
+
+    @pytest.mark.parametrize("level", [logging.INFO, logging.DEBUG])
+    def test_no_array_repr_while_logging(self, counting_model_executor, caplog, level):
+        from src.medigan.generators import Generators
+
+        caplog.set_level(level)
+        generators = Generators(model_executors=[counting_model_executor])
+        dataset = generators.get_as_torch_dataset(
+            model_id=DUMMY_MODEL_ID, num_samples=4
+        )
+        assert len(dataset) == 4
+        data = counting_model_executor.generate(
+            num_samples=3, save_images=False, input_latent_vector=None
+        )
+        Utils.split_images_masks_and_labels(data=data, num_samples=3)
+        Utils.split_images_and_masks_no_ordering(data=data, num_samples=3)
+        assert ReprCountingArray.num_repr_calls == 0
+        if level == logging.DEBUG:
+            assert "ReprCountingArray(shape=(16, 16, 1), dtype=uint8)" in caplog.text
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the Prometheus-style metrics of generation workers. """
+# run with python -m pytest tests/test_metrics.py
+
+import urllib.request
+
+import pytest
+
+from src.medigan.metrics import (
+    DATASET_ITEMS,
+    GENERATE_CALL_DURATION,
+    GENERATE_FAILURES,
+    SAMPLES_GENERATED,
+    MetricsRegistry,
+    get_registry,
+)
+
+from .conftest import DUMMY_MODEL_ID
+
+
+class TestMetrics:
+    def test_counter_and_histogram(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests", ["model_id"])
+        counter.inc(model_id="a")
+        counter.inc(2, model_id="a")
+        assert registry.counter("requests_total", "Requests", ["model_id"]) is counter
+        assert counter.get(model_id="a") == 3
+        with pytest.raises(ValueError):
+            counter.inc(-1, model_id="a")
+        with pytest.raises(ValueError):
+            counter.inc(wrong_label="a")
+        histogram = registry.histogram("latency_seconds", "Latency", buckets=[0.1, 1])
+        for value in [0.05, 0.5, 0.5, 5]:
+            histogram.observe(value)
+        assert histogram.get() == {
+            "buckets": {0.1: 1, 1: 3, float("inf"): 4},
+            "sum": 6.05,
+            "count": 4,
+        }
+        text = registry.expose()
+        assert "# TYPE requests_total counter" in text
+        assert 'requests_total{model_id="a"} 3.0' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in text
+        assert "latency_seconds_count 4" in text
+
+    def test_generation_updates_metrics(self, dummy_model_executor, tmp_path):
+        from src.medigan.generators import Generators
+
+        get_registry().clear()
+        dummy_model_executor.generate(
+            num_samples=5, output_path=str(tmp_path), batch_size=2
+        )
+        assert SAMPLES_GENERATED.get(model_id=DUMMY_MODEL_ID) == 5
+        assert GENERATE_CALL_DURATION.get(model_id=DUMMY_MODEL_ID)["count"] == 3
+        with pytest.raises(RuntimeError):
+            dummy_model_executor.generate(
+                num_samples=1,
+                save_images=False,
+                fail_on_call={"fail_at": 1},
+            )
+        assert GENERATE_FAILURES.get(model_id=DUMMY_MODEL_ID) == 1
+        # The model returns one sample per latent vector, i.e. fewer than requested.
+        dummy_model_executor.generate(
+            num_samples=4,
+            save_images=False,
+            input_latent_vector=[[0.1], [0.2]],
+            is_batched_dict=True,
+        )
+        assert SAMPLES_GENERATED.get(model_id=DUMMY_MODEL_ID) == 7
+        dataset = Generators(
+            model_executors=[dummy_model_executor]
+        ).get_as_torch_dataset(model_id=DUMMY_MODEL_ID, num_samples=3)
+        for i in range(len(dataset)):
+            dataset[i]
+        assert DATASET_ITEMS.get(dataset="SyntheticDataset") == 3
+
+    def test_http_endpoint(self):
+        registry = MetricsRegistry()
+        registry.counter("served_total", "Served").inc()
+        server = registry.start_http_server(port=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url) as response:
+                assert response.headers["Content-Type"].startswith("text/plain")
+                assert "served_total 1.0" in response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the streaming FID, KID, and manifold metric evaluation of image sets. """
+# run with python -m pytest tests/test_model_evaluator.py
+
+import os
+
+import numpy as np
+import pytest
+import torch
+
+from src.medigan.evaluate_model.distribution_metrics import (
+    frechet_distance,
+    kernel_inception_distance,
+)
+from src.medigan.evaluate_model.feature_extractors import FeatureExtractor
+from src.medigan.evaluate_model.feature_statistics import (
+    FeatureReservoir,
+    FeatureStatistics,
+)
+from src.medigan.evaluate_model.manifold_metrics import (
+    compute_nearest_neighbour_radii,
+    manifold_metrics,
+)
+from src.medigan.evaluate_model.model_evaluator import ModelEvaluator
+
+
+class TinyFeatureModel(torch.nn.Module):
+    """Returns 8 pooled features per image, standing in for a real feature extractor."""
+
+    def __init__(self):
+        super().__init__()
+        self.conv = torch.nn.Conv2d(3, 8, kernel_size=3)
+
+    def forward(self, x):
+        return torch.nn.functional.adaptive_avg_pool2d(self.conv(x), 1).flatten(1)
+
+
+@pytest.fixture()
+def feature_extractor(tmp_path):
+    torch.manual_seed(0)
+    weights_path = str(tmp_path / "tiny_feature_model.pt")
+    torch.jit.save(torch.jit.script(TinyFeatureModel()), weights_path)
+    return FeatureExtractor.from_torchscript(
+        weights_path=weights_path, image_size=32, device="cpu"
+    )
+
+
+def _write_images(path, num_images: int, brightness: int, seed: int):
+    rng = np.random.default_rng(seed)
+    os.makedirs(path)
+    for i in range(num_images):
+        image = np.clip(rng.normal(brightness, 30, (40, 40)), 0, 255).astype(np.uint8)
+        np.save(os.path.join(path, f"{i}.npy"), image)
+
+
+class TestModelEvaluator:
+    def test_streaming_statistics_match_numpy(self):
+        features = np.random.default_rng(0).normal(size=(1000, 16))
+        statistics = FeatureStatistics(num_features=16)
+        for batch in np.array_split(features, 7):
+            statistics.update(batch)
+        assert statistics.num_samples == 1000
+        assert np.allclose(statistics.mean, features.mean(axis=0))
+        assert np.allclose(statistics.covariance, np.cov(features, rowvar=False))
+
+    def test_save_and_load_statistics(self, tmp_path):
+        statistics = FeatureStatistics(num_features=4)
+        statistics.update(np.random.default_rng(0).normal(size=(10, 4)))
+        statistics.save(str(tmp_path / "statistics.npz"))
+        loaded_statistics = FeatureStatistics.load(str(tmp_path / "statistics.npz"))
+        assert loaded_statistics.num_samples == 10
+        assert np.allclose(loaded_statistics.covariance, statistics.covariance)
+
+    def test_frechet_distance(self):
+        rng = np.random.default_rng(0)
+        a, b = rng.normal(size=(2, 50, 6))
+        covariance_1, covariance_2 = np.cov(a, rowvar=False), np.cov(b, rowvar=False)
+        mean_1, mean_2 = a.mean(axis=0), b.mean(axis=0)
+        trace_sqrt_product = np.sqrt(
+            np.linalg.eigvals(covariance_1 @ covariance_2).real
+        ).sum()
+        expected = (
+            np.sum((mean_1 - mean_2) ** 2)
+            + np.trace(covariance_1 + covariance_2)
+            - 2 * trace_sqrt_product
+        )
+        distance = frechet_distance(mean_1, covariance_1, mean_2, covariance_2)
+        assert np.isclose(distance, expected)
+        assert np.isclose(
+            frechet_distance(mean_1, covariance_1, mean_1, covariance_1), 0, atol=1e-8
+        )
+
+    def test_reservoir_is_bounded_and_uniform(self):
+        counts = np.zeros(100)
+        for seed in range(200):
+            reservoir = FeatureReservoir(num_features=1, max_size=10, seed=seed)
+            for batch in np.array_split(np.arange(100, dtype=np.float32), 9):
+                reservoir.update(batch[:, None])
+            assert len(reservoir) == 10 and reservoir.num_seen == 100
+            counts[reservoir.features[:, 0].astype(int)] += 1
+        # Each of the 100 values is kept with probability 0.1, i.e. 20 times in 200 runs on average.
+        assert counts[:10].mean() < 35 and counts[-10:].mean() > 8
+
+    def test_unbounded_reservoir_keeps_all_features(self):
+        reservoir = FeatureReservoir(num_features=2, max_size=None)
+        for batch in np.array_split(np.arange(200, dtype=np.float32), 7):
+            reservoir.update(np.stack([batch, batch], axis=1))
+        assert len(reservoir) == reservoir.num_seen == 200
+        assert not reservoir.is_subsampled
+        assert np.array_equal(reservoir.features[:, 0], np.arange(200))
+        restored = FeatureReservoir.from_features(
+            reservoir.features, num_seen=200, max_size=-1
+        )
+        assert restored.max_size is None and len(restored) == 200
+
+    def test_kernel_inception_distance(self):
+        rng = np.random.default_rng(0)
+        features = rng.normal(size=(400, 8))
+        kid, _ = kernel_inception_distance(
+            features[:200], features[200:], subset_size=100, num_subsets=10, seed=0
+        )
+        shifted_kid, _ = kernel_inception_distance(
+            features[:200], features[200:] + 1, subset_size=100, num_subsets=10, seed=0
+        )
+        assert abs(kid) < 0.05 < shifted_kid
+
+    def test_blocked_radii_match_brute_force(self):
+        features = np.random.default_rng(0).normal(size=(100, 8)).astype(np.float32)
+        squared_distances = ((features[:, None] - features[None, :]) ** 2).sum(axis=2)
+        expected = np.sort(squared_distances, axis=1)[:, 3]
+        radii = compute_nearest_neighbour_radii(features, nearest_k=3, block_size=16)
+        assert np.allclose(radii, expected, atol=1e-4)
+
+    def test_manifold_metrics(self):
+        rng = np.random.default_rng(0)
+        real_features = rng.normal(size=(500, 4))
+        same_results = manifold_metrics(
+            real_features, rng.normal(size=(500, 4)), nearest_k=5, block_size=64
+        )
+        assert same_results["precision"] > 0.9 and same_results["recall"] > 0.9
+        assert 0.8 < same_results["density"] < 1.2
+        assert same_results["coverage"] > 0.9
+        # Mode collapse: all generated samples lie close to a single real sample.
+        collapsed_features = real_features[0] + 0.01 * rng.normal(size=(500, 4))
+        collapsed_results = manifold_metrics(
+            real_features, collapsed_features, nearest_k=5, block_size=64
+        )
+        assert collapsed_results["precision"] > 0.9
+        assert collapsed_results["recall"] < 0.1
+        assert collapsed_results["coverage"] < 0.1
+
+    def test_evaluate_image_folders(self, feature_extractor, tmp_path):
+        _write_images(str(tmp_path / "real"), num_images=30, brightness=100, seed=0)
+        _write_images(str(tmp_path / "same"), num_images=30, brightness=100, seed=1)
+        _write_images(str(tmp_path / "other"), num_images=30, brightness=200, seed=2)
+        model_evaluator = ModelEvaluator(
+            feature_extractor=feature_extractor,
+            batch_size=8,
+            seed=0,
+            reference_statistics_path=None,
+        )
+        same_results = model_evaluator.evaluate(
+            str(tmp_path / "real"), str(tmp_path / "same")
+        )
+        other_results = model_evaluator.evaluate(
+            str(tmp_path / "real"), str(tmp_path / "other")
+        )
+        assert same_results["num_samples_1"] == same_results["num_samples_2"] == 30
+        assert same_results["fid"] < other_results["fid"]
+        assert same_results["kid"] < other_results["kid"]
+        manifold_results = model_evaluator.evaluate(
+            str(tmp_path / "real"),
+            str(tmp_path / "same"),
+            metrics=["precision", "recall", "density", "coverage"],
+        )
+        assert "fid" not in manifold_results
+        assert 0 <= manifold_results["precision"] <= 1
+        assert 0 <= manifold_results["coverage"] <= 1
+
+    def test_manifold_metrics_are_not_subsampled(
+        self, feature_extractor, tmp_path, caplog
+    ):
+        _write_images(str(tmp_path / "real"), num_images=30, brightness=100, seed=0)
+        metrics = ["fid", "kid", "precision", "recall"]
+        model_evaluator = ModelEvaluator(
+            feature_extractor=feature_extractor,
+            batch_size=8,
+            max_kid_samples=10,
+            seed=0,
+            reference_statistics_path=None,
+        )
+        image_loader = model_evaluator.get_image_loader(str(tmp_path / "real"))
+        _, reservoir = model_evaluator.accumulate(image_loader, metrics=metrics)
+        assert len(reservoir) == 30
+        _, reservoir = model_evaluator.accumulate(image_loader, metrics=["kid"])
+        assert len(reservoir) == 10
+        model_evaluator.max_manifold_samples = 20
+        _, reservoir = model_evaluator.accumulate(image_loader, metrics=metrics)
+        assert len(reservoir) == 20
+        assert "random subset of 20 of the 30 feature vectors" in caplog.text
+
+    def test_reference_statistics_are_cached(self, feature_extractor, tmp_path):
+        _write_images(str(tmp_path / "real"), num_images=20, brightness=100, seed=0)
+        _write_images(str(tmp_path / "fake"), num_images=20, brightness=120, seed=1)
+        model_evaluator = ModelEvaluator(
+            feature_extractor=feature_extractor,
+            batch_size=8,
+            seed=0,
+            reference_statistics_path=str(tmp_path / "cache"),
+        )
+        extracted_batch_sizes = []
+        extract = feature_extractor.extract
+
+        def counting_extract(images):
+            extracted_batch_sizes.append(len(images))
+            return extract(images)
+
+        feature_extractor.extract = counting_extract
+        results = model_evaluator.evaluate(
+            str(tmp_path / "real"), str(tmp_path / "fake")
+        )
+        assert sum(extracted_batch_sizes) == 40
+        assert len(os.listdir(str(tmp_path / "cache"))) == 1
+        # The second evaluation only extracts the features of the synthetic images.
+        cached_results = model_evaluator.evaluate(
+            str(tmp_path / "real"), str(tmp_path / "fake")
+        )
+        assert sum(extracted_batch_sizes) == 60
+        assert np.isclose(cached_results["fid"], results["fid"])
+        assert np.isclose(cached_results["kid"], results["kid"])
+        # The manifold metrics use a reservoir of all reference features, which is cached separately.
+        manifold_results = model_evaluator.evaluate(
+            str(tmp_path / "real"), str(tmp_path / "fake"), metrics=["precision"]
+        )
+        cached_manifold_results = model_evaluator.evaluate(
+            str(tmp_path / "real"), str(tmp_path / "fake"), metrics=["precision"]
+        )
+        assert len(os.listdir(str(tmp_path / "cache"))) == 2
+        assert sum(extracted_batch_sizes) == 60 + 40 + 20
+        assert cached_manifold_results["precision"] == manifold_results["precision"]
+        # Changing the reference images invalidates the cached statistics.
+        _write_images(str(tmp_path / "real" / "new"), 1, brightness=100, seed=3)
+        os.replace(
+            str(tmp_path / "real" / "new" / "0.npy"), str(tmp_path / "real" / "20.npy")
+        )
+        model_evaluator.evaluate(str(tmp_path / "real"), str(tmp_path / "fake"))
+        assert sum(extracted_batch_sizes) == 120 + 21 + 20
+
+    def test_evaluate_generated_batches(
+        self, dummy_model_executor, feature_extractor, tmp_path
+    ):
+        from src.medigan.generators import Generators
+
+        from .conftest import DUMMY_MODEL_ID
+
+        _write_images(str(tmp_path / "real"), num_images=20, brightness=128, seed=0)
+        generators = Generators(model_executors=[dummy_model_executor])
+        results = generators.evaluate(
+            model_id=DUMMY_MODEL_ID,
+            reference_stats=str(tmp_path / "real"),
+            num_samples=20,
+            feature_extractor=feature_extractor,
+            batch_size=8,
+            seed=0,
+            reference_statistics_path=str(tmp_path / "cache"),
+        )
+        assert results["num_samples_1"] == results["num_samples_2"] == 20
+        assert results["fid"] > 0 and "kid" in results
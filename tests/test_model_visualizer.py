@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the debounced, background generation of the model visualizer. """
+# run with python -m pytest tests/test_model_visualizer.py
+
+import threading
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+from src.medigan.model_visualizer import LatestRequestWorker, ModelVisualizer
+
+
+def _wait_for_result(worker: LatestRequestWorker, timeout: float = 5.0):
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        result = worker.pop_result()
+        if result is not None:
+            return result
+        time.sleep(0.01)
+    raise TimeoutError("The worker did not return a result in time.")
+
+
+class TestModelVisualizer:
+    def test_worker_keeps_only_latest_request(self):
+        is_released = threading.Event()
+        calls = []
+
+        def function(value):
+            is_released.wait()
+            calls.append(value)
+            return value
+
+        worker = LatestRequestWorker(function=function)
+        worker.submit(value=0)
+        time.sleep(0.1)
+        # Requests submitted while the function is running replace each other.
+        for value in range(1, 10):
+            latest_request_id = worker.submit(value=value)
+        is_released.set()
+        result = _wait_for_result(worker)
+        if result[1] == 0:
+            result = _wait_for_result(worker)
+        worker.stop()
+        assert result == (latest_request_id, 9, None)
+        assert calls == [0, 9]
+
+    def test_worker_returns_exceptions(self):
+        def function():
+            raise RuntimeError("Model failure")
+
+        worker = LatestRequestWorker(function=function)
+        worker.submit()
+        _, output, exception = _wait_for_result(worker)
+        worker.stop()
+        assert output is None and isinstance(exception, RuntimeError)
+
+    def test_visualize(self, dummy_model_executor):
+        model_visualizer = ModelVisualizer(
+            model_executor=dummy_model_executor, config=None
+        )
+        gen_function = model_visualizer.gen_function
+        calls = []
+
+        def counting_gen_function(**kwargs):
+            calls.append(kwargs)
+            return gen_function(**kwargs)
+
+        model_visualizer.gen_function = counting_gen_function
+        model_visualizer.visualize(slider_grouper=4, auto_close=True)
+        # Without slider changes, the model generates only the initial image.
+        assert len(calls) == 1
+        model_visualizer.visualize(slider_grouper=4, auto_close=True)
+        assert len(calls) == 2
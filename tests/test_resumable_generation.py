@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the resumable batch-wise generation of the model executor. """
+# run with python -m pytest tests/test_resumable_generation.py
+
+import json
+import os
+
+import pytest
+
+
+class TestResumableGeneration:
+    def test_interrupted_job_is_resumed(self, dummy_model_executor, tmp_path):
+        output_path = str(tmp_path / "job")
+        fail_on_call = {"fail_at": 3}
+        with pytest.raises(RuntimeError):
+            dummy_model_executor.generate(
+                num_samples=10,
+                output_path=output_path,
+                batch_size=3,
+                is_resumable=True,
+                fail_on_call=fail_on_call,
+            )
+        # Batches 0 and 1 were completed before the failure in batch 2.
+        assert len([f for f in os.listdir(output_path) if f.endswith(".npy")]) == 6
+
+        fail_on_call = {"fail_at": -1}
+        dummy_model_executor.generate(
+            num_samples=10,
+            output_path=output_path,
+            batch_size=3,
+            is_resumable=True,
+            fail_on_call=fail_on_call,
+        )
+        # Only the batches 2 and 3 are generated when resuming the job.
+        assert fail_on_call["calls"] == 2
+        assert len([f for f in os.listdir(output_path) if f.endswith(".npy")]) == 10
+
+        with open(os.path.join(output_path, "manifest.jsonl")) as f:
+            lines = [json.loads(line) for line in f]
+        header, entries = lines[0], lines[1:]
+        assert sorted(entry["batch"] for entry in entries) == [0, 1, 2, 3]
+        assert all(
+            entry["seed"] == header["seed"] + entry["batch"] for entry in entries
+        )
+
+    def test_modified_batch_is_generated_again(self, dummy_model_executor, tmp_path):
+        output_path = str(tmp_path / "job")
+        dummy_model_executor.generate(
+            num_samples=4, output_path=output_path, batch_size=2, is_resumable=True
+        )
+        with open(os.path.join(output_path, "batch_1_0.npy"), "wb") as f:
+            f.write(b"corrupted")
+
+        fail_on_call = {"fail_at": -1}
+        dummy_model_executor.generate(
+            num_samples=4,
+            output_path=output_path,
+            batch_size=2,
+            is_resumable=True,
+            fail_on_call=fail_on_call,
+        )
+        assert fail_on_call["calls"] == 1
+        assert len([f for f in os.listdir(output_path) if f.endswith(".npy")]) == 4
+
+    def test_manifest_of_other_job_is_rejected(self, dummy_model_executor, tmp_path):
+        output_path = str(tmp_path / "job")
+        dummy_model_executor.generate(
+            num_samples=4, output_path=output_path, batch_size=2, is_resumable=True
+        )
+        with pytest.raises(ValueError):
+            dummy_model_executor.generate(
+                num_samples=8, output_path=output_path, batch_size=2, is_resumable=True
+            )
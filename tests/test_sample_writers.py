@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the sharded and chunked output formats of the model executor. """
+# run with python -m pytest tests/test_sample_writers.py
+
+import os
+import tarfile
+
+import pytest
+
+
+def _count_samples(output_path: str, output_format: str) -> int:
+    if output_format == "tar":
+        names = []
+        for filename in os.listdir(output_path):
+            if filename.endswith(".tar"):
+                with tarfile.open(os.path.join(output_path, filename)) as tar_file:
+                    names += tar_file.getnames()
+        return len([name for name in names if name.endswith(".sample.npy")])
+    elif output_format == "hdf5":
+        h5py = pytest.importorskip("h5py")
+        with h5py.File(os.path.join(output_path, "samples.h5"), "r") as f:
+            assert f["masks"].shape[0] == f["labels"].shape[0] == f["samples"].shape[0]
+            return f["samples"].shape[0]
+    else:
+        zarr = pytest.importorskip("zarr")
+        group = zarr.open_group(os.path.join(output_path, "samples.zarr"), mode="r")
+        assert group["masks"].shape[0] == group["samples"].shape[0]
+        return group["samples"].shape[0]
+
+
+class TestSampleWriters:
+    @pytest.mark.parametrize("output_format", ["tar", "hdf5", "zarr"])
+    def test_generate_into_output_format(
+        self, dummy_model_executor, tmp_path, output_format
+    ):
+        if output_format != "tar":
+            pytest.importorskip("h5py" if output_format == "hdf5" else "zarr")
+        output_path = str(tmp_path / output_format)
+        dummy_model_executor.generate(
+            num_samples=10,
+            output_path=output_path,
+            batch_size=3,
+            output_format=output_format,
+            samples_per_shard=4,
+            with_masks=True,
+        )
+        assert _count_samples(output_path, output_format) == 10
+        if output_format == "tar":
+            # Shards are closed at batch boundaries once they hold >= 4 samples.
+            assert sorted(os.listdir(output_path)) == [
+                "shard-000000.tar",
+                "shard-000001.tar",
+            ]
+
+    @pytest.mark.parametrize("output_format", ["tar", "hdf5", "zarr"])
+    def test_resume_generation_into_output_format(
+        self, dummy_model_executor, tmp_path, output_format
+    ):
+        if output_format != "tar":
+            pytest.importorskip("h5py" if output_format == "hdf5" else "zarr")
+        output_path = str(tmp_path / output_format)
+        kwargs = dict(
+            num_samples=10,
+            output_path=output_path,
+            batch_size=3,
+            output_format=output_format,
+            samples_per_shard=4,
+            with_masks=True,
+            is_resumable=True,
+        )
+        with pytest.raises(RuntimeError):
+            dummy_model_executor.generate(fail_on_call={"fail_at": 4}, **kwargs)
+        dummy_model_executor.generate(fail_on_call={"fail_at": -1}, **kwargs)
+        assert _count_samples(output_path, output_format) == 10
+        assert not [f for f in os.listdir(output_path) if f.endswith(".tmp")]
+
+    @pytest.mark.parametrize("output_format", ["hdf5", "zarr", "npy"])
+    def test_generate_twice_into_same_store(
+        self, dummy_model_executor, tmp_path, output_format
+    ):
+        if output_format != "npy":
+            pytest.importorskip("h5py" if output_format == "hdf5" else "zarr")
+        output_path = str(tmp_path / output_format)
+        for num_samples in [10, 4]:
+            dummy_model_executor.generate(
+                num_samples=num_samples,
+                output_path=output_path,
+                batch_size=3,
+                output_format=output_format,
+                with_masks=True,
+            )
+        if output_format == "npy":
+            import numpy as np
+
+            assert len(np.load(os.path.join(output_path, "samples.npy"))) == 4
+            assert len(np.load(os.path.join(output_path, "labels.npy"))) == 4
+        else:
+            assert _count_samples(output_path, output_format) == 4
+
+    def test_generate_twice_into_same_shards(self, dummy_model_executor, tmp_path):
+        output_path = str(tmp_path / "tar")
+        for num_samples in [10, 4]:
+            dummy_model_executor.generate(
+                num_samples=num_samples,
+                output_path=output_path,
+                batch_size=3,
+                output_format="tar",
+                samples_per_shard=4,
+            )
+            if num_samples == 10:
+                # An incomplete shard of an interrupted job.
+                open(os.path.join(output_path, "shard-000002.tar.tmp"), "w").close()
+        assert sorted(os.listdir(output_path)) == ["shard-000000.tar"]
+        assert _count_samples(output_path, "tar") == 4
+
+    @pytest.mark.parametrize("is_batched_dict", [False, True])
+    def test_memmap_synthetic_dataset(
+        self, dummy_model_executor, tmp_path, is_batched_dict
+    ):
+        torch = pytest.importorskip("torch")
+        from src.medigan.execute_model.synthetic_dataset import (
+            MemmapSyntheticDataset,
+        )
+
+        output_path = str(tmp_path / "npy")
+        dummy_model_executor.generate(
+            num_samples=10,
+            output_path=output_path,
+            batch_size=3,
+            output_format="npy",
+            with_masks=True,
+            is_batched_dict=is_batched_dict,
+        )
+        dataset = MemmapSyntheticDataset(path=output_path)
+        assert len(dataset) == 10
+        assert dataset[0]["sample"].shape == (16, 16, 1)
+        assert dataset[0]["label"] == "dummy"
+        data_loader = torch.utils.data.DataLoader(dataset, batch_size=4, num_workers=2)
+        assert sum(len(batch["sample"]) for batch in data_loader) == 10
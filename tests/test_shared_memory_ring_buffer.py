@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the shared memory ring buffer transporting generated arrays between processes. """
+# run with python -m pytest tests/test_shared_memory_ring_buffer.py
+
+import multiprocessing
+
+import numpy as np
+
+from src.medigan.shared_memory_ring_buffer import SharedMemoryRingBuffer
+from src.medigan.worker_pool import WorkerPool
+
+from .conftest import DUMMY_EXECUTION_CONFIG, DUMMY_MODEL_ID
+
+
+def _write_in_process(ring_buffer: SharedMemoryRingBuffer, arrays: list, result_queue):
+    result_queue.put(ring_buffer.write(arrays))
+    ring_buffer.close()
+
+
+def _write_in_spawned_process(ring_buffer: SharedMemoryRingBuffer, arrays: list):
+    """Write the `arrays` in a process attaching to the `ring_buffer` by its name, as a worker process does."""
+
+    context = multiprocessing.get_context("spawn")
+    result_queue = context.Queue()
+    process = context.Process(
+        target=_write_in_process, args=(ring_buffer, arrays, result_queue)
+    )
+    process.start()
+    result = result_queue.get(timeout=60)
+    process.join()
+    return result
+
+
+class TestSharedMemoryRingBuffer:
+    def test_write_and_view(self):
+        ring_buffer = SharedMemoryRingBuffer(
+            num_slots=2,
+            slot_shape=(4, 8, 8, 1),
+            context=multiprocessing.get_context("spawn"),
+        )
+        samples = np.arange(3 * 8 * 8, dtype=np.uint8).reshape(3, 8, 8, 1)
+        labels = np.ones(3, dtype=np.int16)
+        slot_index, descriptors = _write_in_spawned_process(
+            ring_buffer, [samples, labels]
+        )
+        views = [
+            ring_buffer.get_view(slot_index, *descriptor) for descriptor in descriptors
+        ]
+        np.testing.assert_array_equal(views[0], samples)
+        np.testing.assert_array_equal(views[1], labels)
+        assert descriptors[1][0] % 64 == 0
+        assert not views[0].flags.owndata
+        assert ring_buffer.write([samples]) is not None
+        # Both slots are in use until they are released.
+        assert ring_buffer.write([samples]) is None
+        ring_buffer.release(slot_index)
+        assert ring_buffer.write([samples])[0] == slot_index
+        # Arrays that are larger than a slot are not written.
+        ring_buffer.release(slot_index)
+        assert ring_buffer.write([np.zeros(1024, dtype=np.uint8)]) is None
+        del views
+        ring_buffer.close()
+
+    def test_worker_pool_zero_copy(self, dummy_model_executor):
+        assert WorkerPool.get_slot_shape([[16, 16], [8, 32, 1]], 4) == (8, 16, 32, 3)
+        with WorkerPool(
+            model_ids=[DUMMY_MODEL_ID],
+            num_workers=1,
+            config_dict={DUMMY_MODEL_ID: {"execution": DUMMY_EXECUTION_CONFIG}},
+            num_slots=2,
+            samples_per_slot=4,
+        ) as pool:
+            for _ in range(3):
+                with pool.submit(
+                    model_id=DUMMY_MODEL_ID,
+                    num_samples=4,
+                    with_masks=True,
+                    is_zero_copy=True,
+                ).result(timeout=60) as result:
+                    assert result["samples"].shape == (4, 16, 16, 1)
+                    assert not result["samples"].flags.owndata
+                    np.testing.assert_array_equal(
+                        result["masks"], (result["samples"] > 127) * 255
+                    )
+            # The arrays of 8 samples do not fit into a slot and are returned via shared memory blocks.
+            result = pool.generate(model_id=DUMMY_MODEL_ID, num_samples=8, timeout=60)
+            assert result["samples"].shape == (8, 16, 16, 1)
+            assert result["samples"].flags.owndata
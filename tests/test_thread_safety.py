@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to stress test the concurrent use of Generators and ModelExecutors from many threads. """
+# run with python -m pytest tests/test_thread_safety.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.medigan.config_manager import ConfigManager
+from src.medigan.generators import Generators
+from src.medigan.tracing import InMemorySpanSink, get_tracer
+
+from .conftest import ZIPPED_MODEL_ID
+
+NUM_THREADS = 16
+
+
+class TestThreadSafety:
+    def test_concurrent_generate(self, zipped_model_config, tmp_path):
+        generators = Generators(
+            config_manager=ConfigManager(config_dict=zipped_model_config)
+        )
+        barrier = threading.Barrier(NUM_THREADS)
+
+        def generate(i: int):
+            barrier.wait()
+            if i % 2 == 0:
+                return generators.generate(
+                    model_id=ZIPPED_MODEL_ID,
+                    num_samples=i + 1,
+                    save_images=False,
+                    image_size=8 + i,
+                )
+            generators.generate(
+                model_id=ZIPPED_MODEL_ID,
+                num_samples=i + 1,
+                output_path=str(tmp_path / str(i)),
+                batch_size=2,
+            )
+            return sorted((tmp_path / str(i)).iterdir())
+
+        sink = InMemorySpanSink()
+        get_tracer().add_sink(sink)
+        try:
+            with ThreadPoolExecutor(max_workers=NUM_THREADS) as executor:
+                results = list(executor.map(generate, range(NUM_THREADS)))
+        finally:
+            get_tracer().remove_sink(sink)
+
+        assert len(generators.model_executors) == 1
+        span_names = [span.name for span in sink.spans]
+        assert span_names.count("utils.unzip_archive") == 1
+        assert span_names.count("model_executor.import_module") == 1
+        for i, result in enumerate(results):
+            assert len(result) == i + 1
+            if i % 2 == 0:
+                assert all(sample.shape == (8 + i, 8 + i, 1) for sample in result)
+
+    def test_concurrent_generate_function_calls(self, dummy_model_executor):
+        gen = dummy_model_executor.generate(
+            num_samples=1, save_images=False, is_gen_function_returned=True
+        )
+        barrier = threading.Barrier(NUM_THREADS)
+
+        def call(i: int):
+            barrier.wait()
+            return gen(num_samples=i + 1, image_size=4 + i)
+
+        with ThreadPoolExecutor(max_workers=NUM_THREADS) as executor:
+            results = list(executor.map(call, range(NUM_THREADS)))
+        for i, samples in enumerate(results):
+            assert len(samples) == i + 1
+            assert samples[0].shape == (4 + i, 4 + i, 1)
+        assert dummy_model_executor._num_generate_calls == NUM_THREADS
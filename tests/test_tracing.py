@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the tracing of the stages of the model lifecycle. """
+# run with python -m pytest tests/test_tracing.py
+
+import json
+import zipfile
+
+import pytest
+
+from src.medigan.tracing import (
+    InMemorySpanSink,
+    JsonLinesSpanSink,
+    Tracer,
+    get_tracer,
+)
+from src.medigan.utils import Utils
+
+
+@pytest.fixture()
+def span_sink():
+    sink = InMemorySpanSink()
+    get_tracer().add_sink(sink)
+    yield sink
+    get_tracer().remove_sink(sink)
+
+
+class TestTracing:
+    def test_nested_spans(self):
+        sink = InMemorySpanSink()
+        tracer = Tracer(sinks=[sink])
+        with tracer.span("outer", model_id="a") as outer:
+            with tracer.span("inner") as inner:
+                inner.add("bytes", 10)
+                inner.add("bytes", 5)
+        with pytest.raises(ValueError):
+            with tracer.span("failing"):
+                raise ValueError("Failure")
+        assert [span.name for span in sink.spans] == ["inner", "outer", "failing"]
+        assert inner.parent_id == outer.span_id and inner.trace_id == outer.trace_id
+        assert outer.parent_id is None and outer.attributes == {"model_id": "a"}
+        assert inner.attributes["bytes"] == 15
+        assert outer.duration >= inner.duration >= 0
+        assert sink.spans[-1].error == "ValueError: Failure"
+        assert tracer.get_current_span() is None
+
+    def test_disabled_tracer_creates_no_spans(self):
+        tracer = Tracer()
+        with tracer.span("stage") as span:
+            span.add("bytes", 1)
+        assert not tracer.is_enabled
+
+    def test_json_lines_sink(self, tmp_path):
+        path = str(tmp_path / "traces" / "spans.jsonl")
+        tracer = Tracer(sinks=[JsonLinesSpanSink(path)])
+        for _ in range(2):
+            with tracer.span("stage", num_samples=3):
+                pass
+        with open(path) as f:
+            spans = [json.loads(line) for line in f]
+        assert len(spans) == 2
+        assert (
+            spans[0]["name"] == "stage" and spans[0]["attributes"]["num_samples"] == 3
+        )
+
+    def test_unzip_archive_is_traced(self, span_sink, tmp_path):
+        archive_path = str(tmp_path / "archive.zip")
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.writestr("a.txt", "a" * 100)
+            archive.writestr("b.txt", "b" * 50)
+        Utils.unzip_archive(archive_path, str(tmp_path / "unzipped"))
+        (span,) = span_sink.spans
+        assert span.name == "utils.unzip_archive"
+        assert span.attributes["num_files"] == 2 and span.attributes["bytes"] == 150
+
+    def test_generation_is_traced(self, dummy_model_executor, span_sink, tmp_path):
+        dummy_model_executor.generate(
+            num_samples=5, output_path=str(tmp_path / "files"), batch_size=2
+        )
+        dummy_model_executor.generate(
+            num_samples=4,
+            output_path=str(tmp_path / "shards"),
+            batch_size=4,
+            output_format="tar",
+        )
+        generate_calls = [
+            span
+            for span in span_sink.spans
+            if span.name == "model_executor.generate_call"
+        ]
+        assert [span.attributes["num_samples"] for span in generate_calls] == [
+            2,
+            2,
+            1,
+            4,
+        ]
+        assert generate_calls[0].attributes["is_first_call"]
+        assert not generate_calls[1].attributes["is_first_call"]
+        move_spans = [
+            span
+            for span in span_sink.spans
+            if span.name == "model_executor.move_batch_files"
+        ]
+        assert sum(span.attributes["num_files"] for span in move_spans) == 5
+        (write_span,) = [
+            span for span in span_sink.spans if span.name == "sample_writer.write"
+        ]
+        assert write_span.attributes["num_samples"] == 4
+        assert write_span.attributes["bytes"] == 4 * 16 * 16
+        assert "model_executor.generate_call" in span_sink.get_durations()
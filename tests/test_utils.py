@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the data handling functions of the Utils class. """
+# run with python -m pytest tests/test_utils.py
+
+import numpy as np
+import pytest
+
+from src.medigan.utils import Utils
+
+
+class TestSplitImagesMasksAndLabels:
+    def test_split_list_of_tuples(self):
+        data = [
+            (np.zeros((4, 4, 1)), np.ones((4, 4, 1)), None, "label") for _ in range(3)
+        ]
+        (
+            samples,
+            masks,
+            other_imaging_output,
+            labels,
+        ) = Utils.split_images_masks_and_labels(data=data, num_samples=3)
+        assert len(samples) == len(masks) == len(labels) == 3
+        assert other_imaging_output is None
+
+    def test_split_batched_dict(self):
+        data = {
+            "samples": np.zeros((3, 4, 4, 1)),
+            "masks": np.ones((3, 4, 4, 1)),
+            "labels": ["a", "b", "c"],
+        }
+        (
+            samples,
+            masks,
+            other_imaging_output,
+            labels,
+        ) = Utils.split_images_masks_and_labels(data=data, num_samples=3)
+        # The stacked arrays are passed through without copies.
+        assert samples is data["samples"] and masks is data["masks"]
+        assert other_imaging_output is None
+        assert labels == ["a", "b", "c"]
+
+    def test_split_batched_dict_with_inconsistent_lengths(self):
+        with pytest.raises(ValueError):
+            Utils.split_images_masks_and_labels(
+                data={"samples": np.zeros((3, 4, 4, 1)), "labels": ["a"]},
+                num_samples=3,
+            )
+
+
+class TestPixelValueChecks:
+    def test_has_more_than_n_diff_pixel_values(self):
+        mask = np.zeros((64, 64), dtype=np.uint8)
+        mask[10:20, 10:20] = 255
+        image = np.arange(64 * 64, dtype=np.float32).reshape(64, 64)
+        assert not Utils.has_more_than_n_diff_pixel_values(mask)
+        assert Utils.has_more_than_n_diff_pixel_values(image)
+        # Distinct values spread over several chunks are counted across chunks.
+        image = np.repeat(np.arange(5, dtype=np.uint8), 100)
+        assert Utils.has_more_than_n_diff_pixel_values(image, n=4, chunk_size=10)
+        assert not Utils.has_more_than_n_diff_pixel_values(image, n=5, chunk_size=10)
+
+    def test_have_more_than_n_diff_pixel_values(self):
+        images = np.zeros((3, 8, 8, 1), dtype=np.uint8)
+        images[1] = np.arange(64, dtype=np.uint8).reshape(8, 8, 1)
+        images[2, :4] = 1
+        result = Utils.have_more_than_n_diff_pixel_values(images, n=4)
+        assert result.tolist() == [False, True, False]
+        assert [
+            Utils.has_more_than_n_diff_pixel_values(image, n=4) for image in images
+        ] == result.tolist()
+        # Masks are checked beyond the first chunk of pixels.
+        images[0].flat[-3:] = [1, 2, 3]
+        result = Utils.have_more_than_n_diff_pixel_values(images, n=4, chunk_size=8)
+        assert result.tolist() == [False, True, False]
+        images[0].flat[-4:] = [1, 2, 3, 4]
+        result = Utils.have_more_than_n_diff_pixel_values(images, n=4, chunk_size=8)
+        assert result.tolist() == [True, True, False]
+
+    def test_split_images_and_masks_no_ordering(self):
+        image = np.random.rand(8, 8).astype(np.float32)
+        mask = (image > 0.5).astype(np.uint8)
+        images, masks = Utils.split_images_and_masks_no_ordering(
+            data=[(image, mask), (image, mask)], num_samples=2
+        )
+        assert len(images) == len(masks) == 2
+        # Float arrays with few values are dropped from tuples but kept as bare data points.
+        constant = np.zeros((8, 8), dtype=np.float32)
+        images, masks = Utils.split_images_and_masks_no_ordering(
+            data=[(image, mask, constant), constant, mask], num_samples=3
+        )
+        assert [len(images), len(masks)] == [2, 2]
+        assert images[1] is constant and masks[1] is mask
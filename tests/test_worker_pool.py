@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# ! /usr/bin/env python
+""" script to test the persistent worker pool serving generation tasks with preloaded models. """
+# run with python -m pytest tests/test_worker_pool.py
+
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from src.medigan.worker_pool import WorkerPool, _to_shared_memory
+
+from .conftest import DUMMY_EXECUTION_CONFIG, DUMMY_MODEL_ID
+
+
+class TestWorkerPool:
+    def test_generate(self, dummy_model_executor):
+        with WorkerPool(
+            model_ids=[DUMMY_MODEL_ID],
+            num_workers=2,
+            config_dict={DUMMY_MODEL_ID: {"execution": DUMMY_EXECUTION_CONFIG}},
+        ) as pool:
+            futures = [
+                pool.submit(model_id=DUMMY_MODEL_ID, num_samples=3, with_masks=True)
+                for _ in range(4)
+            ]
+            results = [future.result(timeout=60) for future in futures]
+            for result in results:
+                assert result["samples"].shape == (3, 16, 16, 1)
+                assert result["masks"].shape == (3, 16, 16, 1)
+                assert result["other_imaging_output"] is None
+                assert result["labels"] == ["dummy"] * 3
+            assert not np.array_equal(results[0]["samples"], results[1]["samples"])
+            result = pool.generate(model_id=DUMMY_MODEL_ID, num_samples=2, timeout=60)
+            assert result["samples"].shape == (2, 16, 16, 1)
+            assert result["masks"] is None
+            with pytest.raises(RuntimeError, match="Dummy model failure"):
+                pool.generate(
+                    model_id=DUMMY_MODEL_ID,
+                    num_samples=1,
+                    timeout=60,
+                    fail_on_call={"fail_at": 1},
+                )
+        with pytest.raises(RuntimeError):
+            pool.submit(model_id=DUMMY_MODEL_ID)
+
+    def test_failed_model_loading(self):
+        with pytest.raises(RuntimeError, match="could not load"):
+            WorkerPool(
+                model_ids=["unknown_model"],
+                num_workers=1,
+                config_dict={DUMMY_MODEL_ID: {"execution": DUMMY_EXECUTION_CONFIG}},
+            ).start(timeout=60)
+
+    @pytest.mark.parametrize("num_slots", [0, 4])
+    def test_close_returns_results_of_queued_tasks(
+        self, dummy_model_executor, num_slots
+    ):
+        pool = WorkerPool(
+            model_ids=[DUMMY_MODEL_ID],
+            num_workers=2,
+            config_dict={DUMMY_MODEL_ID: {"execution": DUMMY_EXECUTION_CONFIG}},
+            num_slots=num_slots,
+        ).start(timeout=60)
+        futures = [
+            pool.submit(model_id=DUMMY_MODEL_ID, num_samples=2, is_zero_copy=True)
+            for _ in range(6)
+        ]
+        pool.close()
+        for future in futures:
+            assert future.result(timeout=0)["samples"].shape == (2, 16, 16, 1)
+
+    def test_worker_exit_fails_only_its_tasks(self, dummy_model_executor):
+        pool = WorkerPool(
+            model_ids=[DUMMY_MODEL_ID],
+            num_workers=2,
+            config_dict={DUMMY_MODEL_ID: {"execution": DUMMY_EXECUTION_CONFIG}},
+            num_slots=0,
+        ).start(timeout=60)
+        try:
+            futures = {"dead": Future(), "alive": Future()}
+            with pool._lock:
+                pool._futures.update(
+                    {task_id: (future, False) for task_id, future in futures.items()}
+                )
+            pool._result_queue.put(("dead", 0, None, None))
+            pool._result_queue.put(("alive", 1, None, None))
+            pool.processes[0].kill()
+            pool.processes[0].join()
+            with pytest.raises(RuntimeError, match="exited unexpectedly"):
+                futures["dead"].result(timeout=10)
+            assert not futures["alive"].done()
+            with pytest.raises(RuntimeError, match="exited unexpectedly"):
+                pool.submit(model_id=DUMMY_MODEL_ID)
+
+            # The result of a failed task is released and does not stop the result thread.
+            samples = np.arange(4, dtype=np.uint8).reshape(1, 2, 2, 1)
+            outputs = {"masks": None, "other_imaging_output": None, "labels": None}
+            block_name = _to_shared_memory(samples)[0]
+            pool._result_queue.put(
+                (
+                    "dead",
+                    0,
+                    {**outputs, "samples": (block_name, (1, 2, 2, 1), "|u1")},
+                    None,
+                )
+            )
+            pool._result_queue.put(
+                ("alive", 1, {**outputs, "samples": _to_shared_memory(samples)}, None)
+            )
+            assert np.array_equal(
+                futures["alive"].result(timeout=10)["samples"], samples
+            )
+            assert pool._result_thread.is_alive()
+            with pytest.raises(FileNotFoundError):
+                shared_memory.SharedMemory(name=block_name)
+        finally:
+            pool.processes[1].kill()
+            pool.close()